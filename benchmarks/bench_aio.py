@@ -0,0 +1,77 @@
+"""
+Latency and throughput of postal.aio under a synthetic load: a number of
+concurrent clients each send requests back to back, with and without
+micro-batching.
+
+Usage:
+    python benchmarks/bench_aio.py [--clients N] [--requests N] [--workers N]
+"""
+import argparse
+import asyncio
+import time
+
+from postal.aio import AsyncPostal
+
+ADDRESSES = [
+    '781 Franklin Ave Crown Heights Brooklyn NYC NY 11216 USA',
+    'The Book Club 100-106 Leonard St, Shoreditch, London, Greater London, EC2A 4RH, United Kingdom',
+    'Friedrichstraße 128, 10117 Berlin, Germany',
+    '92 Avenue des Champs-Élysées, 75008 Paris, France',
+    'Via Nazionale 51, 00184 Roma RM, Italia',
+    'Calle de Alcalá 42, 28014 Madrid, España',
+]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100.0))]
+
+
+async def client(postal, method, client_id, num_requests, latencies):
+    for i in range(num_requests):
+        address = ADDRESSES[(client_id + i) % len(ADDRESSES)]
+        start = time.perf_counter()
+        await method(postal)(address)
+        latencies.append(time.perf_counter() - start)
+
+
+async def load(method, clients, requests_per_client, **kw):
+    async with AsyncPostal(**kw) as postal:
+        # Load any models before timing
+        await method(postal)(ADDRESSES[0])
+
+        latencies = []
+        start = time.perf_counter()
+        await asyncio.gather(*[client(postal, method, i, requests_per_client, latencies) for i in range(clients)])
+        seconds = time.perf_counter() - start
+        return latencies, seconds, postal.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--clients', type=int, default=256)
+    parser.add_argument('--requests', type=int, default=100, help='requests per client')
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    methods = [
+        ('parse_address', lambda postal: postal.parse_address),
+        ('expand_address', lambda postal: (lambda address: postal.expand_address(address, languages=['en']))),
+    ]
+    configs = [
+        ('unbatched', dict(max_batch_size=1)),
+        ('batched', dict()),
+    ]
+
+    for name, method in methods:
+        print(name)
+        for config_name, kw in configs:
+            latencies, seconds, stats = asyncio.run(load(method, args.clients, args.requests,
+                                                         max_workers=args.workers, **kw))
+            print('  {:<10s} {:>10,.0f} req/s  p50 {:8.3f} ms  p99 {:8.3f} ms  {:.1f} req/batch'.format(
+                config_name, len(latencies) / seconds, percentile(latencies, 50) * 1000,
+                percentile(latencies, 99) * 1000, float(stats.requests) / max(stats.batches, 1)))
+
+
+if __name__ == '__main__':
+    main()
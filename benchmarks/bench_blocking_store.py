@@ -0,0 +1,85 @@
+"""
+Build a BlockingStore from synthetic records in a number of daily batches and
+measure ingest rate, merge time, batch lookup rate and the memory the lookups
+need compared with the size of the store on disk.
+
+Usage:
+    python benchmarks/bench_blocking_store.py [--rows N] [--batches N] [--queries N] [--path DIR]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from postal.blocking_store import BlockingStore
+
+LABELS = ['house_number', 'road', 'city', 'postcode']
+STREETS = [
+    ('Franklin Ave', 'Brooklyn', '11216', 40.67, -73.96),
+    ('Leonard St', 'London', 'EC2A 4RH', 51.52, -0.08),
+    ('Friedrichstraße', 'Berlin', '10117', 52.51, 13.39),
+    ('Avenue des Champs-Élysées', 'Paris', '75008', 48.87, 2.31),
+]
+
+
+def record(i):
+    road, city, postcode, lat, lon = STREETS[i % len(STREETS)]
+    number = str(i // len(STREETS) % 5000)
+    return LABELS, [number, '{} {}'.format(road, i // 20000), city, postcode], lat, lon
+
+
+def directory_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--batches', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=10000)
+    parser.add_argument('--path', default=None, help='store directory, a temporary one by default')
+    args = parser.parse_args()
+
+    path = args.path or os.path.join(tempfile.mkdtemp(), 'store')
+    try:
+        store = BlockingStore(path, languages=['en'], max_segments=args.batches + 1)
+        per_batch = args.rows // args.batches
+
+        start = time.perf_counter()
+        for batch in range(args.batches):
+            for i in range(batch * per_batch, (batch + 1) * per_batch):
+                labels, values, lat, lon = record(i)
+                store.add(i, labels, values, latitude=lat, longitude=lon)
+            store.flush()
+        seconds = time.perf_counter() - start
+        print('ingest   {:>10,.0f} records/s  {}'.format(per_batch * args.batches / seconds, store.stats()))
+
+        queries = [record(random.randrange(args.rows)) for _ in range(args.queries)]
+
+        for name in ('segmented', 'merged'):
+            if name == 'merged':
+                start = time.perf_counter()
+                store.merge()
+                print('merge    {:>10.2f} s'.format(time.perf_counter() - start))
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            results = store.candidates_batch(queries)
+            seconds = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            mean_candidates = sum(len(r) for r in results) / float(len(results))
+            print('{:<8s} {:>10,.0f} lookups/s  {:.1f} candidates/lookup  peak {:,} bytes, store {:,} bytes'.format(
+                name, len(queries) / seconds, mean_candidates, peak, directory_bytes(path)))
+        store.close()
+    finally:
+        if args.path is None:
+            shutil.rmtree(os.path.dirname(path))
+
+
+if __name__ == '__main__':
+    main()
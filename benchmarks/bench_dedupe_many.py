@@ -0,0 +1,65 @@
+"""
+Compare is_*_duplicate one pair at a time with the vectorized
+is_*_duplicate_many, with and without a shared value table.
+
+Usage:
+    python benchmarks/bench_dedupe_many.py [--pairs N]
+"""
+import argparse
+import random
+import time
+from array import array
+
+from postal.dedupe import is_name_duplicate, is_name_duplicate_many
+
+NAMES = [
+    'Whole Foods Market',
+    'Whole Foods',
+    "Trader Joe's",
+    'Trader Joes',
+    'Brooklyn Public Library',
+    'Brooklyn Public Library - Central Branch',
+    'St. Mary\'s Hospital',
+    'Saint Marys Hospital',
+]
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--pairs', type=int, default=200000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    indexes1 = array('I', (rng.randrange(len(NAMES)) for _ in range(args.pairs)))
+    indexes2 = array('I', (rng.randrange(len(NAMES)) for _ in range(args.pairs)))
+    values1 = [NAMES[i] for i in indexes1]
+    values2 = [NAMES[i] for i in indexes2]
+    languages = ['en']
+
+    # Load any models before timing
+    is_name_duplicate(NAMES[0], NAMES[1], languages=languages)
+
+    cases = [
+        ('is_name_duplicate', lambda: [is_name_duplicate(v1, v2, languages=languages)
+                                       for v1, v2 in zip(values1, values2)]),
+        ('is_name_duplicate_many', lambda: is_name_duplicate_many(values1, values2, languages=languages)),
+        ('is_name_duplicate_many table', lambda: is_name_duplicate_many(indexes1, indexes2, languages=languages,
+                                                                        table=NAMES)),
+    ]
+
+    baseline = None
+    for name, func in cases:
+        seconds = timed(func)
+        if baseline is None:
+            baseline = seconds
+        print('{:<30s} {:>12,.0f} pairs/s  {:.2f}x'.format(name, args.pairs / seconds, baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Compare the per-call cost of expand_address, expand_address_root and
+name_hashes with keyword options against a precompiled ExpandOptions.
+
+Usage:
+    python benchmarks/bench_expand_options.py [--rows N] [--repeat N]
+"""
+import argparse
+import time
+
+from postal.expand import (expand_address, expand_address_root, ExpandOptions,
+                           ADDRESS_NAME, ADDRESS_STREET)
+from postal.near_dupe import name_hashes
+
+ADDRESSES = [
+    '781 Franklin Ave Crown Heights Brooklyn NYC NY 11216 USA',
+    '30 W 26th St Fl 7',
+    'MAPLE ST.',
+    'ST ISIDORE DR',
+    '123 Dr. MLK Jr. Dr.',
+    'E 106TH ST',
+]
+
+KEYWORDS = dict(languages=['en'], lowercase=True, delete_final_periods=True, roman_numerals=False)
+NAME_KEYWORDS = dict(KEYWORDS, address_components=ADDRESS_NAME | ADDRESS_STREET)
+
+
+def best_of(func, rows, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for row in rows:
+            func(row)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rows = [ADDRESSES[i % len(ADDRESSES)] for i in range(args.rows)]
+
+    options = ExpandOptions(**KEYWORDS)
+    name_options = ExpandOptions(**NAME_KEYWORDS)
+
+    cases = [
+        ('expand_address',
+         lambda s: expand_address(s, **KEYWORDS),
+         lambda s: expand_address(s, options=options)),
+        ('expand_address_root',
+         lambda s: expand_address_root(s, **KEYWORDS),
+         lambda s: expand_address_root(s, options=options)),
+        ('name_hashes',
+         lambda s: name_hashes(s, **NAME_KEYWORDS),
+         lambda s: name_hashes(s, options=name_options)),
+    ]
+
+    for name, with_keywords, with_options in cases:
+        # Load any models before timing
+        with_keywords(ADDRESSES[0])
+
+        keywords_us = best_of(with_keywords, rows, args.repeat) * 1e6
+        options_us = best_of(with_options, rows, args.repeat) * 1e6
+        print('{:<20s} keywords {:8.2f} us/call  ExpandOptions {:8.2f} us/call  saved {:6.2f} us/call ({:.1f}%)'.format(
+            name, keywords_us, options_us, keywords_us - options_us, 100.0 * (keywords_us - options_us) / keywords_us))
+
+
+if __name__ == '__main__':
+    main()
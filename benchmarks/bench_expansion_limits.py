@@ -0,0 +1,74 @@
+"""
+Latency percentiles and peak Python memory of expand_address over a mix of
+ordinary addresses and inputs which expand combinatorially, with and without
+max_expansions/max_input_bytes.
+
+Usage:
+    python benchmarks/bench_expansion_limits.py [--rows N] [--max-expansions N] [--max-input-bytes N]
+"""
+import argparse
+import time
+import tracemalloc
+
+from postal.expand import expand_address
+
+ADDRESSES = [
+    '781 Franklin Ave Crown Heights Brooklyn NYC NY 11216 USA',
+    '30 W 26th St Fl #7',
+    'Friedrichstraße 128, 10117 Berlin, Germany',
+]
+# Ambiguous abbreviations, Roman numerals and hyphens
+PATHOLOGICAL = [
+    'St. St-St. Ste. C-I Ave-St. Dr. Dr. St. Pt. Mt. Ft. St. II-IV St. Ste. V Dr-St',
+    'E-W N-S St. St. Ste. Ft. VI-X Dr. Cir. Ct. Pl. Pk. I-V Blvd. St-Ste Mt-Ft',
+]
+OPTIONS = dict(languages=['en'], roman_numerals=True, replace_word_hyphens=True, delete_word_hyphens=True,
+               replace_numeric_hyphens=True, delete_numeric_hyphens=True)
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run(rows, **kw):
+    latencies = []
+    rejected = 0
+    tracemalloc.start()
+    for address in rows:
+        start = time.perf_counter()
+        try:
+            expand_address(address, **kw)
+        except ValueError:
+            rejected += 1
+        latencies.append(time.perf_counter() - start)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    latencies.sort()
+    return latencies, peak, rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--max-expansions', type=int, default=16)
+    parser.add_argument('--max-input-bytes', type=int, default=None)
+    args = parser.parse_args()
+
+    # One pathological input per 50 ordinary ones
+    rows = [PATHOLOGICAL[i // 50 % len(PATHOLOGICAL)] if i % 50 == 49 else ADDRESSES[i % len(ADDRESSES)]
+            for i in range(args.rows)]
+
+    cases = [
+        ('unbounded', dict(OPTIONS)),
+        ('bounded', dict(OPTIONS, max_expansions=args.max_expansions, max_input_bytes=args.max_input_bytes)),
+    ]
+
+    for name, kw in cases:
+        latencies, peak, rejected = run(rows, **kw)
+        print('{:<10s} p50 {:>8.1f}us  p99 {:>8.1f}us  p99.9 {:>8.1f}us  peak {:,} bytes  rejected {}'.format(
+            name, percentile(latencies, 0.5) * 1e6, percentile(latencies, 0.99) * 1e6,
+            percentile(latencies, 0.999) * 1e6, peak, rejected))
+
+
+if __name__ == '__main__':
+    main()
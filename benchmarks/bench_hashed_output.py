@@ -0,0 +1,56 @@
+"""
+Compare string output with output="hash64" and output="hash128" for
+expand_address and near_dupe_hashes: calls per second and memory held by the
+results for a large set of records.
+
+Usage:
+    python benchmarks/bench_hashed_output.py [--rows N]
+"""
+import argparse
+import time
+import tracemalloc
+
+from postal.expand import expand_address
+from postal.near_dupe import near_dupe_hashes
+
+RECORDS = [
+    (['house_number', 'road', 'city', 'postcode'], ['781', 'Franklin Ave', 'Brooklyn', '11216']),
+    (['name', 'house_number', 'road', 'postcode'], ['The Book Club', '100-106', 'Leonard St', 'EC2A 4RH']),
+    (['house_number', 'road', 'city', 'postcode'], ['128', 'Friedrichstraße', 'Berlin', '10117']),
+    (['house_number', 'road', 'city', 'postcode'], ['92', 'Avenue des Champs-Élysées', 'Paris', '75008']),
+]
+
+
+def measure(func, rows):
+    start = time.perf_counter()
+    for row in rows:
+        func(row)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    results = [func(row) for row in rows]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    return len(rows) / seconds, current / float(len(rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    args = parser.parse_args()
+
+    rows = [RECORDS[i % len(RECORDS)] for i in range(args.rows)]
+
+    for output in ('strings', 'hash64', 'hash128'):
+        cases = [
+            ('expand_address', lambda row: expand_address(' '.join(row[1]), output=output)),
+            ('near_dupe_hashes', lambda row: near_dupe_hashes(row[0], row[1], output=output)),
+        ]
+        for name, func in cases:
+            rate, memory = measure(func, rows)
+            print('{:<18s} {:<8s} {:>10,.0f} calls/s  {:8.1f} bytes/result'.format(name, output, rate, memory))
+
+
+if __name__ == '__main__':
+    main()
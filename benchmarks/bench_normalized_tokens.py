@@ -0,0 +1,66 @@
+"""
+Compare the old normalized_tokens path (remove_parens and token_types.from_id in
+Python) with paren stripping and type mapping in C, and the batch version, on
+long inputs.
+
+Usage:
+    python benchmarks/bench_normalized_tokens.py [--rows N] [--repeat N] [--batch-size N]
+"""
+import argparse
+import time
+
+from postal import _normalize
+from postal.normalize import normalized_tokens, normalized_tokens_batch, remove_parens, DEFAULT_STRING_OPTIONS, \
+    DEFAULT_TOKEN_OPTIONS
+from postal.token_types import token_types
+
+ADDRESSES = [
+    'The Book Club (upstairs) 100-106 Leonard St, Shoreditch, London, Greater London, EC2A 4RH, United Kingdom',
+    'Friedrichstraße 128 (Hinterhaus, 3. OG), 10117 Berlin, Germany',
+    '781 Franklin Ave (at Lefferts Ave) Crown Heights Brooklyn NYC NY 11216 USA',
+    '92 Avenue des Champs-Élysées (entrée B), 75008 Paris, France',
+]
+
+
+def python_normalized_tokens(s):
+    tokens = _normalize.normalized_tokens(s, DEFAULT_STRING_OPTIONS, DEFAULT_TOKEN_OPTIONS, False)
+    return [(t, token_types.from_id(c)) for t, c in remove_parens(tokens)]
+
+
+def timed(func, rows):
+    start = time.perf_counter()
+    func(rows)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=8, help='addresses joined into each input')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    rows = [' '.join(ADDRESSES[(i + j) % len(ADDRESSES)] for j in range(args.repeat)) for i in range(args.rows)]
+    tokens = sum(len(normalized_tokens(s)) for s in rows[:100]) / float(min(len(rows), 100) or 1)
+    print('{:,} rows, {:.0f} tokens per row after stripping'.format(len(rows), tokens))
+
+    def batched(rows):
+        for i in range(0, len(rows), args.batch_size):
+            normalized_tokens_batch(rows[i:i + args.batch_size])
+
+    cases = [
+        ('python remove_parens', lambda rows: [python_normalized_tokens(s) for s in rows]),
+        ('normalized_tokens', lambda rows: [normalized_tokens(s) for s in rows]),
+        ('normalized_tokens_batch', batched),
+    ]
+
+    baseline = None
+    for name, func in cases:
+        seconds = timed(func, rows)
+        if baseline is None:
+            baseline = seconds
+        print('{:<24s} {:>12,.0f} rows/s  {:.2f}x'.format(name, len(rows) / seconds, baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
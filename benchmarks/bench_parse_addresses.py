@@ -0,0 +1,59 @@
+"""
+Compare parse_addresses (one C call per chunk) against calling parse_address
+in a loop.
+
+Usage:
+    python benchmarks/bench_parse_addresses.py [--rows N] [--chunk-size N]
+"""
+import argparse
+import time
+
+from postal.parser import parse_address, parse_addresses
+
+ADDRESSES = [
+    '781 Franklin Ave Crown Heights Brooklyn NYC NY 11216 USA',
+    'The Book Club 100-106 Leonard St, Shoreditch, London, Greater London, EC2A 4RH, United Kingdom',
+    'Friedrichstraße 128, 10117 Berlin, Germany',
+    '92 Avenue des Champs-Élysées, 75008 Paris, France',
+    'Via Nazionale 51, 00184 Roma RM, Italia',
+    'Calle de Alcalá 42, 28014 Madrid, España',
+]
+
+
+def run(func, rows):
+    start = time.perf_counter()
+    func(rows)
+    return time.perf_counter() - start
+
+
+def single_calls(rows):
+    for address in rows:
+        parse_address(address)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rows = [ADDRESSES[i % len(ADDRESSES)] for i in range(args.rows)]
+
+    def batched(rows):
+        for _ in parse_addresses(rows, chunk_size=args.chunk_size):
+            pass
+
+    # Load the parser model before timing anything
+    parse_address(ADDRESSES[0])
+
+    single = min(run(single_calls, rows) for _ in range(args.repeat))
+    batch = min(run(batched, rows) for _ in range(args.repeat))
+
+    print('parse_address loop:  {:.3f}s  {:,.0f} rows/s'.format(single, args.rows / single))
+    print('parse_addresses:     {:.3f}s  {:,.0f} rows/s'.format(batch, args.rows / batch))
+    print('speedup:             {:.2f}x'.format(single / batch))
+
+
+if __name__ == '__main__':
+    main()
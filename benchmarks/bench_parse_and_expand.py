@@ -0,0 +1,69 @@
+"""
+Compare parse_address followed by expand_address on each component (with the
+address components for its label) in Python, with parse_and_expand and
+parse_and_expand_batch.
+
+Usage:
+    python benchmarks/bench_parse_and_expand.py [--rows N] [--batch-size N] [--languages en,fr]
+"""
+import argparse
+import time
+
+from postal import expand
+from postal.expand import expand_address
+from postal.parser import parse_address, parse_and_expand, parse_and_expand_batch
+
+ADDRESSES = [
+    '781 Franklin Ave Crown Heights Brooklyn NYC NY 11216 USA',
+    'The Book Club 100-106 Leonard St, Shoreditch, London, Greater London, EC2A 4RH, United Kingdom',
+    'Friedrichstraße 128, 10117 Berlin, Germany',
+    '92 Avenue des Champs-Élysées, 75008 Paris, France',
+]
+
+LABEL_COMPONENTS = {
+    'house': expand.ADDRESS_NAME,
+    'house_number': expand.ADDRESS_HOUSE_NUMBER,
+    'road': expand.ADDRESS_STREET,
+    'unit': expand.ADDRESS_UNIT,
+    'postcode': expand.ADDRESS_POSTAL_CODE,
+}
+
+
+def python_parse_and_expand(address, languages):
+    return [(component, label, expand_address(component, languages=languages,
+                                              address_components=LABEL_COMPONENTS.get(label, expand.ADDRESS_TOPONYM)))
+            for component, label in parse_address(address)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--languages', default=None, help='comma-separated, classified per address by default')
+    args = parser.parse_args()
+
+    languages = args.languages.split(',') if args.languages else None
+    rows = [ADDRESSES[i % len(ADDRESSES)] for i in range(args.rows)]
+
+    def batched(rows):
+        for i in range(0, len(rows), args.batch_size):
+            parse_and_expand_batch(rows[i:i + args.batch_size], languages=languages)
+
+    cases = [
+        ('python parse + expand', lambda rows: [python_parse_and_expand(a, languages) for a in rows]),
+        ('parse_and_expand', lambda rows: [parse_and_expand(a, languages=languages) for a in rows]),
+        ('parse_and_expand_batch', batched),
+    ]
+
+    baseline = None
+    for name, func in cases:
+        start = time.perf_counter()
+        func(rows)
+        seconds = time.perf_counter() - start
+        if baseline is None:
+            baseline = seconds
+        print('{:<24s} {:>10,.0f} addresses/s  {:.2f}x'.format(name, len(rows) / seconds, baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Compare the list of (component, label) tuples returned by parse_address with
+the compact ParsedAddress: time per parse, allocations per parse and memory
+held by a large set of results.
+
+Usage:
+    python benchmarks/bench_parsed_address.py [--rows N]
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+
+from postal.parser import parse_address, parse_addresses
+
+ADDRESSES = [
+    '781 Franklin Ave Crown Heights Brooklyn NYC NY 11216 USA',
+    'The Book Club 100-106 Leonard St, Shoreditch, London, Greater London, EC2A 4RH, United Kingdom',
+    'Friedrichstraße 128, 10117 Berlin, Germany',
+    '92 Avenue des Champs-Élysées, 75008 Paris, France',
+    'Via Nazionale 51, 00184 Roma RM, Italia',
+    'Calle de Alcalá 42, 28014 Madrid, España',
+]
+
+
+def allocations_per_call(func, rows):
+    # Blocks still allocated after the call, i.e. the size of the kept result in objects
+    results = []
+    before = sys.getallocatedblocks()
+    for address in rows:
+        results.append(func(address))
+    return (sys.getallocatedblocks() - before) / float(len(rows))
+
+
+def retained_bytes(compact, rows):
+    tracemalloc.start()
+    results = list(parse_addresses(rows, compact=compact))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    args = parser.parse_args()
+
+    rows = [ADDRESSES[i % len(ADDRESSES)] for i in range(args.rows)]
+
+    for name, compact in (('list of tuples', False), ('ParsedAddress', True)):
+        func = lambda address: parse_address(address, compact=compact)
+
+        start = time.perf_counter()
+        for address in rows:
+            func(address)
+        seconds = time.perf_counter() - start
+
+        blocks = allocations_per_call(func, rows)
+        memory = retained_bytes(compact, rows)
+        print('{:<16s} {:>10,.0f} parses/s  {:6.1f} blocks/result  {:8.1f} bytes/result'.format(
+            name, len(rows) / seconds, blocks, memory / float(len(rows))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Compare the memory use and throughput of postal.pool.PostalPool, which loads
+libpostal once and forks, with a naive multiprocessing.Pool where each worker
+loads its own copy of the models.
+
+Usage:
+    python benchmarks/bench_pool.py [--processes N] [--rows N]
+"""
+import argparse
+import multiprocessing
+import os
+import time
+
+from postal.pool import PostalPool, process_memory
+
+ADDRESSES = [
+    '781 Franklin Ave Crown Heights Brooklyn NYC NY 11216 USA',
+    'The Book Club 100-106 Leonard St, Shoreditch, London, Greater London, EC2A 4RH, United Kingdom',
+    'Friedrichstraße 128, 10117 Berlin, Germany',
+    '92 Avenue des Champs-Élysées, 75008 Paris, France',
+    'Via Nazionale 51, 00184 Roma RM, Italia',
+    'Calle de Alcalá 42, 28014 Madrid, España',
+]
+
+MB = 1024.0 * 1024.0
+
+
+def _naive_init():
+    import postal
+    postal.setup()
+
+
+def _naive_parse(address):
+    from postal.parser import parse_address
+    return parse_address(address)
+
+
+def report(name, rows, seconds, memory):
+    print('{:<12s} {:>10,.0f} rows/s'.format(name, rows / seconds))
+    for m in memory:
+        print('  pid {:<8d} rss {:9.1f} MB  pss {:9.1f} MB  unique {:9.1f} MB  shared {:9.1f} MB'.format(
+            m.pid, m.rss / MB, m.pss / MB, m.unique / MB, m.shared / MB))
+    print('  total unique {:9.1f} MB  total pss {:9.1f} MB'.format(
+        sum(m.unique for m in memory) / MB, sum(m.pss for m in memory) / MB))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 4)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--chunk-size', type=int, default=256)
+    args = parser.parse_args()
+
+    rows = [ADDRESSES[i % len(ADDRESSES)] for i in range(args.rows)]
+
+    with PostalPool(processes=args.processes, chunk_size=args.chunk_size) as pool:
+        start = time.perf_counter()
+        for _ in pool.parse_addresses(rows):
+            pass
+        seconds = time.perf_counter() - start
+        report('PostalPool', len(rows), seconds, pool.memory())
+
+    # Each naive worker is a fresh interpreter loading its own models
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(args.processes, initializer=_naive_init) as pool:
+        start = time.perf_counter()
+        for _ in pool.imap(_naive_parse, rows, chunksize=args.chunk_size):
+            pass
+        seconds = time.perf_counter() - start
+        memory = [m for m in (process_memory(p.pid) for p in pool._pool) if m is not None]
+        report('naive Pool', len(rows), seconds, memory)
+
+
+if __name__ == '__main__':
+    main()
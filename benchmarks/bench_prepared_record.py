@@ -0,0 +1,79 @@
+"""
+Compare each record against every other record in its block with the
+is_*_duplicate functions on raw values, and with PreparedRecord and compare /
+compare_many.
+
+Usage:
+    python benchmarks/bench_prepared_record.py [--records N] [--block-size N] [--languages en]
+"""
+import argparse
+import time
+
+from postal.dedupe import (HOUSE_NUMBER, NAME, STREET, PreparedRecord, compare, compare_many,
+                           is_house_number_duplicate, is_name_duplicate, is_street_duplicate)
+
+LABELS = ['house', 'house_number', 'road', 'city', 'postcode']
+RECORDS = [
+    ['Whole Foods', '781', 'Franklin Ave', 'Brooklyn', '11216'],
+    ['Whole Foods Market', '781', 'Franklin Avenue', 'Brooklyn', '11216'],
+    ['Book Club', '100', 'Leonard St', 'London', 'EC2A 4RH'],
+    ['The Book Club', '100-106', 'Leonard Street', 'London', 'EC2A 4RH'],
+]
+FIELDS = (NAME, STREET, HOUSE_NUMBER)
+
+
+def raw_compare(values1, values2, languages):
+    return (is_name_duplicate(values1[0], values2[0], languages=languages),
+            is_street_duplicate(values1[2], values2[2], languages=languages),
+            is_house_number_duplicate(values1[1], values2[1], languages=languages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--records', type=int, default=2000)
+    parser.add_argument('--block-size', type=int, default=20)
+    parser.add_argument('--languages', default=None, help='comma-separated, classified per value/record by default')
+    args = parser.parse_args()
+
+    languages = args.languages.split(',') if args.languages else None
+    records = [RECORDS[i % len(RECORDS)] for i in range(args.records)]
+    blocks = [records[i:i + args.block_size] for i in range(0, len(records), args.block_size)]
+    num_pairs = sum(len(block) * (len(block) - 1) // 2 for block in blocks)
+
+    def raw(blocks):
+        for block in blocks:
+            for i, values1 in enumerate(block):
+                for values2 in block[i + 1:]:
+                    raw_compare(values1, values2, languages)
+
+    def prepared(blocks):
+        for block in blocks:
+            block = [PreparedRecord(LABELS, values, languages=languages) for values in block]
+            for i, record in enumerate(block):
+                for other in block[i + 1:]:
+                    compare(record, other, fields=FIELDS)
+
+    def prepared_many(blocks):
+        for block in blocks:
+            block = [PreparedRecord(LABELS, values, languages=languages) for values in block]
+            for i, record in enumerate(block):
+                compare_many(record, block[i + 1:], fields=FIELDS)
+
+    cases = [
+        ('is_*_duplicate', raw),
+        ('compare', prepared),
+        ('compare_many', prepared_many),
+    ]
+
+    baseline = None
+    for name, func in cases:
+        start = time.perf_counter()
+        func(blocks)
+        seconds = time.perf_counter() - start
+        if baseline is None:
+            baseline = seconds
+        print('{:<16s} {:>10,.0f} pairs/s  {:.2f}x'.format(name, num_pairs / seconds, baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Measure how expand_address, normalize_string and parse_address throughput
+scales with the number of threads in a postal.concurrent.ThreadPool.
+
+Usage:
+    python benchmarks/bench_threads.py [--rows N] [--max-threads N]
+"""
+import argparse
+import os
+import time
+
+from postal.concurrent import ThreadPool
+from postal.expand import expand_address
+from postal.normalize import normalize_string
+from postal.parser import parse_address
+
+ADDRESSES = [
+    '781 Franklin Ave Crown Heights Brooklyn NYC NY 11216 USA',
+    'The Book Club 100-106 Leonard St, Shoreditch, London, Greater London, EC2A 4RH, United Kingdom',
+    'Friedrichstraße 128, 10117 Berlin, Germany',
+    '92 Avenue des Champs-Élysées, 75008 Paris, France',
+    'Via Nazionale 51, 00184 Roma RM, Italia',
+    'Calle de Alcalá 42, 28014 Madrid, España',
+]
+
+FUNCTIONS = [
+    ('expand_address', expand_address),
+    ('normalize_string', normalize_string),
+    ('parse_address', parse_address),
+]
+
+
+def throughput(func, rows, num_threads):
+    with ThreadPool(num_threads) as pool:
+        start = time.perf_counter()
+        for _ in pool.map(func, rows):
+            pass
+        return len(rows) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--max-threads', type=int, default=os.cpu_count() or 4)
+    args = parser.parse_args()
+
+    rows = [ADDRESSES[i % len(ADDRESSES)] for i in range(args.rows)]
+
+    for name, func in FUNCTIONS:
+        # Load any models before timing
+        func(ADDRESSES[0])
+
+        baseline = None
+        print(name)
+        for num_threads in range(1, args.max_threads + 1):
+            rate = throughput(func, rows, num_threads)
+            if baseline is None:
+                baseline = rate
+            print('  threads={:<3d} {:>12,.0f} rows/s  {:.2f}x'.format(num_threads, rate, rate / baseline))
+
+
+if __name__ == '__main__':
+    main()
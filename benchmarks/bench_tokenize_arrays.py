@@ -0,0 +1,56 @@
+"""
+Compare tokenize, which builds Python objects for every token, with the
+columnar tokenize_arrays and tokenize_arrays_batch.
+
+Usage:
+    python benchmarks/bench_tokenize_arrays.py [--rows N] [--batch-size N]
+"""
+import argparse
+import time
+
+from postal.tokenize import tokenize, tokenize_arrays, tokenize_arrays_batch
+
+ADDRESSES = [
+    '781 Franklin Ave Crown Heights Brooklyn NYC NY 11216 USA',
+    'The Book Club 100-106 Leonard St, Shoreditch, London, Greater London, EC2A 4RH, United Kingdom',
+    'Friedrichstraße 128, 10117 Berlin, Germany',
+    '92 Avenue des Champs-Élysées, 75008 Paris, France',
+    'Via Nazionale 51, 00184 Roma RM, Italia',
+    'Calle de Alcalá 42, 28014 Madrid, España',
+]
+
+
+def timed(func, rows):
+    start = time.perf_counter()
+    func(rows)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    rows = [ADDRESSES[i % len(ADDRESSES)] for i in range(args.rows)]
+
+    def batched(rows):
+        for i in range(0, len(rows), args.batch_size):
+            tokenize_arrays_batch(rows[i:i + args.batch_size])
+
+    cases = [
+        ('tokenize', lambda rows: [tokenize(s) for s in rows]),
+        ('tokenize_arrays', lambda rows: [tokenize_arrays(s) for s in rows]),
+        ('tokenize_arrays_batch', batched),
+    ]
+
+    baseline = None
+    for name, func in cases:
+        seconds = timed(func, rows)
+        if baseline is None:
+            baseline = seconds
+        print('{:<22s} {:>12,.0f} rows/s  {:.2f}x'.format(name, len(rows) / seconds, baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,363 @@
+"""
+Benchmark suite covering every binding, run over the multilingual corpus in
+benchmarks/data/corpus.tsv.
+
+For each function it reports p50/p99 latency per call, throughput, peak RSS
+and Python allocations per call, for both the public wrapper (postal.parser
+etc.) and the raw C extension call with its arguments already converted. The
+difference between the two is the wrapper's own overhead (argument conversion
+and result building in Python). With --phases, the C extensions' own
+instrumentation (postal.metrics) further splits the raw call into argument
+conversion, the libpostal call and result building.
+
+Results are written as JSON so that runs can be compared, e.g. before and
+after a change or between releases:
+
+Usage:
+    python benchmarks/suite.py run [--output results.json] [--iterations N] [--filter NAME] [--phases]
+    python benchmarks/suite.py compare base.json new.json [--threshold 0.1]
+
+compare exits with status 1 if any benchmark's p50 or throughput regressed
+by more than the threshold (a fraction, 0.1 = 10%).
+"""
+import argparse
+import csv
+import gc
+import hashlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+from collections import OrderedDict, namedtuple
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from postal import _dedupe, _expand, _near_dupe, _normalize, _parser, _tokenize, metrics
+from postal.dedupe import (is_name_duplicate, is_street_duplicate, is_house_number_duplicate,
+                           is_po_box_duplicate, is_unit_duplicate, is_floor_duplicate,
+                           is_postal_code_duplicate, is_toponym_duplicate,
+                           is_name_duplicate_fuzzy, is_street_duplicate_fuzzy)
+from postal.expand import expand_address, expand_address_root
+from postal.near_dupe import name_hashes, near_dupe_hashes
+from postal.normalize import normalize_string, normalized_tokens, DEFAULT_STRING_OPTIONS, DEFAULT_TOKEN_OPTIONS
+from postal.parser import parse_address
+from postal.tokenize import tokenize
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'corpus.tsv')
+
+FORMAT_VERSION = 1
+
+# Corpus columns used as near_dupe_hashes labels
+HASH_LABELS = OrderedDict([
+    ('name', 'house'),
+    ('house_number', 'house_number'),
+    ('street', 'road'),
+    ('unit', 'unit'),
+    ('postcode', 'postcode'),
+    ('city', 'city'),
+])
+
+Case = namedtuple('Case', 'name, wrapper, raw, inputs')
+
+# Benchmarks recorded under a different name by postal.metrics
+METRIC_NAMES = {
+    'expand_address_root': 'expand_address',
+}
+
+
+def load_corpus(path=CORPUS):
+    with io.open(path, encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f, dialect='excel-tab'))
+
+
+def fuzzy_tokens(value):
+    tokens = value.lower().split()
+    scores = [1.0 / len(tokens) ** 0.5] * len(tokens) if tokens else []
+    return tokens, scores
+
+
+def build_cases(rows):
+    """One Case per function, each with a list of argument tuples from the corpus."""
+    addresses = [(r['address'],) for r in rows]
+    addresses_lang = [(r['address'], [r['language']]) for r in rows]
+    names = [(r['name'] or r['street'], [r['language']]) for r in rows if r['name'] or r['street']]
+
+    hash_inputs = []
+    for r in rows:
+        labels = [label for column, label in HASH_LABELS.items() if r[column]]
+        values = [r[column] for column in HASH_LABELS if r[column]]
+        hash_inputs.append((labels, values, [r['language']]))
+
+    # Neighbouring corpus rows are often variants of the same place, so comparing
+    # each row with the next gives a mix of duplicates and non-duplicates
+    pairs = list(zip(rows, rows[1:] + rows[:1]))
+
+    def field_pairs(column):
+        return [(a[column], b[column], [a['language']]) for a, b in pairs if a[column] and b[column]] or \
+               [(a[column] or a['address'], a[column] or a['address'], [a['language']]) for a, b in pairs]
+
+    toponym_pairs = [(['city'], [a['city']], ['city'], [b['city']], [a['language']]) for a, b in pairs]
+    fuzzy_pairs = []
+    fuzzy_street_pairs = []
+    for a, b in pairs:
+        fuzzy_pairs.append(fuzzy_tokens(a['name'] or a['address']) + fuzzy_tokens(b['name'] or b['address']) +
+                           ([a['language']],))
+        fuzzy_street_pairs.append(fuzzy_tokens(a['street'] or a['address']) +
+                                  fuzzy_tokens(b['street'] or b['address']) + ([a['language']],))
+
+    expand_options = _expand.ExpandOptions()
+
+    cases = [
+        Case('parse_address', parse_address, _parser.parse_address, addresses),
+        Case('expand_address', lambda s, l: expand_address(s, languages=l),
+             lambda s, l: _expand.expand_address(s, languages=l), addresses_lang),
+        Case('expand_address_root', lambda s, l: expand_address_root(s, languages=l),
+             lambda s, l: _expand.expand_address(s, languages=l, root=True), addresses_lang),
+        Case('expand_with_options', lambda s: expand_address(s, options=expand_options),
+             lambda s: _expand.expand_with_options(s, expand_options), addresses),
+        Case('normalize_string', lambda s, l: normalize_string(s, languages=l),
+             lambda s, l: _normalize.normalize_string(s, DEFAULT_STRING_OPTIONS, languages=l), addresses_lang),
+        Case('normalized_tokens', lambda s, l: normalized_tokens(s, languages=l),
+             lambda s, l: _normalize.normalized_tokens(s, DEFAULT_STRING_OPTIONS, DEFAULT_TOKEN_OPTIONS,
+                                                       False, languages=l), addresses_lang),
+        Case('tokenize', tokenize, lambda s: _tokenize.tokenize(s, False), addresses),
+        Case('name_hashes', lambda s, l: name_hashes(s, languages=l),
+             lambda s, l: _near_dupe.name_hashes(s, languages=l), names),
+        Case('near_dupe_hashes', lambda labels, values, l: near_dupe_hashes(labels, values, languages=l),
+             lambda labels, values, l: _near_dupe.near_dupe_hashes(labels, values, languages=l), hash_inputs),
+    ]
+
+    for name, func, column in (('is_name_duplicate', is_name_duplicate, 'name'),
+                               ('is_street_duplicate', is_street_duplicate, 'street'),
+                               ('is_house_number_duplicate', is_house_number_duplicate, 'house_number'),
+                               ('is_po_box_duplicate', is_po_box_duplicate, 'po_box'),
+                               ('is_unit_duplicate', is_unit_duplicate, 'unit'),
+                               ('is_floor_duplicate', is_floor_duplicate, 'level'),
+                               ('is_postal_code_duplicate', is_postal_code_duplicate, 'postcode')):
+        raw = getattr(_dedupe, name)
+        cases.append(Case(name, lambda a, b, l, func=func: func(a, b, languages=l),
+                          lambda a, b, l, raw=raw: raw(a, b, languages=l), field_pairs(column)))
+
+    cases.extend([
+        Case('is_toponym_duplicate', lambda l1, v1, l2, v2, l: is_toponym_duplicate(l1, v1, l2, v2, languages=l),
+             lambda l1, v1, l2, v2, l: _dedupe.is_toponym_duplicate(l1, v1, l2, v2, languages=l), toponym_pairs),
+        Case('is_name_duplicate_fuzzy',
+             lambda t1, s1, t2, s2, l: is_name_duplicate_fuzzy(t1, s1, t2, s2, languages=l),
+             lambda t1, s1, t2, s2, l: _dedupe.is_name_duplicate_fuzzy(t1, s1, t2, s2, languages=l), fuzzy_pairs),
+        Case('is_street_duplicate_fuzzy',
+             lambda t1, s1, t2, s2, l: is_street_duplicate_fuzzy(t1, s1, t2, s2, languages=l),
+             lambda t1, s1, t2, s2, l: _dedupe.is_street_duplicate_fuzzy(t1, s1, t2, s2, languages=l),
+             fuzzy_street_pairs),
+    ])
+    return cases
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(p / 100.0 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes, or None where unavailable."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def time_calls(func, inputs, iterations):
+    latencies = []
+    perf_counter = time.perf_counter
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = perf_counter()
+        for _ in range(iterations):
+            for args in inputs:
+                t0 = perf_counter()
+                func(*args)
+                latencies.append(perf_counter() - t0)
+        total = perf_counter() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+    latencies.sort()
+    return latencies, total
+
+
+def allocations_per_call(func, inputs):
+    """
+    Python memory blocks allocated per call and still alive afterwards, i.e. the
+    objects making up the result. Allocations inside libpostal itself use malloc
+    directly and aren't counted.
+    """
+    gc.collect()
+    results = []
+    before = sys.getallocatedblocks()
+    for args in inputs:
+        results.append(func(*args))
+    after = sys.getallocatedblocks()
+    # The list holding the results
+    blocks = after - before - 1
+    del results
+    return max(blocks, 0) / float(len(inputs))
+
+
+def measure(func, inputs, iterations):
+    func(*inputs[0])
+    latencies, total = time_calls(func, inputs, iterations)
+    calls = len(latencies)
+    return OrderedDict([
+        ('calls', calls),
+        ('p50_us', percentile(latencies, 50) * 1e6),
+        ('p99_us', percentile(latencies, 99) * 1e6),
+        ('mean_us', sum(latencies) / calls * 1e6),
+        ('throughput', calls / total if total > 0 else 0.0),
+        ('allocations_per_call', allocations_per_call(func, inputs)),
+    ])
+
+
+def measure_phases(case, iterations):
+    """Mean time per call in each phase of the C function, from postal.metrics."""
+    metrics.reset()
+    metrics.enable()
+    try:
+        for _ in range(iterations):
+            for args in case.inputs:
+                case.raw(*args)
+        metric = metrics.snapshot().get(METRIC_NAMES.get(case.name, case.name))
+    finally:
+        metrics.disable()
+        metrics.reset()
+
+    if not metric or not metric['calls']:
+        return None
+    return OrderedDict((phase, metric['phases'][phase]['sum_seconds'] / metric['calls'] * 1e6)
+                       for phase in metrics.PHASES)
+
+
+def run_suite(cases, iterations, phases=False, progress=None):
+    results = OrderedDict()
+    for case in cases:
+        if progress:
+            progress(case.name)
+        wrapper = measure(case.wrapper, case.inputs, iterations)
+        raw = measure(case.raw, case.inputs, iterations)
+        wrapper['raw'] = raw
+        wrapper['wrapper_overhead_us'] = wrapper['mean_us'] - raw['mean_us']
+        if phases:
+            # Timed separately so the instrumentation doesn't affect the other numbers
+            wrapper['phases_us'] = measure_phases(case, iterations)
+        wrapper['peak_rss'] = peak_rss()
+        results[case.name] = wrapper
+    return results
+
+
+def metadata(corpus_path):
+    with open(corpus_path, 'rb') as f:
+        corpus_sha1 = hashlib.sha1(f.read()).hexdigest()
+    try:
+        from pkg_resources import get_distribution
+        version = get_distribution('postal').version
+    except Exception:
+        version = None
+    return OrderedDict([
+        ('format_version', FORMAT_VERSION),
+        ('timestamp', time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())),
+        ('postal_version', version),
+        ('python', platform.python_version()),
+        ('platform', platform.platform()),
+        ('corpus_sha1', corpus_sha1),
+    ])
+
+
+def print_results(results, out=sys.stdout):
+    out.write('{:<28} {:>10} {:>10} {:>12} {:>10} {:>10} {:>8}\n'.format(
+        'function', 'p50 us', 'p99 us', 'calls/s', 'raw p50', 'overhead', 'allocs'))
+    for name, r in results.items():
+        out.write('{:<28} {:>10.1f} {:>10.1f} {:>12,.0f} {:>10.1f} {:>10.1f} {:>8.1f}'.format(
+            name, r['p50_us'], r['p99_us'], r['throughput'], r['raw']['p50_us'],
+            r['wrapper_overhead_us'], r['allocations_per_call']))
+        if r.get('phases_us'):
+            out.write('  ({})'.format(', '.join('{} {:.1f}'.format(phase, us) for phase, us in r['phases_us'].items())))
+        out.write('\n')
+    rss = [r['peak_rss'] for r in results.values() if r.get('peak_rss')]
+    if rss:
+        out.write('peak RSS: {:.1f} MB\n'.format(max(rss) / 1048576.0))
+
+
+def compare(base, new, threshold, out=sys.stdout):
+    """Print the change in each benchmark, returns the names of the regressions."""
+    regressions = []
+    out.write('{:<28} {:>10} {:>10} {:>8} {:>12} {:>12} {:>8}\n'.format(
+        'function', 'base p50', 'new p50', 'change', 'base calls/s', 'new calls/s', 'change'))
+    for name, b in base['results'].items():
+        n = new['results'].get(name)
+        if n is None:
+            continue
+        p50_change = n['p50_us'] / b['p50_us'] - 1.0 if b['p50_us'] else 0.0
+        throughput_change = n['throughput'] / b['throughput'] - 1.0 if b['throughput'] else 0.0
+        regressed = p50_change > threshold or throughput_change < -threshold
+        if regressed:
+            regressions.append(name)
+        out.write('{:<28} {:>10.1f} {:>10.1f} {:>+7.1%} {:>12,.0f} {:>12,.0f} {:>+7.1%}{}\n'.format(
+            name, b['p50_us'], n['p50_us'], p50_change, b['throughput'], n['throughput'], throughput_change,
+            '  REGRESSION' if regressed else ''))
+    if base['metadata'].get('corpus_sha1') != new['metadata'].get('corpus_sha1'):
+        out.write('warning: the runs used different corpora\n')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    subparsers = parser.add_subparsers(dest='command')
+
+    run_parser = subparsers.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('--output', help='write the results to this JSON file')
+    run_parser.add_argument('--corpus', default=CORPUS)
+    run_parser.add_argument('--iterations', type=int, default=20, help='passes over the corpus per function')
+    run_parser.add_argument('--filter', help='only run functions whose name contains this')
+    run_parser.add_argument('--phases', action='store_true',
+                            help='also split the C call into conversion, libpostal and result building (us)')
+
+    compare_parser = subparsers.add_parser('compare', help='compare two result files')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.1)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare':
+        with open(args.base) as f:
+            base = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        return 1 if compare(base, new, args.threshold) else 0
+    elif args.command != 'run':
+        parser.print_help()
+        return 2
+
+    cases = build_cases(load_corpus(args.corpus))
+    if args.filter:
+        cases = [c for c in cases if args.filter in c.name]
+
+    results = run_suite(cases, args.iterations, phases=args.phases,
+                        progress=lambda name: sys.stderr.write('{}...\n'.format(name)))
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(OrderedDict([('metadata', metadata(args.corpus)), ('results', results)]), f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,11 @@
+from postal.loader import setup, warmup
+
+# postal.language imports the C extensions, so it's only loaded on first use
+_language_attributes = ('classify_language', 'classify_languages')
+
+
+def __getattr__(name):
+    if name in _language_attributes:
+        from postal import language
+        return getattr(language, name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
@@ -0,0 +1,325 @@
+"""
+asyncio interface to the address parser and expander.
+
+The libpostal calls run on a dedicated thread pool so they never block the
+event loop. Requests are queued and concurrent requests are micro-batched:
+the dispatcher takes everything waiting in the queue (up to max_batch_size)
+and runs it as one task on the pool, so under load many awaits share one
+thread hop, and parse requests share one call to parse_addresses.
+
+The queue is bounded, so when the pool can't keep up, callers wait in
+put() (backpressure) instead of queueing unbounded work, and at most
+max_workers batches run at once.
+
+Usage:
+    from postal import aio
+
+    components = await aio.parse_address('781 Franklin Ave Crown Heights Brooklyn NY')
+    expansions = await aio.expand_address('30 W 26th St', languages=['en'])
+
+    async for components in aio.parse_addresses(address_stream):
+        ...
+
+or with an explicit instance and limits:
+
+    async with aio.AsyncPostal(max_workers=4, max_queue_size=1000) as postal:
+        components = await postal.parse_address(address)
+"""
+import asyncio
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from postal import _expand, _parser
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_QUEUE_SIZE = 10000
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_MAX_BATCH_DELAY = 0.0005
+DEFAULT_WINDOW = 1024
+
+PARSE = 'parse'
+EXPAND = 'expand'
+
+AsyncStats = namedtuple('AsyncStats', 'requests, batches, cancelled, queued, running')
+
+
+def _parse_batch(key, items):
+    addresses = [address for address, language, country in items]
+    languages = [language for address, language, country in items]
+    countries = [country for address, language, country in items]
+    try:
+        return [(True, components) for components in
+                _parser.parse_addresses(addresses, language=languages, country=countries)]
+    except Exception:
+        # Find the bad input(s) so one request can't fail the whole batch
+        results = []
+        for address, language, country in items:
+            try:
+                results.append((True, _parser.parse_address(address, language=language, country=country)))
+            except Exception as e:
+                results.append((False, e))
+        return results
+
+
+class AsyncPostal(object):
+    """
+    Runs parse_address and expand_address for asyncio code.
+
+    @param max_workers: number of threads, and the maximum number of batches running at once
+    @param max_queue_size: maximum number of requests waiting to be batched, callers
+                           wait for space beyond that
+    @param max_batch_size: maximum number of requests per batch
+    @param max_batch_delay: seconds to wait for more requests after the first one of a
+                            batch arrives when the queue is otherwise empty (0 to never wait)
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, max_queue_size=DEFAULT_MAX_QUEUE_SIZE,
+                 max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_batch_delay=DEFAULT_MAX_BATCH_DELAY):
+        if max_workers < 1:
+            raise ValueError('max_workers must be at least 1')
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be at least 1')
+        # asyncio.Queue treats 0 as unbounded, which would disable backpressure
+        if max_queue_size < 1:
+            raise ValueError('max_queue_size must be at least 1')
+
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.max_batch_size = max_batch_size
+        self.max_batch_delay = max_batch_delay
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+        self.loop = None
+        self.queue = None
+        self.semaphore = None
+        self.dispatcher = None
+        self.expand_options = {}
+        self.closed = False
+
+        self.requests = 0
+        self.batches = 0
+        self.cancelled = 0
+        self.running = 0
+
+    def _start(self):
+        if self.closed:
+            raise RuntimeError('AsyncPostal is closed')
+
+        loop = asyncio.get_event_loop()
+        if self.loop is None:
+            self.loop = loop
+            self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self.semaphore = asyncio.Semaphore(self.max_workers)
+            self.dispatcher = asyncio.ensure_future(self._dispatch())
+        elif self.loop is not loop:
+            raise RuntimeError('AsyncPostal instances can only be used from one event loop')
+
+    async def _submit(self, kind, key, item):
+        self._start()
+        future = self.loop.create_future()
+        # Waits here when the queue is full
+        await self.queue.put((kind, key, item, future))
+        self.requests += 1
+        return await future
+
+    async def _dispatch(self):
+        queue = self.queue
+        # Requests taken off the queue but not yet handed to a batch, which are
+        # cancelled along with the dispatcher so their callers don't wait forever
+        requests = []
+        pending = deque()
+        try:
+            while True:
+                requests = [await queue.get()]
+
+                if queue.empty() and self.max_batch_delay > 0 and self.max_batch_size > 1:
+                    await asyncio.sleep(self.max_batch_delay)
+
+                while len(requests) < self.max_batch_size:
+                    try:
+                        requests.append(queue.get_nowait())
+                    except asyncio.QueueEmpty:
+                        break
+
+                groups = OrderedDict()
+                for kind, key, item, future in requests:
+                    if future.cancelled():
+                        self.cancelled += 1
+                        continue
+                    groups.setdefault((kind, key), []).append((item, future))
+                pending.extend(groups.items())
+                requests = []
+
+                while pending:
+                    # Concurrency limit, the queue fills up while all of the workers are busy
+                    await self.semaphore.acquire()
+                    (kind, key), group = pending.popleft()
+                    self.running += 1
+                    asyncio.ensure_future(self._run_batch(kind, key, group))
+        except asyncio.CancelledError:
+            for kind, key, item, future in requests:
+                future.cancel()
+            for _, group in pending:
+                for item, future in group:
+                    future.cancel()
+            raise
+
+    def _expand_batch(self, key, items):
+        languages, root, kw = key
+        options = self.expand_options.get(key)
+        if options is None:
+            options = self.expand_options[key] = _expand.ExpandOptions(languages=languages, **dict(kw))
+
+        results = []
+        for address in items:
+            try:
+                results.append((True, _expand.expand_with_options(address, options, root)))
+            except Exception as e:
+                results.append((False, e))
+        return results
+
+    async def _run_batch(self, kind, key, group):
+        try:
+            # Requests cancelled while waiting for a worker are dropped
+            group = [(item, future) for item, future in group if not future.cancelled()]
+            if not group:
+                return
+
+            batch_function = _parse_batch if kind == PARSE else self._expand_batch
+            items = [item for item, future in group]
+            self.batches += 1
+            try:
+                results = await self.loop.run_in_executor(self.executor, batch_function, key, items)
+            except Exception as e:
+                results = [(False, e)] * len(group)
+
+            for (item, future), (ok, value) in zip(group, results):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+        finally:
+            self.running -= 1
+            self.semaphore.release()
+
+    async def parse_address(self, address, language=None, country=None):
+        """Same as postal.parser.parse_address"""
+        return await self._submit(PARSE, None, (address, language, country))
+
+    async def expand_address(self, address, languages=None, root=False, **kw):
+        """Same as postal.expand.expand_address"""
+        if languages is not None:
+            languages = tuple(languages)
+        key = (languages, bool(root), tuple(sorted(kw.items())))
+        return await self._submit(EXPAND, key, address)
+
+    async def expand_address_root(self, address, languages=None, **kw):
+        """Same as postal.expand.expand_address_root"""
+        return await self.expand_address(address, languages=languages, root=True, **kw)
+
+    async def run(self, func, *args, **kw):
+        """Run any other pypostal function on the executor, within the concurrency limit."""
+        self._start()
+        async with self.semaphore:
+            return await self.loop.run_in_executor(self.executor, lambda: func(*args, **kw))
+
+    async def _map(self, make_request, items, window):
+        pending = deque()
+        try:
+            if hasattr(items, '__aiter__'):
+                async for item in items:
+                    pending.append(asyncio.ensure_future(make_request(item)))
+                    if len(pending) >= window:
+                        yield await pending.popleft()
+            else:
+                for item in items:
+                    pending.append(asyncio.ensure_future(make_request(item)))
+                    if len(pending) >= window:
+                        yield await pending.popleft()
+
+            while pending:
+                yield await pending.popleft()
+        finally:
+            # Consumer stopped early or was cancelled
+            for task in pending:
+                task.cancel()
+
+    def parse_addresses(self, addresses, language=None, country=None, window=DEFAULT_WINDOW):
+        """
+        Async generator parsing an iterable or async iterable of addresses,
+        yielding results in input order with at most window requests in flight.
+        """
+        return self._map(lambda address: self.parse_address(address, language=language, country=country),
+                         addresses, window)
+
+    def expand_addresses(self, addresses, languages=None, window=DEFAULT_WINDOW, **kw):
+        """Async generator version of expand_address, see parse_addresses."""
+        return self._map(lambda address: self.expand_address(address, languages=languages, **kw),
+                         addresses, window)
+
+    def stats(self):
+        """AsyncStats(requests, batches, cancelled, queued, running)"""
+        queued = self.queue.qsize() if self.queue is not None else 0
+        return AsyncStats(self.requests, self.batches, self.cancelled, queued, self.running)
+
+    async def close(self):
+        """Stop dispatching and shut down the thread pool. Queued requests are cancelled."""
+        if self.closed:
+            return
+        self.closed = True
+
+        if self.dispatcher is not None:
+            self.dispatcher.cancel()
+            try:
+                await self.dispatcher
+            except asyncio.CancelledError:
+                pass
+
+            while not self.queue.empty():
+                kind, key, item, future = self.queue.get_nowait()
+                future.cancel()
+
+        self.executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+        return False
+
+
+_default = None
+
+
+def get_default():
+    """The AsyncPostal used by the module-level functions, one per event loop."""
+    global _default
+    loop = asyncio.get_event_loop()
+    if _default is None or _default.closed or (_default.loop is not None and _default.loop is not loop):
+        if _default is not None:
+            _default.executor.shutdown(wait=False)
+        _default = AsyncPostal()
+    return _default
+
+
+async def parse_address(address, language=None, country=None):
+    return await get_default().parse_address(address, language=language, country=country)
+
+
+async def expand_address(address, languages=None, **kw):
+    return await get_default().expand_address(address, languages=languages, **kw)
+
+
+async def expand_address_root(address, languages=None, **kw):
+    return await get_default().expand_address_root(address, languages=languages, **kw)
+
+
+def parse_addresses(addresses, language=None, country=None, window=DEFAULT_WINDOW):
+    return get_default().parse_addresses(addresses, language=language, country=country, window=window)
+
+
+def expand_addresses(addresses, languages=None, window=DEFAULT_WINDOW, **kw):
+    return get_default().expand_addresses(addresses, languages=languages, window=window, **kw)
@@ -0,0 +1,425 @@
+"""
+Disk-backed near-dupe blocking store for incremental deduplication across runs.
+
+NearDupeIndex keeps every posting in memory and has to be rebuilt on each run.
+BlockingStore keeps the postings of a large reference set on disk instead, so
+new records can be checked against it every day without rehashing the
+reference set or loading it into memory:
+
+    from postal.blocking_store import BlockingStore
+
+    store = BlockingStore('/data/blocking', languages=['en'])
+    for record_id, labels, values, lat, lon in reference_records:
+        store.add(record_id, labels, values, latitude=lat, longitude=lon)
+    store.flush()
+
+    store.candidates_batch(new_records)   # [[record_id, ...], ...]
+
+Layout: the directory holds a manifest.json and one subdirectory per shard.
+Records are sharded by the geohash prefix (shard_precision characters) of
+their coordinates, or go in the "_" shard when they have none. Each shard is a
+list of immutable segment files, written by flush(), holding sorted pairs of
+native uint64 (key hash, record id). Key hashes are the stable hash64 of the
+near_dupe_hashes / name_hashes strings (see postal.hashing), record ids are
+integers. Segments are memory-mapped and binary searched, so a lookup only
+touches the pages of the keys it needs. merge() rewrites a shard's segments
+into one, which flush() does automatically for shards with more than
+max_segments segments.
+
+The manifest is replaced atomically after segments are written, so readers
+always see a consistent set of segments. Only one process should write to a
+store at a time, and readers should be reopened after a merge, which deletes
+the merged segment files.
+"""
+import heapq
+import json
+import mmap
+import os
+import sys
+from array import array
+from collections import defaultdict, namedtuple
+
+import six
+
+from postal.hashing import HASH64, hash_strings
+from postal.near_dupe import near_dupe_hashes
+from postal.utils import geohash
+
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+
+NO_LOCATION_SHARD = '_'
+
+DEFAULT_SHARD_PRECISION = 3
+DEFAULT_MAX_SEGMENTS = 8
+
+StoreStats = namedtuple('StoreStats', 'num_shards, num_segments, num_postings, num_pending')
+
+
+class Segment(object):
+    """A memory-mapped segment file of sorted (key hash, record id) uint64 pairs."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.values = memoryview(self.mmap).cast('Q')
+        self.num_postings = len(self.values) // 2
+
+    def close(self):
+        self.values.release()
+        self.mmap.close()
+        self.file.close()
+
+    def lower_bound(self, key):
+        """Index of the first posting with a key >= key."""
+        values = self.values
+        lo, hi = 0, self.num_postings
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if values[mid * 2] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def upper_bound(self, key, lo=0):
+        """Index of the first posting at or after lo with a key > key."""
+        values = self.values
+        hi = self.num_postings
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if values[mid * 2] <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, key):
+        """
+        (start, end) posting indices with the given key, end - start being the block size.
+        Both ends are binary searched, so hot keys with huge blocks cost the same as any
+        other key until their record ids are read.
+        """
+        start = self.lower_bound(key)
+        return start, self.upper_bound(key, start)
+
+    def record_ids(self, start, end):
+        return self.values[start * 2 + 1:end * 2:2]
+
+    def __iter__(self):
+        values = self.values
+        for i in range(0, self.num_postings * 2, 2):
+            yield values[i], values[i + 1]
+
+
+def _write_segment(path, postings):
+    """Write an iterable of sorted (key, record_id) pairs, returns the number written."""
+    tmp_path = path + '.tmp'
+    n = 0
+    buf = array('Q')
+    last = None
+    with open(tmp_path, 'wb') as f:
+        for posting in postings:
+            if posting == last:
+                continue
+            last = posting
+            buf.extend(posting)
+            n += 1
+            if len(buf) >= 1 << 16:
+                buf.tofile(f)
+                buf = array('Q')
+        buf.tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return n
+
+
+class BlockingStore(object):
+    """
+    Persistent blocking index over near_dupe_hashes/name_hashes keys, see the module
+    docstring for the layout.
+
+    The hash options (languages and near_dupe_hashes keyword options) and the shard
+    precision are saved in the manifest when the store is created and are used for
+    every later add and lookup, since keys are only comparable when they're hashed
+    the same way. Opening an existing store with different options raises ValueError.
+
+    @param path: directory of the store, created if it doesn't exist
+    @param shard_precision: geohash characters in a shard prefix (3 is roughly 156km cells)
+    @param max_segments: segments per shard before flush() merges them
+    @param max_block_size: keys with more postings than this are ignored in lookups
+                           (None for no limit), see NearDupeIndex
+    @param languages: default languages for hashing, if None the language classifier is used
+    @param kw: options for near_dupe_hashes e.g. with_unit=True, address_only_keys=True
+    """
+
+    def __init__(self, path, shard_precision=None, max_segments=DEFAULT_MAX_SEGMENTS, max_block_size=1000,
+                 languages=None, **kw):
+        if max_block_size is not None and max_block_size < 1:
+            raise ValueError('max_block_size must be at least 1 or None')
+        self.path = path
+        self.max_segments = max_segments
+        self.max_block_size = max_block_size
+
+        if languages is not None:
+            languages = list(languages)
+
+        manifest_path = os.path.join(path, MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get('version') != FORMAT_VERSION:
+                raise ValueError('Unsupported blocking store version: {}'.format(manifest.get('version')))
+            if manifest['byteorder'] != sys.byteorder:
+                raise ValueError('Blocking store was written on a {}-endian machine'.format(manifest['byteorder']))
+            for name, value in (('shard_precision', shard_precision), ('languages', languages),
+                                ('hash_options', kw or None)):
+                if value is not None and value != manifest[name]:
+                    raise ValueError('{} {!r} does not match the store\'s {!r}'.format(name, value, manifest[name]))
+        else:
+            if not os.path.exists(path):
+                os.makedirs(path)
+            manifest = {
+                'version': FORMAT_VERSION,
+                'byteorder': sys.byteorder,
+                'hash': 'murmurhash3_x64_128/hash64',
+                'shard_precision': shard_precision if shard_precision is not None else DEFAULT_SHARD_PRECISION,
+                'languages': languages,
+                'hash_options': kw,
+                'next_segment': 0,
+                'shards': {},
+            }
+            self._write_manifest(manifest)
+
+        self.manifest = manifest
+        self.shard_precision = manifest['shard_precision']
+        self.languages = manifest['languages']
+        self.hash_options = manifest['hash_options']
+
+        self.pending = defaultdict(list)
+        self.num_pending = 0
+        self.segments = {}
+
+    def _write_manifest(self, manifest):
+        manifest_path = os.path.join(self.path, MANIFEST)
+        tmp_path = manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, manifest_path)
+
+    def close(self):
+        """Unmap the open segments. Pending records are not flushed."""
+        for segments in six.itervalues(self.segments):
+            for segment in segments:
+                segment.close()
+        self.segments = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
+        self.close()
+
+    def shard(self, latitude=None, longitude=None):
+        """Shard name for a record at the given coordinates."""
+        if latitude is None or longitude is None:
+            return NO_LOCATION_SHARD
+        return geohash.encode(latitude, longitude, self.shard_precision)
+
+    def shards(self):
+        """Names of the shards with at least one segment."""
+        return sorted(self.manifest['shards'])
+
+    def _query_shards(self, latitude, longitude):
+        # Keys may include geohash neighbors, so records near a shard's edge can match the next shard
+        if latitude is None or longitude is None:
+            return self.shards()
+        shards = geohash.neighbors(self.shard(latitude, longitude))
+        shards.append(NO_LOCATION_SHARD)
+        return [shard for shard in shards if shard in self.manifest['shards']]
+
+    def hashes(self, labels, values, latitude=None, longitude=None, languages=None):
+        """Key hashes for a record, using the store's hash options."""
+        kw = self.hash_options
+        if latitude is not None and longitude is not None:
+            kw = dict(kw, with_latlon=True, latitude=latitude, longitude=longitude)
+        if languages is None:
+            languages = self.languages
+        return near_dupe_hashes(labels, values, languages=languages, output=HASH64, **kw) or array('Q')
+
+    def _key_hashes(self, keys):
+        keys = list(keys)
+        if keys and isinstance(keys[0], (six.text_type, six.binary_type)):
+            return hash_strings(keys)
+        return keys
+
+    def add(self, record_id, labels, values, latitude=None, longitude=None, languages=None):
+        """
+        Hash a record and add it to the store on the next flush().
+
+        @param record_id: integer id of the record, 0 <= record_id < 2 ** 64
+        @param labels: component labels e.g. ["house_number", "road", "postcode"]
+        @param values: component values e.g. ["123", "Broadway", "11216"]
+        @param latitude, longitude: coordinates, used for sharding and geohash keys
+        @param languages: languages for this record, overrides the store's default
+        """
+        self.add_keys(record_id, self.hashes(labels, values, latitude=latitude, longitude=longitude,
+                                             languages=languages),
+                      latitude=latitude, longitude=longitude)
+
+    def add_keys(self, record_id, keys, latitude=None, longitude=None):
+        """
+        Add a record with precomputed keys, e.g. name_hashes(name, output="hash64"), on
+        the next flush(). Keys are either hash64 integers or strings, which are hashed.
+        """
+        pending = self.pending[self.shard(latitude, longitude)]
+        for key in set(self._key_hashes(keys)):
+            pending.append((key, record_id))
+        self.num_pending += 1
+
+    def flush(self):
+        """Write the pending records as a new segment per shard and merge shards with too many segments."""
+        if not self.pending:
+            return
+
+        manifest = self.manifest
+        for shard, postings in six.iteritems(self.pending):
+            if not postings:
+                continue
+            postings.sort()
+            shard_dir = os.path.join(self.path, shard)
+            if not os.path.exists(shard_dir):
+                os.makedirs(shard_dir)
+
+            filename = os.path.join(shard, '{:08d}.seg'.format(manifest['next_segment']))
+            manifest['next_segment'] += 1
+            num_postings = _write_segment(os.path.join(self.path, filename), postings)
+            manifest['shards'].setdefault(shard, []).append({'file': filename, 'postings': num_postings})
+            if shard in self.segments:
+                self.segments[shard].append(Segment(os.path.join(self.path, filename)))
+
+        self._write_manifest(manifest)
+        self.pending = defaultdict(list)
+        self.num_pending = 0
+
+        for shard, segments in list(six.iteritems(manifest['shards'])):
+            if len(segments) > self.max_segments:
+                self.merge(shard)
+
+    def merge(self, shard=None):
+        """
+        Merge the segments of a shard (or of every shard) into a single segment,
+        dropping duplicate postings.
+        """
+        shards = [shard] if shard is not None else self.shards()
+        manifest = self.manifest
+        for shard in shards:
+            entries = manifest['shards'].get(shard, [])
+            if len(entries) < 2:
+                continue
+
+            segments = self._segments(shard)
+            filename = os.path.join(shard, '{:08d}.seg'.format(manifest['next_segment']))
+            manifest['next_segment'] += 1
+            num_postings = _write_segment(os.path.join(self.path, filename), heapq.merge(*segments))
+
+            manifest['shards'][shard] = [{'file': filename, 'postings': num_postings}]
+            self._write_manifest(manifest)
+
+            for segment in segments:
+                segment.close()
+            del self.segments[shard]
+            for entry in entries:
+                os.unlink(os.path.join(self.path, entry['file']))
+
+    def _segments(self, shard):
+        segments = self.segments.get(shard)
+        if segments is None:
+            segments = [Segment(os.path.join(self.path, entry['file'])) for entry in self.manifest['shards'][shard]]
+            self.segments[shard] = segments
+        return segments
+
+    def _blocks(self, keys, shards):
+        """
+        Key => record ids stored under the key in any of the shards, for the given keys
+        (in sorted order, so consecutive lookups touch nearby pages). Keys with no
+        postings or more than max_block_size are left out.
+        """
+        blocks = {}
+        max_block_size = self.max_block_size
+        for key in sorted(keys):
+            ranges = []
+            size = 0
+            for shard in shards:
+                for segment in self._segments(shard):
+                    start, end = segment.lookup(key)
+                    if end > start:
+                        ranges.append((segment, start, end))
+                        size += end - start
+            if size == 0 or (max_block_size is not None and size > max_block_size):
+                continue
+            record_ids = set()
+            for segment, start, end in ranges:
+                record_ids.update(segment.record_ids(start, end))
+            blocks[key] = record_ids
+        return blocks
+
+    def _ranked(self, keys, blocks, exclude=None):
+        counts = defaultdict(int)
+        for key in keys:
+            for record_id in blocks.get(key, ()):
+                counts[record_id] += 1
+        if exclude is not None:
+            counts.pop(exclude, None)
+        return [record_id for record_id, _ in sorted(six.iteritems(counts), key=lambda item: (-item[1], item[0]))]
+
+    def candidates_for_keys(self, keys, latitude=None, longitude=None, exclude=None):
+        """
+        Ids of the stored records sharing at least one of the given keys, ordered by the
+        number of keys shared (most first). Only the shards the keys can occur in are
+        read: the record's geohash cell, its neighbors and the no location shard, or
+        every shard for a record without coordinates.
+        """
+        keys = set(self._key_hashes(keys))
+        return self._ranked(keys, self._blocks(keys, self._query_shards(latitude, longitude)), exclude=exclude)
+
+    def candidates(self, labels, values, latitude=None, longitude=None, languages=None, exclude=None):
+        """Ids of the stored records sharing at least one blocking key with the given record."""
+        return self.candidates_for_keys(self.hashes(labels, values, latitude=latitude, longitude=longitude,
+                                                    languages=languages),
+                                        latitude=latitude, longitude=longitude, exclude=exclude)
+
+    def candidates_batch(self, records):
+        """
+        Candidates for a batch of new records, given as (labels, values) or
+        (labels, values, latitude, longitude) tuples. Returns a list of candidate id lists
+        in the same order. Records searching the same shards are grouped together and
+        each distinct key is looked up once per group, in key order.
+        """
+        groups = defaultdict(list)
+        num_records = 0
+        for i, record in enumerate(records):
+            labels, values = record[0], record[1]
+            latitude, longitude = (record[2], record[3]) if len(record) > 3 else (None, None)
+            keys = set(self.hashes(labels, values, latitude=latitude, longitude=longitude))
+            groups[tuple(self._query_shards(latitude, longitude))].append((i, keys))
+            num_records += 1
+
+        results = [None] * num_records
+        for shards, batch in six.iteritems(groups):
+            blocks = self._blocks(set().union(*(keys for i, keys in batch)), shards)
+            for i, keys in batch:
+                results[i] = self._ranked(keys, blocks)
+        return results
+
+    def stats(self):
+        """StoreStats(num_shards, num_segments, num_postings, num_pending)"""
+        shards = self.manifest['shards']
+        return StoreStats(len(shards), sum(len(entries) for entries in six.itervalues(shards)),
+                          sum(entry['postings'] for entries in six.itervalues(shards) for entry in entries),
+                          self.num_pending)
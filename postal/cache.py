@@ -0,0 +1,249 @@
+"""
+Opt-in, in-process memoization of the pypostal entry points.
+
+Address data tends to be very repetitive (the same city and street names, or
+even entire addresses, show up over and over), so caching the results of
+expand_address, parse_address, normalize_string and name_hashes can skip a
+large share of the calls into libpostal.
+
+Usage:
+    from postal.cache import PostalCache
+
+    cache = PostalCache(maxsize=100000)
+    cache.expand_address('30 W 26th St', languages=['en'])
+    cache.cache_info()
+
+Cached results are immutable (tuples instead of lists) so callers can't modify
+an entry that other callers will see.
+"""
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+
+from postal.utils.encoding import safe_decode
+
+DEFAULT_MAXSIZE = 100000
+
+CacheInfo = namedtuple('CacheInfo', 'hits, misses, evictions, currsize, maxsize, bytes, maxbytes')
+
+_missing = object()
+
+
+def _sizeof(value):
+    """Approximate memory footprint of a cached key or result."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (tuple, list, frozenset)):
+        size += sum(_sizeof(v) for v in value)
+    return size
+
+
+class LRUCache(object):
+    """
+    Thread-safe least-recently-used cache bounded by number of entries and,
+    optionally, by the approximate number of bytes held by keys and values.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, maxbytes=None):
+        if maxsize is not None and maxsize < 1:
+            raise ValueError('maxsize must be at least 1 or None')
+        if maxbytes is not None and maxbytes < 1:
+            raise ValueError('maxbytes must be at least 1 or None')
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key, _missing)
+            if entry is _missing:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = _sizeof(key) + _sizeof(value)
+        # Values too big to ever fit are not cached at all
+        if self.maxbytes is not None and size > self.maxbytes:
+            return
+
+        with self.lock:
+            old = self.entries.pop(key, _missing)
+            if old is not _missing:
+                self.bytes -= old[1]
+
+            self.entries[key] = (value, size)
+            self.bytes += size
+
+            while ((self.maxsize is not None and len(self.entries) > self.maxsize) or
+                   (self.maxbytes is not None and self.bytes > self.maxbytes)):
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def cache_info(self):
+        with self.lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, len(self.entries),
+                             self.maxsize, self.bytes, self.maxbytes)
+
+    def cache_clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = self.bytes = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def _languages_key(languages):
+    if languages is None:
+        return None
+    return tuple(safe_decode(l) for l in languages)
+
+
+def _limited(kw):
+    """Whether the expansion options include max_expansions or max_input_bytes."""
+    return bool(kw.get('max_expansions') or kw.get('max_input_bytes'))
+
+
+def _limited_value(result):
+    """A limited result as (values, truncated), so the cached value is immutable."""
+    if result is None:
+        return None
+    return tuple(result), result.truncated
+
+
+def _limited_result(value, output):
+    """A new Expansions/ExpansionHashes from a cached _limited_value."""
+    from postal.expand import limited_copy
+
+    if value is None:
+        return None
+    values, truncated = value
+    return limited_copy(values, truncated, output)
+
+
+class PostalCache(object):
+    """
+    Memoizing wrappers for expand_address, expand_address_root, parse_address,
+    normalize_string and name_hashes sharing one LRU cache.
+
+    Keys include the input and the complete set of options, with defaults filled
+    in, so e.g. expand_address(s) and expand_address(s, lowercase=True) share an
+    entry.
+
+    @param maxsize: maximum number of cached results (None for no limit)
+    @param maxbytes: maximum approximate size of the cached keys and results in bytes
+                     (None for no limit)
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, maxbytes=None):
+        self.cache = LRUCache(maxsize=maxsize, maxbytes=maxbytes)
+        self._expand_defaults = None
+        self._name_hash_defaults = None
+
+    def _options_key(self, defaults, kw):
+        options = dict(defaults)
+        options.update(kw)
+        return tuple(sorted(options.items()))
+
+    def _expand_key(self, func, text, defaults, languages, options, kw):
+        if options is not None:
+            # ExpandOptions are keyed by their fields, so they share entries with the
+            # equivalent keyword options
+            languages = options.languages
+            defaults = dict(defaults, **options.options)
+        return (func, text, _languages_key(languages), self._options_key(defaults, kw))
+
+    def _cached(self, key, func):
+        result = self.cache.get(key, _missing)
+        if result is _missing:
+            result = func()
+            self.cache.put(key, result)
+        return result
+
+    def expand_address(self, address, languages=None, options=None, **kw):
+        """
+        Cached postal.expand.expand_address, returns a tuple of expansions, or a new
+        Expansions/ExpansionHashes when max_expansions or max_input_bytes is given.
+        """
+        from postal import expand
+
+        if self._expand_defaults is None:
+            self._expand_defaults = dict(expand._expand.get_default_options(), root=False)
+
+        address = safe_decode(address, 'utf-8')
+        key = self._expand_key('expand_address', address, self._expand_defaults, languages, options, kw)
+
+        def expansions():
+            return expand.expand_address(address, languages=languages, options=options, **kw)
+
+        if _limited(kw):
+            return _limited_result(self._cached(key, lambda: _limited_value(expansions())), kw.get('output'))
+        return self._cached(key, lambda: tuple(expansions()))
+
+    def expand_address_root(self, address, languages=None, options=None, **kw):
+        """Cached postal.expand.expand_address_root, see expand_address."""
+        return self.expand_address(address, languages=languages, options=options, root=True, **kw)
+
+    def parse_address(self, address, language=None, country=None):
+        """Cached postal.parser.parse_address, returns a tuple of (component, label) tuples."""
+        from postal import parser
+
+        address = safe_decode(address, 'utf-8')
+        if language is not None:
+            language = safe_decode(language)
+        if country is not None:
+            country = safe_decode(country)
+        key = ('parse_address', address, language, country)
+        return self._cached(key, lambda: tuple(parser.parse_address(address, language=language, country=country)))
+
+    def normalize_string(self, s, string_options=None, languages=None):
+        """Cached postal.normalize.normalize_string."""
+        from postal import normalize
+
+        if string_options is None:
+            string_options = normalize.DEFAULT_STRING_OPTIONS
+
+        s = safe_decode(s)
+        key = ('normalize_string', s, string_options, _languages_key(languages))
+        return self._cached(key, lambda: normalize.normalize_string(s, string_options=string_options, languages=languages))
+
+    def name_hashes(self, name, languages=None, options=None, **kw):
+        """
+        Cached postal.near_dupe.name_hashes, returns a tuple of hashes (or None), or a new
+        Expansions/ExpansionHashes when max_expansions or max_input_bytes is given.
+        """
+        from postal import expand, near_dupe
+
+        if self._name_hash_defaults is None:
+            self._name_hash_defaults = dict(expand._expand.get_default_options(),
+                                            address_components=expand.ADDRESS_NAME | expand.ADDRESS_STREET)
+
+        name = safe_decode(name, 'utf-8')
+        key = self._expand_key('name_hashes', name, self._name_hash_defaults, languages, options, kw)
+
+        def hashes():
+            return near_dupe.name_hashes(name, languages=languages, options=options, **kw)
+
+        if _limited(kw):
+            return _limited_result(self._cached(key, lambda: _limited_value(hashes())), kw.get('output'))
+
+        def hashes_tuple():
+            result = hashes()
+            return tuple(result) if result is not None else None
+
+        return self._cached(key, hashes_tuple)
+
+    def cache_info(self):
+        """CacheInfo(hits, misses, evictions, currsize, maxsize, bytes, maxbytes)"""
+        return self.cache.cache_info()
+
+    def cache_clear(self):
+        self.cache.cache_clear()
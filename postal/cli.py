@@ -0,0 +1,333 @@
+"""
+Command-line tool for parsing, expanding, normalizing and hashing addresses in bulk.
+
+Reads CSV, TSV or JSONL from files or stdin and writes the same format to
+stdout with the results added to each row, e.g.
+
+    python -m postal parse addresses.csv --column address > parsed.csv
+    python -m postal expand --format jsonl --language-field lang < in.jsonl > out.jsonl
+    python -m postal hash addresses.tsv --workers 8 --lat-field lat --lon-field lon
+
+Input is read and processed chunk by chunk with a bounded number of chunks
+in flight, so memory use doesn't depend on the size of the input. Output is
+in input order, including with --workers.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+from postal.utils.encoding import safe_decode
+
+PARSE = 'parse'
+EXPAND = 'expand'
+NORMALIZE = 'normalize'
+HASH = 'hash'
+
+COMMANDS = (PARSE, EXPAND, NORMALIZE, HASH)
+
+CSV = 'csv'
+TSV = 'tsv'
+JSONL = 'jsonl'
+
+FORMATS = (CSV, TSV, JSONL)
+
+EXTENSION_FORMATS = {
+    '.csv': CSV,
+    '.tsv': TSV,
+    '.tab': TSV,
+    '.jsonl': JSONL,
+    '.ndjson': JSONL,
+    '.json': JSONL,
+}
+
+# Output columns for parse in CSV/TSV, in the order the parser's labels usually appear
+PARSER_LABELS = (
+    'house', 'category', 'near', 'house_number', 'road', 'unit', 'level', 'staircase',
+    'entrance', 'po_box', 'postcode', 'suburb', 'city_district', 'city', 'island',
+    'state_district', 'state', 'country_region', 'country', 'world_region',
+)
+
+# Separator for list results (expansions, hashes) in CSV/TSV
+LIST_SEPARATOR = '|'
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_PROGRESS_INTERVAL = 5.0
+
+
+def _languages(value):
+    if not value:
+        return None
+    return [l.strip() for l in value.split(',') if l.strip()]
+
+
+def _process_row(command, text, language, country, latitude, longitude):
+    from postal import _expand, _near_dupe, _normalize, _parser
+
+    if command == PARSE:
+        return _parser.parse_address(text, language=language, country=country)
+    elif command == EXPAND:
+        return _expand.expand_address(text, languages=_languages(language))
+    elif command == NORMALIZE:
+        return _normalize.normalize_string(text, _normalize.NORMALIZE_DEFAULT_STRING_OPTIONS,
+                                           languages=_languages(language))
+    elif command == HASH:
+        parsed = _parser.parse_address(text, language=language, country=country)
+        labels = [label for value, label in parsed]
+        values = [value for value, label in parsed]
+        kw = {}
+        if latitude is not None and longitude is not None:
+            kw = dict(with_latlon=True, latitude=latitude, longitude=longitude)
+        return _near_dupe.near_dupe_hashes(labels, values, languages=_languages(language), **kw) or []
+    raise ValueError('Invalid command: {}'.format(command))
+
+
+def process_chunk(chunk, command):
+    """Process a chunk of (text, language, country, latitude, longitude) tuples."""
+    if command == PARSE and all(latitude is None for _, _, _, latitude, _ in chunk):
+        from postal import _parser
+        return _parser.parse_addresses([text for text, _, _, _, _ in chunk],
+                                       language=[language for _, language, _, _, _ in chunk],
+                                       country=[country for _, _, country, _, _ in chunk])
+    return [_process_row(command, *row) for row in chunk]
+
+
+class Progress(object):
+    """Throughput and ETA on stderr every interval seconds."""
+
+    def __init__(self, interval, total_bytes=None, stream=sys.stderr):
+        self.interval = interval
+        self.total_bytes = total_bytes
+        self.stream = stream
+        self.start = self.last = time.time()
+        self.rows = 0
+
+    def update(self, rows, bytes_read=None, force=False):
+        self.rows = rows
+        now = time.time()
+        if self.interval is None or (not force and now - self.last < self.interval):
+            return
+        self.last = now
+
+        elapsed = now - self.start
+        rate = rows / elapsed if elapsed > 0 else 0.0
+        message = '{:,} rows  {:,.0f} rows/s  {:.0f}s elapsed'.format(rows, rate, elapsed)
+        if self.total_bytes and bytes_read:
+            fraction = min(float(bytes_read) / self.total_bytes, 1.0)
+            remaining = elapsed * (1.0 - fraction) / fraction if fraction > 0 else 0.0
+            message += '  {:.1f}%  ETA {:.0f}s'.format(fraction * 100, remaining)
+        self.stream.write(message + '\n')
+        self.stream.flush()
+
+
+class InputFiles(object):
+    """Opens the input paths in turn (- for stdin) and tracks how many bytes have been read."""
+
+    def __init__(self, paths):
+        self.paths = paths or ['-']
+        self.done_bytes = 0
+        self.current = None
+
+    def total_bytes(self):
+        try:
+            return sum(os.path.getsize(p) for p in self.paths if p != '-')
+        except OSError:
+            return None
+
+    def bytes_read(self):
+        position = 0
+        if self.current is not None and not self.current.closed:
+            try:
+                position = self.current.tell()
+            except (IOError, OSError, ValueError):
+                pass
+        return self.done_bytes + position
+
+    def __iter__(self):
+        for path in self.paths:
+            if path == '-':
+                binary = sys.stdin.buffer
+            else:
+                binary = open(path, 'rb')
+            self.current = binary if path != '-' else None
+            stream = io.TextIOWrapper(binary, encoding='utf-8', newline='')
+            try:
+                yield path, stream
+            finally:
+                if path != '-':
+                    self.done_bytes += os.path.getsize(path)
+                    stream.close()
+                else:
+                    stream.detach()
+                self.current = None
+
+
+def _guess_format(paths):
+    for path in paths:
+        fmt = EXTENSION_FORMATS.get(os.path.splitext(path)[1].lower())
+        if fmt is not None:
+            return fmt
+    return CSV
+
+
+def _read_rows(inputs, fmt, state):
+    for path, stream in inputs:
+        if fmt == JSONL:
+            for line in stream:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        else:
+            reader = csv.DictReader(stream, dialect='excel-tab' if fmt == TSV else 'excel')
+            if state.get('fieldnames') is None:
+                state['fieldnames'] = list(reader.fieldnames or [])
+            for row in reader:
+                yield row
+
+
+def _float(value):
+    if value is None or value == '':
+        return None
+    return float(value)
+
+
+def _field(row, field, default=None):
+    if field is None:
+        return default
+    value = row.get(field)
+    return safe_decode(value) if value not in (None, '') else default
+
+
+def _output_columns(command):
+    if command == PARSE:
+        return list(PARSER_LABELS)
+    elif command == EXPAND:
+        return ['expansions']
+    elif command == NORMALIZE:
+        return ['normalized']
+    return ['hashes']
+
+
+def _add_result(row, command, result, fmt):
+    if command == PARSE:
+        components = {}
+        for value, label in result:
+            components[label] = components[label] + ' ' + value if label in components else value
+        if fmt == JSONL:
+            row['parsed'] = components
+        else:
+            row.update(components)
+    elif command == NORMALIZE:
+        row['normalized'] = result
+    else:
+        name = 'expansions' if command == EXPAND else 'hashes'
+        row[name] = list(result) if fmt == JSONL else LIST_SEPARATOR.join(result)
+    return row
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m postal',
+                                     description='Parse, expand, normalize or hash addresses in bulk.')
+    parser.add_argument('command', choices=COMMANDS)
+    parser.add_argument('inputs', nargs='*', help='input files, stdin if none or -')
+    parser.add_argument('--format', choices=FORMATS, help='input and output format, guessed from the file '
+                                                          'extension by default (csv for stdin)')
+    parser.add_argument('--column', default='address', help='column or JSON key with the address (default: address)')
+    parser.add_argument('--language', help='language code for every row (comma-separated for expand/normalize/hash)')
+    parser.add_argument('--language-field', help='column with a language code per row')
+    parser.add_argument('--country', help='country code for every row (parse/hash)')
+    parser.add_argument('--country-field', help='column with a country code per row (parse/hash)')
+    parser.add_argument('--lat-field', help='column with the latitude, for geohash keys (hash)')
+    parser.add_argument('--lon-field', help='column with the longitude, for geohash keys (hash)')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes (default: 1)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='rows per chunk')
+    parser.add_argument('--progress-interval', type=float, default=DEFAULT_PROGRESS_INTERVAL,
+                        help='seconds between progress reports on stderr')
+    parser.add_argument('--quiet', action='store_true', help='no progress reports')
+    return parser
+
+
+def main(argv=None, stdout=None):
+    args = build_parser().parse_args(argv)
+    if args.workers < 1:
+        raise SystemExit('--workers must be at least 1')
+    if args.chunk_size < 1:
+        raise SystemExit('--chunk-size must be at least 1')
+
+    stdout = stdout or io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', newline='', line_buffering=False)
+
+    fmt = args.format or _guess_format(args.inputs)
+    inputs = InputFiles(args.inputs)
+    progress = Progress(None if args.quiet else args.progress_interval, total_bytes=inputs.total_bytes())
+
+    state = {}
+    rows = _read_rows(inputs, fmt, state)
+
+    def chunks():
+        while True:
+            chunk = list(islice(rows, args.chunk_size))
+            if not chunk:
+                break
+            yield chunk
+
+    def work(chunk):
+        return [(_field(row, args.column, ''),
+                 _field(row, args.language_field, args.language),
+                 _field(row, args.country_field, args.country),
+                 _float(_field(row, args.lat_field)),
+                 _float(_field(row, args.lon_field)))
+                for row in chunk]
+
+    pool = None
+    if args.workers > 1:
+        from postal.pool import PostalPool
+        components = ('libpostal', 'language_classifier', 'parser')
+        pool = PostalPool(processes=args.workers, components=components)
+
+    writer = None
+    count = 0
+    try:
+        def results():
+            # Input chunks are kept in order next to the results computed for them
+            if pool is None:
+                for chunk in chunks():
+                    yield chunk, process_chunk(work(chunk), args.command)
+            else:
+                buffered = []
+
+                def inputs_for_pool():
+                    for chunk in chunks():
+                        buffered.append(chunk)
+                        yield work(chunk)
+
+                for result in pool.imap(process_chunk, inputs_for_pool(), chunk_size=1, command=args.command):
+                    yield buffered.pop(0), result
+
+        for chunk, chunk_results in results():
+            for row, result in zip(chunk, chunk_results):
+                row = _add_result(row, args.command, result, fmt)
+                if fmt == JSONL:
+                    stdout.write(json.dumps(row, ensure_ascii=False))
+                    stdout.write('\n')
+                else:
+                    if writer is None:
+                        fieldnames = state.get('fieldnames') or []
+                        fieldnames = fieldnames + [c for c in _output_columns(args.command) if c not in fieldnames]
+                        writer = csv.DictWriter(stdout, fieldnames=fieldnames, extrasaction='ignore',
+                                                dialect='excel-tab' if fmt == TSV else 'excel')
+                        writer.writeheader()
+                    writer.writerow(row)
+            count += len(chunk)
+            progress.update(count, inputs.bytes_read())
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        stdout.flush()
+
+    progress.update(count, inputs.bytes_read(), force=True)
+    return 0
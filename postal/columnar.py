@@ -0,0 +1,173 @@
+"""
+Columnar parse_address and expand_address for pyarrow arrays and pandas Series.
+
+Addresses are read straight from the Arrow UTF-8 buffers and the results are
+written into Arrow buffers in C, without creating a Python string per row, and
+with the GIL released for the whole column.
+
+Usage:
+    import pyarrow as pa
+    from postal.columnar import parse_address_column, expand_address_column
+
+    addresses = pa.array(['781 Franklin Ave Crown Heights Brooklyn NY 11216', None])
+    parsed = parse_address_column(addresses)   # StructArray, one utf8 field per label
+    parsed.field('road')
+    expand_address_column(addresses, languages=['en'])   # list<utf8> array
+
+    parse_address_column(df['address'])        # DataFrame, one column per label
+
+Requires pyarrow (pip install postal[arrow]), plus pandas for Series
+(pip install postal[pandas]). Columns over 2GB of output should be passed as
+smaller chunks (e.g. a ChunkedArray), since results use 32-bit offsets.
+"""
+import sys
+
+from postal import _expand, _parser
+from postal.expand import ExpandOptions
+from postal.parser import LABELS
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError('postal.columnar requires pyarrow, install it with pip install postal[arrow]')
+
+
+def _series_type():
+    # A Series can only be passed in if pandas has been imported already
+    pd = sys.modules.get('pandas')
+    return pd.Series if pd is not None else None
+
+
+def _string_chunks(values):
+    """Input as (list of utf8/large_utf8 arrays, was chunked)."""
+    series_type = _series_type()
+    if series_type is not None and isinstance(values, series_type):
+        values = pa.Array.from_pandas(values)
+    elif not isinstance(values, (pa.Array, pa.ChunkedArray)):
+        values = pa.array(values, type=pa.string())
+
+    chunked = isinstance(values, pa.ChunkedArray)
+    chunks = values.chunks if chunked else [values]
+
+    result = []
+    for chunk in chunks:
+        if not (pa.types.is_string(chunk.type) or pa.types.is_large_string(chunk.type)):
+            chunk = chunk.cast(pa.string())
+        result.append(chunk)
+    return result, chunked
+
+
+def _buffers(chunk):
+    validity, offsets, data = chunk.buffers()
+    if chunk.null_count == 0:
+        validity = None
+    return (validity, offsets if offsets is not None else b'\0' * 8, data if data is not None else b'',
+            chunk.offset, len(chunk), pa.types.is_large_string(chunk.type))
+
+
+def _string_array(length, buffers):
+    validity, offsets, data, null_count = buffers
+    return pa.Array.from_buffers(pa.string(), length,
+                                 [pa.py_buffer(validity) if validity is not None else None,
+                                  pa.py_buffer(offsets), pa.py_buffer(data)],
+                                 null_count=null_count)
+
+
+def _parse_chunk(chunk, language, country):
+    return [(label, _string_array(len(chunk), buffers))
+            for label, buffers in _parser.parse_address_arrow(*_buffers(chunk), language=language, country=country)]
+
+
+def parse_address_column(values, language=None, country=None, labels=None):
+    """
+    Parse a column of addresses.
+
+    Returns a pyarrow StructArray (ChunkedArray for a ChunkedArray input) with one
+    utf8 field per label, null where the address has no component with that label,
+    or a pandas DataFrame with the same index for a Series. Components with the
+    same label in one address are joined with a space. Null addresses give null rows.
+
+    @param values: pyarrow string array or ChunkedArray, pandas Series or a sequence of strings
+    @param language (optional): language code applied to every address
+    @param country (optional): country code applied to every address
+    @param labels: the fields of the result, by default LABELS followed by any other
+                   labels the parser returned
+    """
+    _require_pyarrow()
+    chunks, chunked = _string_chunks(values)
+    parsed = [dict(_parse_chunk(chunk, language, country)) for chunk in chunks]
+
+    if labels is None:
+        labels = list(LABELS)
+        for columns in parsed:
+            labels.extend(label for label in columns if label not in labels)
+    else:
+        labels = list(labels)
+
+    struct_type = pa.struct([(label, pa.string()) for label in labels])
+
+    result = []
+    for chunk, columns in zip(chunks, parsed):
+        fields = [columns.get(label, pa.nulls(len(chunk), pa.string())) for label in labels]
+        mask = chunk.is_null() if chunk.null_count > 0 else None
+        result.append(pa.StructArray.from_arrays(fields, fields=list(struct_type), mask=mask))
+
+    series_type = _series_type()
+    if series_type is not None and isinstance(values, series_type):
+        import pandas as pd
+        data = dict((label, pd.Series(pa.chunked_array([r.field(i) for r in result], type=pa.string()),
+                                      dtype=pd.ArrowDtype(pa.string()), index=values.index))
+                    for i, label in enumerate(labels))
+        return pd.DataFrame(data, columns=labels, index=values.index)
+
+    if chunked:
+        return pa.chunked_array(result, type=struct_type)
+    return result[0]
+
+
+def _expand_chunk(chunk, options, root):
+    validity, offsets, null_count, values = _expand.expand_address_arrow(*_buffers(chunk), options=options, root=root)
+    num_values = len(values[1]) // 4 - 1
+    return pa.Array.from_buffers(pa.list_(pa.string()), len(chunk),
+                                 [pa.py_buffer(validity) if validity is not None else None, pa.py_buffer(offsets)],
+                                 null_count=null_count, children=[_string_array(num_values, values)])
+
+
+def expand_address_column(values, languages=None, options=None, root=False, **kw):
+    """
+    Expand a column of addresses.
+
+    Returns a pyarrow list<utf8> array (ChunkedArray for a ChunkedArray input) with
+    the expansions of each address, or a pandas Series with the same index for a
+    Series. Null addresses give null rows.
+
+    @param values: pyarrow string array or ChunkedArray, pandas Series or a sequence of strings
+    @param languages: languages to use for every address, see expand_address
+    @param options: a precompiled ExpandOptions instead of languages and keyword options
+    @param root: return the root expansions (see expand_address_root)
+    @param kw: the keyword options of expand_address
+    """
+    _require_pyarrow()
+    if options is None:
+        options = ExpandOptions(languages=languages, **kw)
+    elif languages is not None or kw:
+        raise TypeError('languages and keyword options cannot be combined with options=')
+
+    chunks, chunked = _string_chunks(values)
+    result = [_expand_chunk(chunk, options, root) for chunk in chunks]
+
+    series_type = _series_type()
+    if series_type is not None and isinstance(values, series_type):
+        import pandas as pd
+        list_type = pa.list_(pa.string())
+        return pd.Series(pa.chunked_array(result, type=list_type), dtype=pd.ArrowDtype(list_type),
+                         index=values.index, name=values.name)
+
+    if chunked:
+        return pa.chunked_array(result, type=pa.list_(pa.string()))
+    return result[0]
@@ -0,0 +1,92 @@
+"""
+Thread pool helpers for calling libpostal from multiple threads.
+
+All of the C extensions release the GIL while libpostal is working, so the
+normalization, tokenization, expansion, near-dupe hashing and dedupe calls
+run in parallel across threads. The one exception is the address parser:
+libpostal's parser shares a single context between calls, so parse_address
+and parse_addresses are serialized internally. Other threads still run
+while a parse is in progress, but parsing itself does not scale past one
+core per process (use processes for that).
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+DEFAULT_CHUNK_SIZE = 64
+
+
+def _call_chunk(func, chunk, kw):
+    return [func(item, **kw) for item in chunk]
+
+
+class ThreadPool(object):
+    """
+    Fixed-size pool of threads for running libpostal calls concurrently.
+
+    Usage:
+        with ThreadPool(max_workers=8) as pool:
+            for expansions in pool.map(expand_address, addresses, languages=['en']):
+                ...
+    """
+
+    def __init__(self, max_workers):
+        if max_workers < 1:
+            raise ValueError('max_workers must be at least 1')
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def submit(self, func, *args, **kw):
+        return self.executor.submit(func, *args, **kw)
+
+    def map(self, func, iterable, chunk_size=DEFAULT_CHUNK_SIZE, **kw):
+        """
+        Apply func to each item of iterable, yielding results in input order.
+
+        Items are handed to the worker threads chunk_size at a time and at most
+        2 * max_workers chunks are in flight at once, so the input is consumed
+        lazily and memory stays bounded for large iterables.
+
+        @param func: function to call as func(item, **kw) e.g. expand_address
+        @param iterable: inputs to func
+        @param chunk_size: number of items per task
+        """
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be at least 1')
+
+        items = iter(iterable)
+        pending = deque()
+        max_pending = self.max_workers * 2
+
+        while True:
+            while len(pending) < max_pending:
+                chunk = list(islice(items, chunk_size))
+                if not chunk:
+                    break
+                pending.append(self.executor.submit(_call_chunk, func, chunk, kw))
+
+            if not pending:
+                break
+
+            for result in pending.popleft().result():
+                yield result
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown(wait=True)
+        return False
+
+
+def thread_map(func, iterable, max_workers, chunk_size=DEFAULT_CHUNK_SIZE, **kw):
+    """
+    Apply func to each item of iterable using max_workers threads, yielding
+    results in input order. See ThreadPool.map.
+    """
+    with ThreadPool(max_workers) as pool:
+        for result in pool.map(func, iterable, chunk_size=chunk_size, **kw):
+            yield result
@@ -1,4 +1,8 @@
 """Python bindings to libpostal near_dupe_hashes."""
+import time
+
+from array import array
+from collections import OrderedDict, namedtuple
 
 from postal import _dedupe
 from postal.utils.enum import Enum, EnumValue
@@ -64,3 +68,464 @@ def is_name_duplicate_fuzzy(tokens1, scores1, tokens2, scores2, languages=None,
 def is_street_duplicate_fuzzy(tokens1, scores1, tokens2, scores2, languages=None, **kw):
     dupe_status, sim = _dedupe.is_street_duplicate_fuzzy(tokens1, scores1, tokens2, scores2, languages=languages, **kw)
     return duplicate_status.from_id(dupe_status), sim
+
+
+def _index_array(indexes):
+    if isinstance(indexes, array) and indexes.typecode == 'I':
+        return indexes
+    return array('I', indexes)
+
+
+def _many_args(values1, values2, table):
+    if table is None:
+        if not isinstance(values1, (list, tuple)):
+            values1 = list(values1)
+        if not isinstance(values2, (list, tuple)):
+            values2 = list(values2)
+        return values1, values2
+    return _index_array(values1), _index_array(values2)
+
+
+def _is_duplicate_many(field, values1, values2, languages=None, table=None):
+    values1, values2 = _many_args(values1, values2, table)
+    statuses = array('b')
+    statuses.frombytes(_dedupe.is_duplicate_many(field, values1, values2, languages=languages, table=table))
+    return statuses
+
+
+def _is_duplicate_fuzzy_many(field, values1, values2, languages=None, table=None, **kw):
+    values1, values2 = _many_args(values1, values2, table)
+    statuses, similarities = _dedupe.is_duplicate_fuzzy_many(field, values1, values2, languages=languages,
+                                                             table=table, **kw)
+    status_array = array('b')
+    status_array.frombytes(statuses)
+    similarity_array = array('d')
+    similarity_array.frombytes(similarities)
+    return status_array, similarity_array
+
+
+def is_name_duplicate_many(values1, values2, languages=None, table=None):
+    """
+    Vectorized is_name_duplicate over pairs (values1[i], values2[i]).
+
+    Returns an array('b') of duplicate status ids, use duplicate_status.from_id to
+    get the enum value. None or empty values give NULL_DUPLICATE.
+
+    @param values1, values2: sequences of strings of the same length, or when table
+                             is given, sequences (ideally array('I')) of indexes into table
+    @param languages: languages to use for every pair, if None the language classifier is used
+    @param table: optional sequence of strings shared by the pairs, so that values
+                  repeated across pairs are only passed and converted once
+    """
+    return _is_duplicate_many(_dedupe.DEDUPE_FIELD_NAME, values1, values2, languages=languages, table=table)
+
+
+def is_street_duplicate_many(values1, values2, languages=None, table=None):
+    """Vectorized is_street_duplicate, see is_name_duplicate_many."""
+    return _is_duplicate_many(_dedupe.DEDUPE_FIELD_STREET, values1, values2, languages=languages, table=table)
+
+
+def is_house_number_duplicate_many(values1, values2, languages=None, table=None):
+    """Vectorized is_house_number_duplicate, see is_name_duplicate_many."""
+    return _is_duplicate_many(_dedupe.DEDUPE_FIELD_HOUSE_NUMBER, values1, values2, languages=languages, table=table)
+
+
+def is_po_box_duplicate_many(values1, values2, languages=None, table=None):
+    """Vectorized is_po_box_duplicate, see is_name_duplicate_many."""
+    return _is_duplicate_many(_dedupe.DEDUPE_FIELD_PO_BOX, values1, values2, languages=languages, table=table)
+
+
+def is_unit_duplicate_many(values1, values2, languages=None, table=None):
+    """Vectorized is_unit_duplicate, see is_name_duplicate_many."""
+    return _is_duplicate_many(_dedupe.DEDUPE_FIELD_UNIT, values1, values2, languages=languages, table=table)
+
+
+def is_floor_duplicate_many(values1, values2, languages=None, table=None):
+    """Vectorized is_floor_duplicate, see is_name_duplicate_many."""
+    return _is_duplicate_many(_dedupe.DEDUPE_FIELD_FLOOR, values1, values2, languages=languages, table=table)
+
+
+def is_postal_code_duplicate_many(values1, values2, languages=None, table=None):
+    """Vectorized is_postal_code_duplicate, see is_name_duplicate_many."""
+    return _is_duplicate_many(_dedupe.DEDUPE_FIELD_POSTAL_CODE, values1, values2, languages=languages, table=table)
+
+
+def is_name_duplicate_fuzzy_many(values1, values2, languages=None, table=None, **kw):
+    """
+    Vectorized is_name_duplicate_fuzzy. Each value is a (tokens, scores) pair,
+    and None or empty tokens give NULL_DUPLICATE.
+
+    Returns (statuses, similarities) as an array('b') of duplicate status ids and
+    an array('d') of similarities.
+
+    @param values1, values2: sequences of (tokens, scores) of the same length, or when
+                             table is given, sequences of indexes into table
+    @param languages: languages to use for every pair, if None the language classifier is used
+    @param table: optional sequence of (tokens, scores) shared by the pairs
+    @param needs_review_threshold, likely_dupe_threshold: see is_name_duplicate_fuzzy
+    """
+    return _is_duplicate_fuzzy_many(_dedupe.DEDUPE_FUZZY_FIELD_NAME, values1, values2,
+                                    languages=languages, table=table, **kw)
+
+
+def is_street_duplicate_fuzzy_many(values1, values2, languages=None, table=None, **kw):
+    """Vectorized is_street_duplicate_fuzzy, see is_name_duplicate_fuzzy_many."""
+    return _is_duplicate_fuzzy_many(_dedupe.DEDUPE_FUZZY_FIELD_STREET, values1, values2,
+                                    languages=languages, table=table, **kw)
+
+
+# Component fields which can be compared in batch with compare_pairs
+NAME = 'name'
+STREET = 'street'
+HOUSE_NUMBER = 'house_number'
+PO_BOX = 'po_box'
+UNIT = 'unit'
+FLOOR = 'floor'
+POSTAL_CODE = 'postal_code'
+# The toponyms of a whole record (city, state, etc.), only for PreparedRecord comparisons
+TOPONYM = 'toponym'
+
+FIELD_IDS = {
+    NAME: _dedupe.DEDUPE_FIELD_NAME,
+    STREET: _dedupe.DEDUPE_FIELD_STREET,
+    HOUSE_NUMBER: _dedupe.DEDUPE_FIELD_HOUSE_NUMBER,
+    PO_BOX: _dedupe.DEDUPE_FIELD_PO_BOX,
+    UNIT: _dedupe.DEDUPE_FIELD_UNIT,
+    FLOOR: _dedupe.DEDUPE_FIELD_FLOOR,
+    POSTAL_CODE: _dedupe.DEDUPE_FIELD_POSTAL_CODE,
+}
+
+# Address parser labels which map to each field
+LABEL_FIELDS = {
+    'house': NAME,
+    'road': STREET,
+    'house_number': HOUSE_NUMBER,
+    'po_box': PO_BOX,
+    'unit': UNIT,
+    'level': FLOOR,
+    'postcode': POSTAL_CODE,
+}
+
+DEFAULT_FIELDS = (NAME, STREET, HOUSE_NUMBER, UNIT, POSTAL_CODE)
+
+PREPARED_FIELD_IDS = dict(FIELD_IDS)
+PREPARED_FIELD_IDS[TOPONYM] = _dedupe.DEDUPE_FIELD_TOPONYM
+
+
+def _field_ids(fields, field_ids=FIELD_IDS):
+    try:
+        return [field_ids[f] for f in fields]
+    except KeyError as e:
+        raise ValueError('Invalid field: {}, must be one of {}'.format(e.args[0], ', '.join(sorted(field_ids))))
+
+
+def compare_pairs(columns, fields, pairs, languages=None):
+    """
+    Compare many pairs of records field by field in one call.
+
+    Returns an array('b') of duplicate status ids (see duplicate_status) with
+    len(fields) statuses per pair, i.e. the status for field j of pair i is at
+    i * len(fields) + j. Missing values (None or empty) give NULL_DUPLICATE.
+
+    @param columns: one sequence of values per field, indexed by record
+    @param fields: field names e.g. (NAME, STREET, HOUSE_NUMBER)
+    @param pairs: array('I') of record indexes, flattened (index1, index2) pairs
+    @param languages: languages to use for every comparison, if None the language
+                      classifier is used on each value
+    """
+    statuses = array('b')
+    statuses.frombytes(_dedupe.compare_pairs(columns, _field_ids(fields), pairs, languages=languages))
+    return statuses
+
+
+PreparedRecord = _dedupe.PreparedRecord
+
+
+def compare(record1, record2, fields=DEFAULT_FIELDS):
+    """
+    Compare two PreparedRecords field by field.
+
+    Returns an OrderedDict of field => duplicate_status. Fields missing from
+    either record give NULL_DUPLICATE.
+
+    @param record1, record2: PreparedRecord instances
+    @param fields: field names e.g. (NAME, STREET, HOUSE_NUMBER, TOPONYM)
+    """
+    fields = list(fields)
+    statuses = array('b')
+    statuses.frombytes(_dedupe.compare_prepared(record1, record2, _field_ids(fields, PREPARED_FIELD_IDS)))
+    return OrderedDict((f, duplicate_status.from_id(s)) for f, s in zip(fields, statuses))
+
+
+def compare_many(record, others, fields=DEFAULT_FIELDS):
+    """
+    Compare one PreparedRecord against many others in one call.
+
+    Returns an array('b') of duplicate status ids laid out like compare_pairs,
+    the status for field j of others[i] is at i * len(fields) + j.
+
+    @param record: PreparedRecord
+    @param others: sequence of PreparedRecords
+    @param fields: field names e.g. (NAME, STREET, HOUSE_NUMBER, TOPONYM)
+    """
+    if not isinstance(others, (list, tuple)):
+        others = list(others)
+    statuses = array('b')
+    statuses.frombytes(_dedupe.compare_prepared(record, others, _field_ids(fields, PREPARED_FIELD_IDS)))
+    return statuses
+
+
+class DuplicateRule(object):
+    """
+    Combines the per-field statuses of a pair into a duplicate/not duplicate decision.
+
+    A pair is a duplicate when at least one of the match fields is present in
+    both records, every match field present in both has a status of at least
+    min_status, and none of the conflict fields is NON_DUPLICATE.
+
+    Any callable taking a dict of field => status id and returning a bool can be
+    used as a rule instead.
+
+    @param match: fields which have to agree e.g. (NAME, STREET, HOUSE_NUMBER)
+    @param conflict: fields which only rule out a duplicate when they disagree e.g. (UNIT,)
+    @param min_status: lowest duplicate_status accepted for the match fields
+    """
+
+    def __init__(self, match=(NAME, STREET, HOUSE_NUMBER), conflict=(UNIT, FLOOR, PO_BOX, POSTAL_CODE),
+                 min_status=duplicate_status.LIKELY_DUPLICATE):
+        self.match = tuple(match)
+        self.conflict = tuple(conflict)
+        self.min_status = int(getattr(min_status, 'value', min_status))
+
+    def compile(self, fields):
+        """Returns predicate(statuses, offset) for statuses laid out as in compare_pairs."""
+        fields = list(fields)
+        match = [fields.index(f) for f in self.match if f in fields]
+        conflict = [fields.index(f) for f in self.conflict if f in fields]
+        null_status = _dedupe.NULL_DUPLICATE_STATUS
+        non_duplicate = _dedupe.NON_DUPLICATE
+        min_status = self.min_status
+
+        def is_duplicate(statuses, offset):
+            matched = False
+            for j in match:
+                status = statuses[offset + j]
+                if status == null_status:
+                    continue
+                if status < min_status:
+                    return False
+                matched = True
+            if not matched:
+                return False
+            for j in conflict:
+                if statuses[offset + j] == non_duplicate:
+                    return False
+            return True
+
+        return is_duplicate
+
+    def __call__(self, statuses):
+        fields = list(statuses)
+        return self.compile(fields)([statuses[f] for f in fields], 0)
+
+
+def _compile_rule(rule, fields):
+    if hasattr(rule, 'compile'):
+        return rule.compile(fields)
+
+    num_fields = len(fields)
+
+    def is_duplicate(statuses, offset):
+        return rule(dict(zip(fields, statuses[offset:offset + num_fields])))
+
+    return is_duplicate
+
+
+class UnionFind(object):
+    """Disjoint sets over the integers 0..n-1, stored in two array('I')."""
+
+    def __init__(self):
+        self.parents = array('I')
+        self.sizes = array('I')
+
+    def __len__(self):
+        return len(self.parents)
+
+    def add(self):
+        i = len(self.parents)
+        self.parents.append(i)
+        self.sizes.append(1)
+        return i
+
+    def find(self, i):
+        parents = self.parents
+        while parents[i] != i:
+            # Path halving
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    def union(self, i, j):
+        i = self.find(i)
+        j = self.find(j)
+        if i == j:
+            return False
+        if self.sizes[i] < self.sizes[j]:
+            i, j = j, i
+        self.parents[j] = i
+        self.sizes[i] += self.sizes[j]
+        return True
+
+
+DedupeStats = namedtuple('DedupeStats', 'records, candidate_pairs, duplicate_pairs, batches, '
+                                        'oversized_blocks, seconds')
+
+
+class Deduper(object):
+    """
+    Streaming dedupe pipeline: blocking, batched pairwise comparison and clustering.
+
+    Each record added is hashed with near_dupe_hashes and compared against the
+    earlier records it shares a block with (see NearDupeIndex), so every
+    candidate pair is generated once. Pairs are buffered and compared batch_size
+    at a time in a single call to compare_pairs, with the GIL released, and the
+    pairs the rule accepts are merged into clusters with union-find.
+
+    Memory does not grow with the number of candidate pairs, but it does grow
+    linearly with the number of records: the index keeps the blocking keys and
+    postings, and the field values of every record are kept in memory so that
+    later records can be compared with them. The input has to fit in memory in
+    that form. For larger inputs, partition the records by a coarse key which
+    duplicates always share (e.g. postal code or a geohash prefix) and run one
+    Deduper per partition, or block with postal.blocking_store.BlockingStore.
+
+    Usage:
+        deduper = Deduper(languages=['en'], progress=print)
+        for record_id, labels, values, lat, lon in records:
+            deduper.add(record_id, labels, values, latitude=lat, longitude=lon)
+        clusters = deduper.clusters()
+
+    @param fields: fields to compare, see FIELD_IDS
+    @param rule: DuplicateRule, or a callable taking a dict of field => status id
+    @param languages: languages for hashing and comparison, if None the language classifier is used
+    @param max_block_size: see NearDupeIndex
+    @param batch_size: number of candidate pairs compared per call into libpostal
+    @param progress: callable receiving DedupeStats every progress_every records
+    @param progress_every: number of records between progress calls
+    @param kw: options for near_dupe_hashes
+    """
+
+    def __init__(self, fields=DEFAULT_FIELDS, rule=None, languages=None, max_block_size=1000,
+                 batch_size=10000, progress=None, progress_every=100000, **kw):
+        from postal.near_dupe import NearDupeIndex
+
+        if batch_size < 1:
+            raise ValueError('batch_size must be at least 1')
+        if progress_every < 1:
+            raise ValueError('progress_every must be at least 1')
+
+        self.fields = tuple(fields)
+        self.field_ids = _field_ids(self.fields)
+        self.is_duplicate = _compile_rule(rule if rule is not None else DuplicateRule(), self.fields)
+        self.languages = languages
+        self.batch_size = batch_size
+        self.progress = progress
+        self.progress_every = progress_every
+
+        self.index = NearDupeIndex(max_block_size=max_block_size, languages=languages, **kw)
+        self.columns = [[] for f in self.fields]
+        self.field_positions = dict((f, j) for j, f in enumerate(self.fields))
+        self.union_find = UnionFind()
+        self.pairs = array('I')
+
+        self.candidate_pairs = 0
+        self.duplicate_pairs = 0
+        self.batches = 0
+        self.start = time.perf_counter()
+
+    def add(self, record_id, labels, values, latitude=None, longitude=None):
+        """Add a record, see NearDupeIndex.add"""
+        if record_id in self.index:
+            raise ValueError('Record id {!r} has already been added'.format(record_id))
+
+        keys = self.index.hashes(labels, values, latitude=latitude, longitude=longitude)
+        internal_id = self.union_find.add()
+
+        row = [None] * len(self.fields)
+        for label, value in zip(labels, values):
+            j = self.field_positions.get(LABEL_FIELDS.get(label))
+            if j is not None:
+                row[j] = value
+        for column, value in zip(self.columns, row):
+            column.append(value)
+
+        pairs = self.pairs
+        for candidate_id in self.index.shared_key_counts(keys):
+            pairs.append(candidate_id)
+            pairs.append(internal_id)
+        self.index.add_keys(record_id, keys)
+
+        if len(pairs) >= 2 * self.batch_size:
+            self.flush()
+
+        if self.progress is not None and len(self.index) % self.progress_every == 0:
+            self.progress(self.stats())
+
+    def extend(self, records):
+        """Add records from an iterable of (record_id, labels, values[, latitude, longitude]) tuples."""
+        for record in records:
+            self.add(*record)
+
+    def flush(self):
+        """Compare any buffered candidate pairs."""
+        pairs = self.pairs
+        if not pairs:
+            return
+
+        num_pairs = len(pairs) // 2
+        statuses = compare_pairs(self.columns, self.fields, pairs, languages=self.languages)
+
+        is_duplicate = self.is_duplicate
+        union_find = self.union_find
+        num_fields = len(self.fields)
+        for i in range(num_pairs):
+            if is_duplicate(statuses, i * num_fields):
+                union_find.union(pairs[2 * i], pairs[2 * i + 1])
+                self.duplicate_pairs += 1
+
+        self.candidate_pairs += num_pairs
+        self.batches += 1
+        self.pairs = array('I')
+
+    def stats(self):
+        """DedupeStats for the records added so far."""
+        return DedupeStats(len(self.index), self.candidate_pairs + len(self.pairs) // 2, self.duplicate_pairs,
+                           self.batches, self.index.num_oversized, time.perf_counter() - self.start)
+
+    def clusters(self):
+        """
+        Flushes any buffered pairs and returns the clusters of duplicates found so
+        far, as lists of record ids in the order they were added. Records without
+        duplicates are left out.
+        """
+        self.flush()
+        if self.progress is not None:
+            self.progress(self.stats())
+
+        union_find = self.union_find
+        record_ids = self.index.record_ids
+        clusters = OrderedDict()
+        for i in range(len(union_find)):
+            if union_find.sizes[union_find.find(i)] > 1:
+                clusters.setdefault(union_find.find(i), []).append(record_ids[i])
+        return list(clusters.values())
+
+
+def dedupe(records, **kw):
+    """
+    Deduplicate a stream of (record_id, labels, values[, latitude, longitude]) records
+    and return the clusters of duplicates. Takes the same options as Deduper.
+    """
+    deduper = Deduper(**kw)
+    deduper.extend(records)
+    return deduper.clusters()
@@ -0,0 +1,420 @@
+"""
+Persistent on-disk cache of parse_address, expand_address and near_dupe_hashes
+results, shared by every process and run using the same file.
+
+PostalCache only helps within one process. Batch jobs which re-parse the same
+corpus every night, or pools of workers which each start cold, can share a
+DiskCache instead: results are stored in an SQLite database in WAL mode, so
+any number of processes can read it concurrently while one at a time writes.
+
+Usage:
+    from postal.disk_cache import DiskCache
+
+    cache = DiskCache('/var/cache/postal.sqlite', max_bytes=2 * 1024 ** 3)
+    cache.parse_address('781 Franklin Ave Crown Heights Brooklyn NY 11216')
+    cache.expand_address('30 W 26th St', languages=['en'])
+    cache.cache_info()
+
+Keys are a hash of the function, the input, the complete set of options and a
+fingerprint of pypostal, libpostal and the libpostal data directory, so
+updating the models or the library turns every existing entry into a miss.
+Entries from other fingerprints are deleted the next time the cache is
+compacted.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import namedtuple
+
+from postal.cache import _limited, _limited_result, _limited_value
+from postal.hashing import HASH64, HASH128
+from postal.utils.encoding import safe_decode
+
+DiskCacheInfo = namedtuple('DiskCacheInfo', 'hits, misses, writes, evictions, stale, entries, bytes, max_bytes')
+
+# Writes between checks of the database size against max_bytes
+DEFAULT_COMPACT_INTERVAL = 1000
+
+# Compaction shrinks the cache to this fraction of max_bytes, so it doesn't run again right away
+COMPACT_RATIO = 0.8
+
+# Hits only update an entry's last use time (a write) when it's older than this many seconds
+DEFAULT_TOUCH_INTERVAL = 3600
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    key BLOB PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+'''
+
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [path, stat.st_size, int(stat.st_mtime)]
+
+
+def _libpostal_paths():
+    """Paths of the libpostal shared libraries loaded in this process, where they can be found."""
+    from postal import _expand
+
+    paths = set()
+    try:
+        with open('/proc/self/maps') as f:
+            for line in f:
+                path = line.rstrip('\n').split(' ')[-1]
+                if 'libpostal' in os.path.basename(path):
+                    paths.add(path)
+    except (IOError, OSError):
+        pass
+    return [_expand.__file__] + sorted(paths)
+
+
+def data_fingerprint(datadir=None):
+    """
+    Fingerprint of the installed pypostal extension, the libpostal library and
+    the libpostal data directory, which changes whenever any of them is updated.
+
+    Data files are identified by their path, size and modification time rather than
+    their contents, which would take minutes to hash.
+
+    @param datadir: libpostal data directory, defaults to $LIBPOSTAL_DATA_DIR. If neither
+                    is set, the directory libpostal was built with is used but can't be
+                    fingerprinted, so only the library is.
+    """
+    if datadir is None:
+        datadir = os.environ.get('LIBPOSTAL_DATA_DIR')
+
+    signature = [_file_signature(path) for path in _libpostal_paths()]
+    if datadir is not None:
+        for root, dirs, files in os.walk(datadir):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                file_signature = _file_signature(path)
+                if file_signature is not None:
+                    file_signature[0] = os.path.relpath(path, datadir)
+                signature.append(file_signature)
+
+    return hashlib.sha1(json.dumps(signature).encode('utf-8')).hexdigest()[:16]
+
+
+def _languages_key(languages):
+    if languages is None:
+        return None
+    return [safe_decode(l) for l in languages]
+
+
+def _hashed(output):
+    return output in (HASH64, HASH128)
+
+
+def _decode_strings(value, output):
+    if value is None:
+        return None
+    if _hashed(output):
+        return array('Q', value)
+    return value
+
+
+def _encode_strings(result):
+    if result is None:
+        return None
+    return list(result)
+
+
+class DiskCache(object):
+    """
+    Memoizing wrappers for parse_address, expand_address, expand_address_root,
+    name_hashes and near_dupe_hashes backed by an SQLite file shared between
+    processes.
+
+    Results are returned as the uncached functions return them. Each process or
+    thread opens its own connection, so a DiskCache can be created before forking
+    a pool of workers.
+
+    @param path: the database file, created if it doesn't exist
+    @param max_bytes: approximate bound on the size of the database in bytes (None for no
+                      limit). When a process has written compact_interval entries it checks
+                      the size and, if it's over, deletes the least recently used entries.
+    @param datadir: libpostal data directory for the fingerprint, see data_fingerprint
+    @param fingerprint: use this string instead of computing data_fingerprint, e.g. a
+                        model release name
+    @param compact_interval: writes between size checks
+    @param touch_interval: seconds before a hit updates an entry's last use time again
+    @param timeout: seconds to wait for another process's write to finish
+    """
+
+    def __init__(self, path, max_bytes=None, datadir=None, fingerprint=None,
+                 compact_interval=DEFAULT_COMPACT_INTERVAL, touch_interval=DEFAULT_TOUCH_INTERVAL, timeout=30.0):
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError('max_bytes must be at least 1 or None')
+        self.path = path
+        self.max_bytes = max_bytes
+        self.fingerprint = fingerprint if fingerprint is not None else data_fingerprint(datadir)
+        self.compact_interval = compact_interval
+        self.touch_interval = touch_interval
+        self.timeout = timeout
+
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.stale = 0
+        self.writes_since_check = 0
+
+        self._expand_defaults = None
+        self._name_hash_defaults = None
+
+        # Create the schema up front so concurrent first writes don't race on it
+        self.connection()
+
+    def connection(self):
+        """The connection for the current process and thread."""
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None and self.local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        # auto_vacuum must be set before the first table is created to take effect
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.executescript(SCHEMA)
+        self.local.conn = conn
+        self.local.pid = os.getpid()
+        return conn
+
+    def close(self):
+        """Close this thread's connection, other threads' connections are closed when they exit."""
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            if self.local.pid == os.getpid():
+                conn.close()
+            self.local.conn = None
+
+    def _key(self, *args):
+        data = json.dumps([self.fingerprint] + list(args), sort_keys=True, separators=(',', ':'))
+        return hashlib.blake2b(data.encode('utf-8'), digest_size=16).digest()
+
+    def get(self, key):
+        """The decoded JSON value stored under key, or raise KeyError."""
+        conn = self.connection()
+        row = conn.execute('SELECT value, last_used FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            with self.lock:
+                self.misses += 1
+            raise KeyError(key)
+
+        value, last_used = row
+        now = int(time.time())
+        if now - last_used >= self.touch_interval:
+            try:
+                conn.execute('UPDATE entries SET last_used = ? WHERE key = ?', (now, key))
+            except sqlite3.OperationalError:
+                # Another process holds the write lock for too long, the entry just looks older
+                pass
+
+        with self.lock:
+            self.hits += 1
+        return json.loads(value.decode('utf-8'))
+
+    def put(self, key, value):
+        """Store a JSON-serializable value under key."""
+        data = json.dumps(value, separators=(',', ':')).encode('utf-8')
+        conn = self.connection()
+        conn.execute('INSERT OR REPLACE INTO entries (key, fingerprint, value, size, last_used) VALUES (?, ?, ?, ?, ?)',
+                     (key, self.fingerprint, sqlite3.Binary(data), len(key) + len(data), int(time.time())))
+
+        with self.lock:
+            self.writes += 1
+            self.writes_since_check += 1
+            check = self.max_bytes is not None and self.writes_since_check >= self.compact_interval
+            if check:
+                self.writes_since_check = 0
+
+        if check and self.database_bytes() > self.max_bytes:
+            self.compact()
+
+    def _cached(self, key, func, encode, decode):
+        try:
+            return decode(self.get(key))
+        except KeyError:
+            pass
+        result = func()
+        self.put(key, encode(result))
+        return result
+
+    def database_bytes(self):
+        """Bytes used by the database, not counting free pages."""
+        conn = self.connection()
+        page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+        page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+        freelist_count = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        return (page_count - freelist_count) * page_size
+
+    def compact(self, max_bytes=None):
+        """
+        Delete the entries written under another fingerprint and, if the database is
+        over max_bytes, the least recently used entries until it's at COMPACT_RATIO
+        of max_bytes, then return the free pages to the file system.
+
+        Returns the number of entries deleted.
+
+        @param max_bytes: size to compact to, defaults to the cache's max_bytes
+        """
+        if max_bytes is None:
+            max_bytes = self.max_bytes
+
+        conn = self.connection()
+        evicted = 0
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            stale = conn.execute('DELETE FROM entries WHERE fingerprint != ?', (self.fingerprint,)).rowcount
+
+            if max_bytes is not None:
+                entry_bytes = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+                database_bytes = self.database_bytes()
+                if entry_bytes > 0 and database_bytes > max_bytes:
+                    # Scale the target by the database's overhead (pages, indexes) per entry byte
+                    target = int(max_bytes * COMPACT_RATIO * entry_bytes / float(database_bytes))
+                    excess = entry_bytes - target
+                    keys = []
+                    # Entries used in the same second go in the order they were written
+                    for key, size in conn.execute('SELECT key, size FROM entries ORDER BY last_used, rowid'):
+                        if excess <= 0:
+                            break
+                        excess -= size
+                        keys.append((key,))
+                    conn.executemany('DELETE FROM entries WHERE key = ?', keys)
+                    evicted = len(keys)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+        conn.execute('PRAGMA incremental_vacuum')
+        try:
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        except sqlite3.OperationalError:
+            pass
+
+        with self.lock:
+            self.stale += stale
+            self.evictions += evicted
+        return stale + evicted
+
+    def cache_info(self):
+        """
+        DiskCacheInfo(hits, misses, writes, evictions, stale, entries, bytes, max_bytes). hits,
+        misses, writes, evictions and stale (entries deleted for another fingerprint) count this
+        DiskCache object's calls, entries and bytes (keys and values) describe the shared database.
+        """
+        entries, entry_bytes = self.connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        with self.lock:
+            return DiskCacheInfo(self.hits, self.misses, self.writes, self.evictions, self.stale,
+                                 entries, entry_bytes, self.max_bytes)
+
+    def cache_clear(self):
+        """Delete every entry, for all processes and fingerprints."""
+        conn = self.connection()
+        conn.execute('DELETE FROM entries')
+        conn.execute('PRAGMA incremental_vacuum')
+        with self.lock:
+            self.hits = self.misses = self.writes = self.evictions = self.stale = 0
+
+    def __len__(self):
+        return self.connection().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def _options_key(self, defaults, kw):
+        options = dict(defaults)
+        options.update(kw)
+        return sorted(options.items())
+
+    def _expand_key(self, func, text, defaults, languages, options, output, kw):
+        if options is not None:
+            # ExpandOptions are keyed by their fields, so they share entries with the
+            # equivalent keyword options
+            languages = options.languages
+            defaults = dict(defaults, **options.options)
+        return self._key(func, text, _languages_key(languages), output or 'strings', self._options_key(defaults, kw))
+
+    def _codec(self, output, kw):
+        """(encode, decode) for expansion results, keeping the truncated flag of limited ones."""
+        if _limited(kw):
+            return _limited_value, lambda value: _limited_result(value, output)
+        return _encode_strings, lambda value: _decode_strings(value, output)
+
+    def parse_address(self, address, language=None, country=None):
+        """Cached postal.parser.parse_address."""
+        from postal import parser
+
+        address = safe_decode(address, 'utf-8')
+        if language is not None:
+            language = safe_decode(language)
+        if country is not None:
+            country = safe_decode(country)
+        key = self._key('parse_address', address, language, country)
+        return self._cached(key, lambda: parser.parse_address(address, language=language, country=country),
+                            lambda result: [list(c) for c in result],
+                            lambda value: [tuple(c) for c in value])
+
+    def expand_address(self, address, languages=None, options=None, output=None, **kw):
+        """Cached postal.expand.expand_address."""
+        from postal import expand
+
+        if self._expand_defaults is None:
+            self._expand_defaults = dict(expand._expand.get_default_options(), root=False)
+
+        address = safe_decode(address, 'utf-8')
+        key = self._expand_key('expand_address', address, self._expand_defaults, languages, options, output, kw)
+        return self._cached(key, lambda: expand.expand_address(address, languages=languages, options=options,
+                                                               output=output, **kw),
+                            *self._codec(output, kw))
+
+    def expand_address_root(self, address, languages=None, options=None, output=None, **kw):
+        """Cached postal.expand.expand_address_root."""
+        return self.expand_address(address, languages=languages, options=options, output=output, root=True, **kw)
+
+    def name_hashes(self, name, languages=None, options=None, output=None, **kw):
+        """Cached postal.near_dupe.name_hashes."""
+        from postal import expand, near_dupe
+
+        if self._name_hash_defaults is None:
+            self._name_hash_defaults = dict(expand._expand.get_default_options(),
+                                            address_components=expand.ADDRESS_NAME | expand.ADDRESS_STREET)
+
+        name = safe_decode(name, 'utf-8')
+        key = self._expand_key('name_hashes', name, self._name_hash_defaults, languages, options, output, kw)
+        return self._cached(key, lambda: near_dupe.name_hashes(name, languages=languages, options=options,
+                                                               output=output, **kw),
+                            *self._codec(output, kw))
+
+    def near_dupe_hashes(self, labels, values, languages=None, output=None, **kw):
+        """
+        Cached postal.near_dupe.near_dupe_hashes. Keyword options are part of the key as
+        given, so passing a default value explicitly makes a separate entry.
+        """
+        from postal import near_dupe
+
+        labels = [safe_decode(l, 'utf-8') for l in labels]
+        values = [safe_decode(v, 'utf-8') for v in values]
+        key = self._key('near_dupe_hashes', labels, values, _languages_key(languages), output or 'strings',
+                        sorted(kw.items()))
+        return self._cached(key, lambda: near_dupe.near_dupe_hashes(labels, values, languages=languages,
+                                                                    output=output, **kw),
+                            _encode_strings, lambda value: _decode_strings(value, output))
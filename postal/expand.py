@@ -2,11 +2,76 @@
 """Python bindings to libpostal expand_address."""
 
 from __future__ import unicode_literals
+from array import array
+
 from postal import _expand
+from postal.hashing import STRINGS, output_result
 from postal.utils.encoding import safe_decode
 
 
-def expand_address(address, languages=None, **kw):
+ExpandOptions = _expand.ExpandOptions
+
+
+class Expansions(list):
+    """
+    List of expansions returned when max_expansions or max_input_bytes is given.
+    truncated is True when expansions beyond max_expansions were dropped.
+    """
+    truncated = False
+
+
+class ExpansionHashes(array):
+    """array('Q') of hashed expansions, see Expansions."""
+    truncated = False
+
+
+def _limits(max_expansions, max_input_bytes):
+    """Arguments for the C functions, 0 meaning no limit."""
+    for name, value in (('max_expansions', max_expansions), ('max_input_bytes', max_input_bytes)):
+        if value is not None and value < 1:
+            raise ValueError('{} must be at least 1 or None'.format(name))
+    return max_expansions or 0, max_input_bytes or 0
+
+
+def limited_result(result, output, limited):
+    """
+    The result of a C function called with limits, as returned to the user. When limited
+    the C functions return (result, truncated), which becomes Expansions/ExpansionHashes.
+    """
+    if not limited:
+        return output_result(result, output)
+
+    result, truncated = result
+    if result is None:
+        return None
+    if output is None or output == STRINGS:
+        result = Expansions(result)
+    else:
+        hashes = ExpansionHashes('Q')
+        hashes.frombytes(result)
+        result = hashes
+    result.truncated = truncated
+    return result
+
+
+def limited_copy(values, truncated, output):
+    """A new Expansions/ExpansionHashes holding values, e.g. for a cached limited result."""
+    if output is None or output == STRINGS:
+        result = Expansions(values)
+    else:
+        result = ExpansionHashes('Q', values)
+    result.truncated = truncated
+    return result
+
+
+def _check_options(options, languages, kw):
+    if not isinstance(options, ExpandOptions):
+        raise TypeError('options must be an ExpandOptions instance')
+    if languages is not None or kw:
+        raise TypeError('languages and keyword options cannot be combined with options=')
+
+
+def expand_address(address, languages=None, options=None, output=None, max_expansions=None, max_input_bytes=None, **kw):
     """
     Expand the given address into one or more normalized strings.
 
@@ -49,13 +114,46 @@ def expand_address(address, languages=None, **kw):
                            ambiguous (especially I and V), turning this on simply
                            adds another version of the string if any potential
                            Roman numerals are found.
+    @param options: a precompiled ExpandOptions(languages=..., **kw) to use instead of
+                    languages and the keyword options above. The options are validated
+                    and converted once, which saves most of the per-call overhead when
+                    the same options are used for many addresses.
+    @param output: "strings" (the default) for a list of strings, or "hash64"/"hash128"
+                   for an array('Q') of stable hashes of the expansions, computed in C.
+                   See postal.hashing.
+    @param max_expansions: return at most this many expansions. Some inputs, e.g. long
+                           strings of ambiguous abbreviations with roman_numerals and the
+                           hyphen options on, expand to hundreds of strings. Only the first
+                           max_expansions (in libpostal's order) are converted to Python
+                           objects and the result is an Expansions list (ExpansionHashes
+                           for hashed output) with truncated=True if any were dropped.
+                           libpostal still computes every expansion, use max_input_bytes
+                           to bound that.
+    @param max_input_bytes: raise ValueError without calling libpostal if the address is
+                            longer than this many UTF-8 bytes.
+
+    Limit hits are counted in postal.metrics as rejected and truncated, even when
+    metrics are disabled.
     """
+    max_expansions, max_input_bytes = _limits(max_expansions, max_input_bytes)
+    limited = bool(max_expansions or max_input_bytes)
+
+    if options is not None:
+        root = kw.pop('root', False)
+        _check_options(options, languages, kw)
+        return limited_result(_expand.expand_with_options(address, options, root, output,
+                                                          max_expansions, max_input_bytes), output, limited)
+
     address = safe_decode(address, 'utf-8')
-    return _expand.expand_address(address, languages=languages, **kw)
+    return limited_result(_expand.expand_address(address, languages=languages, output=output,
+                                                 max_expansions=max_expansions, max_input_bytes=max_input_bytes,
+                                                 **kw), output, limited)
 
 
-def expand_address_root(address, languages=None, **kw):
-    return expand_address(address, languages=languages, root=True, **kw)
+def expand_address_root(address, languages=None, options=None, output=None, max_expansions=None,
+                        max_input_bytes=None, **kw):
+    return expand_address(address, languages=languages, options=options, output=output,
+                          max_expansions=max_expansions, max_input_bytes=max_input_bytes, root=True, **kw)
 
 
 # Constants for address components
@@ -0,0 +1,67 @@
+"""
+Hashed output for expand_address, name_hashes and near_dupe_hashes.
+
+With output="hash64" or output="hash128" those functions return an array('Q')
+of integer hashes of the UTF-8 strings they would otherwise return, computed in
+C without creating the strings in Python. Blocking keys and deduplicated
+expansions are usually only compared for equality, so an 8 or 16 byte integer
+can stand in for each string at a fraction of the memory.
+
+Stability: the hashes are MurmurHash3_x64_128 with seed 0 over the UTF-8 bytes
+of each string. hash64 is the first 64-bit half (h1) and hash128 gives h1, h2 as
+two consecutive entries per string, so the array is twice as long. The values
+are the same on every platform and will not change between releases of postal,
+so they can be stored and compared with hashes computed later. They match
+mmh3.hash64(s, signed=False)[0] and mmh3.hash128(s, signed=False) from the mmh3
+package. The strings being hashed can still change when libpostal or its data
+files are updated, as they can with output="strings".
+"""
+from array import array
+
+from postal import _expand
+
+STRINGS = 'strings'
+HASH64 = 'hash64'
+HASH128 = 'hash128'
+
+OUTPUT_MODES = (STRINGS, HASH64, HASH128)
+
+
+def to_array(result):
+    """Convert the bytes returned by the C functions in a hashed output mode to array('Q')."""
+    if result is None:
+        return None
+    hashes = array('Q')
+    hashes.frombytes(result)
+    return hashes
+
+
+def output_result(result, output):
+    """The result of a C function called with output=, as returned to the user."""
+    if output is None or output == STRINGS:
+        return result
+    return to_array(result)
+
+
+def hash_strings(strings, output=HASH64):
+    """
+    Hash a sequence of strings the same way the hashed output modes do, e.g. to
+    look up a string in a set of hashes returned by near_dupe_hashes.
+
+    @param strings: sequence of Unicode or UTF-8 encoded strings
+    @param output: "hash64" or "hash128"
+    """
+    if output is None or output == STRINGS:
+        raise ValueError('output must be one of hash64, hash128')
+    return to_array(_expand.hash_strings(list(strings), output))
+
+
+def hash64(s):
+    """64-bit hash of a single string, see hash_strings."""
+    return hash_strings([s], HASH64)[0]
+
+
+def hash128(s):
+    """128-bit hash of a single string as an integer, h1 in the low 64 bits and h2 in the high."""
+    h1, h2 = hash_strings([s], HASH128)
+    return (h2 << 64) | h1
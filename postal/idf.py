@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+Corpus token IDF model for the fuzzy dedupe functions.
+
+is_name_duplicate_fuzzy and is_street_duplicate_fuzzy compare strings as
+weighted bags of tokens. TokenIDFModel computes those weights: it's built in
+one streaming pass over a corpus, counting the number of strings each
+normalized token appears in, and scores strings with L2-normalized TF-IDF.
+
+Usage:
+    from postal.idf import TokenIDFModel
+    from postal.dedupe import is_name_duplicate_fuzzy
+
+    model = TokenIDFModel()
+    model.update(names)
+    model.save('names.idf')
+
+    model = TokenIDFModel.load('names.idf')
+    (tokens1, scores1), (tokens2, scores2) = model.score([name1, name2])
+    is_name_duplicate_fuzzy(tokens1, scores1, tokens2, scores2)
+
+Saved models store the vocabulary as one sorted UTF-8 blob with uint32
+offsets and document frequencies, and are memory-mapped on load, so a large
+vocabulary costs no Python objects and is shared between processes.
+"""
+import math
+import mmap
+import struct
+import sys
+from array import array
+from collections import OrderedDict
+
+import six
+
+from postal import _normalize
+from postal.token_types import token_types
+from postal.utils.encoding import safe_decode
+
+MAGIC = b'PPIDF001'
+
+# magic, number of documents, vocabulary size, blob size, string options, token options
+HEADER = struct.Struct('<8sQQQII')
+
+# Only words and numbers are scored, punctuation is dropped
+SCORED_TOKEN_TYPES = frozenset(t.value for t in token_types.WORD_TOKEN_TYPES | token_types.NUMERIC_TOKEN_TYPES)
+
+
+def _uint32_view(buf, byteswap):
+    if byteswap:
+        a = array('I')
+        a.frombytes(bytes(buf))
+        a.byteswap()
+        return a
+    return buf.cast('I')
+
+
+class TokenIDFModel(object):
+    """
+    Document frequencies of normalized tokens over a corpus.
+
+    @param string_options: normalize_string options used for tokens (see postal.normalize)
+    @param token_options: token normalization options (see postal.normalize)
+    @param strip_parentheticals: drop tokens inside parentheses
+    @param languages: languages used for normalization, if None the defaults are used
+    """
+
+    def __init__(self, string_options=_normalize.NORMALIZE_DEFAULT_STRING_OPTIONS,
+                 token_options=_normalize.NORMALIZE_DEFAULT_TOKEN_OPTIONS,
+                 strip_parentheticals=True, languages=None):
+        self.string_options = string_options
+        self.token_options = token_options
+        self.strip_parentheticals = strip_parentheticals
+        self.languages = languages
+
+        self.num_docs = 0
+        self.counts = {}
+
+        # Set when loaded from a file
+        self.mmap = None
+        self.offsets = None
+        self.doc_freqs = None
+        self.blob_start = 0
+        self.vocab_size = 0
+
+    def tokens(self, s):
+        """Normalized word and numeric tokens of s, in order, with repeats."""
+        normalized = _normalize.normalized_tokens(safe_decode(s), self.string_options, self.token_options,
+                                                  False, languages=self.languages,
+                                                  strip_parentheticals=self.strip_parentheticals)
+        return [token for token, token_type in normalized if token_type in SCORED_TOKEN_TYPES]
+
+    def update(self, strings):
+        """Count the tokens of each string in an iterable, one document per string."""
+        if self.mmap is not None:
+            raise ValueError('Models loaded from a file are read-only')
+
+        counts = self.counts
+        num_docs = 0
+        for s in strings:
+            for token in set(self.tokens(s)):
+                counts[token] = counts.get(token, 0) + 1
+            num_docs += 1
+        self.num_docs += num_docs
+
+    def __len__(self):
+        return self.vocab_size if self.mmap is not None else len(self.counts)
+
+    def doc_freq(self, token):
+        """Number of documents containing token."""
+        if self.mmap is None:
+            return self.counts.get(token, 0)
+
+        key = token.encode('utf-8')
+        offsets = self.offsets
+        data = self.mmap
+        blob_start = self.blob_start
+        lo, hi = 0, self.vocab_size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = data[blob_start + offsets[mid]:blob_start + offsets[mid + 1]]
+            if value < key:
+                lo = mid + 1
+            elif value > key:
+                hi = mid
+            else:
+                return self.doc_freqs[mid]
+        return 0
+
+    def idf(self, token):
+        """Smoothed inverse document frequency, log((N + 1) / (df + 1)) + 1."""
+        return math.log(float(self.num_docs + 1) / (self.doc_freq(token) + 1)) + 1.0
+
+    def score(self, strings):
+        """
+        Score a batch of strings.
+
+        Returns a list with a (tokens, scores) pair per string: the unique
+        normalized tokens in order of first appearance, and their L2-normalized
+        TF-IDF weights. Each pair can be passed straight to the fuzzy dedupe
+        functions e.g. is_name_duplicate_fuzzy(tokens1, scores1, tokens2, scores2)
+        or as a value to is_name_duplicate_fuzzy_many.
+        """
+        if isinstance(strings, six.string_types + (six.binary_type,)):
+            raise TypeError('score takes a sequence of strings, not a single string')
+
+        # IDF lookups are shared by every string in the batch
+        idfs = {}
+        results = []
+        for s in strings:
+            tf = OrderedDict()
+            for token in self.tokens(s):
+                tf[token] = tf.get(token, 0) + 1
+
+            weights = []
+            for token, count in six.iteritems(tf):
+                idf = idfs.get(token)
+                if idf is None:
+                    idf = idfs[token] = self.idf(token)
+                weights.append(count * idf)
+
+            norm = math.sqrt(sum(w * w for w in weights))
+            if norm > 0.0:
+                weights = [w / norm for w in weights]
+            results.append((list(tf), weights))
+        return results
+
+    def save(self, path):
+        """Write the model in the compact, memory-mappable format."""
+        if self.mmap is not None:
+            raise ValueError('Model was loaded from a file and is already saved')
+
+        vocab = sorted((token.encode('utf-8'), count) for token, count in six.iteritems(self.counts))
+
+        offsets = array('I', [0])
+        doc_freqs = array('I')
+        total = 0
+        for token, count in vocab:
+            total += len(token)
+            if total >= 2 ** 32:
+                raise ValueError('Vocabulary is too large to save, the total token size must be under 4GB')
+            offsets.append(total)
+            doc_freqs.append(min(count, 2 ** 32 - 1))
+
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+            doc_freqs.byteswap()
+
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, self.num_docs, len(vocab), total, self.string_options, self.token_options))
+            f.write(offsets.tobytes())
+            f.write(doc_freqs.tobytes())
+            for token, _ in vocab:
+                f.write(token)
+
+    @classmethod
+    def load(cls, path, strip_parentheticals=True, languages=None):
+        """Memory-map a model written by save."""
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(data) < HEADER.size:
+            data.close()
+            raise ValueError('{} is not a TokenIDFModel file'.format(path))
+
+        magic, num_docs, vocab_size, blob_size, string_options, token_options = HEADER.unpack_from(data, 0)
+        offsets_size = 4 * (vocab_size + 1)
+        doc_freqs_size = 4 * vocab_size
+        if magic != MAGIC or len(data) != HEADER.size + offsets_size + doc_freqs_size + blob_size:
+            data.close()
+            raise ValueError('{} is not a TokenIDFModel file'.format(path))
+
+        model = cls(string_options=string_options, token_options=token_options,
+                    strip_parentheticals=strip_parentheticals, languages=languages)
+        model.num_docs = num_docs
+        model.vocab_size = vocab_size
+        model.counts = None
+        model.mmap = data
+
+        byteswap = sys.byteorder != 'little'
+        view = memoryview(data)
+        start = HEADER.size
+        model.offsets = _uint32_view(view[start:start + offsets_size], byteswap)
+        start += offsets_size
+        model.doc_freqs = _uint32_view(view[start:start + doc_freqs_size], byteswap)
+        start += doc_freqs_size
+        model.blob_start = start
+        return model
+
+    def close(self):
+        """Unmap a model loaded from a file."""
+        if self.mmap is not None:
+            if isinstance(self.offsets, memoryview):
+                self.offsets.release()
+                self.doc_freqs.release()
+            self.offsets = self.doc_freqs = None
+            self.mmap.close()
+            self.mmap = None
+            self.vocab_size = 0
+            self.counts = {}
+
+    @classmethod
+    def build(cls, strings, **kw):
+        """Build a model from an iterable of strings in one pass."""
+        model = cls(**kw)
+        model.update(strings)
+        return model
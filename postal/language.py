@@ -0,0 +1,264 @@
+"""
+Language classification and resolution.
+
+expand_address, name_hashes and the dedupe functions run libpostal's language
+classifier on every call when languages=None. When the languages are known or
+repetitive (e.g. a feed partitioned by country, or the same street names over
+and over), a LanguageResolver can supply them instead: from the caller, a
+per-country default or a cache of earlier classifier results, and only falls
+back to the classifier when none of those apply.
+
+Usage:
+    from postal.language import LanguageResolver, classify_language
+
+    classify_language('Rue de la Paix 12, Paris')  # [('fr', 0.98), ...]
+
+    resolver = LanguageResolver()
+    expand_address = resolver.wrap(postal.expand.expand_address)
+    expand_address('Hauptstr. 5', country='de')   # languages=['de'], no classifier call
+    expand_address('30 W 26th St')                # classified once, then cached
+    resolver.stats()
+"""
+import inspect
+import re
+import threading
+from collections import namedtuple
+from functools import wraps
+
+from postal import _expand
+from postal.cache import LRUCache
+from postal.utils.encoding import binary_type, safe_decode, text_type
+
+DEFAULT_CACHE_SIZE = 100000
+DEFAULT_MIN_PROBABILITY = 0.05
+DEFAULT_MAX_LANGUAGES = 3
+
+# Cache keys: the lowercased input with whitespace collapsed, or only its tokens
+# without digits, so e.g. "12 Main St" and "14 Main St" share an entry
+NORMALIZED = 'normalized'
+TOKENS = 'tokens'
+
+# Countries with one dominant language (or a small set) for addresses
+COUNTRY_LANGUAGES = {
+    'ar': ('es',), 'at': ('de',), 'au': ('en',), 'be': ('nl', 'fr'), 'br': ('pt',),
+    'ca': ('en', 'fr'), 'ch': ('de', 'fr', 'it'), 'cl': ('es',), 'cn': ('zh',), 'co': ('es',),
+    'cz': ('cs',), 'de': ('de',), 'dk': ('da',), 'es': ('es',), 'fi': ('fi', 'sv'),
+    'fr': ('fr',), 'gb': ('en',), 'gr': ('el',), 'hu': ('hu',), 'ie': ('en',),
+    'it': ('it',), 'jp': ('ja',), 'kr': ('ko',), 'mx': ('es',), 'nl': ('nl',),
+    'no': ('nb',), 'nz': ('en',), 'pe': ('es',), 'pl': ('pl',), 'pt': ('pt',),
+    'ro': ('ro',), 'ru': ('ru',), 'se': ('sv',), 'tr': ('tr',), 'ua': ('uk',),
+    'us': ('en',),
+}
+
+LanguageStats = namedtuple('LanguageStats', 'explicit, country_defaults, cache_hits, classifier_calls, avoided')
+
+_whitespace_re = re.compile(r'\s+', re.UNICODE)
+
+
+def classify_language(text):
+    """
+    Run libpostal's language classifier on text.
+
+    Returns a list of (language, probability) tuples, most likely first.
+
+    @param text: the text as either Unicode or a UTF-8 encoded string
+    """
+    return _expand.classify_language(text)
+
+
+def classify_languages(texts):
+    """Batch version of classify_language, with one C call for all of the texts."""
+    if not isinstance(texts, (list, tuple)):
+        texts = list(texts)
+    return _expand.classify_languages(texts)
+
+
+def normalized_signature(text):
+    return _whitespace_re.sub(' ', safe_decode(text).lower()).strip()
+
+
+def token_signature(text):
+    return ' '.join(t for t in normalized_signature(text).split(' ') if not any(c.isdigit() for c in t))
+
+
+_signatures = {
+    NORMALIZED: normalized_signature,
+    TOKENS: token_signature,
+}
+
+
+class LanguageResolver(object):
+    """
+    Resolves the languages to pass to expand/dedupe calls, avoiding the language
+    classifier where possible.
+
+    In order: languages given by the caller, the default for the country (if any),
+    a cached classifier result for the same signature, the classifier.
+
+    @param country_languages: dict of lowercase country code => sequence of languages,
+                              defaults to COUNTRY_LANGUAGES, {} to disable
+    @param cache_size: maximum number of cached classifier results (0 to disable caching)
+    @param signature: NORMALIZED, TOKENS or a function(text) => cache key
+    @param min_probability: ignore classifier languages less likely than this
+    @param max_languages: maximum number of classifier languages to use
+    """
+
+    def __init__(self, country_languages=None, cache_size=DEFAULT_CACHE_SIZE, signature=NORMALIZED,
+                 min_probability=DEFAULT_MIN_PROBABILITY, max_languages=DEFAULT_MAX_LANGUAGES):
+        if country_languages is None:
+            country_languages = COUNTRY_LANGUAGES
+        self.country_languages = dict((safe_decode(k).lower(), list(v)) for k, v in country_languages.items())
+
+        if callable(signature):
+            self.signature = signature
+        elif signature in _signatures:
+            self.signature = _signatures[signature]
+        else:
+            raise ValueError('Invalid signature: {}, must be one of {} or a function'.format(
+                signature, ', '.join(sorted(_signatures))))
+
+        self.cache = LRUCache(maxsize=cache_size) if cache_size else None
+        self.min_probability = min_probability
+        self.max_languages = max_languages
+
+        self.lock = threading.Lock()
+        self.explicit = 0
+        self.country_defaults = 0
+        self.cache_hits = 0
+        self.classifier_calls = 0
+
+    def _count(self, name, n=1):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def _languages(self, classification):
+        languages = [language for language, probability in classification
+                     if probability >= self.min_probability][:self.max_languages]
+        # Fall back to the classifier inside libpostal for an empty result
+        return languages or None
+
+    def _country(self, country):
+        if country is None:
+            return None
+        return self.country_languages.get(safe_decode(country).lower())
+
+    def resolve(self, text, country=None, languages=None):
+        """
+        Languages for text, or None if the classifier found nothing usable.
+
+        @param text: the text as either Unicode or a UTF-8 encoded string
+        @param country: optional country code for the per-country defaults
+        @param languages: languages already known for the text, returned as is
+        """
+        if languages is not None:
+            self._count('explicit')
+            return languages
+
+        country_languages = self._country(country)
+        if country_languages is not None:
+            self._count('country_defaults')
+            return country_languages
+
+        key = None
+        if self.cache is not None:
+            key = self.signature(text)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._count('cache_hits')
+                return list(cached) if cached else None
+
+        self._count('classifier_calls')
+        result = self._languages(_expand.classify_language(text))
+        if key is not None:
+            self.cache.put(key, tuple(result or ()))
+        return result
+
+    def resolve_many(self, texts, countries=None):
+        """
+        resolve for a sequence of texts, with the remaining classifier calls made
+        in one batch.
+
+        @param countries: None, a single country code or a sequence with one per text
+        """
+        if not isinstance(texts, (list, tuple)):
+            texts = list(texts)
+        if countries is None or isinstance(countries, (str, bytes)):
+            countries = [countries] * len(texts)
+
+        results = [None] * len(texts)
+        pending = {}
+        for i, (text, country) in enumerate(zip(texts, countries)):
+            country_languages = self._country(country)
+            if country_languages is not None:
+                self._count('country_defaults')
+                results[i] = country_languages
+                continue
+
+            key = self.signature(text) if self.cache is not None else i
+            if self.cache is not None:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    self._count('cache_hits')
+                    results[i] = list(cached) if cached else None
+                    continue
+
+            if key in pending:
+                # Same signature earlier in this batch
+                self._count('cache_hits')
+                pending[key][1].append(i)
+            else:
+                pending[key] = (text, [i])
+
+        if pending:
+            keys = list(pending)
+            classifications = _expand.classify_languages([pending[key][0] for key in keys])
+            self._count('classifier_calls', len(keys))
+            for key, classification in zip(keys, classifications):
+                languages = self._languages(classification)
+                if self.cache is not None:
+                    self.cache.put(key, tuple(languages or ()))
+                for i in pending[key][1]:
+                    results[i] = list(languages) if languages else None
+
+        return results
+
+    def wrap(self, func):
+        """
+        Wrap func(text, ..., languages=None, **kw), e.g. expand_address or name_hashes,
+        so that languages are resolved from its first argument unless given. The
+        wrapper also takes country=... for the per-country defaults.
+
+        Only for functions taking a single string first. Record-style functions like
+        the dedupe ones take labels and values instead, call resolve on the relevant
+        value and pass languages=... to them directly.
+        """
+        signature = inspect.signature(func)
+        if 'languages' not in signature.parameters:
+            raise TypeError('{} has no languages argument'.format(func.__name__))
+
+        @wraps(func)
+        def wrapper(text, *args, **kw):
+            if not isinstance(text, (text_type, binary_type)):
+                raise TypeError('{} takes a string first, not {}, LanguageResolver.wrap only supports '
+                                'single string functions'.format(func.__name__, type(text).__name__))
+            country = kw.pop('country', None)
+            # languages may be given positionally or by keyword
+            bound = signature.bind(text, *args, **kw)
+            bound.arguments['languages'] = self.resolve(text, country=country,
+                                                        languages=bound.arguments.get('languages'))
+            return func(*bound.args, **bound.kwargs)
+        return wrapper
+
+    def stats(self):
+        """LanguageStats, avoided is the number of resolutions which didn't call the classifier."""
+        with self.lock:
+            avoided = self.explicit + self.country_defaults + self.cache_hits
+            return LanguageStats(self.explicit, self.country_defaults, self.cache_hits,
+                                 self.classifier_calls, avoided)
+
+    def clear(self):
+        """Clear the cache and the counters."""
+        if self.cache is not None:
+            self.cache.cache_clear()
+        with self.lock:
+            self.explicit = self.country_defaults = self.cache_hits = self.classifier_calls = 0
@@ -0,0 +1,142 @@
+"""
+Explicit loading of libpostal's models.
+
+Importing the pypostal modules no longer loads anything: each model is loaded
+the first time a function that needs it is called. Long-running services can
+call setup() or warmup() at startup to pay the loading cost up front, and
+short-lived workers can load only the components they use e.g.
+
+    import postal
+    postal.setup(components=('parser',))
+"""
+import os
+import sys
+import time
+from collections import namedtuple
+
+from postal.utils.encoding import string_types
+
+LIBPOSTAL = 'libpostal'
+LANGUAGE_CLASSIFIER = 'language_classifier'
+PARSER = 'parser'
+
+COMPONENTS = (LIBPOSTAL, LANGUAGE_CLASSIFIER, PARSER)
+
+# Everything depends on the base libpostal data (transliteration, numex, address dictionaries)
+DEPENDENCIES = {
+    LIBPOSTAL: (),
+    LANGUAGE_CLASSIFIER: (LIBPOSTAL,),
+    PARSER: (LIBPOSTAL,),
+}
+
+LoadStats = namedtuple('LoadStats', 'seconds, memory_bytes')
+
+_load_stats = {}
+
+
+def _rss_bytes():
+    """Current resident set size of this process in bytes, or None if unknown."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # Peak rather than current RSS, but good enough to measure a model load
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def _setup_function(component):
+    if component == LIBPOSTAL:
+        from postal import _expand
+        return _expand.setup_libpostal
+    elif component == LANGUAGE_CLASSIFIER:
+        from postal import _expand
+        return _expand.setup_language_classifier
+    elif component == PARSER:
+        from postal import _parser
+        return _parser.setup_parser
+    raise ValueError('Invalid component: {}, must be one of {}'.format(component, ', '.join(COMPONENTS)))
+
+
+def _with_dependencies(components):
+    ordered = []
+    for component in components:
+        if component not in DEPENDENCIES:
+            raise ValueError('Invalid component: {}, must be one of {}'.format(component, ', '.join(COMPONENTS)))
+        for c in DEPENDENCIES[component] + (component,):
+            if c not in ordered:
+                ordered.append(c)
+    return ordered
+
+
+def setup(components=COMPONENTS, datadir=None):
+    """
+    Load the given libpostal components now instead of on first use.
+
+    Returns a dict of component name => LoadStats(seconds, memory_bytes) with the
+    time each component took to load and how much resident memory it added
+    (memory_bytes is None where it can't be measured). Components which were
+    already loaded are not reloaded and report their original numbers.
+
+    @param components: any of "libpostal", "language_classifier" and "parser".
+                       Dependencies are loaded too, e.g. "parser" also loads "libpostal".
+    @param datadir: libpostal data directory. Defaults to $LIBPOSTAL_DATA_DIR or the
+                    directory libpostal was configured with. Components loaded lazily
+                    later on use the same directory.
+    """
+    if isinstance(components, string_types):
+        components = (components,)
+
+    if datadir is not None:
+        # Lazy loads in any of the extension modules read $LIBPOSTAL_DATA_DIR
+        os.environ['LIBPOSTAL_DATA_DIR'] = datadir
+
+    stats = {}
+    for component in _with_dependencies(components):
+        if component not in _load_stats:
+            setup_function = _setup_function(component)
+            rss_before = _rss_bytes()
+            start = time.perf_counter()
+            setup_function(datadir=datadir)
+            seconds = time.perf_counter() - start
+            rss_after = _rss_bytes()
+            memory_bytes = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+            _load_stats[component] = LoadStats(seconds, memory_bytes)
+        stats[component] = _load_stats[component]
+
+    return stats
+
+
+def warmup(components=COMPONENTS, datadir=None):
+    """
+    Load the given components (see setup) and run one small call through each
+    so the first real request doesn't pay any first-call costs. Returns the
+    same stats as setup.
+    """
+    stats = setup(components=components, datadir=datadir)
+
+    if LIBPOSTAL in stats:
+        from postal import _normalize
+        _normalize.normalize_string(u'warmup', _normalize.NORMALIZE_DEFAULT_STRING_OPTIONS)
+
+    if LANGUAGE_CLASSIFIER in stats:
+        from postal import _expand
+        _expand.expand_address(u'1 Warmup St')
+
+    if PARSER in stats:
+        from postal import _parser
+        _parser.parse_address(u'1 Warmup St')
+
+    return stats
+
+
+def load_stats():
+    """Load stats for the components loaded through setup/warmup so far."""
+    return dict(_load_stats)
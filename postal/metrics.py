@@ -0,0 +1,200 @@
+"""
+Opt-in instrumentation for the C extensions.
+
+When enabled, every call to the instrumented functions records its call and
+error counts, input size in bytes, output cardinality (components, expansions,
+tokens, hashes or pairs) and a latency histogram for each phase of the call:
+
+    convert    argument parsing and conversion to C strings
+    libpostal  the libpostal call itself, including waiting for locks and the GIL
+    result     building the Python result
+
+Disabled by default, in which case the cost is one flag check per call.
+
+The max_input_bytes and max_expansions guards of expand_address and name_hashes
+count the inputs they rejected and the results they truncated in rejected and
+truncated, whether or not metrics are enabled.
+
+Usage:
+    from postal import metrics
+
+    metrics.enable()
+    ...
+    metrics.snapshot()['parse_address']['calls']
+    print(metrics.prometheus_text())
+
+Set PYPOSTAL_METRICS=1 in the environment to enable metrics on import.
+"""
+import os
+import threading
+
+from postal import _dedupe, _expand, _near_dupe, _normalize, _parser, _tokenize
+
+_modules = (_parser, _expand, _normalize, _tokenize, _near_dupe, _dedupe)
+
+PHASES = ('convert', 'libpostal', 'result')
+
+# Upper bound of each histogram bucket in seconds, powers of two from 256ns,
+# see PYPOSTAL_HISTOGRAM_* in pyutils.h
+HISTOGRAM_MIN_SHIFT = 8
+HISTOGRAM_BUCKETS = 24
+BUCKET_BOUNDS = tuple([2 ** (HISTOGRAM_MIN_SHIFT + i) / 1e9 for i in range(HISTOGRAM_BUCKETS - 1)] +
+                      [float('inf')])
+
+_enabled = False
+_hooks = []
+
+
+def enable():
+    """Start recording metrics in all of the extension modules."""
+    global _enabled
+    for module in _modules:
+        module.set_metrics_enabled(True)
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    for module in _modules:
+        module.set_metrics_enabled(False)
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Zero all counters and histograms."""
+    for module in _modules:
+        module.metrics_reset()
+
+
+def snapshot():
+    """
+    Current metrics for each function, e.g.
+
+        {'parse_address': {'calls': 10, 'errors': 0, 'input_bytes': 452, 'output_items': 47,
+                           'rejected': 0, 'truncated': 0,
+                           'phases': {'libpostal': {'sum_seconds': 0.0021, 'count': 10,
+                                                    'buckets': [0, 0, ..., 3, 7, 0, ...]},
+                                      ...}},
+         ...}
+
+    buckets are per-bucket (not cumulative) counts, with upper bounds in BUCKET_BOUNDS.
+    """
+    result = {}
+    for module in _modules:
+        for name, metric in module.metrics_snapshot().items():
+            phases = {}
+            for phase, values in metric['phases'].items():
+                phases[phase] = {
+                    'sum_seconds': values['sum_ns'] / 1e9,
+                    'count': metric['calls'],
+                    'buckets': values['buckets'],
+                }
+            metric['phases'] = phases
+            result[name] = metric
+    return result
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+def prometheus_text(metrics=None, prefix='pypostal'):
+    """Metrics in the Prometheus text exposition format."""
+    if metrics is None:
+        metrics = snapshot()
+
+    lines = []
+    counters = (
+        ('calls_total', 'calls', 'Number of calls'),
+        ('errors_total', 'errors', 'Number of calls which raised an exception'),
+        ('input_bytes_total', 'input_bytes', 'UTF-8 bytes of input'),
+        ('output_items_total', 'output_items', 'Components, expansions, tokens, hashes or pairs returned'),
+        ('rejected_total', 'rejected', 'Inputs rejected for exceeding max_input_bytes'),
+        ('truncated_total', 'truncated', 'Results truncated to max_expansions'),
+    )
+    functions = sorted(metrics)
+
+    for suffix, key, help_text in counters:
+        name = '{}_{}'.format(prefix, suffix)
+        lines.append('# HELP {} {}'.format(name, help_text))
+        lines.append('# TYPE {} counter'.format(name))
+        for function in functions:
+            lines.append('{}{{function="{}"}} {}'.format(name, _escape(function), metrics[function][key]))
+
+    name = '{}_phase_seconds'.format(prefix)
+    lines.append('# HELP {} Time spent in each phase of a call'.format(name))
+    lines.append('# TYPE {} histogram'.format(name))
+    for function in functions:
+        for phase in PHASES:
+            values = metrics[function]['phases'][phase]
+            labels = 'function="{}",phase="{}"'.format(_escape(function), phase)
+            cumulative = 0
+            for bound, count in zip(BUCKET_BOUNDS, values['buckets']):
+                cumulative += count
+                lines.append('{}_bucket{{{},le="{}"}} {}'.format(name, labels, _format_bound(bound), cumulative))
+            lines.append('{}_sum{{{}}} {!r}'.format(name, labels, values['sum_seconds']))
+            lines.append('{}_count{{{}}} {}'.format(name, labels, values['count']))
+
+    return '\n'.join(lines) + '\n'
+
+
+def add_export_hook(func):
+    """Register func(snapshot) to be called by export()."""
+    _hooks.append(func)
+
+
+def remove_export_hook(func):
+    _hooks.remove(func)
+
+
+def export():
+    """Take a snapshot and pass it to every registered export hook."""
+    if not _hooks:
+        return
+    metrics = snapshot()
+    for hook in list(_hooks):
+        hook(metrics)
+
+
+class PeriodicExport(object):
+    """
+    Calls export() every interval seconds on a daemon thread.
+
+    @param interval: seconds between exports
+    """
+
+    def __init__(self, interval=60.0):
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            export()
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='pypostal-metrics-export')
+            self.thread.daemon = True
+            self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop the thread, with one final export."""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        export()
+
+
+if os.environ.get('PYPOSTAL_METRICS', '').lower() in ('1', 'true', 'yes'):
+    enable()
@@ -1,13 +1,42 @@
 """Python bindings to libpostal near_dupe_hashes."""
 
+import six
+
+from array import array
+from collections import defaultdict, namedtuple
+
 from postal import _near_dupe
+from postal.expand import ExpandOptions, _limits, limited_result
+from postal.hashing import output_result
+
+
+def name_hashes(name, languages=None, options=None, output=None, max_expansions=None, max_input_bytes=None, **kw):
+    """
+    Hash the given venue or street name into normalized strings for blocking.
 
+    Takes the same options as expand_address, except address_components defaults to
+    ADDRESS_NAME | ADDRESS_STREET. When passing a precompiled options=ExpandOptions(...),
+    set address_components on it explicitly, as ExpandOptions defaults to ADDRESS_ALL.
+    output="hash64"/"hash128" returns an array('Q') of stable hashes, see postal.hashing.
+    max_expansions and max_input_bytes bound the number of hashes returned and the
+    length of the name, see expand_address.
+    """
+    max_expansions, max_input_bytes = _limits(max_expansions, max_input_bytes)
+    limited = bool(max_expansions or max_input_bytes)
 
-def name_hashes(name, languages=None, **kw):
-    return _near_dupe.name_hashes(name, languages=languages, **kw)
+    if options is not None:
+        if not isinstance(options, ExpandOptions):
+            raise TypeError('options must be an ExpandOptions instance')
+        if languages is not None or kw:
+            raise TypeError('languages and keyword options cannot be combined with options=')
+        return limited_result(_near_dupe.name_hashes_with_options(name, options, output, max_expansions,
+                                                                  max_input_bytes), output, limited)
+    return limited_result(_near_dupe.name_hashes(name, languages=languages, output=output,
+                                                 max_expansions=max_expansions, max_input_bytes=max_input_bytes,
+                                                 **kw), output, limited)
 
 
-def near_dupe_hashes(labels, values, languages=None, **kw):
+def near_dupe_hashes(labels, values, languages=None, output=None, **kw):
     """
     Hash the given address into normalized strings that can be used to group similar
     addresses together for more detailed pairwise comparison. This can be thought of
@@ -42,5 +71,207 @@ def near_dupe_hashes(labels, values, languages=None, **kw):
     @param name_and_address_keys: include keys with name + address + geo
     @param name_only_keys: include keys with name + geo
     @param address_only_keys: include keys with address + geo
+    @param output: "strings" (the default) for a list of strings, or "hash64"/"hash128"
+                   for an array('Q') of stable hashes of the keys, computed in C.
+                   See postal.hashing.
+    """
+    return output_result(_near_dupe.near_dupe_hashes(labels, values, languages=languages, output=output, **kw),
+                         output)
+
+
+BlockStats = namedtuple('BlockStats', 'num_records, num_keys, num_postings, num_oversized, '
+                                      'max_block_size, mean_block_size, candidate_pairs, histogram')
+
+
+class NearDupeIndex(object):
+    """
+    In-memory blocking index over near_dupe_hashes.
+
+    Records are added one at a time, so the index can be built from a stream,
+    and queried for candidates sharing at least one hash with a given record.
+    Hash keys are interned to integer key ids and record ids to integer internal
+    ids, and each block (the records sharing a key) is an array('I') of internal
+    ids, so a posting costs 4 bytes rather than a list slot and a Python object.
+
+    Blocks which grow past max_block_size are dropped and the key is ignored
+    from then on: very common keys (e.g. a chain store name with no address)
+    match too many records to be useful and would make pairwise comparison
+    quadratic.
+
+    Not thread-safe, use one index per thread or a lock around add/candidates.
+
+    @param max_block_size: maximum number of records per key (None for no limit)
+    @param languages: default languages for hashing, if None the language classifier is used
+    @param kw: options for near_dupe_hashes e.g. with_unit=True, address_only_keys=True
     """
-    return _near_dupe.near_dupe_hashes(labels, values, languages=languages, **kw)
+
+    def __init__(self, max_block_size=1000, languages=None, **kw):
+        if max_block_size is not None and max_block_size < 1:
+            raise ValueError('max_block_size must be at least 1 or None')
+        self.max_block_size = max_block_size
+        self.languages = languages
+        self.hash_options = kw
+
+        self.key_ids = {}
+        self.blocks = []
+        self.block_sizes = array('I')
+        self.record_ids = []
+        self.internal_ids = {}
+        self.num_postings = 0
+        self.num_oversized = 0
+
+    def __len__(self):
+        return len(self.record_ids)
+
+    def __contains__(self, record_id):
+        return record_id in self.internal_ids
+
+    def hashes(self, labels, values, latitude=None, longitude=None, languages=None):
+        """Blocking keys for a record, using the index's hash options."""
+        kw = self.hash_options
+        if latitude is not None and longitude is not None:
+            kw = dict(kw, with_latlon=True, latitude=latitude, longitude=longitude)
+        if languages is None:
+            languages = self.languages
+        return near_dupe_hashes(labels, values, languages=languages, **kw) or []
+
+    def add(self, record_id, labels, values, latitude=None, longitude=None, languages=None):
+        """
+        Hash a record and add it to the index.
+
+        @param record_id: any hashable id, unique within the index
+        @param labels: component labels e.g. ["house_number", "road", "postcode"]
+        @param values: component values e.g. ["123", "Broadway", "11216"]
+        @param latitude, longitude: coordinates, used for geohash keys when both are given
+        @param languages: languages for this record, overrides the index's default
+        """
+        self.add_keys(record_id, self.hashes(labels, values, latitude=latitude, longitude=longitude,
+                                             languages=languages))
+
+    def add_keys(self, record_id, keys):
+        """Add a record with precomputed blocking keys."""
+        if record_id in self.internal_ids:
+            raise ValueError('Record id {!r} has already been added'.format(record_id))
+
+        internal_id = len(self.record_ids)
+        self.internal_ids[record_id] = internal_id
+        self.record_ids.append(record_id)
+
+        key_ids = self.key_ids
+        blocks = self.blocks
+        block_sizes = self.block_sizes
+        max_block_size = self.max_block_size
+
+        for key in set(keys):
+            key_id = key_ids.get(key)
+            if key_id is None:
+                key_id = len(blocks)
+                key_ids[key] = key_id
+                blocks.append(array('I'))
+                block_sizes.append(0)
+
+            block_sizes[key_id] += 1
+            block = blocks[key_id]
+            if block is None:
+                continue
+
+            if max_block_size is not None and len(block) >= max_block_size:
+                # Oversized blocks are dropped, their size is still tracked for stats
+                self.num_postings -= len(block)
+                blocks[key_id] = None
+                self.num_oversized += 1
+                continue
+
+            block.append(internal_id)
+            self.num_postings += 1
+
+    def extend(self, records):
+        """
+        Add records from an iterable of (record_id, labels, values) or
+        (record_id, labels, values, latitude, longitude) tuples.
+        """
+        for record in records:
+            self.add(*record)
+
+    def candidates(self, labels, values, latitude=None, longitude=None, languages=None, exclude=None):
+        """
+        Ids of the records sharing at least one blocking key with the given record,
+        ordered by the number of keys shared (most first).
+
+        @param exclude: a record id to leave out of the results, usually the record's own id
+        """
+        return self.candidates_for_keys(self.hashes(labels, values, latitude=latitude, longitude=longitude,
+                                                    languages=languages), exclude=exclude)
+
+    def shared_key_counts(self, keys):
+        """
+        Internal id => number of keys shared, for the records sharing any of the keys.
+        Internal ids number the records from 0 in the order they were added, and
+        index.record_ids[internal_id] is the record id.
+        """
+        counts = defaultdict(int)
+        for key in set(keys):
+            key_id = self.key_ids.get(key)
+            if key_id is None:
+                continue
+            block = self.blocks[key_id]
+            if block is None:
+                continue
+            for internal_id in block:
+                counts[internal_id] += 1
+        return counts
+
+    def candidates_for_keys(self, keys, exclude=None):
+        """Ids of the records sharing at least one of the given keys, see candidates."""
+        counts = self.shared_key_counts(keys)
+
+        if exclude is not None:
+            counts.pop(self.internal_ids.get(exclude), None)
+
+        record_ids = self.record_ids
+        return [record_ids[i] for i, _ in sorted(six.iteritems(counts), key=lambda item: (-item[1], item[0]))]
+
+    def candidate_pairs(self):
+        """
+        Generator of (record_id1, record_id2) pairs sharing at least one block,
+        each pair yielded once, in the order the records were added.
+        """
+        seen = set()
+        record_ids = self.record_ids
+        for block in self.blocks:
+            if block is None or len(block) < 2:
+                continue
+            for i in range(len(block)):
+                a = block[i]
+                for j in range(i + 1, len(block)):
+                    b = block[j]
+                    pair = (a << 32) | b
+                    if pair in seen:
+                        continue
+                    seen.add(pair)
+                    yield record_ids[a], record_ids[b]
+
+    def block_stats(self):
+        """
+        BlockStats for the index. Sizes count every record hashed to a key, including
+        the ones beyond max_block_size. histogram maps a power of two n to the number
+        of keys with n <= size < 2n, and candidate_pairs is the number of pairwise
+        comparisons the stored blocks imply (pairs shared by several blocks are
+        counted once per block).
+        """
+        histogram = defaultdict(int)
+        max_size = 0
+        candidate_pairs = 0
+        for size, block in zip(self.block_sizes, self.blocks):
+            bucket = 1
+            while bucket * 2 <= size:
+                bucket *= 2
+            histogram[bucket] += 1
+            max_size = max(max_size, size)
+            if block is not None:
+                candidate_pairs += len(block) * (len(block) - 1) // 2
+
+        num_keys = len(self.blocks)
+        mean_size = float(sum(self.block_sizes)) / num_keys if num_keys else 0.0
+        return BlockStats(len(self.record_ids), num_keys, self.num_postings, self.num_oversized,
+                          max_size, mean_size, candidate_pairs, dict(histogram))
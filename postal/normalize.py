@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from postal import _normalize
-from postal.token_types import token_types
+from postal.token_types import token_types, token_type_table
 
 from postal.utils.encoding import safe_decode
 
@@ -34,6 +34,9 @@ DEFAULT_TOKEN_OPTIONS = _normalize.NORMALIZE_DEFAULT_TOKEN_OPTIONS
 TOKEN_OPTIONS_DROP_PERIODS = _normalize.NORMALIZE_TOKEN_OPTIONS_DROP_PERIODS
 DEFAULT_TOKEN_OPTIONS_NUMERIC = _normalize.NORMALIZE_DEFAULT_TOKEN_OPTIONS_NUMERIC
 
+# Token types come back from C as postal.token_types.TokenType members
+_normalize.register_token_types(token_type_table())
+
 
 def remove_parens(tokens):
     new_tokens = []
@@ -66,13 +69,29 @@ def normalized_tokens(s, string_options=DEFAULT_STRING_OPTIONS,
     i.e. methods with a single output. The string tree version will
     return multiple normalized strings, each with tokens.
 
+    Token types are postal.token_types.TokenType members, which compare
+    equal to the corresponding token_types values.
+
     Usage:
         normalized_tokens(u'St.-Barthélemy')
     '''
     s = safe_decode(s)
-    normalized_tokens = _normalize.normalized_tokens(s, string_options, token_options, whitespace, languages=languages)
+    return _normalize.normalized_tokens(s, string_options, token_options, whitespace, languages=languages,
+                                        strip_parentheticals=strip_parentheticals)
 
-    if strip_parentheticals:
-        normalized_tokens = remove_parens(normalized_tokens)
 
-    return [(s, token_types.from_id(token_type)) for s, token_type in normalized_tokens]
+def normalized_tokens_batch(strings, string_options=DEFAULT_STRING_OPTIONS,
+                            token_options=DEFAULT_TOKEN_OPTIONS,
+                            strip_parentheticals=True, whitespace=False,
+                            languages=None):
+    '''
+    normalized_tokens for many strings with one C call, which releases the GIL
+    once for the whole batch. Returns a list with the tokens of each string.
+
+    @param strings: a sequence of strings as either Unicode or UTF-8 encoded strings
+    @param languages: languages applied to every string
+    '''
+    if not isinstance(strings, (list, tuple)):
+        strings = list(strings)
+    return _normalize.normalized_tokens_batch(strings, string_options, token_options, whitespace,
+                                              languages=languages, strip_parentheticals=strip_parentheticals)
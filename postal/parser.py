@@ -1,15 +1,156 @@
 """Python bindings to libpostal parse_address."""
+from itertools import islice
+
 from postal import _parser
-from postal.utils.encoding import safe_decode
+from postal.utils.encoding import safe_decode, string_types, binary_type
+
+DEFAULT_CHUNK_SIZE = 1000
+
+ParsedAddress = _parser.ParsedAddress
 
+# The parser's labels, in the order they usually appear in an address
+LABELS = (
+    'house', 'category', 'near', 'house_number', 'road', 'unit', 'level', 'staircase',
+    'entrance', 'po_box', 'postcode', 'suburb', 'city_district', 'city', 'island',
+    'state_district', 'state', 'country_region', 'country', 'world_region',
+)
 
-def parse_address(address, language=None, country=None):
+
+def parse_address(address, language=None, country=None, compact=False):
     """
     Parse address into components.
 
     @param address: the address as either Unicode or a UTF-8 encoded string
     @param language (optional): language code
     @param country (optional): country code
+    @param compact: return a ParsedAddress instead of a list of (component, label)
+                    tuples. It iterates and indexes the same way, supports lookup by
+                    label e.g. parsed['road'] and to_dict(), and keeps the components
+                    in a single UTF-8 buffer which is only decoded on access, so it's
+                    much smaller when many results are kept in memory.
     """
     address = safe_decode(address, 'utf-8')
-    return _parser.parse_address(address, language=language, country=country)
+    return _parser.parse_address(address, language=language, country=country, compact=compact)
+
+
+def _per_row(value):
+    return value is not None and not isinstance(value, string_types + (binary_type,))
+
+
+def parse_addresses(addresses, language=None, country=None, chunk_size=DEFAULT_CHUNK_SIZE, compact=False):
+    """
+    Parse an iterable of addresses, yielding the components of each address
+    in input order (same output as parse_address).
+
+    Addresses are consumed and parsed chunk_size at a time with one C call per
+    chunk, so arbitrarily large iterables can be parsed in bounded memory.
+
+    @param addresses: iterable of addresses as either Unicode or UTF-8 encoded strings
+    @param language (optional): language code applied to every address, or an iterable
+                                of language codes (or None) with one entry per address
+    @param country (optional): country code applied to every address, or an iterable
+                               of country codes (or None) with one entry per address
+    @param chunk_size: number of addresses to parse per C call
+    @param compact: yield ParsedAddress objects, see parse_address
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be at least 1')
+
+    addresses = iter(addresses)
+    languages = iter(language) if _per_row(language) else None
+    countries = iter(country) if _per_row(country) else None
+
+    while True:
+        chunk = list(islice(addresses, chunk_size))
+        if not chunk:
+            break
+
+        chunk_language = list(islice(languages, len(chunk))) if languages is not None else language
+        chunk_country = list(islice(countries, len(chunk))) if countries is not None else country
+
+        for components in _parser.parse_addresses(chunk, language=chunk_language, country=chunk_country,
+                                                  compact=compact):
+            yield components
+
+
+ExpandedComponent = _parser.ExpandedComponent
+
+
+def _expand_options(languages, options, kw):
+    from postal.expand import ExpandOptions, _check_options
+
+    if options is not None:
+        _check_options(options, languages, kw)
+        return options
+    if languages is not None or kw:
+        return ExpandOptions(languages=languages, **kw)
+    return None
+
+
+def _hashed_components(components, output):
+    from postal.hashing import output_result
+    return [ExpandedComponent((c.component, c.label, output_result(c.expansions, output))) for c in components]
+
+
+def parse_and_expand(address, language=None, country=None, languages=None, options=None, root=False,
+                     output=None, **kw):
+    """
+    Parse an address and expand each component using the address components for its
+    label (ADDRESS_HOUSE_NUMBER for house_number, ADDRESS_STREET for road, ADDRESS_TOPONYM
+    for city etc.), in a single C call.
+
+    Returns a list of ExpandedComponent(component, label, expansions) named tuples in
+    parse_address order.
+
+    The language is only classified once per address: expansions use languages (or
+    the languages of options), else the parser's language, else the language classifier's
+    result for the whole address.
+
+    @param address: the address as either Unicode or a UTF-8 encoded string
+    @param language (optional): language code for the parser
+    @param country (optional): country code for the parser
+    @param languages: languages to use in expansion, see expand_address
+    @param options: a precompiled ExpandOptions instead of languages and keyword options.
+                    Its address_components are replaced by each label's.
+    @param root: use the root expansions (see expand_address_root)
+    @param output: "strings", "hash64" or "hash128", see expand_address
+    @param kw: the keyword options of expand_address, except address_components
+    """
+    if 'address_components' in kw:
+        raise TypeError('address_components is set from each component\'s label')
+    options = _expand_options(languages, options, kw)
+    address = safe_decode(address, 'utf-8')
+    components = _parser.parse_and_expand(address, language=language, country=country, options=options,
+                                          root=root, output=output)
+    if output is not None and output != 'strings':
+        components = _hashed_components(components, output)
+    return components
+
+
+def parse_and_expand_batch(addresses, language=None, country=None, languages=None, options=None, root=False,
+                           output=None, **kw):
+    """
+    parse_and_expand for many addresses with one C call, which releases the GIL once
+    for the whole batch. Returns a list with the components of each address.
+
+    @param addresses: a sequence of addresses as either Unicode or UTF-8 encoded strings
+    @param language (optional): language code applied to every address, or a sequence
+                                of language codes (or None) with one entry per address
+    @param country (optional): country code applied to every address, or a sequence
+                               of country codes (or None) with one entry per address
+    The other options are the same as parse_and_expand.
+    """
+    if 'address_components' in kw:
+        raise TypeError('address_components is set from each component\'s label')
+    options = _expand_options(languages, options, kw)
+    if not isinstance(addresses, (list, tuple)):
+        addresses = list(addresses)
+    if _per_row(language):
+        language = list(language)
+    if _per_row(country):
+        country = list(country)
+    results = _parser.parse_and_expand_batch(addresses, language=language, country=country, options=options,
+                                             root=root, output=output)
+    if output is not None and output != 'strings':
+        results = [_hashed_components(components, output) for components in results]
+    return results
@@ -0,0 +1,207 @@
+"""
+Process pool which shares libpostal's models between workers.
+
+The models take a couple of GB of memory per process. PostalPool loads them
+once in the parent (see postal.loader.setup) and then forks the workers, so
+every worker shares the parent's model pages copy-on-write. libpostal never
+writes to the models after loading, so the pages stay shared for the life of
+the pool, and N workers cost roughly one copy of the models rather than N.
+
+Usage:
+    from postal.pool import PostalPool
+
+    with PostalPool(processes=8) as pool:
+        for components in pool.parse_addresses(addresses):
+            ...
+        pool.memory()  # unique and shared memory per worker
+
+Requires the "fork" start method, so it's not available on Windows.
+"""
+import gc
+import multiprocessing
+import os
+from collections import deque, namedtuple
+from functools import partial
+from itertools import islice
+
+from postal import loader
+
+DEFAULT_CHUNK_SIZE = 256
+
+WorkerMemory = namedtuple('WorkerMemory', 'pid, rss, pss, unique, shared')
+
+
+def _chunks(iterable, chunk_size):
+    items = iter(iterable)
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            break
+        yield chunk
+
+
+def _call_chunk(func, kw, chunk):
+    return [func(item, **kw) for item in chunk]
+
+
+def _call_chunk_star(func, kw, chunk):
+    return [func(*item, **kw) for item in chunk]
+
+
+def _parse_chunk(language, country, chunk):
+    from postal import _parser
+    return _parser.parse_addresses(chunk, language=language, country=country)
+
+
+def _expand_chunk(kw, chunk):
+    from postal import _expand
+    from postal.expand import ExpandOptions
+    kw = dict(kw)
+    root = kw.pop('root', False)
+    options = ExpandOptions(**kw)
+    return [_expand.expand_with_options(address, options, root) for address in chunk]
+
+
+def process_memory(pid):
+    """
+    WorkerMemory for a process from /proc/<pid>/smaps_rollup (or smaps on older
+    kernels), in bytes. unique is memory only this process uses (private pages),
+    shared is memory shared with other processes, e.g. the forked model pages.
+    Returns None where /proc isn't available.
+    """
+    fields = {}
+    for filename in ('smaps_rollup', 'smaps'):
+        try:
+            with open('/proc/{}/{}'.format(pid, filename)) as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 3 and parts[2] == 'kB':
+                        fields[parts[0].rstrip(':')] = fields.get(parts[0].rstrip(':'), 0) + int(parts[1]) * 1024
+            break
+        except (IOError, OSError):
+            continue
+    else:
+        return None
+
+    unique = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    shared = fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)
+    return WorkerMemory(pid, fields.get('Rss', 0), fields.get('Pss', 0), unique, shared)
+
+
+class PostalPool(object):
+    """
+    Pre-fork process pool with libpostal's models loaded once in the parent.
+
+    @param processes: number of worker processes, defaults to os.cpu_count()
+    @param components: libpostal components to load before forking, see postal.loader.setup
+    @param datadir: libpostal data directory
+    @param chunk_size: default number of items sent to a worker per task
+    """
+
+    def __init__(self, processes=None, components=loader.COMPONENTS, datadir=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+        try:
+            context = multiprocessing.get_context('fork')
+        except ValueError:
+            raise RuntimeError('PostalPool requires the fork start method, which is not available on this platform')
+
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be at least 1')
+
+        self.chunk_size = chunk_size
+        self.load_stats = loader.setup(components=components, datadir=datadir)
+
+        self.processes = processes or os.cpu_count() or 1
+
+        # Objects which exist before the fork are moved out of the collector's reach so
+        # collections in the workers don't write to (and un-share) their pages. The
+        # workers keep the frozen state, the parent's GC is restored right after the
+        # fork unless the application had frozen objects itself.
+        freeze = hasattr(gc, 'freeze')
+        unfreeze = freeze and gc.get_freeze_count() == 0
+        if freeze:
+            gc.collect()
+            gc.freeze()
+        try:
+            self.pool = context.Pool(self.processes)
+        finally:
+            if unfreeze:
+                gc.unfreeze()
+
+    def _imap(self, chunk_func, iterable, chunk_size):
+        # Pool.imap reads its whole input up front, so chunks are submitted here with at
+        # most two per worker in flight to keep memory bounded for large or endless inputs
+        chunks = _chunks(iterable, chunk_size or self.chunk_size)
+        pending = deque()
+        max_pending = 2 * self.processes
+
+        while True:
+            while len(pending) < max_pending:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                pending.append(self.pool.apply_async(chunk_func, (chunk,)))
+
+            if not pending:
+                break
+
+            for result in pending.popleft().get():
+                yield result
+
+    def imap(self, func, iterable, chunk_size=None, **kw):
+        """
+        Apply func(item, **kw) to each item on the workers, yielding results in
+        input order. Items are sent chunk_size at a time. func has to be picklable,
+        i.e. a module-level function such as postal.expand.expand_address or
+        postal.dedupe.is_name_duplicate.
+        """
+        return self._imap(partial(_call_chunk, func, kw), iterable, chunk_size)
+
+    def map(self, func, iterable, chunk_size=None, **kw):
+        """List version of imap."""
+        return list(self.imap(func, iterable, chunk_size=chunk_size, **kw))
+
+    def starmap(self, func, iterable, chunk_size=None, **kw):
+        """Like map, but calls func(*item, **kw) e.g. for the pairs of is_*_duplicate."""
+        return list(self._imap(partial(_call_chunk_star, func, kw), iterable, chunk_size))
+
+    def parse_addresses(self, addresses, language=None, country=None, chunk_size=None):
+        """
+        Parse addresses on the workers, yielding the components of each in input
+        order. Each chunk is parsed with one call to parse_addresses.
+
+        @param language, country: a single code applied to every address (or None)
+        """
+        return self._imap(partial(_parse_chunk, language, country), addresses, chunk_size)
+
+    def expand_addresses(self, addresses, chunk_size=None, **kw):
+        """
+        Expand addresses on the workers, yielding the expansions of each in input
+        order. Takes the same options as expand_address.
+        """
+        return self._imap(partial(_expand_chunk, kw), addresses, chunk_size)
+
+    def worker_pids(self):
+        # multiprocessing doesn't expose the workers publicly
+        return [p.pid for p in self.pool._pool]
+
+    def memory(self):
+        """WorkerMemory for each worker process (see process_memory)."""
+        return [m for m in (process_memory(pid) for pid in self.worker_pids()) if m is not None]
+
+    def close(self):
+        self.pool.close()
+
+    def terminate(self):
+        self.pool.terminate()
+
+    def join(self):
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.pool.terminate()
+        self.pool.join()
+        return False
@@ -20,6 +20,61 @@ struct module_state {
 #endif
 
 
+#define METRIC_IS_NAME_DUPLICATE 0
+#define METRIC_IS_STREET_DUPLICATE 1
+#define METRIC_IS_HOUSE_NUMBER_DUPLICATE 2
+#define METRIC_IS_PO_BOX_DUPLICATE 3
+#define METRIC_IS_UNIT_DUPLICATE 4
+#define METRIC_IS_FLOOR_DUPLICATE 5
+#define METRIC_IS_POSTAL_CODE_DUPLICATE 6
+#define METRIC_IS_TOPONYM_DUPLICATE 7
+#define METRIC_IS_NAME_DUPLICATE_FUZZY 8
+#define METRIC_IS_STREET_DUPLICATE_FUZZY 9
+#define METRIC_IS_DUPLICATE_MANY 10
+#define METRIC_COMPARE_PREPARED 11
+
+static pypostal_metric_t metrics[] = {
+    {"is_name_duplicate"},
+    {"is_street_duplicate"},
+    {"is_house_number_duplicate"},
+    {"is_po_box_duplicate"},
+    {"is_unit_duplicate"},
+    {"is_floor_duplicate"},
+    {"is_postal_code_duplicate"},
+    {"is_toponym_duplicate"},
+    {"is_name_duplicate_fuzzy"},
+    {"is_street_duplicate_fuzzy"},
+    {"is_duplicate_many"},
+    {"compare_prepared"},
+    {NULL}
+};
+
+PYPOSTAL_METRICS_FUNCTIONS(metrics)
+
+
+static size_t strings_total_len(char **strings, size_t num_strings) {
+    size_t len = 0;
+    for (size_t i = 0; i < num_strings; i++) {
+        if (strings[i] != NULL) {
+            len += strlen(strings[i]);
+        }
+    }
+    return len;
+}
+
+
+/* Components needed for a dedupe call, the language classifier is only used
+   when no languages are passed in */
+static uint32_t dedupe_components(PyObject *arg_languages) {
+    uint32_t components = PYPOSTAL_COMPONENT_LIBPOSTAL;
+    if (!PySequence_Check(arg_languages) || PySequence_Length(arg_languages) <= 0) {
+        PyErr_Clear();
+        components |= PYPOSTAL_COMPONENT_LANGUAGE_CLASSIFIER;
+    }
+    return components;
+}
+
+
 static PyObject *py_place_languages(PyObject *self, PyObject *args) {
     PyObject *arg_labels;
     PyObject *arg_values;
@@ -30,6 +85,10 @@ static PyObject *py_place_languages(PyObject *self, PyObject *args) {
         return 0;
     }
 
+    if (!pypostal_setup(PYPOSTAL_COMPONENT_LIBPOSTAL | PYPOSTAL_COMPONENT_LANGUAGE_CLASSIFIER, NULL)) {
+        return NULL;
+    }
+
     size_t num_labels = 0;
     char **labels = PyObject_to_strings(arg_labels, &num_labels);
 
@@ -50,7 +109,9 @@ static PyObject *py_place_languages(PyObject *self, PyObject *args) {
 
     size_t num_components = num_labels;
 
+    Py_BEGIN_ALLOW_THREADS
     languages = libpostal_place_languages(num_components, labels, values, &num_languages);
+    Py_END_ALLOW_THREADS
 
     if (languages != NULL) {
         result = PyObject_from_strings(languages, num_languages);
@@ -70,7 +131,7 @@ static PyObject *py_place_languages(PyObject *self, PyObject *args) {
 typedef libpostal_duplicate_status_t (*duplicate_function)(char *, char *, libpostal_duplicate_options_t);
 
 
-static PyObject *py_is_duplicate(PyObject *self, PyObject *args, PyObject *keywords, duplicate_function dupe_func) {
+static PyObject *py_is_duplicate(PyObject *self, PyObject *args, PyObject *keywords, duplicate_function dupe_func, pypostal_metric_t *metric) {
     PyObject *arg_value1;
     PyObject *arg_value2;
     PyObject *arg_languages = Py_None;
@@ -78,6 +139,9 @@ static PyObject *py_is_duplicate(PyObject *self, PyObject *args, PyObject *keywo
 
     PyObject *result = Py_None;
 
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
     static char *kwlist[] = {"value1",
                              "value2", 
                              "languages",
@@ -93,6 +157,10 @@ static PyObject *py_is_duplicate(PyObject *self, PyObject *args, PyObject *keywo
         return 0;
     }
 
+    if (!pypostal_setup(dedupe_components(arg_languages), NULL)) {
+        return NULL;
+    }
+
     char *value1 = PyObject_to_string(arg_value1);
 
     if (value1 == NULL) {
@@ -118,10 +186,20 @@ static PyObject *py_is_duplicate(PyObject *self, PyObject *args, PyObject *keywo
         options.languages = languages;
     }
 
-    libpostal_duplicate_status_t status = dupe_func(value1, value2, options);
+    libpostal_duplicate_status_t status;
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
+
+    Py_BEGIN_ALLOW_THREADS
+    status = dupe_func(value1, value2, options);
+    Py_END_ALLOW_THREADS
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
 
     result = PyLong_FromSsize_t((ssize_t)status);
 
+    PYPOSTAL_METRIC_RECORD(metric, &timer, strlen(value1) + strlen(value2), 1, result != NULL);
+
     if (languages != NULL) {
         string_array_destroy(languages, num_languages);
     }
@@ -139,31 +217,31 @@ static PyObject *py_is_duplicate(PyObject *self, PyObject *args, PyObject *keywo
 
 
 static PyObject *py_is_name_duplicate(PyObject *self, PyObject *args, PyObject *keywords) {
-    return py_is_duplicate(self, args, keywords, libpostal_is_name_duplicate);
+    return py_is_duplicate(self, args, keywords, libpostal_is_name_duplicate, &metrics[METRIC_IS_NAME_DUPLICATE]);
 }
 
 static PyObject *py_is_street_duplicate(PyObject *self, PyObject *args, PyObject *keywords) {
-    return py_is_duplicate(self, args, keywords, libpostal_is_street_duplicate);
+    return py_is_duplicate(self, args, keywords, libpostal_is_street_duplicate, &metrics[METRIC_IS_STREET_DUPLICATE]);
 }
 
 static PyObject *py_is_house_number_duplicate(PyObject *self, PyObject *args, PyObject *keywords) {
-    return py_is_duplicate(self, args, keywords, libpostal_is_house_number_duplicate);
+    return py_is_duplicate(self, args, keywords, libpostal_is_house_number_duplicate, &metrics[METRIC_IS_HOUSE_NUMBER_DUPLICATE]);
 }
 
 static PyObject *py_is_po_box_duplicate(PyObject *self, PyObject *args, PyObject *keywords) {
-    return py_is_duplicate(self, args, keywords, libpostal_is_po_box_duplicate);
+    return py_is_duplicate(self, args, keywords, libpostal_is_po_box_duplicate, &metrics[METRIC_IS_PO_BOX_DUPLICATE]);
 }
 
 static PyObject *py_is_unit_duplicate(PyObject *self, PyObject *args, PyObject *keywords) {
-    return py_is_duplicate(self, args, keywords, libpostal_is_unit_duplicate);
+    return py_is_duplicate(self, args, keywords, libpostal_is_unit_duplicate, &metrics[METRIC_IS_UNIT_DUPLICATE]);
 }
 
 static PyObject *py_is_floor_duplicate(PyObject *self, PyObject *args, PyObject *keywords) {
-    return py_is_duplicate(self, args, keywords, libpostal_is_floor_duplicate);
+    return py_is_duplicate(self, args, keywords, libpostal_is_floor_duplicate, &metrics[METRIC_IS_FLOOR_DUPLICATE]);
 }
 
 static PyObject *py_is_postal_code_duplicate(PyObject *self, PyObject *args, PyObject *keywords) {
-    return py_is_duplicate(self, args, keywords, libpostal_is_postal_code_duplicate);
+    return py_is_duplicate(self, args, keywords, libpostal_is_postal_code_duplicate, &metrics[METRIC_IS_POSTAL_CODE_DUPLICATE]);
 }
 
 static PyObject *py_is_toponym_duplicate(PyObject *self, PyObject *args, PyObject *keywords) {
@@ -177,6 +255,9 @@ static PyObject *py_is_toponym_duplicate(PyObject *self, PyObject *args, PyObjec
     
     PyObject *result = Py_None;
 
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
     static char *kwlist[] = {"labels1",
                              "values1",
                              "labels2",
@@ -196,6 +277,10 @@ static PyObject *py_is_toponym_duplicate(PyObject *self, PyObject *args, PyObjec
         return 0;
     }
 
+    if (!pypostal_setup(dedupe_components(arg_languages), NULL)) {
+        return NULL;
+    }
+
     if (!PySequence_Check(arg_labels1) || !PySequence_Check(arg_values1) || !PySequence_Check(arg_labels2) || !PySequence_Check(arg_values2)) {
         PyErr_SetString(PyExc_TypeError,
                         "Input labels and values must be sequences");
@@ -258,10 +343,22 @@ static PyObject *py_is_toponym_duplicate(PyObject *self, PyObject *args, PyObjec
         options.languages = languages;
     }
 
-    libpostal_duplicate_status_t status = libpostal_is_toponym_duplicate(num_components1, labels1, values1, num_components2, labels2, values2, options);
+    libpostal_duplicate_status_t status;
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
+
+    Py_BEGIN_ALLOW_THREADS
+    status = libpostal_is_toponym_duplicate(num_components1, labels1, values1, num_components2, labels2, values2, options);
+    Py_END_ALLOW_THREADS
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
 
     result = PyLong_FromSsize_t((ssize_t)status);
 
+    PYPOSTAL_METRIC_RECORD(&metrics[METRIC_IS_TOPONYM_DUPLICATE], &timer,
+                           strings_total_len(values1, num_values1) + strings_total_len(values2, num_values2),
+                           1, result != NULL);
+
     string_array_destroy(labels1, num_labels1);
     string_array_destroy(values1, num_values1);
     string_array_destroy(labels2, num_labels2);
@@ -324,7 +421,7 @@ double *PyObject_to_double_array(PyObject *obj, size_t *num_values) {
 
 typedef libpostal_fuzzy_duplicate_status_t (*fuzzy_duplicate_function)(size_t, char **, double *, size_t, char **, double *, libpostal_fuzzy_duplicate_options_t);
 
-static PyObject *py_is_duplicate_fuzzy(PyObject *self, PyObject *args, PyObject *keywords, fuzzy_duplicate_function dupe_func) {
+static PyObject *py_is_duplicate_fuzzy(PyObject *self, PyObject *args, PyObject *keywords, fuzzy_duplicate_function dupe_func, pypostal_metric_t *metric) {
     PyObject *arg_tokens1;
     PyObject *arg_scores1;
     PyObject *arg_tokens2;
@@ -338,6 +435,9 @@ static PyObject *py_is_duplicate_fuzzy(PyObject *self, PyObject *args, PyObject
 
     PyObject *result = Py_None;
 
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
     static char *kwlist[] = {"tokens1",
                              "scores1",
                              "tokens2",
@@ -361,6 +461,10 @@ static PyObject *py_is_duplicate_fuzzy(PyObject *self, PyObject *args, PyObject
         return 0;
     }
 
+    if (!pypostal_setup(dedupe_components(arg_languages), NULL)) {
+        return NULL;
+    }
+
     if (!PySequence_Check(arg_tokens1) || !PySequence_Check(arg_scores1) || !PySequence_Check(arg_tokens2) || !PySequence_Check(arg_scores2)) {
         PyErr_SetString(PyExc_TypeError,
                         "Input tokens and scores must be sequences");
@@ -423,10 +527,22 @@ static PyObject *py_is_duplicate_fuzzy(PyObject *self, PyObject *args, PyObject
         options.languages = languages;
     }
 
-    libpostal_fuzzy_duplicate_status_t status = dupe_func(num_components1, tokens1, scores1, num_components2, tokens2, scores2, options);
+    libpostal_fuzzy_duplicate_status_t status;
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
+
+    Py_BEGIN_ALLOW_THREADS
+    status = dupe_func(num_components1, tokens1, scores1, num_components2, tokens2, scores2, options);
+    Py_END_ALLOW_THREADS
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
 
     result = Py_BuildValue("ld", status.status, status.similarity);
 
+    PYPOSTAL_METRIC_RECORD(metric, &timer,
+                           strings_total_len(tokens1, num_tokens1) + strings_total_len(tokens2, num_tokens2),
+                           1, result != NULL);
+
     string_array_destroy(tokens1, num_tokens1);
     free(scores1);
     string_array_destroy(tokens2, num_tokens2);
@@ -441,14 +557,1067 @@ static PyObject *py_is_duplicate_fuzzy(PyObject *self, PyObject *args, PyObject
 
 
 static PyObject *py_is_name_duplicate_fuzzy(PyObject *self, PyObject *args, PyObject *keywords) {
-    return py_is_duplicate_fuzzy(self, args, keywords, libpostal_is_name_duplicate_fuzzy);
+    return py_is_duplicate_fuzzy(self, args, keywords, libpostal_is_name_duplicate_fuzzy, &metrics[METRIC_IS_NAME_DUPLICATE_FUZZY]);
 }
 
 
 static PyObject *py_is_street_duplicate_fuzzy(PyObject *self, PyObject *args, PyObject *keywords) {
-    return py_is_duplicate_fuzzy(self, args, keywords, libpostal_is_street_duplicate_fuzzy);
+    return py_is_duplicate_fuzzy(self, args, keywords, libpostal_is_street_duplicate_fuzzy, &metrics[METRIC_IS_STREET_DUPLICATE_FUZZY]);
+}
+
+/* Component fields which can be compared in batch, indexes into field_duplicate_functions */
+#define DEDUPE_FIELD_NAME 0
+#define DEDUPE_FIELD_STREET 1
+#define DEDUPE_FIELD_HOUSE_NUMBER 2
+#define DEDUPE_FIELD_PO_BOX 3
+#define DEDUPE_FIELD_UNIT 4
+#define DEDUPE_FIELD_FLOOR 5
+#define DEDUPE_FIELD_POSTAL_CODE 6
+#define NUM_DEDUPE_FIELDS 7
+
+static duplicate_function field_duplicate_functions[NUM_DEDUPE_FIELDS] = {
+    libpostal_is_name_duplicate,
+    libpostal_is_street_duplicate,
+    libpostal_is_house_number_duplicate,
+    libpostal_is_po_box_duplicate,
+    libpostal_is_unit_duplicate,
+    libpostal_is_floor_duplicate,
+    libpostal_is_postal_code_duplicate
+};
+
+
+/* Borrowed UTF-8 view of a field value, or NULL (with no exception set) for None/empty values */
+static inline int field_value(PyObject *obj, const char **value) {
+    if (obj == Py_None) {
+        *value = NULL;
+        return 1;
+    }
+
+    const char *str = PyObject_to_string_borrowed(obj);
+    if (str == NULL) {
+        return 0;
+    }
+
+    *value = str[0] != '\0' ? str : NULL;
+    return 1;
 }
 
+
+/* Compares values1[i] with values2[i] for i < num_values, where the values are laid out
+   as [pair][field]. Pairs where either value is missing get LIBPOSTAL_NULL_DUPLICATE_STATUS.
+   Must be called with the GIL released or held, it doesn't touch any Python objects. */
+static void compare_field_values(uint8_t *fields, size_t num_fields, const char **values1, const char **values2,
+                                 size_t num_values, libpostal_duplicate_options_t options, int8_t *statuses) {
+    for (size_t i = 0; i < num_values; i++) {
+        if (values1[i] == NULL || values2[i] == NULL) {
+            statuses[i] = (int8_t)LIBPOSTAL_NULL_DUPLICATE_STATUS;
+            continue;
+        }
+        duplicate_function dupe_func = field_duplicate_functions[fields[i % num_fields]];
+        statuses[i] = (int8_t)dupe_func((char *)values1[i], (char *)values2[i], options);
+    }
+}
+
+
+static PyObject *py_compare_pairs(PyObject *self, PyObject *args, PyObject *keywords) {
+    PyObject *arg_columns;
+    PyObject *arg_fields;
+    PyObject *arg_pairs;
+    PyObject *arg_languages = Py_None;
+
+    static char *kwlist[] = {"columns",
+                             "fields",
+                             "pairs",
+                             "languages",
+                             NULL
+                            };
+
+    if (!PyArg_ParseTupleAndKeywords(args, keywords,
+                                     "OOO|O:compare_pairs", kwlist,
+                                     &arg_columns,
+                                     &arg_fields,
+                                     &arg_pairs,
+                                     &arg_languages
+                                     )) {
+        return 0;
+    }
+
+    PyObject *result = NULL;
+
+    PyObject *columns = PySequence_Fast(arg_columns, "columns must be a sequence");
+    if (columns == NULL) {
+        return NULL;
+    }
+
+    PyObject *fields_seq = PySequence_Fast(arg_fields, "fields must be a sequence");
+    if (fields_seq == NULL) {
+        Py_DECREF(columns);
+        return NULL;
+    }
+
+    size_t num_fields = (size_t)PySequence_Fast_GET_SIZE(fields_seq);
+    if (num_fields == 0 || num_fields != (size_t)PySequence_Fast_GET_SIZE(columns)) {
+        PyErr_SetString(PyExc_ValueError, "fields and columns must be non-empty and the same length");
+        Py_DECREF(fields_seq);
+        Py_DECREF(columns);
+        return NULL;
+    }
+
+    Py_buffer pairs_view;
+    if (PyObject_GetBuffer(arg_pairs, &pairs_view, PyBUF_SIMPLE) < 0) {
+        Py_DECREF(fields_seq);
+        Py_DECREF(columns);
+        return NULL;
+    }
+
+    uint8_t *fields = NULL;
+    PyObject **column_seqs = NULL;
+    const char **values1 = NULL;
+    const char **values2 = NULL;
+    PyObject **value_refs = NULL;
+    size_t num_value_refs = 0;
+    int8_t *statuses = NULL;
+    size_t num_languages = 0;
+    char **languages = NULL;
+
+    if (pairs_view.len % (2 * sizeof(uint32_t)) != 0) {
+        PyErr_SetString(PyExc_ValueError, "pairs must be a buffer of uint32 (index1, index2) pairs e.g. array('I')");
+        goto exit_release_buffer;
+    }
+
+    size_t num_pairs = (size_t)pairs_view.len / (2 * sizeof(uint32_t));
+    const uint32_t *pairs = (const uint32_t *)pairs_view.buf;
+    size_t num_values = num_pairs * num_fields;
+
+    fields = malloc(num_fields * sizeof(uint8_t));
+    column_seqs = calloc(num_fields, sizeof(PyObject *));
+    values1 = malloc((num_values + 1) * sizeof(char *));
+    values2 = malloc((num_values + 1) * sizeof(char *));
+    value_refs = malloc((2 * num_values + 1) * sizeof(PyObject *));
+    statuses = malloc((num_values + 1) * sizeof(int8_t));
+    if (fields == NULL || column_seqs == NULL || values1 == NULL || values2 == NULL || value_refs == NULL || statuses == NULL) {
+        PyErr_NoMemory();
+        goto exit_release_buffer;
+    }
+
+    for (size_t j = 0; j < num_fields; j++) {
+        long field = PyLong_AsLong(PySequence_Fast_GET_ITEM(fields_seq, j));
+        if (field == -1 && PyErr_Occurred()) {
+            goto exit_release_buffer;
+        }
+        if (field < 0 || field >= NUM_DEDUPE_FIELDS) {
+            PyErr_Format(PyExc_ValueError, "Invalid dedupe field: %ld", field);
+            goto exit_release_buffer;
+        }
+        fields[j] = (uint8_t)field;
+
+        column_seqs[j] = PySequence_Fast(PySequence_Fast_GET_ITEM(columns, j), "each column must be a sequence");
+        if (column_seqs[j] == NULL) {
+            goto exit_release_buffer;
+        }
+    }
+
+    // Only the rows referenced by pairs are converted. Unicode objects cache their UTF-8
+    // representation, so a value repeated across pairs is only encoded once. The columns
+    // may be the caller's lists, so a reference to each value used is held while the GIL
+    // is released rather than copying whole columns on every call.
+    for (size_t i = 0; i < num_pairs; i++) {
+        uint32_t index1 = pairs[2 * i];
+        uint32_t index2 = pairs[2 * i + 1];
+
+        for (size_t j = 0; j < num_fields; j++) {
+            PyObject *column = column_seqs[j];
+            Py_ssize_t column_len = PySequence_Fast_GET_SIZE(column);
+            if ((Py_ssize_t)index1 >= column_len || (Py_ssize_t)index2 >= column_len) {
+                PyErr_Format(PyExc_IndexError, "pair (%u, %u) out of range for a column of length %zd", index1, index2, column_len);
+                goto exit_release_buffer;
+            }
+
+            size_t k = i * num_fields + j;
+            PyObject *item1 = PySequence_Fast_GET_ITEM(column, index1);
+            PyObject *item2 = PySequence_Fast_GET_ITEM(column, index2);
+            Py_INCREF(item1);
+            value_refs[num_value_refs++] = item1;
+            Py_INCREF(item2);
+            value_refs[num_value_refs++] = item2;
+            if (!field_value(item1, &values1[k]) || !field_value(item2, &values2[k])) {
+                goto exit_release_buffer;
+            }
+        }
+    }
+
+    if (!pypostal_setup(dedupe_components(arg_languages), NULL)) {
+        goto exit_release_buffer;
+    }
+
+    libpostal_duplicate_options_t options = libpostal_get_default_duplicate_options();
+
+    if (PySequence_Check(arg_languages)) {
+        languages = PyObject_to_strings_max_len(arg_languages, LIBPOSTAL_MAX_LANGUAGE_LEN, &num_languages);
+        if (languages == NULL && PyErr_Occurred()) {
+            goto exit_release_buffer;
+        }
+    }
+
+    if (num_languages > 0 && languages != NULL) {
+        options.num_languages = num_languages;
+        options.languages = languages;
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    compare_field_values(fields, num_fields, values1, values2, num_values, options, statuses);
+    Py_END_ALLOW_THREADS
+
+    result = PyBytes_FromStringAndSize((const char *)statuses, (Py_ssize_t)num_values);
+
+exit_release_buffer:
+    if (languages != NULL) {
+        string_array_destroy(languages, num_languages);
+    }
+    if (column_seqs != NULL) {
+        for (size_t j = 0; j < num_fields; j++) {
+            Py_XDECREF(column_seqs[j]);
+        }
+    }
+    free(column_seqs);
+    for (size_t i = 0; i < num_value_refs; i++) {
+        Py_DECREF(value_refs[i]);
+    }
+    free(value_refs);
+    free(fields);
+    free(values1);
+    free(values2);
+    free(statuses);
+    PyBuffer_Release(&pairs_view);
+    Py_DECREF(fields_seq);
+    Py_DECREF(columns);
+    return result;
+}
+
+/* Index arrays for the table form of is_duplicate_many, a buffer of uint32 */
+static bool get_index_buffer(PyObject *obj, Py_buffer *view, size_t *num_indices) {
+    if (PyObject_GetBuffer(obj, view, PyBUF_SIMPLE) < 0) {
+        return false;
+    }
+    if (view->len % sizeof(uint32_t) != 0) {
+        PyErr_SetString(PyExc_ValueError, "indexes must be a buffer of uint32 e.g. array('I')");
+        PyBuffer_Release(view);
+        return false;
+    }
+    *num_indices = (size_t)view->len / sizeof(uint32_t);
+    return true;
+}
+
+
+/* Pairs of values for the many functions, either two sequences of values or two index arrays into a shared table.
+   The sequences are snapshots, see pypostal_sequence_snapshot. */
+typedef struct value_pairs {
+    PyObject *seq1;
+    PyObject *seq2;
+    PyObject *table;
+    Py_buffer view1;
+    Py_buffer view2;
+    size_t num_pairs;
+} value_pairs_t;
+
+static bool value_pairs_init(value_pairs_t *pairs, PyObject *arg_values1, PyObject *arg_values2, PyObject *arg_table) {
+    memset(pairs, 0, sizeof(value_pairs_t));
+
+    if (arg_table == Py_None) {
+        pairs->seq1 = pypostal_sequence_snapshot(arg_values1, "values1 must be a sequence");
+        if (pairs->seq1 == NULL) return false;
+        pairs->seq2 = pypostal_sequence_snapshot(arg_values2, "values2 must be a sequence");
+        if (pairs->seq2 == NULL) return false;
+
+        pairs->num_pairs = (size_t)PySequence_Fast_GET_SIZE(pairs->seq1);
+        if (pairs->num_pairs != (size_t)PySequence_Fast_GET_SIZE(pairs->seq2)) {
+            PyErr_SetString(PyExc_ValueError, "values1 and values2 must be the same length");
+            return false;
+        }
+        return true;
+    }
+
+    pairs->table = pypostal_sequence_snapshot(arg_table, "table must be a sequence");
+    if (pairs->table == NULL) return false;
+
+    size_t num_indices1 = 0;
+    size_t num_indices2 = 0;
+    if (!get_index_buffer(arg_values1, &pairs->view1, &num_indices1)) {
+        return false;
+    }
+    if (!get_index_buffer(arg_values2, &pairs->view2, &num_indices2)) {
+        PyBuffer_Release(&pairs->view1);
+        pairs->view1.obj = NULL;
+        return false;
+    }
+
+    pairs->num_pairs = num_indices1;
+    if (num_indices1 != num_indices2) {
+        PyErr_SetString(PyExc_ValueError, "values1 and values2 must be the same length");
+        return false;
+    }
+
+    Py_ssize_t table_len = PySequence_Fast_GET_SIZE(pairs->table);
+    const uint32_t *indices1 = (const uint32_t *)pairs->view1.buf;
+    const uint32_t *indices2 = (const uint32_t *)pairs->view2.buf;
+    for (size_t i = 0; i < num_indices1; i++) {
+        if ((Py_ssize_t)indices1[i] >= table_len || (Py_ssize_t)indices2[i] >= table_len) {
+            PyErr_Format(PyExc_IndexError, "index out of range for a table of length %zd", table_len);
+            return false;
+        }
+    }
+
+    return true;
+}
+
+/* Position in the table (or in values1 followed by values2) of value i of pair side 1 or 2 */
+static inline size_t value_pairs_entry(value_pairs_t *pairs, size_t i, int side) {
+    if (pairs->table == NULL) {
+        return side == 1 ? i : pairs->num_pairs + i;
+    }
+    return (size_t)(side == 1 ? ((const uint32_t *)pairs->view1.buf)[i] : ((const uint32_t *)pairs->view2.buf)[i]);
+}
+
+static inline size_t value_pairs_num_entries(value_pairs_t *pairs) {
+    if (pairs->table == NULL) {
+        return 2 * pairs->num_pairs;
+    }
+    return (size_t)PySequence_Fast_GET_SIZE(pairs->table);
+}
+
+static inline PyObject *value_pairs_get(value_pairs_t *pairs, size_t entry) {
+    if (pairs->table != NULL) {
+        return PySequence_Fast_GET_ITEM(pairs->table, entry);
+    } else if (entry < pairs->num_pairs) {
+        return PySequence_Fast_GET_ITEM(pairs->seq1, entry);
+    }
+    return PySequence_Fast_GET_ITEM(pairs->seq2, entry - pairs->num_pairs);
+}
+
+static void value_pairs_destroy(value_pairs_t *pairs) {
+    Py_XDECREF(pairs->seq1);
+    Py_XDECREF(pairs->seq2);
+    Py_XDECREF(pairs->table);
+    if (pairs->view1.obj != NULL) PyBuffer_Release(&pairs->view1);
+    if (pairs->view2.obj != NULL) PyBuffer_Release(&pairs->view2);
+}
+
+
+static PyObject *py_is_duplicate_many(PyObject *self, PyObject *args, PyObject *keywords) {
+    int field;
+    PyObject *arg_values1;
+    PyObject *arg_values2;
+    PyObject *arg_languages = Py_None;
+    PyObject *arg_table = Py_None;
+
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
+    static char *kwlist[] = {"field",
+                             "values1",
+                             "values2",
+                             "languages",
+                             "table",
+                             NULL
+                            };
+
+    if (!PyArg_ParseTupleAndKeywords(args, keywords,
+                                     "iOO|OO:is_duplicate_many", kwlist,
+                                     &field,
+                                     &arg_values1,
+                                     &arg_values2,
+                                     &arg_languages,
+                                     &arg_table
+                                     )) {
+        return 0;
+    }
+
+    if (field < 0 || field >= NUM_DEDUPE_FIELDS) {
+        PyErr_Format(PyExc_ValueError, "Invalid dedupe field: %d", field);
+        return 0;
+    }
+
+    PyObject *result = NULL;
+    const char **values1 = NULL;
+    const char **values2 = NULL;
+    int8_t *statuses = NULL;
+    size_t num_languages = 0;
+    char **languages = NULL;
+
+    value_pairs_t pairs;
+    if (!value_pairs_init(&pairs, arg_values1, arg_values2, arg_table)) {
+        goto exit_destroy_pairs;
+    }
+
+    size_t num_pairs = pairs.num_pairs;
+    values1 = malloc((num_pairs + 1) * sizeof(char *));
+    values2 = malloc((num_pairs + 1) * sizeof(char *));
+    statuses = malloc((num_pairs + 1) * sizeof(int8_t));
+    if (values1 == NULL || values2 == NULL || statuses == NULL) {
+        PyErr_NoMemory();
+        goto exit_destroy_pairs;
+    }
+
+    // Unicode objects cache their UTF-8 representation, so table entries shared
+    // by many pairs are only encoded once
+    for (size_t i = 0; i < num_pairs; i++) {
+        if (!field_value(value_pairs_get(&pairs, value_pairs_entry(&pairs, i, 1)), &values1[i]) ||
+            !field_value(value_pairs_get(&pairs, value_pairs_entry(&pairs, i, 2)), &values2[i])) {
+            goto exit_destroy_pairs;
+        }
+    }
+
+    if (!pypostal_setup(dedupe_components(arg_languages), NULL)) {
+        goto exit_destroy_pairs;
+    }
+
+    libpostal_duplicate_options_t options = libpostal_get_default_duplicate_options();
+
+    if (PySequence_Check(arg_languages)) {
+        languages = PyObject_to_strings_max_len(arg_languages, LIBPOSTAL_MAX_LANGUAGE_LEN, &num_languages);
+        if (languages == NULL && PyErr_Occurred()) {
+            goto exit_destroy_pairs;
+        }
+    }
+
+    if (num_languages > 0 && languages != NULL) {
+        options.num_languages = num_languages;
+        options.languages = languages;
+    }
+
+    uint8_t fields[1] = {(uint8_t)field};
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
+
+    Py_BEGIN_ALLOW_THREADS
+    compare_field_values(fields, 1, values1, values2, num_pairs, options, statuses);
+    Py_END_ALLOW_THREADS
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
+
+    result = PyBytes_FromStringAndSize((const char *)statuses, (Py_ssize_t)num_pairs);
+
+    PYPOSTAL_METRIC_RECORD(&metrics[METRIC_IS_DUPLICATE_MANY], &timer,
+                           strings_total_len((char **)values1, num_pairs) + strings_total_len((char **)values2, num_pairs),
+                           num_pairs, result != NULL);
+
+exit_destroy_pairs:
+    if (languages != NULL) {
+        string_array_destroy(languages, num_languages);
+    }
+    free(values1);
+    free(values2);
+    free(statuses);
+    value_pairs_destroy(&pairs);
+    return result;
+}
+
+
+#define DEDUPE_FUZZY_FIELD_NAME 0
+#define DEDUPE_FUZZY_FIELD_STREET 1
+#define NUM_DEDUPE_FUZZY_FIELDS 2
+
+static fuzzy_duplicate_function fuzzy_field_duplicate_functions[NUM_DEDUPE_FUZZY_FIELDS] = {
+    libpostal_is_name_duplicate_fuzzy,
+    libpostal_is_street_duplicate_fuzzy
+};
+
+/* A (tokens, scores) value converted to C arrays. Tokens are borrowed from the token
+   objects, which are kept alive by tokens_seq. */
+typedef struct fuzzy_value {
+    bool converted;
+    PyObject *tokens_seq;
+    size_t num_tokens;
+    char **tokens;
+    double *scores;
+} fuzzy_value_t;
+
+static bool fuzzy_value_convert(fuzzy_value_t *value, PyObject *obj) {
+    value->converted = true;
+
+    if (obj == Py_None) {
+        return true;
+    }
+
+    if (!PySequence_Check(obj) || PySequence_Length(obj) != 2) {
+        PyErr_SetString(PyExc_TypeError, "fuzzy values must be (tokens, scores) pairs");
+        return false;
+    }
+
+    PyObject *arg_tokens = PySequence_GetItem(obj, 0);
+    PyObject *arg_scores = PySequence_GetItem(obj, 1);
+    bool ok = false;
+
+    if (arg_tokens == NULL || arg_scores == NULL) {
+        goto exit_decref_items;
+    }
+
+    value->tokens_seq = pypostal_sequence_snapshot(arg_tokens, "tokens must be a sequence");
+    if (value->tokens_seq == NULL) {
+        goto exit_decref_items;
+    }
+
+    size_t num_tokens = (size_t)PySequence_Fast_GET_SIZE(value->tokens_seq);
+    if (PySequence_Length(arg_scores) != (Py_ssize_t)num_tokens) {
+        PyErr_SetString(PyExc_TypeError, "tokens and scores must be of equal length");
+        goto exit_decref_items;
+    }
+
+    if (num_tokens == 0) {
+        ok = true;
+        goto exit_decref_items;
+    }
+
+    value->tokens = malloc(num_tokens * sizeof(char *));
+    if (value->tokens == NULL) {
+        PyErr_NoMemory();
+        goto exit_decref_items;
+    }
+
+    for (size_t i = 0; i < num_tokens; i++) {
+        value->tokens[i] = (char *)PyObject_to_string_borrowed(PySequence_Fast_GET_ITEM(value->tokens_seq, i));
+        if (value->tokens[i] == NULL) {
+            goto exit_decref_items;
+        }
+    }
+
+    size_t num_scores = 0;
+    value->scores = PyObject_to_double_array(arg_scores, &num_scores);
+    if (value->scores == NULL) {
+        if (!PyErr_Occurred()) {
+            PyErr_SetString(PyExc_TypeError, "scores must be a sequence of numbers");
+        }
+        goto exit_decref_items;
+    }
+
+    value->num_tokens = num_tokens;
+    ok = true;
+
+exit_decref_items:
+    Py_XDECREF(arg_tokens);
+    Py_XDECREF(arg_scores);
+    return ok;
+}
+
+static void fuzzy_value_destroy(fuzzy_value_t *value) {
+    free(value->tokens);
+    free(value->scores);
+    Py_XDECREF(value->tokens_seq);
+}
+
+
+static PyObject *py_is_duplicate_fuzzy_many(PyObject *self, PyObject *args, PyObject *keywords) {
+    int field;
+    PyObject *arg_values1;
+    PyObject *arg_values2;
+    PyObject *arg_languages = Py_None;
+    PyObject *arg_table = Py_None;
+
+    libpostal_fuzzy_duplicate_options_t options = libpostal_get_default_fuzzy_duplicate_options();
+
+    double needs_review_threshold = options.needs_review_threshold;
+    double likely_dupe_threshold = options.likely_dupe_threshold;
+
+    static char *kwlist[] = {"field",
+                             "values1",
+                             "values2",
+                             "languages",
+                             "table",
+                             "needs_review_threshold",
+                             "likely_dupe_threshold",
+                             NULL
+                            };
+
+    if (!PyArg_ParseTupleAndKeywords(args, keywords,
+                                     "iOO|OOdd:is_duplicate_fuzzy_many", kwlist,
+                                     &field,
+                                     &arg_values1,
+                                     &arg_values2,
+                                     &arg_languages,
+                                     &arg_table,
+                                     &needs_review_threshold,
+                                     &likely_dupe_threshold
+                                     )) {
+        return 0;
+    }
+
+    if (field < 0 || field >= NUM_DEDUPE_FUZZY_FIELDS) {
+        PyErr_Format(PyExc_ValueError, "Invalid fuzzy dedupe field: %d", field);
+        return 0;
+    }
+
+    options.needs_review_threshold = needs_review_threshold;
+    options.likely_dupe_threshold = likely_dupe_threshold;
+
+    PyObject *result = NULL;
+    fuzzy_value_t *values = NULL;
+    size_t num_entries = 0;
+    int8_t *statuses = NULL;
+    double *similarities = NULL;
+    size_t num_languages = 0;
+    char **languages = NULL;
+
+    value_pairs_t pairs;
+    if (!value_pairs_init(&pairs, arg_values1, arg_values2, arg_table)) {
+        goto exit_destroy_pairs;
+    }
+
+    size_t num_pairs = pairs.num_pairs;
+    num_entries = value_pairs_num_entries(&pairs);
+    values = calloc(num_entries + 1, sizeof(fuzzy_value_t));
+    statuses = malloc((num_pairs + 1) * sizeof(int8_t));
+    similarities = malloc((num_pairs + 1) * sizeof(double));
+    if (values == NULL || statuses == NULL || similarities == NULL) {
+        PyErr_NoMemory();
+        goto exit_destroy_pairs;
+    }
+
+    // Only the entries referenced by a pair are converted, and each of them only once
+    for (size_t i = 0; i < num_pairs; i++) {
+        for (int side = 1; side <= 2; side++) {
+            size_t entry = value_pairs_entry(&pairs, i, side);
+            if (!values[entry].converted && !fuzzy_value_convert(&values[entry], value_pairs_get(&pairs, entry))) {
+                goto exit_destroy_pairs;
+            }
+        }
+    }
+
+    if (!pypostal_setup(dedupe_components(arg_languages), NULL)) {
+        goto exit_destroy_pairs;
+    }
+
+    if (PySequence_Check(arg_languages)) {
+        languages = PyObject_to_strings_max_len(arg_languages, LIBPOSTAL_MAX_LANGUAGE_LEN, &num_languages);
+        if (languages == NULL && PyErr_Occurred()) {
+            goto exit_destroy_pairs;
+        }
+    }
+
+    if (num_languages > 0 && languages != NULL) {
+        options.num_languages = num_languages;
+        options.languages = languages;
+    }
+
+    fuzzy_duplicate_function dupe_func = fuzzy_field_duplicate_functions[field];
+
+    Py_BEGIN_ALLOW_THREADS
+    for (size_t i = 0; i < num_pairs; i++) {
+        fuzzy_value_t *value1 = &values[value_pairs_entry(&pairs, i, 1)];
+        fuzzy_value_t *value2 = &values[value_pairs_entry(&pairs, i, 2)];
+        if (value1->num_tokens == 0 || value2->num_tokens == 0) {
+            statuses[i] = (int8_t)LIBPOSTAL_NULL_DUPLICATE_STATUS;
+            similarities[i] = 0.0;
+            continue;
+        }
+        libpostal_fuzzy_duplicate_status_t status = dupe_func(value1->num_tokens, value1->tokens, value1->scores,
+                                                              value2->num_tokens, value2->tokens, value2->scores,
+                                                              options);
+        statuses[i] = (int8_t)status.status;
+        similarities[i] = status.similarity;
+    }
+    Py_END_ALLOW_THREADS
+
+    PyObject *py_statuses = PyBytes_FromStringAndSize((const char *)statuses, (Py_ssize_t)num_pairs);
+    PyObject *py_similarities = PyBytes_FromStringAndSize((const char *)similarities, (Py_ssize_t)(num_pairs * sizeof(double)));
+    if (py_statuses != NULL && py_similarities != NULL) {
+        result = PyTuple_Pack(2, py_statuses, py_similarities);
+    }
+    Py_XDECREF(py_statuses);
+    Py_XDECREF(py_similarities);
+
+exit_destroy_pairs:
+    if (languages != NULL) {
+        string_array_destroy(languages, num_languages);
+    }
+    if (values != NULL) {
+        for (size_t i = 0; i < num_entries; i++) {
+            fuzzy_value_destroy(&values[i]);
+        }
+    }
+    free(values);
+    free(statuses);
+    free(similarities);
+    value_pairs_destroy(&pairs);
+    return result;
+}
+
+/* PreparedRecord: a record's labels and values converted to C strings once,
+   with the value of each dedupe field looked up and the place languages
+   resolved, so comparing it against many other records only costs the
+   libpostal comparisons themselves. */
+
+#define DEDUPE_FIELD_TOPONYM NUM_DEDUPE_FIELDS
+#define NUM_PREPARED_FIELDS (NUM_DEDUPE_FIELDS + 1)
+
+static const struct {
+    const char *label;
+    uint8_t field;
+} label_fields[] = {
+    {"house", DEDUPE_FIELD_NAME},
+    {"road", DEDUPE_FIELD_STREET},
+    {"house_number", DEDUPE_FIELD_HOUSE_NUMBER},
+    {"po_box", DEDUPE_FIELD_PO_BOX},
+    {"unit", DEDUPE_FIELD_UNIT},
+    {"level", DEDUPE_FIELD_FLOOR},
+    {"postcode", DEDUPE_FIELD_POSTAL_CODE},
+};
+
+typedef struct {
+    PyObject_HEAD
+    char **labels;
+    char **values;
+    size_t num_components;
+    char **languages;
+    size_t num_languages;
+    const char *fields[NUM_DEDUPE_FIELDS];
+    PyObject *languages_tuple;
+    int initialized;
+} PreparedRecordObject;
+
+static void PreparedRecord_clear_strings(PreparedRecordObject *self) {
+    if (self->labels != NULL) {
+        string_array_destroy(self->labels, self->num_components);
+    }
+    if (self->values != NULL) {
+        string_array_destroy(self->values, self->num_components);
+    }
+    if (self->languages != NULL) {
+        string_array_destroy(self->languages, self->num_languages);
+    }
+    self->labels = NULL;
+    self->values = NULL;
+    self->languages = NULL;
+    self->num_components = 0;
+    self->num_languages = 0;
+    memset(self->fields, 0, sizeof(self->fields));
+    Py_CLEAR(self->languages_tuple);
+}
+
+static void PreparedRecord_dealloc(PreparedRecordObject *self) {
+    PreparedRecord_clear_strings(self);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+static int PreparedRecord_init(PreparedRecordObject *self, PyObject *args, PyObject *keywords) {
+    PyObject *arg_labels;
+    PyObject *arg_values;
+    PyObject *arg_languages = Py_None;
+
+    // compare_prepared reads the strings without the GIL
+    if (self->initialized) {
+        PyErr_SetString(PyExc_TypeError, "PreparedRecord is immutable and can't be initialized again");
+        return -1;
+    }
+
+    static char *kwlist[] = {"labels",
+                             "values",
+                             "languages",
+                             NULL
+                            };
+
+    if (!PyArg_ParseTupleAndKeywords(args, keywords,
+                                     "OO|O:PreparedRecord", kwlist,
+                                     &arg_labels,
+                                     &arg_values,
+                                     &arg_languages
+                                     )) {
+        return -1;
+    }
+
+    if (!PySequence_Check(arg_labels) || !PySequence_Check(arg_values)) {
+        PyErr_SetString(PyExc_TypeError, "labels and values must be sequences");
+        return -1;
+    } else if (PySequence_Length(arg_labels) != PySequence_Length(arg_values)) {
+        PyErr_SetString(PyExc_ValueError, "labels and values must be of equal length");
+        return -1;
+    }
+
+    int has_languages = 0;
+    if (arg_languages != Py_None) {
+        if (PyUnicode_Check(arg_languages) || PyBytes_Check(arg_languages) || !PySequence_Check(arg_languages)) {
+            PyErr_SetString(PyExc_TypeError, "languages must be a sequence of strings");
+            return -1;
+        }
+        Py_ssize_t num_languages = PySequence_Length(arg_languages);
+        if (num_languages < 0) {
+            return -1;
+        }
+        has_languages = num_languages > 0;
+    }
+
+    uint32_t components = PYPOSTAL_COMPONENT_LIBPOSTAL;
+    if (!has_languages) {
+        components |= PYPOSTAL_COMPONENT_LANGUAGE_CLASSIFIER;
+    }
+    if (!pypostal_setup(components, NULL)) {
+        return -1;
+    }
+
+    size_t num_labels = 0;
+    size_t num_values = 0;
+    self->labels = PyObject_to_strings(arg_labels, &num_labels);
+    if (self->labels == NULL && PyErr_Occurred()) {
+        goto error;
+    }
+    self->num_components = num_labels;
+    self->values = PyObject_to_strings(arg_values, &num_values);
+    if ((self->values == NULL && PyErr_Occurred()) || num_values != num_labels) {
+        if (!PyErr_Occurred()) {
+            PyErr_SetString(PyExc_TypeError, "labels and values must be strings");
+        }
+        goto error;
+    }
+
+    for (size_t i = 0; i < self->num_components; i++) {
+        for (size_t j = 0; j < sizeof(label_fields) / sizeof(label_fields[0]); j++) {
+            if (self->fields[label_fields[j].field] == NULL && self->values[i][0] != '\0' &&
+                strcmp(self->labels[i], label_fields[j].label) == 0) {
+                self->fields[label_fields[j].field] = self->values[i];
+            }
+        }
+    }
+
+    if (has_languages) {
+        self->languages = PyObject_to_strings_max_len(arg_languages, LIBPOSTAL_MAX_LANGUAGE_LEN, &self->num_languages);
+        if (self->languages == NULL && PyErr_Occurred()) {
+            goto error;
+        }
+    } else if (self->num_components > 0) {
+        size_t num_languages = 0;
+        char **languages = NULL;
+
+        Py_BEGIN_ALLOW_THREADS
+        languages = libpostal_place_languages(self->num_components, self->labels, self->values, &num_languages);
+        Py_END_ALLOW_THREADS
+
+        self->languages = languages;
+        self->num_languages = languages != NULL ? num_languages : 0;
+    }
+
+    self->languages_tuple = PyTuple_New((Py_ssize_t)self->num_languages);
+    if (self->languages_tuple == NULL) {
+        goto error;
+    }
+    for (size_t i = 0; i < self->num_languages; i++) {
+        PyObject *language = PyUnicode_DecodeUTF8(self->languages[i], strlen(self->languages[i]), "strict");
+        if (language == NULL) {
+            goto error;
+        }
+        PyTuple_SET_ITEM(self->languages_tuple, (Py_ssize_t)i, language);
+    }
+
+    self->initialized = 1;
+    return 0;
+
+error:
+    PreparedRecord_clear_strings(self);
+    return -1;
+}
+
+static PyObject *PreparedRecord_get_languages(PreparedRecordObject *self, void *closure) {
+    if (self->languages_tuple == NULL) {
+        return PyTuple_New(0);
+    }
+    Py_INCREF(self->languages_tuple);
+    return self->languages_tuple;
+}
+
+static Py_ssize_t PreparedRecord_length(PreparedRecordObject *self) {
+    return (Py_ssize_t)self->num_components;
+}
+
+static PySequenceMethods PreparedRecord_as_sequence = {
+    .sq_length = (lenfunc)PreparedRecord_length,
+};
+
+static PyGetSetDef PreparedRecord_getset[] = {
+    {"languages", (getter)PreparedRecord_get_languages, NULL, "languages used to compare the record, given or from place_languages", NULL},
+    {NULL}
+};
+
+static PyTypeObject PreparedRecordType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "postal._dedupe.PreparedRecord",
+    .tp_basicsize = sizeof(PreparedRecordObject),
+    .tp_itemsize = 0,
+    .tp_dealloc = (destructor)PreparedRecord_dealloc,
+    .tp_as_sequence = &PreparedRecord_as_sequence,
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE,
+    .tp_doc = "PreparedRecord(labels, values, languages=None)\n\n"
+              "A record prepared once for repeated comparisons with compare and compare_many.\n\n"
+              "The labels and values are converted for libpostal when the record is created, the\n"
+              "value of each field is looked up by its parser label (the first non-empty value wins)\n"
+              "and, when languages isn't given, the place languages of the record are resolved with\n"
+              "place_languages. Comparing two prepared records uses the union of their languages.",
+    .tp_getset = PreparedRecord_getset,
+    .tp_init = (initproc)PreparedRecord_init,
+    .tp_new = PyType_GenericNew,
+};
+
+
+#define MAX_STACK_PAIR_LANGUAGES 16
+
+/* Compares two prepared records field by field, without the GIL. The languages of a
+   pair are the union of both records' languages, or none (libpostal classifies each
+   value) when neither has any. languages_buf holds MAX_STACK_PAIR_LANGUAGES entries. */
+static int compare_prepared_records(PreparedRecordObject *a, PreparedRecordObject *b, uint8_t *fields, size_t num_fields,
+                                    char **languages_buf, int8_t *statuses) {
+    libpostal_duplicate_options_t options = libpostal_get_default_duplicate_options();
+
+    char **languages = languages_buf;
+    size_t max_languages = a->num_languages + b->num_languages;
+    if (max_languages > MAX_STACK_PAIR_LANGUAGES) {
+        languages = malloc(max_languages * sizeof(char *));
+        if (languages == NULL) {
+            return 0;
+        }
+    }
+
+    size_t num_languages = 0;
+    for (size_t i = 0; i < a->num_languages; i++) {
+        languages[num_languages++] = a->languages[i];
+    }
+    for (size_t i = 0; i < b->num_languages; i++) {
+        size_t j;
+        for (j = 0; j < a->num_languages; j++) {
+            if (strcmp(a->languages[j], b->languages[i]) == 0) {
+                break;
+            }
+        }
+        if (j == a->num_languages) {
+            languages[num_languages++] = b->languages[i];
+        }
+    }
+
+    if (num_languages > 0) {
+        options.languages = languages;
+        options.num_languages = num_languages;
+    }
+
+    for (size_t j = 0; j < num_fields; j++) {
+        uint8_t field = fields[j];
+        if (field == DEDUPE_FIELD_TOPONYM) {
+            if (a->num_components == 0 || b->num_components == 0) {
+                statuses[j] = (int8_t)LIBPOSTAL_NULL_DUPLICATE_STATUS;
+                continue;
+            }
+            statuses[j] = (int8_t)libpostal_is_toponym_duplicate(a->num_components, a->labels, a->values,
+                                                                 b->num_components, b->labels, b->values, options);
+            continue;
+        }
+
+        const char *value1 = a->fields[field];
+        const char *value2 = b->fields[field];
+        if (value1 == NULL || value2 == NULL) {
+            statuses[j] = (int8_t)LIBPOSTAL_NULL_DUPLICATE_STATUS;
+            continue;
+        }
+        statuses[j] = (int8_t)field_duplicate_functions[field]((char *)value1, (char *)value2, options);
+    }
+
+    if (languages != languages_buf) {
+        free(languages);
+    }
+    return 1;
+}
+
+
+/* compare_prepared(record, others, fields): record is compared against a single
+   PreparedRecord or each one in a sequence, returns bytes of len(fields) statuses
+   per comparison. */
+static PyObject *py_compare_prepared(PyObject *self, PyObject *args) {
+    PyObject *arg_record;
+    PyObject *arg_others;
+    PyObject *arg_fields;
+
+    PyObject *result = NULL;
+
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
+    if (!PyArg_ParseTuple(args, "O!OO:compare_prepared", &PreparedRecordType, &arg_record, &arg_others, &arg_fields)) {
+        return NULL;
+    }
+
+    PyObject *others = NULL;
+    if (PyObject_TypeCheck(arg_others, &PreparedRecordType)) {
+        others = PyTuple_Pack(1, arg_others);
+    } else {
+        others = pypostal_sequence_snapshot(arg_others, "others must be a PreparedRecord or a sequence of them");
+    }
+    if (others == NULL) {
+        return NULL;
+    }
+
+    PyObject *fields_seq = PySequence_Fast(arg_fields, "fields must be a sequence");
+    if (fields_seq == NULL) {
+        Py_DECREF(others);
+        return NULL;
+    }
+
+    size_t num_others = (size_t)PySequence_Fast_GET_SIZE(others);
+    size_t num_fields = (size_t)PySequence_Fast_GET_SIZE(fields_seq);
+
+    uint8_t *fields = malloc((num_fields > 0 ? num_fields : 1) * sizeof(uint8_t));
+    int8_t *statuses = malloc((num_others * num_fields > 0 ? num_others * num_fields : 1) * sizeof(int8_t));
+    if (fields == NULL || statuses == NULL) {
+        PyErr_NoMemory();
+        goto exit_compare_prepared;
+    }
+
+    for (size_t j = 0; j < num_fields; j++) {
+        long field = PyLong_AsLong(PySequence_Fast_GET_ITEM(fields_seq, j));
+        if (field == -1 && PyErr_Occurred()) {
+            goto exit_compare_prepared;
+        }
+        if (field < 0 || field >= NUM_PREPARED_FIELDS) {
+            PyErr_Format(PyExc_ValueError, "Invalid dedupe field: %ld", field);
+            goto exit_compare_prepared;
+        }
+        fields[j] = (uint8_t)field;
+    }
+
+    for (size_t i = 0; i < num_others; i++) {
+        if (!PyObject_TypeCheck(PySequence_Fast_GET_ITEM(others, i), &PreparedRecordType)) {
+            PyErr_SetString(PyExc_TypeError, "others must be a PreparedRecord or a sequence of them");
+            goto exit_compare_prepared;
+        }
+    }
+
+    PreparedRecordObject *record = (PreparedRecordObject *)arg_record;
+    PyObject **items = PySequence_Fast_ITEMS(others);
+    char *languages_buf[MAX_STACK_PAIR_LANGUAGES];
+    int ok = 1;
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
+
+    // The records are kept alive by the others snapshot and arg_record while the GIL is released
+    Py_BEGIN_ALLOW_THREADS
+    for (size_t i = 0; i < num_others && ok; i++) {
+        ok = compare_prepared_records(record, (PreparedRecordObject *)items[i], fields, num_fields,
+                                      languages_buf, statuses + i * num_fields);
+    }
+    Py_END_ALLOW_THREADS
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
+
+    if (!ok) {
+        PyErr_NoMemory();
+        goto exit_compare_prepared;
+    }
+
+    result = PyBytes_FromStringAndSize((const char *)statuses, (Py_ssize_t)(num_others * num_fields));
+
+exit_compare_prepared:
+    PYPOSTAL_METRIC_RECORD(&metrics[METRIC_COMPARE_PREPARED], &timer, 0, num_others * num_fields, result != NULL);
+    free(fields);
+    free(statuses);
+    Py_DECREF(fields_seq);
+    Py_DECREF(others);
+    return result;
+}
+
+
 static PyMethodDef dedupe_methods[] = {
     {"place_languages", (PyCFunction)py_place_languages, METH_VARARGS, "place_languages(labels, values)"},
     {"is_name_duplicate", (PyCFunction)py_is_name_duplicate, METH_VARARGS | METH_KEYWORDS, "is_name_duplicate(value1, value2, languages=None)"},
@@ -461,6 +1630,11 @@ static PyMethodDef dedupe_methods[] = {
     {"is_toponym_duplicate", (PyCFunction)py_is_toponym_duplicate, METH_VARARGS | METH_KEYWORDS, "is_toponym_duplicate(labels1, values1, labels2, values2, languages=None)"},
     {"is_name_duplicate_fuzzy", (PyCFunction)py_is_name_duplicate_fuzzy, METH_VARARGS | METH_KEYWORDS, "is_name_duplicate_fuzzy(tokens1, scores1, tokens2, scores2, languages=None, **kw)"},
     {"is_street_duplicate_fuzzy", (PyCFunction)py_is_street_duplicate_fuzzy, METH_VARARGS | METH_KEYWORDS, "is_street_duplicate_fuzzy(tokens1, scores1, tokens2, scores2, languages=None, **kw)"},
+    {"compare_pairs", (PyCFunction)py_compare_pairs, METH_VARARGS | METH_KEYWORDS, "compare_pairs(columns, fields, pairs, languages=None)"},
+    {"compare_prepared", (PyCFunction)py_compare_prepared, METH_VARARGS, "compare_prepared(record, others, fields)"},
+    {"is_duplicate_many", (PyCFunction)py_is_duplicate_many, METH_VARARGS | METH_KEYWORDS, "is_duplicate_many(field, values1, values2, languages=None, table=None)"},
+    {"is_duplicate_fuzzy_many", (PyCFunction)py_is_duplicate_fuzzy_many, METH_VARARGS | METH_KEYWORDS, "is_duplicate_fuzzy_many(field, values1, values2, languages=None, table=None, **kw)"},
+    PYPOSTAL_METRICS_METHODS,
     {NULL, NULL},
 };
 
@@ -526,20 +1700,32 @@ init_dedupe(void) {
         INITERROR;
     }
 
-   char* datadir = getenv("LIBPOSTAL_DATA_DIR");
-
-    if ((datadir!=NULL) && (!libpostal_setup_datadir(datadir) || !libpostal_setup_language_classifier_datadir(datadir)) ||
-        (!libpostal_setup() || !libpostal_setup_language_classifier())) {
-            PyErr_SetString(PyExc_TypeError,
-                            "Error loading libpostal");
+    if (PyType_Ready(&PreparedRecordType) < 0) {
+        Py_DECREF(module);
+        INITERROR;
     }
 
+    Py_INCREF(&PreparedRecordType);
+    PyModule_AddObject(module, "PreparedRecord", (PyObject *)&PreparedRecordType);
+
     PyModule_AddObject(module, "NULL_DUPLICATE_STATUS", PyLong_FromSsize_t(LIBPOSTAL_NULL_DUPLICATE_STATUS));
     PyModule_AddObject(module, "NON_DUPLICATE", PyLong_FromSsize_t(LIBPOSTAL_NON_DUPLICATE));
     PyModule_AddObject(module, "POSSIBLE_DUPLICATE_NEEDS_REVIEW", PyLong_FromSsize_t(LIBPOSTAL_POSSIBLE_DUPLICATE_NEEDS_REVIEW));
     PyModule_AddObject(module, "LIKELY_DUPLICATE", PyLong_FromSsize_t(LIBPOSTAL_LIKELY_DUPLICATE));
     PyModule_AddObject(module, "EXACT_DUPLICATE", PyLong_FromSsize_t(LIBPOSTAL_EXACT_DUPLICATE));
 
+    PyModule_AddObject(module, "DEDUPE_FIELD_NAME", PyLong_FromLong(DEDUPE_FIELD_NAME));
+    PyModule_AddObject(module, "DEDUPE_FIELD_STREET", PyLong_FromLong(DEDUPE_FIELD_STREET));
+    PyModule_AddObject(module, "DEDUPE_FIELD_HOUSE_NUMBER", PyLong_FromLong(DEDUPE_FIELD_HOUSE_NUMBER));
+    PyModule_AddObject(module, "DEDUPE_FIELD_PO_BOX", PyLong_FromLong(DEDUPE_FIELD_PO_BOX));
+    PyModule_AddObject(module, "DEDUPE_FIELD_UNIT", PyLong_FromLong(DEDUPE_FIELD_UNIT));
+    PyModule_AddObject(module, "DEDUPE_FIELD_FLOOR", PyLong_FromLong(DEDUPE_FIELD_FLOOR));
+    PyModule_AddObject(module, "DEDUPE_FIELD_POSTAL_CODE", PyLong_FromLong(DEDUPE_FIELD_POSTAL_CODE));
+    PyModule_AddObject(module, "DEDUPE_FIELD_TOPONYM", PyLong_FromLong(DEDUPE_FIELD_TOPONYM));
+
+    PyModule_AddObject(module, "DEDUPE_FUZZY_FIELD_NAME", PyLong_FromLong(DEDUPE_FUZZY_FIELD_NAME));
+    PyModule_AddObject(module, "DEDUPE_FUZZY_FIELD_STREET", PyLong_FromLong(DEDUPE_FUZZY_FIELD_STREET));
+
 #ifndef IS_PY3K
     Py_AtExit(&cleanup_libpostal);
 #endif
@@ -1,6 +1,7 @@
 #include <Python.h>
 #include <libpostal/libpostal.h>
 #include "pyutils.h"
+#include "pyexpandoptions.h"
 
 #if PY_MAJOR_VERSION >= 3
 #define IS_PY3K
@@ -19,6 +20,350 @@ struct module_state {
 #endif
 
 
+static void ExpandOptions_dealloc(ExpandOptionsObject *self) {
+    string_array_destroy(self->languages, self->num_languages);
+    Py_XDECREF(self->languages_tuple);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+static int ExpandOptions_init(ExpandOptionsObject *self, PyObject *args, PyObject *keywords) {
+    PyObject *arg_languages = Py_None;
+    libpostal_normalize_options_t options = libpostal_get_default_options();
+
+    // Other threads may be reading the options without the GIL
+    if (self->initialized) {
+        PyErr_SetString(PyExc_TypeError, "ExpandOptions is immutable and can't be initialized again");
+        return -1;
+    }
+
+    static char *kwlist[] = {"languages",
+                             "address_components",
+                             "latin_ascii",
+                             "transliterate",
+                             "strip_accents",
+                             "decompose",
+                             "lowercase",
+                             "trim_string",
+                             "replace_word_hyphens",
+                             "delete_word_hyphens",
+                             "replace_numeric_hyphens",
+                             "delete_numeric_hyphens",
+                             "split_alpha_from_numeric",
+                             "delete_final_periods",
+                             "delete_acronym_periods",
+                             "drop_english_possessives",
+                             "delete_apostrophes",
+                             "expand_numex",
+                             "roman_numerals",
+                             NULL
+                            };
+
+    uint32_t address_components = options.address_components;
+    uint32_t latin_ascii = options.latin_ascii;
+    uint32_t transliterate = options.transliterate;
+    uint32_t strip_accents = options.strip_accents;
+    uint32_t decompose = options.decompose;
+    uint32_t lowercase = options.lowercase;
+    uint32_t trim_string = options.trim_string;
+    uint32_t replace_word_hyphens = options.replace_word_hyphens;
+    uint32_t delete_word_hyphens = options.delete_word_hyphens;
+    uint32_t replace_numeric_hyphens = options.replace_numeric_hyphens;
+    uint32_t delete_numeric_hyphens = options.delete_numeric_hyphens;
+    uint32_t split_alpha_from_numeric = options.split_alpha_from_numeric;
+    uint32_t delete_final_periods = options.delete_final_periods;
+    uint32_t delete_acronym_periods = options.delete_acronym_periods;
+    uint32_t drop_english_possessives = options.drop_english_possessives;
+    uint32_t delete_apostrophes = options.delete_apostrophes;
+    uint32_t expand_numex = options.expand_numex;
+    uint32_t roman_numerals = options.roman_numerals;
+
+    if (!PyArg_ParseTupleAndKeywords(args, keywords,
+                                     "|OIIIIIIIIIIIIIIIIII:ExpandOptions", kwlist,
+                                     &arg_languages,
+                                     &address_components,
+                                     &latin_ascii,
+                                     &transliterate,
+                                     &strip_accents,
+                                     &decompose,
+                                     &lowercase,
+                                     &trim_string,
+                                     &replace_word_hyphens,
+                                     &delete_word_hyphens,
+                                     &replace_numeric_hyphens,
+                                     &delete_numeric_hyphens,
+                                     &split_alpha_from_numeric,
+                                     &delete_final_periods,
+                                     &delete_acronym_periods,
+                                     &drop_english_possessives,
+                                     &delete_apostrophes,
+                                     &expand_numex,
+                                     &roman_numerals
+                                     )) {
+        return -1;
+    }
+
+    if (address_components > UINT16_MAX) {
+        PyErr_SetString(PyExc_ValueError, "address_components out of range");
+        return -1;
+    }
+
+    options.address_components = (uint16_t)address_components;
+    options.latin_ascii = latin_ascii;
+    options.transliterate = transliterate;
+    options.strip_accents = strip_accents;
+    options.decompose = decompose;
+    options.lowercase = lowercase;
+    options.trim_string = trim_string;
+    options.replace_word_hyphens = replace_word_hyphens;
+    options.delete_word_hyphens = delete_word_hyphens;
+    options.replace_numeric_hyphens = replace_numeric_hyphens;
+    options.delete_numeric_hyphens = delete_numeric_hyphens;
+    options.split_alpha_from_numeric = split_alpha_from_numeric;
+    options.delete_final_periods = delete_final_periods;
+    options.delete_acronym_periods = delete_acronym_periods;
+    options.drop_english_possessives = drop_english_possessives;
+    options.delete_apostrophes = delete_apostrophes;
+    options.expand_numex = expand_numex;
+    options.roman_numerals = roman_numerals;
+
+    size_t num_languages = 0;
+    char **languages = NULL;
+    PyObject *languages_tuple = NULL;
+
+    if (arg_languages != Py_None) {
+        if (PyUnicode_Check(arg_languages) || PyBytes_Check(arg_languages) || !PySequence_Check(arg_languages)) {
+            PyErr_SetString(PyExc_TypeError, "languages must be a sequence of strings");
+            return -1;
+        }
+
+        languages_tuple = PySequence_Tuple(arg_languages);
+        if (languages_tuple == NULL) {
+            return -1;
+        }
+
+        languages = PyObject_to_strings_max_len(languages_tuple, LIBPOSTAL_MAX_LANGUAGE_LEN, &num_languages);
+        if (languages == NULL && PyErr_Occurred()) {
+            Py_DECREF(languages_tuple);
+            return -1;
+        }
+    }
+
+    if (num_languages > 0) {
+        options.num_languages = num_languages;
+        options.languages = languages;
+    }
+
+    self->options = options;
+    self->languages = languages;
+    self->num_languages = num_languages;
+    self->languages_tuple = languages_tuple;
+    self->initialized = 1;
+
+    return 0;
+}
+
+/* The options other than languages as a dict of keyword arguments */
+static PyObject *PyObject_from_normalize_options(libpostal_normalize_options_t options) {
+    PyObject *result = PyDict_New();
+    if (result == NULL) {
+        return NULL;
+    }
+
+    PyObject *address_components = PyLong_FromUnsignedLong(options.address_components);
+    if (address_components == NULL || PyDict_SetItemString(result, "address_components", address_components) < 0) {
+        Py_XDECREF(address_components);
+        Py_DECREF(result);
+        return NULL;
+    }
+    Py_DECREF(address_components);
+
+    struct {
+        char *name;
+        bool value;
+    } flags[] = {
+        {"latin_ascii", options.latin_ascii},
+        {"transliterate", options.transliterate},
+        {"strip_accents", options.strip_accents},
+        {"decompose", options.decompose},
+        {"lowercase", options.lowercase},
+        {"trim_string", options.trim_string},
+        {"replace_word_hyphens", options.replace_word_hyphens},
+        {"delete_word_hyphens", options.delete_word_hyphens},
+        {"replace_numeric_hyphens", options.replace_numeric_hyphens},
+        {"delete_numeric_hyphens", options.delete_numeric_hyphens},
+        {"split_alpha_from_numeric", options.split_alpha_from_numeric},
+        {"delete_final_periods", options.delete_final_periods},
+        {"delete_acronym_periods", options.delete_acronym_periods},
+        {"drop_english_possessives", options.drop_english_possessives},
+        {"delete_apostrophes", options.delete_apostrophes},
+        {"expand_numex", options.expand_numex},
+        {"roman_numerals", options.roman_numerals}
+    };
+
+    for (size_t i = 0; i < sizeof(flags) / sizeof(flags[0]); i++) {
+        if (PyDict_SetItemString(result, flags[i].name, flags[i].value ? Py_True : Py_False) < 0) {
+            Py_DECREF(result);
+            return NULL;
+        }
+    }
+
+    return result;
+}
+
+static PyObject *ExpandOptions_get_languages(ExpandOptionsObject *self, void *closure) {
+    if (self->languages_tuple == NULL) {
+        Py_RETURN_NONE;
+    }
+    Py_INCREF(self->languages_tuple);
+    return self->languages_tuple;
+}
+
+static PyObject *ExpandOptions_get_address_components(ExpandOptionsObject *self, void *closure) {
+    return PyLong_FromUnsignedLong(self->options.address_components);
+}
+
+static PyObject *ExpandOptions_get_options(ExpandOptionsObject *self, void *closure) {
+    return PyObject_from_normalize_options(self->options);
+}
+
+static PyObject *ExpandOptions_repr(ExpandOptionsObject *self) {
+    PyObject *languages = self->languages_tuple != NULL ? self->languages_tuple : Py_None;
+    #ifdef IS_PY3K
+    return PyUnicode_FromFormat("ExpandOptions(languages=%R, address_components=%u)", languages, (unsigned int)self->options.address_components);
+    #else
+    PyObject *languages_repr = PyObject_Repr(languages);
+    if (languages_repr == NULL) {
+        return NULL;
+    }
+    PyObject *result = PyString_FromFormat("ExpandOptions(languages=%s, address_components=%u)", PyString_AsString(languages_repr), (unsigned int)self->options.address_components);
+    Py_DECREF(languages_repr);
+    return result;
+    #endif
+}
+
+static PyGetSetDef ExpandOptions_getset[] = {
+    {"languages", (getter)ExpandOptions_get_languages, NULL, "languages used in expansion, or None to use the language classifier", NULL},
+    {"address_components", (getter)ExpandOptions_get_address_components, NULL, "address component bit-set", NULL},
+    {"options", (getter)ExpandOptions_get_options, NULL, "dict of the keyword options other than languages", NULL},
+    {NULL}
+};
+
+static PyTypeObject ExpandOptionsType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "postal._expand.ExpandOptions",
+    .tp_basicsize = sizeof(ExpandOptionsObject),
+    .tp_itemsize = 0,
+    .tp_dealloc = (destructor)ExpandOptions_dealloc,
+    .tp_repr = (reprfunc)ExpandOptions_repr,
+    .tp_flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_BASETYPE,
+    .tp_doc = "ExpandOptions(languages=None, **kw)\n\n"
+              "Expansion options validated and converted to libpostal's C struct once, for reuse across\n"
+              "calls to expand_address, expand_address_root and name_hashes. Takes the same keyword\n"
+              "arguments as expand_address.",
+    .tp_getset = ExpandOptions_getset,
+    .tp_init = (initproc)ExpandOptions_init,
+    .tp_new = PyType_GenericNew,
+};
+
+
+#define METRIC_EXPAND_ADDRESS 0
+#define METRIC_EXPAND_WITH_OPTIONS 1
+#define METRIC_CLASSIFY_LANGUAGE 2
+#define METRIC_CLASSIFY_LANGUAGES 3
+#define METRIC_EXPAND_ADDRESS_ARROW 4
+
+static pypostal_metric_t metrics[] = {
+    {"expand_address"},
+    {"expand_with_options"},
+    {"classify_language"},
+    {"classify_languages"},
+    {"expand_address_arrow"},
+    {NULL}
+};
+
+PYPOSTAL_METRICS_FUNCTIONS(metrics)
+
+
+static PyObject *expand_with_options(char *input, ExpandOptionsObject *options, int root_expansions, int output,
+                                     pypostal_limits_t *limits, pypostal_timer_t *timer) {
+    PyObject *result = NULL;
+
+    if (!pypostal_limits_check_input(limits, input, &metrics[METRIC_EXPAND_WITH_OPTIONS])) {
+        PYPOSTAL_METRIC_RECORD(&metrics[METRIC_EXPAND_WITH_OPTIONS], timer, strlen(input), 0, 0);
+        return NULL;
+    }
+
+    uint32_t components = PYPOSTAL_COMPONENT_LIBPOSTAL;
+    if (options->options.num_languages == 0) {
+        components |= PYPOSTAL_COMPONENT_LANGUAGE_CLASSIFIER;
+    }
+
+    if (!pypostal_setup(components, NULL)) {
+        return NULL;
+    }
+
+    size_t num_expansions = 0;
+    char **expansions = NULL;
+
+    pypostal_timer_phase(timer, PYPOSTAL_PHASE_CONVERT);
+
+    Py_BEGIN_ALLOW_THREADS
+    if (!root_expansions) {
+        expansions = libpostal_expand_address(input, options->options, &num_expansions);
+    } else {
+        expansions = libpostal_expand_address_root(input, options->options, &num_expansions);
+    }
+    Py_END_ALLOW_THREADS
+
+    pypostal_timer_phase(timer, PYPOSTAL_PHASE_LIBPOSTAL);
+
+    if (expansions != NULL) {
+        result = PyObject_from_strings_limited(expansions, num_expansions, output, limits, &metrics[METRIC_EXPAND_WITH_OPTIONS]);
+        libpostal_expansion_array_destroy(expansions, num_expansions);
+    }
+
+    PYPOSTAL_METRIC_RECORD(&metrics[METRIC_EXPAND_WITH_OPTIONS], timer, strlen(input), num_expansions, result != NULL);
+
+    return result;
+}
+
+
+static PyObject *py_expand_with_options(PyObject *self, PyObject *args) {
+    PyObject *arg_input;
+    PyObject *arg_options;
+    int root_expansions = 0;
+    PyObject *arg_output = Py_None;
+    Py_ssize_t max_expansions = 0;
+    Py_ssize_t max_input_bytes = 0;
+
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
+    if (!PyArg_ParseTuple(args, "OO!|pOnn:expand_with_options", &arg_input, &ExpandOptionsType, &arg_options, &root_expansions, &arg_output,
+                          &max_expansions, &max_input_bytes)) {
+        return 0;
+    }
+
+    int output = pypostal_output_mode(arg_output);
+    if (output < 0) {
+        return NULL;
+    }
+
+    pypostal_limits_t limits;
+    if (!pypostal_limits_init(&limits, max_expansions, max_input_bytes)) {
+        return NULL;
+    }
+
+    // The options object is kept alive by args for the duration of the call
+    char *input = (char *)PyObject_to_string_borrowed(arg_input);
+    if (input == NULL) {
+        return NULL;
+    }
+
+    return expand_with_options(input, (ExpandOptionsObject *)arg_options, root_expansions, output, &limits, &timer);
+}
+
+
 static PyObject *py_expand(PyObject *self, PyObject *args, PyObject *keywords) {
     PyObject *arg_input;
     PyObject *arg_languages = Py_None;
@@ -26,6 +371,9 @@ static PyObject *py_expand(PyObject *self, PyObject *args, PyObject *keywords) {
 
     PyObject *result = NULL;
 
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
     static char *kwlist[] = {"address",
                              "languages",
                              "address_components",
@@ -47,6 +395,9 @@ static PyObject *py_expand(PyObject *self, PyObject *args, PyObject *keywords) {
                              "expand_numex",
                              "roman_numerals",
                              "root",
+                             "output",
+                             "max_expansions",
+                             "max_input_bytes",
                              NULL
                             };
 
@@ -69,9 +420,12 @@ static PyObject *py_expand(PyObject *self, PyObject *args, PyObject *keywords) {
     uint32_t expand_numex = options.expand_numex;
     uint32_t roman_numerals = options.roman_numerals;
     uint32_t root_expansions = 0;
+    PyObject *arg_output = Py_None;
+    Py_ssize_t max_expansions = 0;
+    Py_ssize_t max_input_bytes = 0;
 
     if (!PyArg_ParseTupleAndKeywords(args, keywords, 
-                                     "O|OHIIIIIIIIIIIIIIIIII:pyexpand", kwlist,
+                                     "O|OHIIIIIIIIIIIIIIIIIIOnn:pyexpand", kwlist,
                                      &arg_input, &arg_languages,
                                      &address_components,
                                      &latin_ascii,
@@ -91,11 +445,24 @@ static PyObject *py_expand(PyObject *self, PyObject *args, PyObject *keywords) {
                                      &delete_apostrophes,
                                      &expand_numex,
                                      &roman_numerals,
-                                     &root_expansions
+                                     &root_expansions,
+                                     &arg_output,
+                                     &max_expansions,
+                                     &max_input_bytes
                                      )) {
         return 0;
     }
 
+    int output = pypostal_output_mode(arg_output);
+    if (output < 0) {
+        return NULL;
+    }
+
+    pypostal_limits_t limits;
+    if (!pypostal_limits_init(&limits, max_expansions, max_input_bytes)) {
+        return NULL;
+    }
+
 
     options.address_components = address_components;
     options.latin_ascii = latin_ascii;
@@ -123,6 +490,12 @@ static PyObject *py_expand(PyObject *self, PyObject *args, PyObject *keywords) {
         return NULL;
     }
 
+    if (!pypostal_limits_check_input(&limits, input, &metrics[METRIC_EXPAND_ADDRESS])) {
+        PYPOSTAL_METRIC_RECORD(&metrics[METRIC_EXPAND_ADDRESS], &timer, strlen(input), 0, 0);
+        free(input);
+        return NULL;
+    }
+
     size_t num_languages = 0;
     char **languages = NULL;
 
@@ -135,14 +508,34 @@ static PyObject *py_expand(PyObject *self, PyObject *args, PyObject *keywords) {
         options.languages = languages;
     }
 
+    // The language classifier is only needed when no languages are given
+    uint32_t components = PYPOSTAL_COMPONENT_LIBPOSTAL;
+    if (options.num_languages == 0) {
+        components |= PYPOSTAL_COMPONENT_LANGUAGE_CLASSIFIER;
+    }
+
+    if (!pypostal_setup(components, NULL)) {
+        free(input);
+        string_array_destroy(languages, num_languages);
+        return NULL;
+    }
+
     size_t num_expansions = 0;
     char **expansions = NULL;
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
+
+    Py_BEGIN_ALLOW_THREADS
     if (!root_expansions) {
         expansions = libpostal_expand_address(input, options, &num_expansions);
     } else {
         expansions = libpostal_expand_address_root(input, options, &num_expansions);
     }
+    Py_END_ALLOW_THREADS
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
 
+    size_t input_bytes = timer.enabled ? strlen(input) : 0;
     free(input);
 
     if (languages != NULL) {
@@ -153,15 +546,372 @@ static PyObject *py_expand(PyObject *self, PyObject *args, PyObject *keywords) {
     }
 
     if (expansions != NULL) {
-        result = PyObject_from_strings(expansions, num_expansions);
+        result = PyObject_from_strings_limited(expansions, num_expansions, output, &limits, &metrics[METRIC_EXPAND_ADDRESS]);
         libpostal_expansion_array_destroy(expansions, num_expansions);
     }
 
+    PYPOSTAL_METRIC_RECORD(&metrics[METRIC_EXPAND_ADDRESS], &timer, input_bytes, num_expansions, result != NULL);
+
+    return result;
+}
+
+static PyObject *py_expand_address_arrow(PyObject *self, PyObject *args, PyObject *keywords) {
+    PyObject *arg_validity;
+    PyObject *arg_offsets;
+    PyObject *arg_data;
+    Py_ssize_t offset;
+    Py_ssize_t length;
+    int large = 0;
+    PyObject *arg_options;
+    int root_expansions = 0;
+
+    PyObject *result = NULL;
+
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
+    static char *kwlist[] = {"validity",
+                             "offsets",
+                             "data",
+                             "offset",
+                             "length",
+                             "large",
+                             "options",
+                             "root",
+                             NULL
+                            };
+
+    if (!PyArg_ParseTupleAndKeywords(args, keywords,
+                                     "OOOnnpO!|p:expand_address_arrow", kwlist,
+                                     &arg_validity, &arg_offsets, &arg_data,
+                                     &offset, &length, &large,
+                                     &ExpandOptionsType, &arg_options, &root_expansions
+                                     )) {
+        return 0;
+    }
+
+    ExpandOptionsObject *options = (ExpandOptionsObject *)arg_options;
+
+    uint32_t components = PYPOSTAL_COMPONENT_LIBPOSTAL;
+    if (options->options.num_languages == 0) {
+        components |= PYPOSTAL_COMPONENT_LANGUAGE_CLASSIFIER;
+    }
+
+    if (!pypostal_setup(components, NULL)) {
+        return NULL;
+    }
+
+    pypostal_string_column_t column;
+    if (!pypostal_string_column_init(&column, arg_validity, arg_offsets, arg_data, offset, length, large)) {
+        return NULL;
+    }
+
+    // The list level of the list<utf8> result, the expansions themselves go in values
+    int32_t *list_offsets = calloc((size_t)length + 1, sizeof(int32_t));
+    uint8_t *list_validity = calloc(((size_t)length + 7) / 8 + 1, 1);
+    size_t null_count = 0;
+
+    pypostal_string_builder_t values;
+    pypostal_cstring_t input = {NULL, 0};
+    int ok = pypostal_string_builder_init(&values, (size_t)length);
+    size_t input_bytes = 0;
+
+    if (list_offsets == NULL || list_validity == NULL || !ok) {
+        PyErr_NoMemory();
+        goto exit_free_arrays;
+    }
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
+
+    Py_BEGIN_ALLOW_THREADS
+    for (Py_ssize_t i = 0; i < length && ok; i++) {
+        if (pypostal_string_column_is_valid(&column, i)) {
+            size_t len;
+            const char *value = pypostal_string_column_value(&column, i, &len);
+            char *str = pypostal_cstring_set(&input, value, len);
+            if (str == NULL) {
+                ok = 0;
+                break;
+            }
+            input_bytes += len;
+
+            size_t num_expansions = 0;
+            char **expansions = NULL;
+            if (!root_expansions) {
+                expansions = libpostal_expand_address(str, options->options, &num_expansions);
+            } else {
+                expansions = libpostal_expand_address_root(str, options->options, &num_expansions);
+            }
+
+            for (size_t j = 0; expansions != NULL && j < num_expansions && ok; j++) {
+                ok = pypostal_string_builder_append(&values, expansions[j], strlen(expansions[j])) &&
+                     pypostal_string_builder_finish_row(&values, 1);
+            }
+
+            if (expansions != NULL) {
+                libpostal_expansion_array_destroy(expansions, num_expansions);
+            }
+
+            if (values.num_rows > INT32_MAX) {
+                values.overflow = 1;
+                ok = 0;
+            }
+            pypostal_bitmap_set(list_validity, (size_t)i);
+        } else {
+            null_count++;
+        }
+        list_offsets[i + 1] = (int32_t)values.num_rows;
+    }
+    Py_END_ALLOW_THREADS
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
+
+    if (!ok) {
+        pypostal_string_builder_set_error(&values);
+        goto exit_free_arrays;
+    }
+
+    PyObject *py_validity = NULL;
+    if (null_count > 0) {
+        py_validity = PyBytes_FromStringAndSize((const char *)list_validity, ((size_t)length + 7) / 8);
+    } else {
+        py_validity = Py_None;
+        Py_INCREF(py_validity);
+    }
+    PyObject *py_offsets = PyBytes_FromStringAndSize((const char *)list_offsets, ((size_t)length + 1) * sizeof(int32_t));
+    PyObject *py_values = pypostal_string_builder_to_tuple(&values);
+
+    if (py_validity != NULL && py_offsets != NULL && py_values != NULL) {
+        result = Py_BuildValue("(OOnO)", py_validity, py_offsets, (Py_ssize_t)null_count, py_values);
+    }
+
+    Py_XDECREF(py_validity);
+    Py_XDECREF(py_offsets);
+    Py_XDECREF(py_values);
+
+exit_free_arrays:
+    PYPOSTAL_METRIC_RECORD(&metrics[METRIC_EXPAND_ADDRESS_ARROW], &timer, input_bytes, values.num_rows, result != NULL);
+    pypostal_string_builder_destroy(&values);
+    free(input.str);
+    free(list_offsets);
+    free(list_validity);
+    pypostal_string_column_release(&column);
+    return result;
+}
+
+/* [(language, probability), ...] in descending order of probability */
+static PyObject *PyObject_from_language_response(libpostal_language_classifier_response_t *response) {
+    size_t num_languages = response != NULL ? response->num_languages : 0;
+    PyObject *result = PyList_New((Py_ssize_t)num_languages);
+    if (result == NULL) {
+        return NULL;
+    }
+
+    for (size_t i = 0; i < num_languages; i++) {
+        PyObject *language = Py_BuildValue("(sd)", response->languages[i], response->probs[i]);
+        if (language == NULL) {
+            Py_DECREF(result);
+            return NULL;
+        }
+        PyList_SET_ITEM(result, (Py_ssize_t)i, language);
+    }
+
+    return result;
+}
+
+
+static PyObject *py_classify_language(PyObject *self, PyObject *args) {
+    PyObject *arg_input;
+
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
+    if (!PyArg_ParseTuple(args, "O:classify_language", &arg_input)) {
+        return 0;
+    }
+
+    char *input = (char *)PyObject_to_string_borrowed(arg_input);
+    if (input == NULL) {
+        return NULL;
+    }
+
+    if (!pypostal_setup(PYPOSTAL_COMPONENT_LIBPOSTAL | PYPOSTAL_COMPONENT_LANGUAGE_CLASSIFIER, NULL)) {
+        return NULL;
+    }
+
+    libpostal_language_classifier_response_t *response = NULL;
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
+
+    Py_BEGIN_ALLOW_THREADS
+    response = libpostal_classify_language(input);
+    Py_END_ALLOW_THREADS
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
+
+    PyObject *result = PyObject_from_language_response(response);
+
+    PYPOSTAL_METRIC_RECORD(&metrics[METRIC_CLASSIFY_LANGUAGE], &timer, strlen(input),
+                           response != NULL ? response->num_languages : 0, result != NULL);
+
+    if (response != NULL) {
+        libpostal_language_classifier_response_destroy(response);
+    }
+
+    return result;
+}
+
+
+static PyObject *py_classify_languages(PyObject *self, PyObject *args) {
+    PyObject *arg_inputs;
+
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
+    if (!PyArg_ParseTuple(args, "O:classify_languages", &arg_inputs)) {
+        return 0;
+    }
+
+    if (!pypostal_setup(PYPOSTAL_COMPONENT_LIBPOSTAL | PYPOSTAL_COMPONENT_LANGUAGE_CLASSIFIER, NULL)) {
+        return NULL;
+    }
+
+    PyObject *inputs_seq = pypostal_sequence_snapshot(arg_inputs, "texts must be a sequence");
+    if (inputs_seq == NULL) {
+        return NULL;
+    }
+
+    Py_ssize_t num_inputs = PySequence_Fast_GET_SIZE(inputs_seq);
+
+    PyObject *result = NULL;
+    size_t num_languages = 0;
+
+    char **inputs = calloc(num_inputs > 0 ? (size_t)num_inputs : 1, sizeof(char *));
+    libpostal_language_classifier_response_t **responses = calloc(num_inputs > 0 ? (size_t)num_inputs : 1, sizeof(libpostal_language_classifier_response_t *));
+    if (inputs == NULL || responses == NULL) {
+        PyErr_NoMemory();
+        goto exit_free_arrays;
+    }
+
+    for (Py_ssize_t i = 0; i < num_inputs; i++) {
+        // Borrowed UTF-8 views, valid while the snapshot in inputs_seq is alive
+        inputs[i] = (char *)PyObject_to_string_borrowed(PySequence_Fast_GET_ITEM(inputs_seq, i));
+        if (inputs[i] == NULL) {
+            goto exit_free_arrays;
+        }
+    }
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
+
+    Py_BEGIN_ALLOW_THREADS
+    for (Py_ssize_t i = 0; i < num_inputs; i++) {
+        responses[i] = libpostal_classify_language(inputs[i]);
+    }
+    Py_END_ALLOW_THREADS
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
+
+    result = PyList_New(num_inputs);
+    if (result == NULL) {
+        goto exit_destroy_responses;
+    }
+
+    for (Py_ssize_t i = 0; i < num_inputs; i++) {
+        PyObject *languages = PyObject_from_language_response(responses[i]);
+        if (languages == NULL) {
+            Py_CLEAR(result);
+            goto exit_destroy_responses;
+        }
+        PyList_SET_ITEM(result, i, languages);
+        num_languages += responses[i] != NULL ? responses[i]->num_languages : 0;
+    }
+
+exit_destroy_responses:
+    if (timer.enabled) {
+        size_t input_bytes = 0;
+        for (Py_ssize_t i = 0; i < num_inputs; i++) {
+            input_bytes += strlen(inputs[i]);
+        }
+        pypostal_metric_record(&metrics[METRIC_CLASSIFY_LANGUAGES], &timer, input_bytes, num_languages, result != NULL);
+    }
+    for (Py_ssize_t i = 0; i < num_inputs; i++) {
+        if (responses[i] != NULL) {
+            libpostal_language_classifier_response_destroy(responses[i]);
+        }
+    }
+exit_free_arrays:
+    free(inputs);
+    free(responses);
+    Py_DECREF(inputs_seq);
     return result;
 }
 
+
+static PyObject *py_get_default_options(PyObject *self, PyObject *noargs) {
+    return PyObject_from_normalize_options(libpostal_get_default_options());
+}
+
+/* Hashes of arbitrary strings, as the output="hash64"/"hash128" modes compute them */
+static PyObject *py_hash_strings(PyObject *self, PyObject *args) {
+    PyObject *arg_strings;
+    PyObject *arg_output;
+
+    if (!PyArg_ParseTuple(args, "OO:hash_strings", &arg_strings, &arg_output)) {
+        return NULL;
+    }
+
+    int output = pypostal_output_mode(arg_output);
+    if (output < 0) {
+        return NULL;
+    }
+
+    PyObject *seq = PySequence_Fast(arg_strings, "strings must be a sequence");
+    if (seq == NULL) {
+        return NULL;
+    }
+
+    PyObject *result = NULL;
+    size_t num_strings = (size_t)PySequence_Fast_GET_SIZE(seq);
+    char **strings = malloc((num_strings > 0 ? num_strings : 1) * sizeof(char *));
+    if (strings == NULL) {
+        PyErr_NoMemory();
+        goto exit_hash_strings;
+    }
+
+    for (size_t i = 0; i < num_strings; i++) {
+        strings[i] = (char *)PyObject_to_string_borrowed(PySequence_Fast_GET_ITEM(seq, i));
+        if (strings[i] == NULL) {
+            goto exit_hash_strings;
+        }
+    }
+
+    result = PyObject_from_strings_output(strings, num_strings, output);
+
+exit_hash_strings:
+    free(strings);
+    Py_DECREF(seq);
+    return result;
+}
+
+static PyObject *py_setup_libpostal(PyObject *self, PyObject *args, PyObject *keywords) {
+    return pypostal_py_setup(args, keywords, PYPOSTAL_COMPONENT_LIBPOSTAL);
+}
+
+static PyObject *py_setup_language_classifier(PyObject *self, PyObject *args, PyObject *keywords) {
+    return pypostal_py_setup(args, keywords, PYPOSTAL_COMPONENT_LANGUAGE_CLASSIFIER);
+}
+
 static PyMethodDef expand_methods[] = {
+    {"get_default_options", (PyCFunction)py_get_default_options, METH_NOARGS, "get_default_options()"},
+    {"setup_libpostal", (PyCFunction)py_setup_libpostal, METH_VARARGS | METH_KEYWORDS, "setup_libpostal(datadir=None)"},
+    {"setup_language_classifier", (PyCFunction)py_setup_language_classifier, METH_VARARGS | METH_KEYWORDS, "setup_language_classifier(datadir=None)"},
     {"expand_address", (PyCFunction)py_expand, METH_VARARGS | METH_KEYWORDS, "expand_address(text, **kw)"},
+    {"expand_with_options", (PyCFunction)py_expand_with_options, METH_VARARGS, "expand_with_options(text, options, root=False, output=None, max_expansions=0, max_input_bytes=0)"},
+    {"expand_address_arrow", (PyCFunction)py_expand_address_arrow, METH_VARARGS | METH_KEYWORDS, "expand_address_arrow(validity, offsets, data, offset, length, large, options, root=False)"},
+    {"classify_language", (PyCFunction)py_classify_language, METH_VARARGS, "classify_language(text)"},
+    {"classify_languages", (PyCFunction)py_classify_languages, METH_VARARGS, "classify_languages(texts)"},
+    {"hash_strings", (PyCFunction)py_hash_strings, METH_VARARGS, "hash_strings(strings, output)"},
+    PYPOSTAL_METRICS_METHODS,
     {NULL, NULL},
 };
 
@@ -229,14 +979,15 @@ init_expand(void) {
         INITERROR;
     }
 
-   char* datadir = getenv("LIBPOSTAL_DATA_DIR");
-
-    if ((datadir!=NULL) && (!libpostal_setup_datadir(datadir) || !libpostal_setup_language_classifier_datadir(datadir)) ||
-        (!libpostal_setup() || !libpostal_setup_language_classifier())) {
-            PyErr_SetString(PyExc_TypeError,
-                            "Error loading libpostal");
+    if (PyType_Ready(&ExpandOptionsType) < 0) {
+        Py_DECREF(module);
+        INITERROR;
     }
 
+    Py_INCREF(&ExpandOptionsType);
+    PyModule_AddObject(module, "ExpandOptions", (PyObject *)&ExpandOptionsType);
+    pypostal_expand_options_type = &ExpandOptionsType;
+
     PyModule_AddObject(module, "ADDRESS_NONE", PyLong_FromUnsignedLongLong(LIBPOSTAL_ADDRESS_NONE));
     PyModule_AddObject(module, "ADDRESS_ANY", PyLong_FromUnsignedLongLong(LIBPOSTAL_ADDRESS_ANY));
     PyModule_AddObject(module, "ADDRESS_NAME", PyLong_FromUnsignedLongLong(LIBPOSTAL_ADDRESS_NAME));
@@ -0,0 +1,55 @@
+#ifndef HAVE_PYPOSTAL_EXPAND_OPTIONS_H
+#define HAVE_PYPOSTAL_EXPAND_OPTIONS_H
+
+#include <Python.h>
+#include <libpostal/libpostal.h>
+
+/* ExpandOptions holds a libpostal_normalize_options_t which has been validated
+   and converted once, including the languages as C strings, so that calls
+   which take one can skip argument parsing and conversion entirely.
+
+   The type is defined in the _expand module. Other extension modules accept
+   ExpandOptions objects too, and look the type up from postal._expand on
+   first use via pypostal_expand_options_check.
+
+   The object is immutable once initialized, since the options (and the language
+   strings) are read with the GIL released. */
+typedef struct {
+    PyObject_HEAD
+    libpostal_normalize_options_t options;
+    char **languages;
+    size_t num_languages;
+    PyObject *languages_tuple;
+    int initialized;
+} ExpandOptionsObject;
+
+static PyTypeObject *pypostal_expand_options_type = NULL;
+
+/* Returns 1 if obj is an ExpandOptions, 0 if not, -1 with an exception set on error */
+static inline int pypostal_expand_options_check(PyObject *obj) {
+    if (pypostal_expand_options_type == NULL) {
+        PyObject *module = PyImport_ImportModule("postal._expand");
+        if (module == NULL) {
+            return -1;
+        }
+
+        PyObject *type = PyObject_GetAttrString(module, "ExpandOptions");
+        Py_DECREF(module);
+        if (type == NULL) {
+            return -1;
+        }
+
+        if (!PyType_Check(type)) {
+            Py_DECREF(type);
+            PyErr_SetString(PyExc_TypeError, "postal._expand.ExpandOptions is not a type");
+            return -1;
+        }
+
+        // Keeps the reference for the lifetime of the process
+        pypostal_expand_options_type = (PyTypeObject *)type;
+    }
+
+    return PyObject_TypeCheck(obj, pypostal_expand_options_type);
+}
+
+#endif
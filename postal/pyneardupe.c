@@ -2,6 +2,7 @@
 #include <libpostal/libpostal.h>
 
 #include "pyutils.h"
+#include "pyexpandoptions.h"
 
 #if PY_MAJOR_VERSION >= 3
 #define IS_PY3K
@@ -19,10 +20,26 @@ struct module_state {
     static struct module_state _state;
 #endif
 
+
+#define METRIC_NAME_HASHES 0
+#define METRIC_NEAR_DUPE_HASHES 1
+
+static pypostal_metric_t metrics[] = {
+    {"name_hashes"},
+    {"near_dupe_hashes"},
+    {NULL}
+};
+
+PYPOSTAL_METRICS_FUNCTIONS(metrics)
+
+
 static PyObject *py_name_hashes(PyObject *self, PyObject *args, PyObject *keywords) {
     PyObject *arg_input;
     PyObject *arg_languages = Py_None;
 
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
     libpostal_normalize_options_t options = libpostal_get_default_options();
     options.address_components = LIBPOSTAL_ADDRESS_NAME | LIBPOSTAL_ADDRESS_STREET;
 
@@ -48,6 +65,9 @@ static PyObject *py_name_hashes(PyObject *self, PyObject *args, PyObject *keywor
                              "delete_apostrophes",
                              "expand_numex",
                              "roman_numerals",
+                             "output",
+                             "max_expansions",
+                             "max_input_bytes",
                              NULL
                             };
 
@@ -69,9 +89,12 @@ static PyObject *py_name_hashes(PyObject *self, PyObject *args, PyObject *keywor
     uint32_t delete_apostrophes = options.delete_apostrophes;
     uint32_t expand_numex = options.expand_numex;
     uint32_t roman_numerals = options.roman_numerals;
+    PyObject *arg_output = Py_None;
+    Py_ssize_t max_expansions = 0;
+    Py_ssize_t max_input_bytes = 0;
 
     if (!PyArg_ParseTupleAndKeywords(args, keywords,
-                                     "O|OHIIIIIIIIIIIIIIIII:name_hashes", kwlist,
+                                     "O|OHIIIIIIIIIIIIIIIIIOnn:name_hashes", kwlist,
                                      &arg_input, &arg_languages,
                                      &address_components,
                                      &latin_ascii,
@@ -90,11 +113,24 @@ static PyObject *py_name_hashes(PyObject *self, PyObject *args, PyObject *keywor
                                      &drop_english_possessives,
                                      &delete_apostrophes,
                                      &expand_numex,
-                                     &roman_numerals
+                                     &roman_numerals,
+                                     &arg_output,
+                                     &max_expansions,
+                                     &max_input_bytes
                                      )) {
         return 0;
     }
 
+    int output = pypostal_output_mode(arg_output);
+    if (output < 0) {
+        return NULL;
+    }
+
+    pypostal_limits_t limits;
+    if (!pypostal_limits_init(&limits, max_expansions, max_input_bytes)) {
+        return NULL;
+    }
+
 
     options.address_components = address_components;
     options.latin_ascii = latin_ascii;
@@ -121,6 +157,12 @@ static PyObject *py_name_hashes(PyObject *self, PyObject *args, PyObject *keywor
         return 0;
     }
 
+    if (!pypostal_limits_check_input(&limits, input, &metrics[METRIC_NAME_HASHES])) {
+        PYPOSTAL_METRIC_RECORD(&metrics[METRIC_NAME_HASHES], &timer, strlen(input), 0, 0);
+        free(input);
+        return NULL;
+    }
+
     size_t num_languages = 0;
     char **languages = NULL;
 
@@ -133,19 +175,35 @@ static PyObject *py_name_hashes(PyObject *self, PyObject *args, PyObject *keywor
         options.languages = languages;
     }
 
+    // The language classifier is only needed when no languages are given
+    uint32_t components = PYPOSTAL_COMPONENT_LIBPOSTAL;
+    if (options.num_languages == 0) {
+        components |= PYPOSTAL_COMPONENT_LANGUAGE_CLASSIFIER;
+    }
+
+    if (!pypostal_setup(components, NULL)) {
+        free(input);
+        string_array_destroy(languages, num_languages);
+        return NULL;
+    }
+
     size_t num_hashes = 0;
     char **hashes = NULL;
 
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
+
+    Py_BEGIN_ALLOW_THREADS
     hashes = libpostal_near_dupe_name_hashes(input, options, &num_hashes);
+    Py_END_ALLOW_THREADS
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
 
+    size_t input_bytes = timer.enabled ? strlen(input) : 0;
     free(input);
 
+    result = PyObject_from_strings_limited(hashes, num_hashes, output, &limits, &metrics[METRIC_NAME_HASHES]);
     if (hashes != NULL) {
-        result = PyObject_from_strings(hashes, num_hashes);
         string_array_destroy(hashes, num_hashes);
-    } else {
-        result = Py_None;
-        Py_INCREF(Py_None);
     }
 
     if (languages != NULL) {
@@ -155,6 +213,83 @@ static PyObject *py_name_hashes(PyObject *self, PyObject *args, PyObject *keywor
         free(languages);
     }
 
+    PYPOSTAL_METRIC_RECORD(&metrics[METRIC_NAME_HASHES], &timer, input_bytes, num_hashes, result != NULL);
+
+    return result;
+}
+
+
+static PyObject *py_name_hashes_with_options(PyObject *self, PyObject *args) {
+    PyObject *arg_input;
+    PyObject *arg_options;
+    PyObject *arg_output = Py_None;
+    Py_ssize_t max_expansions = 0;
+    Py_ssize_t max_input_bytes = 0;
+
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
+    if (!PyArg_ParseTuple(args, "OO|Onn:name_hashes_with_options", &arg_input, &arg_options, &arg_output,
+                          &max_expansions, &max_input_bytes)) {
+        return 0;
+    }
+
+    int output = pypostal_output_mode(arg_output);
+    if (output < 0) {
+        return NULL;
+    }
+
+    pypostal_limits_t limits;
+    if (!pypostal_limits_init(&limits, max_expansions, max_input_bytes)) {
+        return NULL;
+    }
+
+    int is_options = pypostal_expand_options_check(arg_options);
+    if (is_options < 0) {
+        return NULL;
+    } else if (!is_options) {
+        PyErr_SetString(PyExc_TypeError, "options must be an ExpandOptions instance");
+        return NULL;
+    }
+
+    ExpandOptionsObject *options = (ExpandOptionsObject *)arg_options;
+
+    char *input = (char *)PyObject_to_string_borrowed(arg_input);
+    if (input == NULL) {
+        return NULL;
+    }
+
+    if (!pypostal_limits_check_input(&limits, input, &metrics[METRIC_NAME_HASHES])) {
+        PYPOSTAL_METRIC_RECORD(&metrics[METRIC_NAME_HASHES], &timer, strlen(input), 0, 0);
+        return NULL;
+    }
+
+    uint32_t components = PYPOSTAL_COMPONENT_LIBPOSTAL;
+    if (options->options.num_languages == 0) {
+        components |= PYPOSTAL_COMPONENT_LANGUAGE_CLASSIFIER;
+    }
+
+    if (!pypostal_setup(components, NULL)) {
+        return NULL;
+    }
+
+    size_t num_hashes = 0;
+    char **hashes = NULL;
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
+
+    Py_BEGIN_ALLOW_THREADS
+    hashes = libpostal_near_dupe_name_hashes(input, options->options, &num_hashes);
+    Py_END_ALLOW_THREADS
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
+
+    PyObject *result = PyObject_from_strings_limited(hashes, num_hashes, output, &limits, &metrics[METRIC_NAME_HASHES]);
+    if (hashes != NULL) {
+        string_array_destroy(hashes, num_hashes);
+    }
+
+    PYPOSTAL_METRIC_RECORD(&metrics[METRIC_NAME_HASHES], &timer, strlen(input), num_hashes, result != NULL);
     return result;
 }
 
@@ -167,6 +302,9 @@ static PyObject *py_near_dupe_hashes(PyObject *self, PyObject *args, PyObject *k
 
     PyObject *result = NULL;
 
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
     static char *kwlist[] = {"labels",
                              "values",
                              "languages", 
@@ -183,6 +321,7 @@ static PyObject *py_near_dupe_hashes(PyObject *self, PyObject *args, PyObject *k
                              "name_and_address_keys",
                              "name_only_keys",
                              "address_only_keys",
+                             "output",
                              NULL
                             };
 
@@ -199,9 +338,10 @@ static PyObject *py_near_dupe_hashes(PyObject *self, PyObject *args, PyObject *k
     uint32_t name_and_address_keys = options.name_and_address_keys;
     uint32_t name_only_keys = options.name_only_keys;
     uint32_t address_only_keys = options.address_only_keys;
+    PyObject *arg_output = Py_None;
 
     if (!PyArg_ParseTupleAndKeywords(args, keywords, 
-                                     "OO|OIIIIIIIddIIII:near_dupe", kwlist,
+                                     "OO|OIIIIIIIddIIIIO:near_dupe", kwlist,
                                      &arg_labels,
                                      &arg_values,
                                      &arg_languages,
@@ -217,11 +357,17 @@ static PyObject *py_near_dupe_hashes(PyObject *self, PyObject *args, PyObject *k
                                      &geohash_precision,
                                      &name_and_address_keys,
                                      &name_only_keys,
-                                     &address_only_keys
+                                     &address_only_keys,
+                                     &arg_output
                                      )) {
         return 0;
     }
 
+    int output = pypostal_output_mode(arg_output);
+    if (output < 0) {
+        return 0;
+    }
+
     if (!PySequence_Check(arg_labels) || !PySequence_Check(arg_values)) {
         PyErr_SetString(PyExc_TypeError,
                         "Input labels and values must be sequences");
@@ -253,6 +399,15 @@ static PyObject *py_near_dupe_hashes(PyObject *self, PyObject *args, PyObject *k
         languages = PyObject_to_strings_max_len(arg_languages, LIBPOSTAL_MAX_LANGUAGE_LEN, &num_languages);
     }
 
+    uint32_t components = PYPOSTAL_COMPONENT_LIBPOSTAL;
+    if (num_languages == 0 || languages == NULL) {
+        components |= PYPOSTAL_COMPONENT_LANGUAGE_CLASSIFIER;
+    }
+
+    if (!pypostal_setup(components, NULL)) {
+        goto exit_free_languages;
+    }
+
     size_t num_labels = 0;
     char **labels = PyObject_to_strings(arg_labels, &num_labels);
 
@@ -272,20 +427,34 @@ static PyObject *py_near_dupe_hashes(PyObject *self, PyObject *args, PyObject *k
 
     size_t num_components = num_labels;
 
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
+
+    Py_BEGIN_ALLOW_THREADS
     if (num_languages > 0 && languages != NULL) {
         near_dupe_hashes = libpostal_near_dupe_hashes_languages(num_components, labels, values, options, num_languages, languages, &num_hashes);
     } else {
         near_dupe_hashes = libpostal_near_dupe_hashes(num_components, labels, values, options, &num_hashes);
     }
+    Py_END_ALLOW_THREADS
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
 
     if (near_dupe_hashes != NULL) {
-        result = PyObject_from_strings(near_dupe_hashes, num_hashes);
+        result = PyObject_from_strings_output(near_dupe_hashes, num_hashes, output);
         string_array_destroy(near_dupe_hashes, num_hashes);
     } else {
         result = Py_None;
         Py_INCREF(Py_None);
     }
 
+    if (timer.enabled) {
+        size_t input_bytes = 0;
+        for (size_t i = 0; i < num_values; i++) {
+            input_bytes += strlen(values[i]);
+        }
+        pypostal_metric_record(&metrics[METRIC_NEAR_DUPE_HASHES], &timer, input_bytes, num_hashes, result != NULL);
+    }
+
     string_array_destroy(values, num_values);
 
 exit_free_labels:
@@ -298,7 +467,9 @@ exit_free_languages:
 
 static PyMethodDef near_dupe_methods[] = {
     {"name_hashes", (PyCFunction)py_name_hashes, METH_VARARGS | METH_KEYWORDS, "name_hashes(name, **kw)"},
+    {"name_hashes_with_options", (PyCFunction)py_name_hashes_with_options, METH_VARARGS, "name_hashes_with_options(name, options, output=None, max_expansions=0, max_input_bytes=0)"},
     {"near_dupe_hashes", (PyCFunction)py_near_dupe_hashes, METH_VARARGS | METH_KEYWORDS, "near_dupe_hashes(labels, values, **kw)"},
+    PYPOSTAL_METRICS_METHODS,
     {NULL, NULL},
 };
 
@@ -366,14 +537,6 @@ init_near_dupe(void) {
         INITERROR;
     }
 
-   char* datadir = getenv("LIBPOSTAL_DATA_DIR");
-
-    if (((datadir!=NULL) && (!libpostal_setup_datadir(datadir) || !libpostal_setup_language_classifier_datadir(datadir))) ||
-        (!libpostal_setup() || !libpostal_setup_language_classifier())) {
-            PyErr_SetString(PyExc_TypeError,
-                            "Error loading libpostal");
-    }
-
 #ifndef IS_PY3K
     Py_AtExit(&cleanup_libpostal);
 #endif
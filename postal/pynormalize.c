@@ -19,6 +19,21 @@ struct module_state {
     static struct module_state _state;
 #endif
 
+
+#define METRIC_NORMALIZE_STRING 0
+#define METRIC_NORMALIZED_TOKENS 1
+#define METRIC_NORMALIZED_TOKENS_BATCH 2
+
+static pypostal_metric_t metrics[] = {
+    {"normalize_string"},
+    {"normalized_tokens"},
+    {"normalized_tokens_batch"},
+    {NULL}
+};
+
+PYPOSTAL_METRICS_FUNCTIONS(metrics)
+
+
 static PyObject *py_normalize_string(PyObject *self, PyObject *args, PyObject *keywords)
 {
     PyObject *arg1;
@@ -27,6 +42,9 @@ static PyObject *py_normalize_string(PyObject *self, PyObject *args, PyObject *k
 
     PyObject *result = NULL;
 
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
     static char *kwlist[] = {"s",
                              "options",
                              "languages",
@@ -43,6 +61,10 @@ static PyObject *py_normalize_string(PyObject *self, PyObject *args, PyObject *k
     }
 
 
+    if (!pypostal_setup(PYPOSTAL_COMPONENT_LIBPOSTAL, NULL)) {
+        return NULL;
+    }
+
     char *input = PyObject_to_string(arg1);
 
     if (input == NULL) {
@@ -56,8 +78,17 @@ static PyObject *py_normalize_string(PyObject *self, PyObject *args, PyObject *k
         languages = PyObject_to_strings_max_len(arg_languages, LIBPOSTAL_MAX_LANGUAGE_LEN, &num_languages);
     }
 
-    char *normalized = libpostal_normalize_string_languages(input, options, num_languages, languages);
+    char *normalized = NULL;
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
 
+    Py_BEGIN_ALLOW_THREADS
+    normalized = libpostal_normalize_string_languages(input, options, num_languages, languages);
+    Py_END_ALLOW_THREADS
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
+
+    size_t input_bytes = timer.enabled ? strlen(input) : 0;
     free(input);
     if (normalized == NULL) {
         goto exit_free_languages;
@@ -72,11 +103,137 @@ static PyObject *py_normalize_string(PyObject *self, PyObject *args, PyObject *k
     }
 
 exit_free_languages:
+    PYPOSTAL_METRIC_RECORD(&metrics[METRIC_NORMALIZE_STRING], &timer, input_bytes, result != NULL, result != NULL);
     string_array_destroy(languages, num_languages);
     return result;
 }
 
 
+// Tuple of token type objects indexed by token type id (None for unused ids),
+// set from Python by register_token_types so tokens come back as the enum
+// members directly. Plain ints until then.
+static PyObject *token_type_table = NULL;
+
+
+static PyObject *py_register_token_types(PyObject *self, PyObject *arg) {
+    if (!PyTuple_Check(arg)) {
+        PyErr_SetString(PyExc_TypeError, "token types must be a tuple indexed by token type id");
+        return NULL;
+    }
+
+    PyObject *old = token_type_table;
+    Py_INCREF(arg);
+    token_type_table = arg;
+    Py_XDECREF(old);
+
+    Py_RETURN_NONE;
+}
+
+
+static PyObject *token_type_object(uint16_t type) {
+    if (token_type_table != NULL && (Py_ssize_t)type < PyTuple_GET_SIZE(token_type_table)) {
+        PyObject *item = PyTuple_GET_ITEM(token_type_table, type);
+        if (item != Py_None) {
+            Py_INCREF(item);
+            return item;
+        }
+    }
+    return PyLong_FromLong(type);
+}
+
+
+static inline bool keep_normalized_token(uint16_t type, bool strip_parentheticals, size_t *open_parens) {
+    if (!strip_parentheticals) {
+        return true;
+    }
+
+    // Same semantics as postal.normalize.remove_parens: parens are always dropped,
+    // everything between them too, and unbalanced close parens are ignored
+    if (type == LIBPOSTAL_TOKEN_TYPE_PUNCT_OPEN) {
+        (*open_parens)++;
+        return false;
+    } else if (type == LIBPOSTAL_TOKEN_TYPE_PUNCT_CLOSE) {
+        if (*open_parens > 0) {
+            (*open_parens)--;
+        }
+        return false;
+    }
+    return *open_parens == 0;
+}
+
+
+static PyObject *PyObject_from_normalized_tokens(libpostal_normalized_token_t *normalized_tokens, size_t num_tokens, bool strip_parentheticals, size_t *num_output) {
+    size_t open_parens = 0;
+    size_t num_kept = 0;
+
+    for (size_t i = 0; i < num_tokens; i++) {
+        if (keep_normalized_token(normalized_tokens[i].token.type, strip_parentheticals, &open_parens)) {
+            num_kept++;
+        }
+    }
+
+    PyObject *result = PyList_New((Py_ssize_t)num_kept);
+    if (result == NULL) {
+        return NULL;
+    }
+
+    open_parens = 0;
+    Py_ssize_t j = 0;
+
+    for (size_t i = 0; i < num_tokens; i++) {
+        libpostal_normalized_token_t normalized_token = normalized_tokens[i];
+        if (!keep_normalized_token(normalized_token.token.type, strip_parentheticals, &open_parens)) {
+            continue;
+        }
+
+        char *token_str = normalized_token.str;
+        PyObject *py_token = PyUnicode_DecodeUTF8((const char *)token_str, strlen(token_str), "strict");
+        if (py_token == NULL) {
+            Py_DECREF(result);
+            return NULL;
+        }
+
+        PyObject *py_token_type = token_type_object(normalized_token.token.type);
+        if (py_token_type == NULL) {
+            Py_DECREF(py_token);
+            Py_DECREF(result);
+            return NULL;
+        }
+
+        PyObject *t = PyTuple_New(2);
+        if (t == NULL) {
+            Py_DECREF(py_token);
+            Py_DECREF(py_token_type);
+            Py_DECREF(result);
+            return NULL;
+        }
+
+        PyTuple_SET_ITEM(t, 0, py_token);
+        PyTuple_SET_ITEM(t, 1, py_token_type);
+
+        // Note: PyList_SET_ITEM steals a reference, so don't worry about DECREF
+        PyList_SET_ITEM(result, j++, t);
+    }
+
+    if (num_output != NULL) {
+        *num_output = num_kept;
+    }
+
+    return result;
+}
+
+
+static void normalized_tokens_destroy(libpostal_normalized_token_t *normalized_tokens, size_t num_tokens) {
+    if (normalized_tokens == NULL) {
+        return;
+    }
+    for (size_t i = 0; i < num_tokens; i++) {
+        free(normalized_tokens[i].str);
+    }
+    free(normalized_tokens);
+}
+
+
 static PyObject *py_normalized_tokens(PyObject *self, PyObject *args, PyObject *keywords)
 {
     PyObject *arg1;
@@ -84,28 +241,38 @@ static PyObject *py_normalized_tokens(PyObject *self, PyObject *args, PyObject *
     uint64_t token_options = LIBPOSTAL_NORMALIZE_DEFAULT_TOKEN_OPTIONS;
     uint32_t arg_whitespace = 0;
     PyObject *arg_languages = Py_None;
+    uint32_t arg_strip_parentheticals = 0;
 
     PyObject *result = NULL;
 
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
     static char *kwlist[] = {"s",
                              "string_options",
                              "token_options",
                              "whitespace",
                              "languages",
+                             "strip_parentheticals",
                              NULL
                             };
 
     if (!PyArg_ParseTupleAndKeywords(args, keywords,
-                                     "O|KKIO:normalize", kwlist,
+                                     "O|KKIOI:normalize", kwlist,
                                      &arg1,
                                      &string_options,
                                      &token_options,
                                      &arg_whitespace,
-                                     &arg_languages
+                                     &arg_languages,
+                                     &arg_strip_parentheticals
                                      )) {
         return 0;
     }
 
+    if (!pypostal_setup(PYPOSTAL_COMPONENT_LIBPOSTAL, NULL)) {
+        return NULL;
+    }
+
     char *input = PyObject_to_string(arg1);
 
     if (input == NULL) {
@@ -121,53 +288,170 @@ static PyObject *py_normalized_tokens(PyObject *self, PyObject *args, PyObject *
         languages = PyObject_to_strings_max_len(arg_languages, LIBPOSTAL_MAX_LANGUAGE_LEN, &num_languages);
     }
 
-    size_t num_tokens;
-    libpostal_normalized_token_t *normalized_tokens = libpostal_normalized_tokens_languages(input, string_options, token_options, whitespace, num_languages, languages, &num_tokens);
+    size_t num_tokens = 0;
+    size_t num_output = 0;
+    libpostal_normalized_token_t *normalized_tokens = NULL;
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
+
+    Py_BEGIN_ALLOW_THREADS
+    normalized_tokens = libpostal_normalized_tokens_languages(input, string_options, token_options, whitespace, num_languages, languages, &num_tokens);
+    Py_END_ALLOW_THREADS
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
+
+    size_t input_bytes = timer.enabled ? strlen(input) : 0;
     free(input);
 
     if (normalized_tokens == NULL) {
         goto exit_free_normalize_languages;
     }
 
-    result = PyList_New((Py_ssize_t)num_tokens);
-    if (!result) {
-        goto exit_free_normalized_tokens;
+    result = PyObject_from_normalized_tokens(normalized_tokens, num_tokens, arg_strip_parentheticals, &num_output);
+
+    normalized_tokens_destroy(normalized_tokens, num_tokens);
+exit_free_normalize_languages:
+    PYPOSTAL_METRIC_RECORD(&metrics[METRIC_NORMALIZED_TOKENS], &timer, input_bytes, num_output, result != NULL);
+    string_array_destroy(languages, num_languages);
+
+    return result;
+}
+
+
+static PyObject *py_normalized_tokens_batch(PyObject *self, PyObject *args, PyObject *keywords)
+{
+    PyObject *arg_inputs;
+    uint64_t string_options = LIBPOSTAL_NORMALIZE_DEFAULT_STRING_OPTIONS;
+    uint64_t token_options = LIBPOSTAL_NORMALIZE_DEFAULT_TOKEN_OPTIONS;
+    uint32_t arg_whitespace = 0;
+    PyObject *arg_languages = Py_None;
+    uint32_t arg_strip_parentheticals = 0;
+
+    PyObject *result = NULL;
+
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
+    static char *kwlist[] = {"strings",
+                             "string_options",
+                             "token_options",
+                             "whitespace",
+                             "languages",
+                             "strip_parentheticals",
+                             NULL
+                            };
+
+    if (!PyArg_ParseTupleAndKeywords(args, keywords,
+                                     "O|KKIOI:normalized_tokens_batch", kwlist,
+                                     &arg_inputs,
+                                     &string_options,
+                                     &token_options,
+                                     &arg_whitespace,
+                                     &arg_languages,
+                                     &arg_strip_parentheticals
+                                     )) {
+        return 0;
     }
 
-    for (size_t i = 0; i < num_tokens; i++) {
-        libpostal_normalized_token_t normalized_token = normalized_tokens[i];
-        char *token_str = normalized_token.str;
-        PyObject *py_token = PyUnicode_DecodeUTF8((const char *)token_str, strlen(token_str), "strict");
-        if (py_token == NULL) {
-            Py_DECREF(result);
-            goto exit_free_normalized_tokens;
+    if (!pypostal_setup(PYPOSTAL_COMPONENT_LIBPOSTAL, NULL)) {
+        return NULL;
+    }
+
+    PyObject *inputs_seq = pypostal_sequence_snapshot(arg_inputs, "strings must be a sequence");
+    if (inputs_seq == NULL) {
+        return NULL;
+    }
+
+    Py_ssize_t num_inputs = PySequence_Fast_GET_SIZE(inputs_seq);
+
+    bool whitespace = arg_whitespace;
+
+    size_t num_languages = 0;
+    char **languages = NULL;
+
+    size_t num_output = 0;
+
+    char **inputs = calloc(num_inputs > 0 ? (size_t)num_inputs : 1, sizeof(char *));
+    libpostal_normalized_token_t **tokens = calloc(num_inputs > 0 ? (size_t)num_inputs : 1, sizeof(libpostal_normalized_token_t *));
+    size_t *num_tokens = calloc(num_inputs > 0 ? (size_t)num_inputs : 1, sizeof(size_t));
+    if (inputs == NULL || tokens == NULL || num_tokens == NULL) {
+        PyErr_NoMemory();
+        goto exit_free_arrays;
+    }
+
+    for (Py_ssize_t i = 0; i < num_inputs; i++) {
+        // Borrowed UTF-8 views, valid while the snapshot in inputs_seq is alive
+        inputs[i] = (char *)PyObject_to_string_borrowed(PySequence_Fast_GET_ITEM(inputs_seq, i));
+        if (inputs[i] == NULL) {
+            goto exit_free_arrays;
         }
+    }
 
-        PyObject *t = PyTuple_New(2);
-        PyObject *py_token_type = PyLong_FromLong(normalized_token.token.type);
+    if (arg_languages != Py_None) {
+        if (PyUnicode_Check(arg_languages) || PyBytes_Check(arg_languages) || !PySequence_Check(arg_languages)) {
+            PyErr_SetString(PyExc_TypeError, "languages must be a sequence of strings");
+            goto exit_free_arrays;
+        }
 
-        PyTuple_SetItem(t, 0, py_token);
-        PyTuple_SetItem(t, 1, py_token_type);
+        languages = PyObject_to_strings_max_len(arg_languages, LIBPOSTAL_MAX_LANGUAGE_LEN, &num_languages);
+        if (languages == NULL && PyErr_Occurred()) {
+            goto exit_free_arrays;
+        }
+    }
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
 
-        // Note: PyList_SetItem steals a reference, so don't worry about DECREF
-        PyList_SetItem(result, (Py_ssize_t)i, t);
+    Py_BEGIN_ALLOW_THREADS
+    for (Py_ssize_t i = 0; i < num_inputs; i++) {
+        tokens[i] = libpostal_normalized_tokens_languages(inputs[i], string_options, token_options, whitespace, num_languages, languages, &num_tokens[i]);
     }
+    Py_END_ALLOW_THREADS
 
-exit_free_normalized_tokens:
-    for (size_t i = 0; i < num_tokens; i++) {
-        free(normalized_tokens[i].str);
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
+
+    result = PyList_New(num_inputs);
+    if (result == NULL) {
+        goto exit_destroy_tokens;
     }
-    free(normalized_tokens);
-exit_free_normalize_languages:
-    string_array_destroy(languages, num_languages);
 
+    for (Py_ssize_t i = 0; i < num_inputs; i++) {
+        size_t num_kept = 0;
+        PyObject *row = tokens[i] != NULL ? PyObject_from_normalized_tokens(tokens[i], num_tokens[i], arg_strip_parentheticals, &num_kept) : PyList_New(0);
+        if (row == NULL) {
+            Py_CLEAR(result);
+            goto exit_destroy_tokens;
+        }
+        PyList_SET_ITEM(result, i, row);
+        num_output += num_kept;
+    }
+
+exit_destroy_tokens:
+    if (timer.enabled) {
+        size_t input_bytes = 0;
+        for (Py_ssize_t i = 0; i < num_inputs; i++) {
+            input_bytes += strlen(inputs[i]);
+        }
+        pypostal_metric_record(&metrics[METRIC_NORMALIZED_TOKENS_BATCH], &timer, input_bytes, num_output, result != NULL);
+    }
+    for (Py_ssize_t i = 0; i < num_inputs; i++) {
+        normalized_tokens_destroy(tokens[i], num_tokens[i]);
+    }
+exit_free_arrays:
+    string_array_destroy(languages, num_languages);
+    free(inputs);
+    free(tokens);
+    free(num_tokens);
+    Py_DECREF(inputs_seq);
     return result;
 }
 
 
 static PyMethodDef normalize_methods[] = {
     {"normalize_string", (PyCFunction)py_normalize_string, METH_VARARGS | METH_KEYWORDS, "normalize_string(input, options, langauges)"},
-    {"normalized_tokens", (PyCFunction)py_normalized_tokens, METH_VARARGS | METH_KEYWORDS, "normalize_token(input, string_options, token_options, whitespace, languages)"},
+    {"normalized_tokens", (PyCFunction)py_normalized_tokens, METH_VARARGS | METH_KEYWORDS, "normalize_token(input, string_options, token_options, whitespace, languages, strip_parentheticals)"},
+    {"normalized_tokens_batch", (PyCFunction)py_normalized_tokens_batch, METH_VARARGS | METH_KEYWORDS, "normalized_tokens_batch(strings, string_options, token_options, whitespace, languages, strip_parentheticals)"},
+    {"register_token_types", (PyCFunction)py_register_token_types, METH_O, "register_token_types(table)"},
+    PYPOSTAL_METRICS_METHODS,
     {NULL, NULL},
 };
 
@@ -225,15 +509,6 @@ init_normalize(void) {
         INITERROR;
     }
 
-   char* datadir = getenv("LIBPOSTAL_DATA_DIR");
-
-    if ((datadir!=NULL && !libpostal_setup_datadir(datadir)) || !libpostal_setup()) {
-            PyErr_SetString(PyExc_RuntimeError,
-                            "Could not load libpostal");
-            Py_DECREF(module);
-            INITERROR;
-    }
-
     PyModule_AddObject(module, "NORMALIZE_STRING_LATIN_ASCII", PyLong_FromUnsignedLongLong(LIBPOSTAL_NORMALIZE_STRING_LATIN_ASCII));
     PyModule_AddObject(module, "NORMALIZE_STRING_TRANSLITERATE", PyLong_FromUnsignedLongLong(LIBPOSTAL_NORMALIZE_STRING_TRANSLITERATE));
     PyModule_AddObject(module, "NORMALIZE_STRING_STRIP_ACCENTS", PyLong_FromUnsignedLongLong(LIBPOSTAL_NORMALIZE_STRING_STRIP_ACCENTS));
@@ -1,6 +1,8 @@
 #include <Python.h>
+#include <stddef.h>
 #include <libpostal/libpostal.h>
 #include "pyutils.h"
+#include "pyexpandoptions.h"
 
 #if PY_MAJOR_VERSION >= 3
 #define IS_PY3K
@@ -19,114 +21,1544 @@ struct module_state {
 #endif
 
 
+/* libpostal's address parser keeps a single shared context for feature
+   extraction and tagging, so concurrent calls to libpostal_parse_address
+   are not safe. The GIL is released while parsing so other Python threads
+   can make progress, but parses themselves are serialized on this lock. */
+static PyThread_type_lock parser_lock = NULL;
+
+
+#define METRIC_PARSE_ADDRESS 0
+#define METRIC_PARSE_ADDRESSES 1
+#define METRIC_PARSE_ADDRESS_ARROW 2
+#define METRIC_PARSE_AND_EXPAND 3
+#define METRIC_PARSE_AND_EXPAND_BATCH 4
+
+static pypostal_metric_t metrics[] = {
+    {"parse_address"},
+    {"parse_addresses"},
+    {"parse_address_arrow"},
+    {"parse_and_expand"},
+    {"parse_and_expand_batch"},
+    {NULL}
+};
+
+PYPOSTAL_METRICS_FUNCTIONS(metrics)
+
+
+/* Labels come from a small, fixed set, so keep one unicode object per label
+   around instead of decoding the same few strings for every component. */
+#define MAX_CACHED_LABELS 64
+
+static char *cached_labels[MAX_CACHED_LABELS];
+static PyObject *cached_label_objects[MAX_CACHED_LABELS];
+static size_t num_cached_labels = 0;
+static PyObject *labels_tuple = NULL;
+
+static PyObject *label_to_unicode(char *label) {
+    for (size_t i = 0; i < num_cached_labels; i++) {
+        if (strcmp(cached_labels[i], label) == 0) {
+            Py_INCREF(cached_label_objects[i]);
+            return cached_label_objects[i];
+        }
+    }
+
+    PyObject *label_unicode = PyUnicode_DecodeUTF8((const char *)label, strlen(label), "strict");
+    if (label_unicode == NULL || num_cached_labels >= MAX_CACHED_LABELS) {
+        return label_unicode;
+    }
+
+    char *label_copy = strdup(label);
+    if (label_copy == NULL) {
+        return label_unicode;
+    }
+
+    PyUnicode_InternInPlace(&label_unicode);
+    cached_labels[num_cached_labels] = label_copy;
+    cached_label_objects[num_cached_labels] = label_unicode;
+    num_cached_labels++;
+
+    Py_INCREF(label_unicode);
+    return label_unicode;
+}
+
+static void clear_label_cache(void) {
+    for (size_t i = 0; i < num_cached_labels; i++) {
+        free(cached_labels[i]);
+        Py_CLEAR(cached_label_objects[i]);
+    }
+    num_cached_labels = 0;
+    Py_CLEAR(labels_tuple);
+}
+
+
+/* Label ids for ParsedAddress are indexes into the label cache, and each
+   ParsedAddress keeps a reference to a tuple of the cached label objects so the
+   ids stay valid for its lifetime. The tuple is rebuilt when new labels are seen. */
+
+static int label_id(char *label) {
+    for (size_t i = 0; i < num_cached_labels; i++) {
+        if (strcmp(cached_labels[i], label) == 0) {
+            return (int)i;
+        }
+    }
+
+    size_t n = num_cached_labels;
+    PyObject *label_unicode = label_to_unicode(label);
+    if (label_unicode == NULL) {
+        return -1;
+    }
+    Py_DECREF(label_unicode);
+
+    if (num_cached_labels == n) {
+        PyErr_SetString(PyExc_ValueError, "Too many distinct labels for ParsedAddress");
+        return -1;
+    }
+    return (int)n;
+}
+
+static PyObject *get_labels_tuple(void) {
+    if (labels_tuple == NULL || (size_t)PyTuple_GET_SIZE(labels_tuple) != num_cached_labels) {
+        PyObject *labels = PyTuple_New((Py_ssize_t)num_cached_labels);
+        if (labels == NULL) {
+            return NULL;
+        }
+        for (size_t i = 0; i < num_cached_labels; i++) {
+            Py_INCREF(cached_label_objects[i]);
+            PyTuple_SET_ITEM(labels, (Py_ssize_t)i, cached_label_objects[i]);
+        }
+        Py_XDECREF(labels_tuple);
+        labels_tuple = labels;
+    }
+    Py_INCREF(labels_tuple);
+    return labels_tuple;
+}
+
+
+/* ParsedAddress stores the components of a parse in one allocation: n + 1
+   uint32 offsets into the UTF-8 data, n uint8 label ids, then the data itself.
+   Components are only decoded to str when they're accessed. */
+typedef struct {
+    PyObject_VAR_HEAD
+    PyObject *labels;
+    Py_ssize_t num_components;
+    char storage[];
+} ParsedAddressObject;
+
+static PyTypeObject ParsedAddressType;
+
+static inline uint32_t *ParsedAddress_offsets(ParsedAddressObject *self) {
+    return (uint32_t *)self->storage;
+}
+
+static inline uint8_t *ParsedAddress_label_ids(ParsedAddressObject *self) {
+    return (uint8_t *)(self->storage + (self->num_components + 1) * sizeof(uint32_t));
+}
+
+static inline char *ParsedAddress_data(ParsedAddressObject *self) {
+    return self->storage + (self->num_components + 1) * sizeof(uint32_t) + self->num_components;
+}
+
+static ParsedAddressObject *ParsedAddress_alloc(Py_ssize_t num_components, size_t data_len) {
+    if (data_len > UINT32_MAX) {
+        PyErr_SetString(PyExc_OverflowError, "address too long for ParsedAddress");
+        return NULL;
+    }
+    Py_ssize_t size = (num_components + 1) * sizeof(uint32_t) + num_components + (Py_ssize_t)data_len;
+    ParsedAddressObject *self = PyObject_NewVar(ParsedAddressObject, &ParsedAddressType, size);
+    if (self == NULL) {
+        return NULL;
+    }
+    self->num_components = num_components;
+    self->labels = get_labels_tuple();
+    if (self->labels == NULL) {
+        Py_DECREF(self);
+        return NULL;
+    }
+    return self;
+}
+
+static PyObject *ParsedAddress_from_parser_response(libpostal_address_parser_response_t *parsed) {
+    size_t data_len = 0;
+    for (size_t i = 0; i < parsed->num_components; i++) {
+        data_len += strlen(parsed->components[i]);
+    }
+
+    // Assign the label ids first so the labels tuple taken by the object has all of them
+    uint8_t ids[MAX_CACHED_LABELS];
+    uint8_t *label_ids = parsed->num_components <= MAX_CACHED_LABELS ? ids : malloc(parsed->num_components);
+    if (label_ids == NULL) {
+        return PyErr_NoMemory();
+    }
+
+    ParsedAddressObject *self = NULL;
+    for (size_t i = 0; i < parsed->num_components; i++) {
+        int id = label_id(parsed->labels[i]);
+        if (id < 0) {
+            goto exit_free_label_ids;
+        }
+        label_ids[i] = (uint8_t)id;
+    }
+
+    self = ParsedAddress_alloc((Py_ssize_t)parsed->num_components, data_len);
+    if (self == NULL) {
+        goto exit_free_label_ids;
+    }
+
+    uint32_t *offsets = ParsedAddress_offsets(self);
+    char *data = ParsedAddress_data(self);
+    uint32_t offset = 0;
+
+    for (size_t i = 0; i < parsed->num_components; i++) {
+        size_t len = strlen(parsed->components[i]);
+        memcpy(data + offset, parsed->components[i], len);
+        offsets[i] = offset;
+        offset += (uint32_t)len;
+    }
+    offsets[parsed->num_components] = offset;
+    memcpy(ParsedAddress_label_ids(self), label_ids, parsed->num_components);
+
+exit_free_label_ids:
+    if (label_ids != ids) {
+        free(label_ids);
+    }
+    return (PyObject *)self;
+}
+
+static PyObject *ParsedAddress_component(ParsedAddressObject *self, Py_ssize_t i) {
+    uint32_t *offsets = ParsedAddress_offsets(self);
+    return PyUnicode_DecodeUTF8(ParsedAddress_data(self) + offsets[i], offsets[i + 1] - offsets[i], "strict");
+}
+
+static PyObject *ParsedAddress_label(ParsedAddressObject *self, Py_ssize_t i) {
+    PyObject *label = PyTuple_GET_ITEM(self->labels, ParsedAddress_label_ids(self)[i]);
+    Py_INCREF(label);
+    return label;
+}
+
+/* Index of label in self->labels, -1 if it isn't there (no exception set) */
+static int ParsedAddress_find_label(ParsedAddressObject *self, PyObject *label) {
+    Py_ssize_t num_labels = PyTuple_GET_SIZE(self->labels);
+    for (Py_ssize_t i = 0; i < num_labels; i++) {
+        PyObject *item = PyTuple_GET_ITEM(self->labels, i);
+        if (item == label) {
+            return (int)i;
+        }
+        int cmp = PyObject_RichCompareBool(item, label, Py_EQ);
+        if (cmp > 0) {
+            return (int)i;
+        } else if (cmp < 0) {
+            PyErr_Clear();
+        }
+    }
+    return -1;
+}
+
+/* Components with the given label id, joined with a space if there's more than one.
+   Returns NULL without an exception set if there are none. */
+static PyObject *ParsedAddress_get_label_id(ParsedAddressObject *self, int id) {
+    uint8_t *label_ids = ParsedAddress_label_ids(self);
+    uint32_t *offsets = ParsedAddress_offsets(self);
+    char *data = ParsedAddress_data(self);
+
+    Py_ssize_t first = -1;
+    size_t len = 0;
+    size_t count = 0;
+    for (Py_ssize_t i = 0; i < self->num_components; i++) {
+        if (label_ids[i] == id) {
+            if (first < 0) {
+                first = i;
+            }
+            len += offsets[i + 1] - offsets[i];
+            count++;
+        }
+    }
+
+    if (count == 0) {
+        return NULL;
+    } else if (count == 1) {
+        return ParsedAddress_component(self, first);
+    }
+
+    len += count - 1;
+    char *joined = malloc(len);
+    if (joined == NULL) {
+        return PyErr_NoMemory();
+    }
+    size_t pos = 0;
+    for (Py_ssize_t i = first; i < self->num_components; i++) {
+        if (label_ids[i] == id) {
+            if (pos > 0) {
+                joined[pos++] = ' ';
+            }
+            memcpy(joined + pos, data + offsets[i], offsets[i + 1] - offsets[i]);
+            pos += offsets[i + 1] - offsets[i];
+        }
+    }
+    PyObject *result = PyUnicode_DecodeUTF8(joined, len, "strict");
+    free(joined);
+    return result;
+}
+
+static PyObject *ParsedAddress_to_list(ParsedAddressObject *self, PyObject *noargs) {
+    PyObject *result = PyList_New(self->num_components);
+    if (result == NULL) {
+        return NULL;
+    }
+    for (Py_ssize_t i = 0; i < self->num_components; i++) {
+        PyObject *component = ParsedAddress_component(self, i);
+        if (component == NULL) {
+            Py_DECREF(result);
+            return NULL;
+        }
+        PyObject *tuple = PyTuple_New(2);
+        if (tuple == NULL) {
+            Py_DECREF(component);
+            Py_DECREF(result);
+            return NULL;
+        }
+        PyTuple_SET_ITEM(tuple, 0, component);
+        PyTuple_SET_ITEM(tuple, 1, ParsedAddress_label(self, i));
+        PyList_SET_ITEM(result, i, tuple);
+    }
+    return result;
+}
+
+static PyObject *ParsedAddress_to_dict(ParsedAddressObject *self, PyObject *noargs) {
+    PyObject *result = PyDict_New();
+    if (result == NULL) {
+        return NULL;
+    }
+    uint8_t *label_ids = ParsedAddress_label_ids(self);
+    for (Py_ssize_t i = 0; i < self->num_components; i++) {
+        PyObject *label = PyTuple_GET_ITEM(self->labels, label_ids[i]);
+        int contains = PyDict_Contains(result, label);
+        if (contains < 0) {
+            Py_DECREF(result);
+            return NULL;
+        } else if (contains) {
+            continue;
+        }
+        PyObject *value = ParsedAddress_get_label_id(self, label_ids[i]);
+        if (value == NULL || PyDict_SetItem(result, label, value) < 0) {
+            Py_XDECREF(value);
+            Py_DECREF(result);
+            return NULL;
+        }
+        Py_DECREF(value);
+    }
+    return result;
+}
+
+static PyObject *ParsedAddress_get(ParsedAddressObject *self, PyObject *args) {
+    PyObject *label;
+    PyObject *default_value = Py_None;
+    if (!PyArg_ParseTuple(args, "O|O:get", &label, &default_value)) {
+        return NULL;
+    }
+    int id = ParsedAddress_find_label(self, label);
+    PyObject *result = id >= 0 ? ParsedAddress_get_label_id(self, id) : NULL;
+    if (result == NULL && !PyErr_Occurred()) {
+        Py_INCREF(default_value);
+        return default_value;
+    }
+    return result;
+}
+
+static PyObject *ParsedAddress_labels(ParsedAddressObject *self, PyObject *noargs) {
+    PyObject *result = PyList_New(self->num_components);
+    if (result == NULL) {
+        return NULL;
+    }
+    for (Py_ssize_t i = 0; i < self->num_components; i++) {
+        PyList_SET_ITEM(result, i, ParsedAddress_label(self, i));
+    }
+    return result;
+}
+
+static PyObject *ParsedAddress_reduce(ParsedAddressObject *self, PyObject *noargs) {
+    PyObject *components = ParsedAddress_to_list(self, NULL);
+    if (components == NULL) {
+        return NULL;
+    }
+    PyObject *result = Py_BuildValue("(O(N))", (PyObject *)Py_TYPE(self), components);
+    return result;
+}
+
+static Py_ssize_t ParsedAddress_length(ParsedAddressObject *self) {
+    return self->num_components;
+}
+
+static PyObject *ParsedAddress_item(ParsedAddressObject *self, Py_ssize_t i) {
+    if (i < 0 || i >= self->num_components) {
+        PyErr_SetString(PyExc_IndexError, "ParsedAddress index out of range");
+        return NULL;
+    }
+    PyObject *component = ParsedAddress_component(self, i);
+    if (component == NULL) {
+        return NULL;
+    }
+    PyObject *label = ParsedAddress_label(self, i);
+    PyObject *result = PyTuple_Pack(2, component, label);
+    Py_DECREF(component);
+    Py_DECREF(label);
+    return result;
+}
+
+static PyObject *ParsedAddress_subscript(ParsedAddressObject *self, PyObject *key) {
+    if (PyIndex_Check(key)) {
+        Py_ssize_t i = PyNumber_AsSsize_t(key, PyExc_IndexError);
+        if (i == -1 && PyErr_Occurred()) {
+            return NULL;
+        }
+        if (i < 0) {
+            i += self->num_components;
+        }
+        return ParsedAddress_item(self, i);
+    }
+
+    int id = ParsedAddress_find_label(self, key);
+    PyObject *result = id >= 0 ? ParsedAddress_get_label_id(self, id) : NULL;
+    if (result == NULL && !PyErr_Occurred()) {
+        PyErr_SetObject(PyExc_KeyError, key);
+    }
+    return result;
+}
+
+static int ParsedAddress_contains(ParsedAddressObject *self, PyObject *label) {
+    int id = ParsedAddress_find_label(self, label);
+    if (id < 0) {
+        return 0;
+    }
+    uint8_t *label_ids = ParsedAddress_label_ids(self);
+    for (Py_ssize_t i = 0; i < self->num_components; i++) {
+        if (label_ids[i] == id) {
+            return 1;
+        }
+    }
+    return 0;
+}
+
+static PyObject *ParsedAddress_richcompare(ParsedAddressObject *self, PyObject *other, int op) {
+    if ((op != Py_EQ && op != Py_NE) ||
+        !(PyObject_TypeCheck(other, &ParsedAddressType) || PyList_Check(other))) {
+        Py_RETURN_NOTIMPLEMENTED;
+    }
+
+    PyObject *list = ParsedAddress_to_list(self, NULL);
+    if (list == NULL) {
+        return NULL;
+    }
+    PyObject *other_list = other;
+    if (PyObject_TypeCheck(other, &ParsedAddressType)) {
+        other_list = ParsedAddress_to_list((ParsedAddressObject *)other, NULL);
+        if (other_list == NULL) {
+            Py_DECREF(list);
+            return NULL;
+        }
+    } else {
+        Py_INCREF(other_list);
+    }
+
+    PyObject *result = PyObject_RichCompare(list, other_list, op);
+    Py_DECREF(list);
+    Py_DECREF(other_list);
+    return result;
+}
+
+static PyObject *ParsedAddress_repr(ParsedAddressObject *self) {
+    PyObject *list = ParsedAddress_to_list(self, NULL);
+    if (list == NULL) {
+        return NULL;
+    }
+    #ifdef IS_PY3K
+    PyObject *result = PyUnicode_FromFormat("ParsedAddress(%R)", list);
+    #else
+    PyObject *list_repr = PyObject_Repr(list);
+    PyObject *result = list_repr != NULL ? PyString_FromFormat("ParsedAddress(%s)", PyString_AsString(list_repr)) : NULL;
+    Py_XDECREF(list_repr);
+    #endif
+    Py_DECREF(list);
+    return result;
+}
+
+/* ParsedAddress([(component, label), ...]), mostly for unpickling */
+static PyObject *ParsedAddress_new(PyTypeObject *type, PyObject *args, PyObject *keywords) {
+    PyObject *arg_components;
+    static char *kwlist[] = {"components", NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, keywords, "O:ParsedAddress", kwlist, &arg_components)) {
+        return NULL;
+    }
+
+    PyObject *seq = PySequence_Fast(arg_components, "components must be a sequence of (component, label) tuples");
+    if (seq == NULL) {
+        return NULL;
+    }
+
+    Py_ssize_t n = PySequence_Fast_GET_SIZE(seq);
+    libpostal_address_parser_response_t parsed = {(size_t)n, NULL, NULL};
+    PyObject *result = NULL;
+
+    parsed.components = calloc(n > 0 ? (size_t)n : 1, sizeof(char *));
+    parsed.labels = calloc(n > 0 ? (size_t)n : 1, sizeof(char *));
+    if (parsed.components == NULL || parsed.labels == NULL) {
+        PyErr_NoMemory();
+        goto exit_free_arrays;
+    }
+
+    for (Py_ssize_t i = 0; i < n; i++) {
+        PyObject *item = PySequence_Fast_GET_ITEM(seq, i);
+        if (!PyTuple_Check(item) || PyTuple_GET_SIZE(item) != 2) {
+            PyErr_SetString(PyExc_TypeError, "components must be a sequence of (component, label) tuples");
+            goto exit_free_arrays;
+        }
+        // Borrowed views, valid while seq holds the tuples
+        parsed.components[i] = (char *)PyObject_to_string_borrowed(PyTuple_GET_ITEM(item, 0));
+        parsed.labels[i] = parsed.components[i] != NULL ? (char *)PyObject_to_string_borrowed(PyTuple_GET_ITEM(item, 1)) : NULL;
+        if (parsed.labels[i] == NULL) {
+            goto exit_free_arrays;
+        }
+    }
+
+    result = ParsedAddress_from_parser_response(&parsed);
+
+exit_free_arrays:
+    free(parsed.components);
+    free(parsed.labels);
+    Py_DECREF(seq);
+    return result;
+}
+
+static void ParsedAddress_dealloc(ParsedAddressObject *self) {
+    Py_XDECREF(self->labels);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+static PySequenceMethods ParsedAddress_as_sequence = {
+    .sq_length = (lenfunc)ParsedAddress_length,
+    .sq_item = (ssizeargfunc)ParsedAddress_item,
+    .sq_contains = (objobjproc)ParsedAddress_contains,
+};
+
+static PyMappingMethods ParsedAddress_as_mapping = {
+    .mp_length = (lenfunc)ParsedAddress_length,
+    .mp_subscript = (binaryfunc)ParsedAddress_subscript,
+};
+
+static PyMethodDef ParsedAddress_methods[] = {
+    {"get", (PyCFunction)ParsedAddress_get, METH_VARARGS, "get(label, default=None), the component(s) with label"},
+    {"to_dict", (PyCFunction)ParsedAddress_to_dict, METH_NOARGS, "to_dict(), {label: component}, repeated labels joined with a space"},
+    {"to_list", (PyCFunction)ParsedAddress_to_list, METH_NOARGS, "to_list(), [(component, label), ...] as returned by parse_address"},
+    {"labels", (PyCFunction)ParsedAddress_labels, METH_NOARGS, "labels(), the label of each component in order"},
+    {"__reduce__", (PyCFunction)ParsedAddress_reduce, METH_NOARGS, NULL},
+    {NULL}
+};
+
+static PyTypeObject ParsedAddressType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "postal._parser.ParsedAddress",
+    .tp_basicsize = offsetof(ParsedAddressObject, storage),
+    .tp_itemsize = 1,
+    .tp_dealloc = (destructor)ParsedAddress_dealloc,
+    .tp_repr = (reprfunc)ParsedAddress_repr,
+    .tp_as_sequence = &ParsedAddress_as_sequence,
+    .tp_as_mapping = &ParsedAddress_as_mapping,
+    .tp_richcompare = (richcmpfunc)ParsedAddress_richcompare,
+    .tp_flags = Py_TPFLAGS_DEFAULT,
+    .tp_doc = "ParsedAddress(components)\n\n"
+              "Compact result of parse_address(..., compact=True). The components are kept in one UTF-8\n"
+              "buffer and only decoded when accessed. Iterates and indexes like the list of\n"
+              "(component, label) tuples, and parsed['road'] looks up a component by label.",
+    .tp_methods = ParsedAddress_methods,
+    .tp_new = ParsedAddress_new,
+};
+
+
+static PyObject *PyObject_from_parser_response(libpostal_address_parser_response_t *parsed) {
+    PyObject *result = PyList_New((Py_ssize_t)parsed->num_components);
+    if (!result) {
+        return NULL;
+    }
+
+    for (size_t i = 0; i < parsed->num_components; i++) {
+        char *component = parsed->components[i];
+        char *label = parsed->labels[i];
+        PyObject *component_unicode = PyUnicode_DecodeUTF8((const char *)component, strlen(component), "strict");
+        if (component_unicode == NULL) {
+            Py_DECREF(result);
+            return NULL;
+        }
+
+        PyObject *label_unicode = label_to_unicode(label);
+        if (label_unicode == NULL) {
+            Py_DECREF(component_unicode);
+            Py_DECREF(result);
+            return NULL;
+        }
+
+        PyObject *tuple = PyTuple_New(2);
+        if (tuple == NULL) {
+            Py_DECREF(component_unicode);
+            Py_DECREF(label_unicode);
+            Py_DECREF(result);
+            return NULL;
+        }
+
+        // Note: PyTuple_SET_ITEM and PyList_SET_ITEM steal references, so don't worry about DECREF
+        PyTuple_SET_ITEM(tuple, 0, component_unicode);
+        PyTuple_SET_ITEM(tuple, 1, label_unicode);
+        PyList_SET_ITEM(result, (Py_ssize_t)i, tuple);
+    }
+
+    return result;
+}
+
+
 static PyObject *py_parse_address(PyObject *self, PyObject *args, PyObject *keywords) {
     PyObject *arg_input;
     PyObject *arg_language = Py_None;
     PyObject *arg_country = Py_None;
+    int compact = 0;
+
+    PyObject *result = NULL;
+    size_t num_components = 0;
+
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
+    static char *kwlist[] = {"address",
+                             "language",
+                             "country",
+                             "compact",
+                             NULL
+                            };
+
+
+    if (!PyArg_ParseTupleAndKeywords(args, keywords, 
+                                     "O|OOp:pyparser", kwlist,
+                                     &arg_input, &arg_language,
+                                     &arg_country, &compact
+                                     )) {
+        return 0;
+    }
+
+    if (!pypostal_setup(PYPOSTAL_COMPONENT_LIBPOSTAL | PYPOSTAL_COMPONENT_PARSER, NULL)) {
+        return NULL;
+    }
+
+    char *input = PyObject_to_string(arg_input);
+
+    if (input == NULL) {
+        return NULL;
+    }
+
+    char *language = NULL;
+
+    if (arg_language != Py_None) {
+        language = PyObject_to_string(arg_language);
+        if (language == NULL) {
+            goto exit_free_input;
+        }
+    }
+
+    char *country = NULL;
+
+    if (arg_country != Py_None) {
+        country = PyObject_to_string(arg_country);
+        if (country == NULL) {
+            goto exit_free_language;
+        }
+    }
+    
+    libpostal_address_parser_options_t options = libpostal_get_address_parser_default_options();
+    options.language = language;
+    options.country = country;
+
+    libpostal_address_parser_response_t *parsed = NULL;
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
+
+    Py_BEGIN_ALLOW_THREADS
+    PyThread_acquire_lock(parser_lock, WAIT_LOCK);
+    parsed = libpostal_parse_address(input, options);
+    PyThread_release_lock(parser_lock);
+    Py_END_ALLOW_THREADS
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
+
+    if (parsed == NULL) {
+        goto exit_free_country;
+    }
+
+    num_components = parsed->num_components;
+    result = compact ? ParsedAddress_from_parser_response(parsed) : PyObject_from_parser_response(parsed);
+
+    libpostal_address_parser_response_destroy(parsed);
+exit_free_country:
+    if (country != NULL) {
+        free(country);
+    }
+exit_free_language:
+    if (language != NULL) {
+        free(language);
+    }
+exit_free_input:
+    PYPOSTAL_METRIC_RECORD(&metrics[METRIC_PARSE_ADDRESS], &timer, strlen(input), num_components, result != NULL);
+    if (input != NULL) {
+        free(input);
+    }
+    return result;
+}
+
+
+/* A language or country argument to parse_addresses may be None, a single
+   string applied to every address, or a sequence with one entry per address. */
+static int parse_addresses_option_fast(PyObject *arg, Py_ssize_t num_addresses, const char *name, PyObject **seq) {
+    *seq = NULL;
+    if (arg == Py_None || PyUnicode_Check(arg) || PyBytes_Check(arg)) {
+        return 1;
+    }
+
+    *seq = pypostal_sequence_snapshot(arg, "language and country must be strings or sequences");
+    if (*seq == NULL) {
+        return 0;
+    }
+
+    if (PySequence_Fast_GET_SIZE(*seq) != num_addresses) {
+        PyErr_Format(PyExc_ValueError,
+                     "%s must have the same length as addresses", name);
+        Py_CLEAR(*seq);
+        return 0;
+    }
+    return 1;
+}
+
+static int parse_addresses_option_value(PyObject *arg, PyObject *seq, Py_ssize_t i, char **value) {
+    PyObject *item = seq != NULL ? PySequence_Fast_GET_ITEM(seq, i) : arg;
+    if (item == Py_None) {
+        *value = NULL;
+        return 1;
+    }
+    *value = (char *)PyObject_to_string_borrowed(item);
+    return *value != NULL;
+}
+
+
+static PyObject *py_parse_addresses(PyObject *self, PyObject *args, PyObject *keywords) {
+    PyObject *arg_addresses;
+    PyObject *arg_language = Py_None;
+    PyObject *arg_country = Py_None;
+    int compact = 0;
+
+    PyObject *result = NULL;
+
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
+    static char *kwlist[] = {"addresses",
+                             "language",
+                             "country",
+                             "compact",
+                             NULL
+                            };
+
+    if (!PyArg_ParseTupleAndKeywords(args, keywords,
+                                     "O|OOp:pyparser", kwlist,
+                                     &arg_addresses, &arg_language,
+                                     &arg_country, &compact
+                                     )) {
+        return 0;
+    }
+
+    if (!pypostal_setup(PYPOSTAL_COMPONENT_LIBPOSTAL | PYPOSTAL_COMPONENT_PARSER, NULL)) {
+        return NULL;
+    }
+
+    PyObject *addresses = pypostal_sequence_snapshot(arg_addresses, "addresses must be a sequence");
+    if (addresses == NULL) {
+        return NULL;
+    }
+
+    Py_ssize_t num_addresses = PySequence_Fast_GET_SIZE(addresses);
+
+    PyObject *languages = NULL;
+    PyObject *countries = NULL;
+
+    if (!parse_addresses_option_fast(arg_language, num_addresses, "language", &languages)) {
+        goto exit_decref_addresses;
+    }
+
+    if (!parse_addresses_option_fast(arg_country, num_addresses, "country", &countries)) {
+        goto exit_decref_languages;
+    }
+
+    char **inputs = calloc(num_addresses > 0 ? (size_t)num_addresses : 1, sizeof(char *) * 3);
+    libpostal_address_parser_response_t **responses = calloc(num_addresses > 0 ? (size_t)num_addresses : 1, sizeof(libpostal_address_parser_response_t *));
+    if (inputs == NULL || responses == NULL) {
+        PyErr_NoMemory();
+        goto exit_free_arrays;
+    }
+
+    char **input_languages = inputs + num_addresses;
+    char **input_countries = input_languages + num_addresses;
+
+    for (Py_ssize_t i = 0; i < num_addresses; i++) {
+        // Borrowed UTF-8 views, valid as long as the snapshots of the input sequences are alive, so no per-row copies
+        inputs[i] = (char *)PyObject_to_string_borrowed(PySequence_Fast_GET_ITEM(addresses, i));
+        if (inputs[i] == NULL ||
+            !parse_addresses_option_value(arg_language, languages, i, &input_languages[i]) ||
+            !parse_addresses_option_value(arg_country, countries, i, &input_countries[i])) {
+            goto exit_free_arrays;
+        }
+    }
+
+    // The options struct is reused for every address, only the language/country pointers change
+    libpostal_address_parser_options_t options = libpostal_get_address_parser_default_options();
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
+
+    Py_BEGIN_ALLOW_THREADS
+    PyThread_acquire_lock(parser_lock, WAIT_LOCK);
+    for (Py_ssize_t i = 0; i < num_addresses; i++) {
+        options.language = input_languages[i];
+        options.country = input_countries[i];
+        responses[i] = libpostal_parse_address(inputs[i], options);
+    }
+    PyThread_release_lock(parser_lock);
+    Py_END_ALLOW_THREADS
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
+
+    result = PyList_New(num_addresses);
+    if (result == NULL) {
+        goto exit_destroy_responses;
+    }
+
+    for (Py_ssize_t i = 0; i < num_addresses; i++) {
+        if (responses[i] == NULL) {
+            PyErr_SetString(PyExc_ValueError, "Error parsing address");
+            Py_CLEAR(result);
+            goto exit_destroy_responses;
+        }
+
+        PyObject *components = compact ? ParsedAddress_from_parser_response(responses[i]) : PyObject_from_parser_response(responses[i]);
+        if (components == NULL) {
+            Py_CLEAR(result);
+            goto exit_destroy_responses;
+        }
+
+        PyList_SET_ITEM(result, i, components);
+    }
+
+exit_destroy_responses:
+    if (timer.enabled) {
+        size_t input_bytes = 0;
+        size_t num_components = 0;
+        for (Py_ssize_t i = 0; i < num_addresses; i++) {
+            input_bytes += strlen(inputs[i]);
+            num_components += responses[i] != NULL ? responses[i]->num_components : 0;
+        }
+        pypostal_metric_record(&metrics[METRIC_PARSE_ADDRESSES], &timer, input_bytes, num_components, result != NULL);
+    }
+    for (Py_ssize_t i = 0; i < num_addresses; i++) {
+        if (responses[i] != NULL) {
+            libpostal_address_parser_response_destroy(responses[i]);
+        }
+    }
+exit_free_arrays:
+    free(inputs);
+    free(responses);
+    Py_XDECREF(countries);
+exit_decref_languages:
+    Py_XDECREF(languages);
+exit_decref_addresses:
+    Py_DECREF(addresses);
+    return result;
+}
+
+
+/* One output column per label for parse_address_arrow, created the first time
+   the label is seen. Components with the same label in one address are joined
+   with a space. */
+typedef struct label_column {
+    char *label;
+    pypostal_string_builder_t builder;
+    int has_value;
+} label_column_t;
+
+typedef struct label_columns {
+    label_column_t *columns;
+    size_t n;
+    size_t m;
+} label_columns_t;
+
+static label_column_t *label_columns_get(label_columns_t *columns, const char *label, size_t num_rows, size_t row) {
+    for (size_t i = 0; i < columns->n; i++) {
+        if (strcmp(columns->columns[i].label, label) == 0) {
+            return &columns->columns[i];
+        }
+    }
+
+    if (columns->n == columns->m) {
+        size_t m = columns->m > 0 ? columns->m * 2 : 16;
+        label_column_t *resized = realloc(columns->columns, m * sizeof(label_column_t));
+        if (resized == NULL) {
+            return NULL;
+        }
+        columns->columns = resized;
+        columns->m = m;
+    }
+
+    label_column_t *column = &columns->columns[columns->n];
+    memset(column, 0, sizeof(label_column_t));
+    column->label = strdup(label);
+    if (column->label == NULL || !pypostal_string_builder_init(&column->builder, num_rows)) {
+        free(column->label);
+        pypostal_string_builder_destroy(&column->builder);
+        return NULL;
+    }
+
+    // Nulls for the rows before the label first appeared
+    for (size_t i = 0; i < row; i++) {
+        if (!pypostal_string_builder_finish_row(&column->builder, 0)) {
+            free(column->label);
+            pypostal_string_builder_destroy(&column->builder);
+            return NULL;
+        }
+    }
+
+    columns->n++;
+    return column;
+}
+
+static void label_columns_destroy(label_columns_t *columns) {
+    for (size_t i = 0; i < columns->n; i++) {
+        free(columns->columns[i].label);
+        pypostal_string_builder_destroy(&columns->columns[i].builder);
+    }
+    free(columns->columns);
+}
+
+
+static PyObject *py_parse_address_arrow(PyObject *self, PyObject *args, PyObject *keywords) {
+    PyObject *arg_validity;
+    PyObject *arg_offsets;
+    PyObject *arg_data;
+    Py_ssize_t offset;
+    Py_ssize_t length;
+    int large = 0;
+    PyObject *arg_language = Py_None;
+    PyObject *arg_country = Py_None;
+
+    PyObject *result = NULL;
+
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
+    static char *kwlist[] = {"validity",
+                             "offsets",
+                             "data",
+                             "offset",
+                             "length",
+                             "large",
+                             "language",
+                             "country",
+                             NULL
+                            };
+
+    if (!PyArg_ParseTupleAndKeywords(args, keywords,
+                                     "OOOnn|pOO:parse_address_arrow", kwlist,
+                                     &arg_validity, &arg_offsets, &arg_data,
+                                     &offset, &length, &large,
+                                     &arg_language, &arg_country
+                                     )) {
+        return 0;
+    }
+
+    if (!pypostal_setup(PYPOSTAL_COMPONENT_LIBPOSTAL | PYPOSTAL_COMPONENT_PARSER, NULL)) {
+        return NULL;
+    }
+
+    char *language = NULL;
+    char *country = NULL;
+
+    if (arg_language != Py_None && (language = (char *)PyObject_to_string_borrowed(arg_language)) == NULL) {
+        return NULL;
+    }
+
+    if (arg_country != Py_None && (country = (char *)PyObject_to_string_borrowed(arg_country)) == NULL) {
+        return NULL;
+    }
+
+    pypostal_string_column_t column;
+    if (!pypostal_string_column_init(&column, arg_validity, arg_offsets, arg_data, offset, length, large)) {
+        return NULL;
+    }
+
+    label_columns_t columns = {NULL, 0, 0};
+    pypostal_cstring_t input = {NULL, 0};
+    label_column_t *failed = NULL;
+    int ok = 1;
+    size_t input_bytes = 0;
+    size_t num_components = 0;
+
+    libpostal_address_parser_options_t options = libpostal_get_address_parser_default_options();
+    options.language = language;
+    options.country = country;
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
+
+    Py_BEGIN_ALLOW_THREADS
+    PyThread_acquire_lock(parser_lock, WAIT_LOCK);
+    for (Py_ssize_t i = 0; i < length && ok; i++) {
+        if (pypostal_string_column_is_valid(&column, i)) {
+            size_t len;
+            const char *value = pypostal_string_column_value(&column, i, &len);
+            char *str = pypostal_cstring_set(&input, value, len);
+            if (str == NULL) {
+                ok = 0;
+                break;
+            }
+            input_bytes += len;
+
+            libpostal_address_parser_response_t *parsed = libpostal_parse_address(str, options);
+            if (parsed == NULL) {
+                ok = -1;
+                break;
+            }
+
+            for (size_t j = 0; j < parsed->num_components && ok; j++) {
+                label_column_t *label_column = label_columns_get(&columns, parsed->labels[j], (size_t)length, (size_t)i);
+                if (label_column == NULL) {
+                    ok = 0;
+                    break;
+                }
+                const char *component = parsed->components[j];
+                if ((label_column->has_value && !pypostal_string_builder_append(&label_column->builder, " ", 1)) ||
+                    !pypostal_string_builder_append(&label_column->builder, component, strlen(component))) {
+                    failed = label_column;
+                    ok = 0;
+                    break;
+                }
+                label_column->has_value = 1;
+            }
+            num_components += parsed->num_components;
+            libpostal_address_parser_response_destroy(parsed);
+        }
+
+        for (size_t j = 0; j < columns.n && ok; j++) {
+            label_column_t *label_column = &columns.columns[j];
+            if (!pypostal_string_builder_finish_row(&label_column->builder, label_column->has_value)) {
+                failed = label_column;
+                ok = 0;
+            }
+            label_column->has_value = 0;
+        }
+    }
+    PyThread_release_lock(parser_lock);
+    Py_END_ALLOW_THREADS
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
+
+    if (ok == 0) {
+        if (failed != NULL) {
+            pypostal_string_builder_set_error(&failed->builder);
+        } else {
+            PyErr_NoMemory();
+        }
+        goto exit_destroy_columns;
+    } else if (ok < 0) {
+        PyErr_SetString(PyExc_ValueError, "Error parsing address");
+        goto exit_destroy_columns;
+    }
+
+    result = PyList_New((Py_ssize_t)columns.n);
+    if (result == NULL) {
+        goto exit_destroy_columns;
+    }
+
+    for (size_t j = 0; j < columns.n; j++) {
+        PyObject *buffers = pypostal_string_builder_to_tuple(&columns.columns[j].builder);
+        PyObject *label = buffers != NULL ? label_to_unicode(columns.columns[j].label) : NULL;
+        PyObject *item = label != NULL ? PyTuple_Pack(2, label, buffers) : NULL;
+        Py_XDECREF(label);
+        Py_XDECREF(buffers);
+        if (item == NULL) {
+            Py_CLEAR(result);
+            goto exit_destroy_columns;
+        }
+        PyList_SET_ITEM(result, (Py_ssize_t)j, item);
+    }
+
+exit_destroy_columns:
+    PYPOSTAL_METRIC_RECORD(&metrics[METRIC_PARSE_ADDRESS_ARROW], &timer, input_bytes, num_components, result != NULL);
+    label_columns_destroy(&columns);
+    free(input.str);
+    pypostal_string_column_release(&column);
+    return result;
+}
+
+
+/* parse_and_expand: parse an address, then expand each component with the
+   address_components mask for its label, in one call and one GIL release. */
+
+static PyStructSequence_Field expanded_component_fields[] = {
+    {"component", "the component as returned by parse_address"},
+    {"label", "the parser label e.g. road"},
+    {"expansions", "expansions of the component using the address components for its label"},
+    {NULL}
+};
+
+static PyStructSequence_Desc expanded_component_desc = {
+    "postal._parser.ExpandedComponent",
+    "ExpandedComponent(component, label, expansions)",
+    expanded_component_fields,
+    3
+};
+
+static PyTypeObject ExpandedComponentType;
+
+static const struct {
+    const char *label;
+    uint16_t components;
+} label_components[] = {
+    {"house", LIBPOSTAL_ADDRESS_NAME},
+    {"category", LIBPOSTAL_ADDRESS_CATEGORY},
+    {"near", LIBPOSTAL_ADDRESS_NEAR},
+    {"house_number", LIBPOSTAL_ADDRESS_HOUSE_NUMBER},
+    {"road", LIBPOSTAL_ADDRESS_STREET},
+    {"unit", LIBPOSTAL_ADDRESS_UNIT},
+    {"level", LIBPOSTAL_ADDRESS_LEVEL},
+    {"staircase", LIBPOSTAL_ADDRESS_STAIRCASE},
+    {"entrance", LIBPOSTAL_ADDRESS_ENTRANCE},
+    {"po_box", LIBPOSTAL_ADDRESS_PO_BOX},
+    {"postcode", LIBPOSTAL_ADDRESS_POSTAL_CODE},
+    {"suburb", LIBPOSTAL_ADDRESS_TOPONYM},
+    {"city_district", LIBPOSTAL_ADDRESS_TOPONYM},
+    {"city", LIBPOSTAL_ADDRESS_TOPONYM},
+    {"island", LIBPOSTAL_ADDRESS_TOPONYM},
+    {"state_district", LIBPOSTAL_ADDRESS_TOPONYM},
+    {"state", LIBPOSTAL_ADDRESS_TOPONYM},
+    {"country_region", LIBPOSTAL_ADDRESS_TOPONYM},
+    {"country", LIBPOSTAL_ADDRESS_TOPONYM},
+    {"world_region", LIBPOSTAL_ADDRESS_TOPONYM},
+};
+
+static uint16_t label_address_components(const char *label) {
+    for (size_t i = 0; i < sizeof(label_components) / sizeof(label_components[0]); i++) {
+        if (strcmp(label_components[i].label, label) == 0) {
+            return label_components[i].components;
+        }
+    }
+    return LIBPOSTAL_ADDRESS_ALL;
+}
+
+typedef struct parse_and_expand_result {
+    libpostal_address_parser_response_t *parsed;
+    char ***expansions;
+    size_t *num_expansions;
+} parse_and_expand_result_t;
+
+static void parse_and_expand_result_destroy(parse_and_expand_result_t *result) {
+    if (result->parsed == NULL) {
+        return;
+    }
+    if (result->expansions != NULL) {
+        for (size_t i = 0; i < result->parsed->num_components; i++) {
+            if (result->expansions[i] != NULL) {
+                libpostal_expansion_array_destroy(result->expansions[i], result->num_expansions[i]);
+            }
+        }
+    }
+    free(result->expansions);
+    free(result->num_expansions);
+    libpostal_address_parser_response_destroy(result->parsed);
+    memset(result, 0, sizeof(parse_and_expand_result_t));
+}
+
+/* Called without the GIL. Languages for expansion are, in order: the ones in
+   options, the language given to the parser, or the language classifier's
+   result for the whole address, classified once rather than per component.
+   Returns 0 if parsing (result->parsed is NULL) or an allocation failed, the
+   caller destroys the result either way. */
+static int parse_and_expand_run(char *input, char *language, char *country, libpostal_normalize_options_t options,
+                                int root, parse_and_expand_result_t *result) {
+    memset(result, 0, sizeof(parse_and_expand_result_t));
+
+    libpostal_address_parser_options_t parser_options = libpostal_get_address_parser_default_options();
+    parser_options.language = language;
+    parser_options.country = country;
+
+    PyThread_acquire_lock(parser_lock, WAIT_LOCK);
+    result->parsed = libpostal_parse_address(input, parser_options);
+    PyThread_release_lock(parser_lock);
+
+    if (result->parsed == NULL) {
+        return 0;
+    }
+
+    size_t num_components = result->parsed->num_components;
+    result->expansions = calloc(num_components > 0 ? num_components : 1, sizeof(char **));
+    result->num_expansions = calloc(num_components > 0 ? num_components : 1, sizeof(size_t));
+    if (result->expansions == NULL || result->num_expansions == NULL) {
+        return 0;
+    }
+
+    libpostal_language_classifier_response_t *classified = NULL;
+    if (options.num_languages == 0) {
+        if (language != NULL) {
+            options.languages = &language;
+            options.num_languages = 1;
+        } else if (num_components > 0) {
+            classified = libpostal_classify_language(input);
+            if (classified != NULL) {
+                options.languages = classified->languages;
+                options.num_languages = classified->num_languages;
+            }
+        }
+    }
+
+    for (size_t i = 0; i < num_components; i++) {
+        options.address_components = label_address_components(result->parsed->labels[i]);
+        if (!root) {
+            result->expansions[i] = libpostal_expand_address(result->parsed->components[i], options, &result->num_expansions[i]);
+        } else {
+            result->expansions[i] = libpostal_expand_address_root(result->parsed->components[i], options, &result->num_expansions[i]);
+        }
+    }
+
+    if (classified != NULL) {
+        libpostal_language_classifier_response_destroy(classified);
+    }
+    return 1;
+}
+
+static PyObject *PyObject_from_parse_and_expand_result(parse_and_expand_result_t *result, int output) {
+    libpostal_address_parser_response_t *parsed = result->parsed;
+    PyObject *list = PyList_New((Py_ssize_t)parsed->num_components);
+    if (list == NULL) {
+        return NULL;
+    }
+
+    for (size_t i = 0; i < parsed->num_components; i++) {
+        PyObject *item = PyStructSequence_New(&ExpandedComponentType);
+        if (item == NULL) {
+            goto error;
+        }
+        PyList_SET_ITEM(list, (Py_ssize_t)i, item);
+
+        PyObject *component = PyUnicode_DecodeUTF8((const char *)parsed->components[i], strlen(parsed->components[i]), "strict");
+        if (component == NULL) {
+            goto error;
+        }
+        PyStructSequence_SET_ITEM(item, 0, component);
+
+        PyObject *label = label_to_unicode(parsed->labels[i]);
+        if (label == NULL) {
+            goto error;
+        }
+        PyStructSequence_SET_ITEM(item, 1, label);
+
+        PyObject *expansions = PyObject_from_strings_output(result->expansions[i], result->expansions[i] != NULL ? result->num_expansions[i] : 0, output);
+        if (expansions == NULL) {
+            goto error;
+        }
+        PyStructSequence_SET_ITEM(item, 2, expansions);
+    }
+
+    return list;
+
+error:
+    Py_DECREF(list);
+    return NULL;
+}
+
+/* Expansion options from an ExpandOptions or None, and the components to set up for them */
+static int parse_and_expand_options(PyObject *arg_options, int need_classifier, libpostal_normalize_options_t *options, uint32_t *components) {
+    *components = PYPOSTAL_COMPONENT_LIBPOSTAL | PYPOSTAL_COMPONENT_PARSER;
+
+    if (arg_options == Py_None) {
+        *options = libpostal_get_default_options();
+    } else {
+        int is_options = pypostal_expand_options_check(arg_options);
+        if (is_options < 0) {
+            return 0;
+        } else if (!is_options) {
+            PyErr_SetString(PyExc_TypeError, "options must be an ExpandOptions instance");
+            return 0;
+        }
+        *options = ((ExpandOptionsObject *)arg_options)->options;
+    }
+
+    if (options->num_languages == 0 && need_classifier) {
+        *components |= PYPOSTAL_COMPONENT_LANGUAGE_CLASSIFIER;
+    }
+    return 1;
+}
+
+
+static PyObject *py_parse_and_expand(PyObject *self, PyObject *args, PyObject *keywords) {
+    PyObject *arg_input;
+    PyObject *arg_language = Py_None;
+    PyObject *arg_country = Py_None;
+    PyObject *arg_options = Py_None;
+    int root = 0;
+    PyObject *arg_output = Py_None;
 
     PyObject *result = NULL;
+    size_t num_components = 0;
+
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
 
     static char *kwlist[] = {"address",
                              "language",
                              "country",
+                             "options",
+                             "root",
+                             "output",
                              NULL
                             };
 
-
-    if (!PyArg_ParseTupleAndKeywords(args, keywords, 
-                                     "O|OO:pyparser", kwlist,
-                                     &arg_input, &arg_language,
-                                     &arg_country
+    if (!PyArg_ParseTupleAndKeywords(args, keywords,
+                                     "O|OOOpO:parse_and_expand", kwlist,
+                                     &arg_input, &arg_language, &arg_country,
+                                     &arg_options, &root, &arg_output
                                      )) {
-        return 0;
+        return NULL;
     }
 
-    char *input = PyObject_to_string(arg_input);
+    int output = pypostal_output_mode(arg_output);
+    if (output < 0) {
+        return NULL;
+    }
+
+    libpostal_normalize_options_t options;
+    uint32_t components;
+    if (!parse_and_expand_options(arg_options, arg_language == Py_None, &options, &components)) {
+        return NULL;
+    }
 
+    if (!pypostal_setup(components, NULL)) {
+        return NULL;
+    }
+
+    char *input = (char *)PyObject_to_string_borrowed(arg_input);
     if (input == NULL) {
         return NULL;
     }
 
     char *language = NULL;
-
-    if (arg_language != Py_None) {
-        language = PyObject_to_string(arg_language);
-        if (language == NULL) {
-            goto exit_free_input;
-        }
+    if (arg_language != Py_None && (language = (char *)PyObject_to_string_borrowed(arg_language)) == NULL) {
+        return NULL;
     }
 
     char *country = NULL;
+    if (arg_country != Py_None && (country = (char *)PyObject_to_string_borrowed(arg_country)) == NULL) {
+        return NULL;
+    }
 
-    if (arg_country != Py_None) {
-        country = PyObject_to_string(arg_country);
-        if (country == NULL) {
-            goto exit_free_language;
+    parse_and_expand_result_t expanded;
+    int ok;
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
+
+    Py_BEGIN_ALLOW_THREADS
+    ok = parse_and_expand_run(input, language, country, options, root, &expanded);
+    Py_END_ALLOW_THREADS
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
+
+    if (!ok) {
+        if (expanded.parsed == NULL) {
+            PyErr_SetString(PyExc_ValueError, "Error parsing address");
+        } else {
+            PyErr_NoMemory();
         }
+        goto exit_parse_and_expand;
     }
-    
-    libpostal_address_parser_options_t options = libpostal_get_address_parser_default_options();
-    options.language = language;
-    options.country = country;
 
-    libpostal_address_parser_response_t *parsed = libpostal_parse_address(input, options);
-    if (parsed == NULL) {
-        goto exit_free_country;
+    num_components = expanded.parsed->num_components;
+    result = PyObject_from_parse_and_expand_result(&expanded, output);
+
+exit_parse_and_expand:
+    parse_and_expand_result_destroy(&expanded);
+    PYPOSTAL_METRIC_RECORD(&metrics[METRIC_PARSE_AND_EXPAND], &timer, strlen(input), num_components, result != NULL);
+    return result;
+}
+
+
+static PyObject *py_parse_and_expand_batch(PyObject *self, PyObject *args, PyObject *keywords) {
+    PyObject *arg_addresses;
+    PyObject *arg_language = Py_None;
+    PyObject *arg_country = Py_None;
+    PyObject *arg_options = Py_None;
+    int root = 0;
+    PyObject *arg_output = Py_None;
+
+    PyObject *result = NULL;
+
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
+    static char *kwlist[] = {"addresses",
+                             "language",
+                             "country",
+                             "options",
+                             "root",
+                             "output",
+                             NULL
+                            };
+
+    if (!PyArg_ParseTupleAndKeywords(args, keywords,
+                                     "O|OOOpO:parse_and_expand_batch", kwlist,
+                                     &arg_addresses, &arg_language, &arg_country,
+                                     &arg_options, &root, &arg_output
+                                     )) {
+        return NULL;
     }
 
-    result = PyList_New((Py_ssize_t)parsed->num_components);
-    if (!result) {
-        goto exit_destroy_response;
+    int output = pypostal_output_mode(arg_output);
+    if (output < 0) {
+        return NULL;
     }
 
-    for (int i = 0; i < parsed->num_components; i++) {
-        char *component = parsed->components[i];
-        char *label = parsed->labels[i];
-        PyObject *component_unicode = PyUnicode_DecodeUTF8((const char *)component, strlen(component), "strict");
-        if (component_unicode == NULL) {
-            Py_DECREF(result);
-            goto exit_destroy_response;
+    libpostal_normalize_options_t options;
+    uint32_t components;
+    // Per-row languages are checked once they're converted, below
+    if (!parse_and_expand_options(arg_options, arg_language == Py_None, &options, &components)) {
+        return NULL;
+    }
+
+    if (!pypostal_setup(components, NULL)) {
+        return NULL;
+    }
+
+    PyObject *addresses = pypostal_sequence_snapshot(arg_addresses, "addresses must be a sequence");
+    if (addresses == NULL) {
+        return NULL;
+    }
+
+    Py_ssize_t num_addresses = PySequence_Fast_GET_SIZE(addresses);
+
+    PyObject *languages = NULL;
+    PyObject *countries = NULL;
+
+    if (!parse_addresses_option_fast(arg_language, num_addresses, "language", &languages)) {
+        goto exit_batch_decref_addresses;
+    }
+
+    if (!parse_addresses_option_fast(arg_country, num_addresses, "country", &countries)) {
+        goto exit_batch_decref_languages;
+    }
+
+    char **inputs = calloc(num_addresses > 0 ? (size_t)num_addresses : 1, sizeof(char *) * 3);
+    parse_and_expand_result_t *results = calloc(num_addresses > 0 ? (size_t)num_addresses : 1, sizeof(parse_and_expand_result_t));
+    if (inputs == NULL || results == NULL) {
+        PyErr_NoMemory();
+        goto exit_batch_free_arrays;
+    }
+
+    char **input_languages = inputs + num_addresses;
+    char **input_countries = input_languages + num_addresses;
+
+    for (Py_ssize_t i = 0; i < num_addresses; i++) {
+        inputs[i] = (char *)PyObject_to_string_borrowed(PySequence_Fast_GET_ITEM(addresses, i));
+        if (inputs[i] == NULL ||
+            !parse_addresses_option_value(arg_language, languages, i, &input_languages[i]) ||
+            !parse_addresses_option_value(arg_country, countries, i, &input_countries[i])) {
+            goto exit_batch_free_arrays;
         }
+    }
 
-        PyObject *label_unicode = PyUnicode_DecodeUTF8((const char *)label, strlen(label), "strict");
-        if (label_unicode == NULL) {
-            Py_DECREF(component_unicode);
-            Py_DECREF(result);
-            goto exit_destroy_response;
+    // Per-row languages may leave some rows without one, set up the classifier for those
+    if (languages != NULL && options.num_languages == 0) {
+        for (Py_ssize_t i = 0; i < num_addresses; i++) {
+            if (input_languages[i] == NULL) {
+                if (!pypostal_setup(PYPOSTAL_COMPONENT_LANGUAGE_CLASSIFIER, NULL)) {
+                    goto exit_batch_free_arrays;
+                }
+                break;
+            }
         }
-        PyObject *tuple = Py_BuildValue("(OO)", component_unicode, label_unicode);
-        if (tuple == NULL) {
-            Py_DECREF(component_unicode);
-            Py_DECREF(label_unicode);
-            goto exit_destroy_response;
+    }
+
+    Py_ssize_t failed = -1;
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
+
+    Py_BEGIN_ALLOW_THREADS
+    for (Py_ssize_t i = 0; i < num_addresses; i++) {
+        if (!parse_and_expand_run(inputs[i], input_languages[i], input_countries[i], options, root, &results[i])) {
+            failed = i;
+            break;
         }
+    }
+    Py_END_ALLOW_THREADS
 
-        // Note: PyList_SetItem steals a reference, so don't worry about DECREF
-        PyList_SetItem(result, (Py_ssize_t)i, tuple);
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
 
-        Py_DECREF(component_unicode);
-        Py_DECREF(label_unicode);
+    if (failed >= 0) {
+        if (results[failed].parsed == NULL) {
+            PyErr_SetString(PyExc_ValueError, "Error parsing address");
+        } else {
+            PyErr_NoMemory();
+        }
+        goto exit_batch_destroy_results;
     }
 
-exit_destroy_response:
-    libpostal_address_parser_response_destroy(parsed);
-exit_free_country:
-    if (country != NULL) {
-        free(country);
+    result = PyList_New(num_addresses);
+    if (result == NULL) {
+        goto exit_batch_destroy_results;
     }
-exit_free_language:
-    if (language != NULL) {
-        free(language);
+
+    for (Py_ssize_t i = 0; i < num_addresses; i++) {
+        PyObject *item = PyObject_from_parse_and_expand_result(&results[i], output);
+        if (item == NULL) {
+            Py_CLEAR(result);
+            goto exit_batch_destroy_results;
+        }
+        PyList_SET_ITEM(result, i, item);
     }
-exit_free_input:
-    if (input != NULL) {
-        free(input);
+
+exit_batch_destroy_results:
+    if (timer.enabled) {
+        size_t input_bytes = 0;
+        size_t num_components = 0;
+        for (Py_ssize_t i = 0; i < num_addresses; i++) {
+            input_bytes += strlen(inputs[i]);
+            num_components += results[i].parsed != NULL ? results[i].parsed->num_components : 0;
+        }
+        pypostal_metric_record(&metrics[METRIC_PARSE_AND_EXPAND_BATCH], &timer, input_bytes, num_components, result != NULL);
     }
+    for (Py_ssize_t i = 0; i < num_addresses; i++) {
+        parse_and_expand_result_destroy(&results[i]);
+    }
+exit_batch_free_arrays:
+    free(inputs);
+    free(results);
+    Py_XDECREF(countries);
+exit_batch_decref_languages:
+    Py_XDECREF(languages);
+exit_batch_decref_addresses:
+    Py_DECREF(addresses);
     return result;
 }
 
+
+static PyObject *py_setup_parser(PyObject *self, PyObject *args, PyObject *keywords) {
+    return pypostal_py_setup(args, keywords, PYPOSTAL_COMPONENT_PARSER);
+}
+
 static PyMethodDef parser_methods[] = {
-    {"parse_address", (PyCFunction)py_parse_address, METH_VARARGS | METH_KEYWORDS, "parse_address(text, language, country)"},
+    {"setup_parser", (PyCFunction)py_setup_parser, METH_VARARGS | METH_KEYWORDS, "setup_parser(datadir=None)"},
+    {"parse_address", (PyCFunction)py_parse_address, METH_VARARGS | METH_KEYWORDS, "parse_address(text, language, country, compact=False)"},
+    {"parse_addresses", (PyCFunction)py_parse_addresses, METH_VARARGS | METH_KEYWORDS, "parse_addresses(addresses, language, country, compact=False)"},
+    {"parse_address_arrow", (PyCFunction)py_parse_address_arrow, METH_VARARGS | METH_KEYWORDS, "parse_address_arrow(validity, offsets, data, offset, length, large, language, country)"},
+    {"parse_and_expand", (PyCFunction)py_parse_and_expand, METH_VARARGS | METH_KEYWORDS, "parse_and_expand(address, language=None, country=None, options=None, root=False, output=None)"},
+    {"parse_and_expand_batch", (PyCFunction)py_parse_and_expand_batch, METH_VARARGS | METH_KEYWORDS, "parse_and_expand_batch(addresses, language=None, country=None, options=None, root=False, output=None)"},
+    PYPOSTAL_METRICS_METHODS,
     {NULL, NULL},
 };
 
@@ -141,6 +1573,7 @@ static int parser_traverse(PyObject *m, visitproc visit, void *arg) {
 
 static int parser_clear(PyObject *m) {
     Py_CLEAR(GETSTATE(m)->error);
+    clear_label_cache();
     libpostal_teardown();
     libpostal_teardown_parser();
     return 0;
@@ -192,12 +1625,35 @@ init_parser(void) {
         INITERROR;
     }
 
-   char* datadir = getenv("LIBPOSTAL_DATA_DIR");
+    if (PyType_Ready(&ParsedAddressType) < 0) {
+        Py_DECREF(module);
+        INITERROR;
+    }
+
+    Py_INCREF(&ParsedAddressType);
+    PyModule_AddObject(module, "ParsedAddress", (PyObject *)&ParsedAddressType);
 
-    if ((datadir!=NULL) && (!libpostal_setup_datadir(datadir) || !libpostal_setup_parser_datadir(datadir)) ||
-        (!libpostal_setup() || !libpostal_setup_parser())) {
-            PyErr_SetString(PyExc_TypeError,
-                            "Error loading libpostal data");
+    if (ExpandedComponentType.tp_name == NULL) {
+#ifdef IS_PY3K
+        if (PyStructSequence_InitType2(&ExpandedComponentType, &expanded_component_desc) < 0) {
+            Py_DECREF(module);
+            INITERROR;
+        }
+#else
+        PyStructSequence_InitType(&ExpandedComponentType, &expanded_component_desc);
+#endif
+    }
+
+    Py_INCREF(&ExpandedComponentType);
+    PyModule_AddObject(module, "ExpandedComponent", (PyObject *)&ExpandedComponentType);
+
+    if (parser_lock == NULL) {
+        parser_lock = PyThread_allocate_lock();
+        if (parser_lock == NULL) {
+            PyErr_SetString(PyExc_RuntimeError, "Could not allocate parser lock");
+            Py_DECREF(module);
+            INITERROR;
+        }
     }
 
 #ifndef IS_PY3K
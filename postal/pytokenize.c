@@ -20,11 +20,25 @@ struct module_state {
     static struct module_state _state;
 #endif
 
+
+#define METRIC_TOKENIZE 0
+
+static pypostal_metric_t metrics[] = {
+    {"tokenize"},
+    {NULL}
+};
+
+PYPOSTAL_METRICS_FUNCTIONS(metrics)
+
+
 static PyObject *py_tokenize(PyObject *self, PyObject *args) 
 {
     PyObject *arg1;
     uint32_t arg_whitespace = 0;
 
+    pypostal_timer_t timer;
+    pypostal_timer_start(&timer);
+
     if (!PyArg_ParseTuple(args, "OI:tokenize", &arg1, &arg_whitespace)) {
         return 0;
     }
@@ -37,9 +51,18 @@ static PyObject *py_tokenize(PyObject *self, PyObject *args)
         return 0;
     }
 
-    size_t num_tokens;
+    size_t num_tokens = 0;
+
+    libpostal_token_t *tokens = NULL;
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_CONVERT);
+
+    Py_BEGIN_ALLOW_THREADS
+    tokens = libpostal_tokenize(input, whitespace, &num_tokens);
+    Py_END_ALLOW_THREADS
+
+    pypostal_timer_phase(&timer, PYPOSTAL_PHASE_LIBPOSTAL);
 
-    libpostal_token_t *tokens = libpostal_tokenize(input, whitespace, &num_tokens);
     if (tokens == NULL) {
         goto error_free_input;
     }
@@ -60,6 +83,8 @@ static PyObject *py_tokenize(PyObject *self, PyObject *args)
         }
     }
 
+    PYPOSTAL_METRIC_RECORD(&metrics[METRIC_TOKENIZE], &timer, strlen(input), num_tokens, 1);
+
     free(input);
     free(tokens);
 
@@ -68,12 +93,273 @@ static PyObject *py_tokenize(PyObject *self, PyObject *args)
 error_free_tokens:
     free(tokens);
 error_free_input:
+    PYPOSTAL_METRIC_RECORD(&metrics[METRIC_TOKENIZE], &timer, strlen(input), 0, 0);
     free(input);
     return 0;
 }
 
+#define TOKEN_OFFSETS_BYTES 0
+#define TOKEN_OFFSETS_CODE_POINTS 1
+
+typedef struct token_arrays {
+    uint32_t *offsets;
+    uint32_t *lengths;
+    uint32_t *types;
+    size_t n;
+    size_t m;
+} token_arrays_t;
+
+static bool token_arrays_init(token_arrays_t *arrays, size_t size) {
+    if (size == 0) size = 1;
+    arrays->offsets = malloc(size * sizeof(uint32_t));
+    arrays->lengths = malloc(size * sizeof(uint32_t));
+    arrays->types = malloc(size * sizeof(uint32_t));
+    arrays->n = 0;
+    arrays->m = size;
+    return arrays->offsets != NULL && arrays->lengths != NULL && arrays->types != NULL;
+}
+
+static bool token_arrays_reserve(token_arrays_t *arrays, size_t size) {
+    if (size <= arrays->m) return true;
+
+    size_t m = arrays->m;
+    while (m < size) {
+        m *= 2;
+    }
+
+    uint32_t *offsets = realloc(arrays->offsets, m * sizeof(uint32_t));
+    if (offsets == NULL) return false;
+    arrays->offsets = offsets;
+
+    uint32_t *lengths = realloc(arrays->lengths, m * sizeof(uint32_t));
+    if (lengths == NULL) return false;
+    arrays->lengths = lengths;
+
+    uint32_t *types = realloc(arrays->types, m * sizeof(uint32_t));
+    if (types == NULL) return false;
+    arrays->types = types;
+
+    arrays->m = m;
+    return true;
+}
+
+static void token_arrays_destroy(token_arrays_t *arrays) {
+    free(arrays->offsets);
+    free(arrays->lengths);
+    free(arrays->types);
+}
+
+static inline size_t utf8_num_code_points(const char *str, size_t len) {
+    size_t n = 0;
+    for (size_t i = 0; i < len; i++) {
+        // Count every byte which isn't a continuation byte
+        if (((unsigned char)str[i] & 0xC0) != 0x80) n++;
+    }
+    return n;
+}
+
+/* Appends the tokens to arrays, converting byte offsets/lengths to code points if requested.
+   Tokens are expected in order, which is how libpostal's tokenizer returns them. */
+static bool token_arrays_append(token_arrays_t *arrays, const char *input, libpostal_token_t *tokens, size_t num_tokens, int unit) {
+    if (!token_arrays_reserve(arrays, arrays->n + num_tokens)) {
+        return false;
+    }
+
+    size_t byte_pos = 0;
+    size_t code_point_pos = 0;
+
+    for (size_t i = 0; i < num_tokens; i++) {
+        libpostal_token_t token = tokens[i];
+        size_t j = arrays->n + i;
+
+        if (unit == TOKEN_OFFSETS_CODE_POINTS) {
+            if (token.offset < byte_pos) {
+                byte_pos = 0;
+                code_point_pos = 0;
+            }
+            code_point_pos += utf8_num_code_points(input + byte_pos, token.offset - byte_pos);
+            size_t len = utf8_num_code_points(input + token.offset, token.len);
+
+            arrays->offsets[j] = (uint32_t)code_point_pos;
+            arrays->lengths[j] = (uint32_t)len;
+
+            byte_pos = token.offset + token.len;
+            code_point_pos += len;
+        } else {
+            arrays->offsets[j] = (uint32_t)token.offset;
+            arrays->lengths[j] = (uint32_t)token.len;
+        }
+        arrays->types[j] = (uint32_t)token.type;
+    }
+
+    arrays->n += num_tokens;
+    return true;
+}
+
+static PyObject *token_arrays_to_tuple(token_arrays_t *arrays, PyObject *row_index) {
+    PyObject *offsets = PyBytes_FromStringAndSize((const char *)arrays->offsets, arrays->n * sizeof(uint32_t));
+    PyObject *lengths = PyBytes_FromStringAndSize((const char *)arrays->lengths, arrays->n * sizeof(uint32_t));
+    PyObject *types = PyBytes_FromStringAndSize((const char *)arrays->types, arrays->n * sizeof(uint32_t));
+
+    PyObject *result = NULL;
+    if (offsets != NULL && lengths != NULL && types != NULL) {
+        if (row_index != NULL) {
+            result = PyTuple_Pack(4, offsets, lengths, types, row_index);
+        } else {
+            result = PyTuple_Pack(3, offsets, lengths, types);
+        }
+    }
+
+    Py_XDECREF(offsets);
+    Py_XDECREF(lengths);
+    Py_XDECREF(types);
+    return result;
+}
+
+static bool check_unit(int unit) {
+    if (unit != TOKEN_OFFSETS_BYTES && unit != TOKEN_OFFSETS_CODE_POINTS) {
+        PyErr_SetString(PyExc_ValueError, "unit must be TOKEN_OFFSETS_BYTES or TOKEN_OFFSETS_CODE_POINTS");
+        return false;
+    }
+    return true;
+}
+
+static PyObject *py_tokenize_arrays(PyObject *self, PyObject *args)
+{
+    PyObject *arg1;
+    uint32_t arg_whitespace = 0;
+    int unit = TOKEN_OFFSETS_BYTES;
+
+    if (!PyArg_ParseTuple(args, "OI|i:tokenize_arrays", &arg1, &arg_whitespace, &unit)) {
+        return 0;
+    }
+
+    if (!check_unit(unit)) {
+        return 0;
+    }
+
+    bool whitespace = arg_whitespace;
+
+    const char *input = PyObject_to_string_borrowed(arg1);
+    if (input == NULL) {
+        return 0;
+    }
+
+    size_t num_tokens = 0;
+    libpostal_token_t *tokens = NULL;
+
+    Py_BEGIN_ALLOW_THREADS
+    tokens = libpostal_tokenize((char *)input, whitespace, &num_tokens);
+    Py_END_ALLOW_THREADS
+    if (tokens == NULL) {
+        return 0;
+    }
+
+    PyObject *result = NULL;
+    token_arrays_t arrays;
+    if (!token_arrays_init(&arrays, num_tokens) || !token_arrays_append(&arrays, input, tokens, num_tokens, unit)) {
+        PyErr_NoMemory();
+    } else {
+        result = token_arrays_to_tuple(&arrays, NULL);
+    }
+
+    token_arrays_destroy(&arrays);
+    free(tokens);
+    return result;
+}
+
+static PyObject *py_tokenize_arrays_batch(PyObject *self, PyObject *args)
+{
+    PyObject *arg_strings;
+    uint32_t arg_whitespace = 0;
+    int unit = TOKEN_OFFSETS_BYTES;
+
+    if (!PyArg_ParseTuple(args, "OI|i:tokenize_arrays_batch", &arg_strings, &arg_whitespace, &unit)) {
+        return 0;
+    }
+
+    if (!check_unit(unit)) {
+        return 0;
+    }
+
+    bool whitespace = arg_whitespace;
+
+    PyObject *seq = pypostal_sequence_snapshot(arg_strings, "strings must be a sequence");
+    if (seq == NULL) {
+        return 0;
+    }
+
+    Py_ssize_t num_strings = PySequence_Fast_GET_SIZE(seq);
+
+    PyObject *result = NULL;
+    uint64_t *row_index = NULL;
+    const char **inputs = NULL;
+    token_arrays_t arrays;
+
+    if (!token_arrays_init(&arrays, (size_t)num_strings * 8)) {
+        PyErr_NoMemory();
+        goto exit_destroy_arrays;
+    }
+
+    row_index = malloc(((size_t)num_strings + 1) * sizeof(uint64_t));
+    inputs = malloc(((size_t)num_strings + 1) * sizeof(char *));
+    if (row_index == NULL || inputs == NULL) {
+        PyErr_NoMemory();
+        goto exit_destroy_arrays;
+    }
+
+    // The UTF-8 views are owned by the string objects, which the snapshot in seq keeps alive
+    for (Py_ssize_t i = 0; i < num_strings; i++) {
+        inputs[i] = PyObject_to_string_borrowed(PySequence_Fast_GET_ITEM(seq, i));
+        if (inputs[i] == NULL) {
+            goto exit_destroy_arrays;
+        }
+    }
+
+    bool ok = true;
+
+    Py_BEGIN_ALLOW_THREADS
+    row_index[0] = 0;
+    for (Py_ssize_t i = 0; i < num_strings; i++) {
+        size_t num_tokens = 0;
+        libpostal_token_t *tokens = libpostal_tokenize((char *)inputs[i], whitespace, &num_tokens);
+        if (tokens == NULL) {
+            num_tokens = 0;
+        } else {
+            ok = token_arrays_append(&arrays, inputs[i], tokens, num_tokens, unit);
+            free(tokens);
+            if (!ok) break;
+        }
+        row_index[i + 1] = (uint64_t)arrays.n;
+    }
+    Py_END_ALLOW_THREADS
+
+    if (!ok) {
+        PyErr_NoMemory();
+        goto exit_destroy_arrays;
+    }
+
+    PyObject *py_row_index = PyBytes_FromStringAndSize((const char *)row_index, ((size_t)num_strings + 1) * sizeof(uint64_t));
+    if (py_row_index == NULL) {
+        goto exit_destroy_arrays;
+    }
+
+    result = token_arrays_to_tuple(&arrays, py_row_index);
+    Py_DECREF(py_row_index);
+
+exit_destroy_arrays:
+    token_arrays_destroy(&arrays);
+    free(row_index);
+    free(inputs);
+    Py_DECREF(seq);
+    return result;
+}
+
 static PyMethodDef tokenize_methods[] = {
     {"tokenize", (PyCFunction)py_tokenize, METH_VARARGS, "tokenize(text, whitespace)"},
+    PYPOSTAL_METRICS_METHODS,
+    {"tokenize_arrays", (PyCFunction)py_tokenize_arrays, METH_VARARGS, "tokenize_arrays(text, whitespace, unit=TOKEN_OFFSETS_BYTES)"},
+    {"tokenize_arrays_batch", (PyCFunction)py_tokenize_arrays_batch, METH_VARARGS, "tokenize_arrays_batch(texts, whitespace, unit=TOKEN_OFFSETS_BYTES)"},
     {NULL, NULL},
 };
 
@@ -129,6 +415,9 @@ init_tokenize(void) {
         INITERROR;
     }
 
+    PyModule_AddObject(module, "TOKEN_OFFSETS_BYTES", PyLong_FromLong(TOKEN_OFFSETS_BYTES));
+    PyModule_AddObject(module, "TOKEN_OFFSETS_CODE_POINTS", PyLong_FromLong(TOKEN_OFFSETS_CODE_POINTS));
+
 #if PY_MAJOR_VERSION >= 3
     return module;
 #endif
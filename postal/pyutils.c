@@ -1,5 +1,100 @@
 #include "pyutils.h"
 
+#include <libpostal/libpostal.h>
+
+#ifdef _WIN32
+#include <windows.h>
+#else
+#include <time.h>
+#endif
+
+static uint32_t loaded_components = 0;
+
+/* Load any of the requested components which haven't been loaded yet. libpostal
+   itself skips modules that are already in memory, so this is safe to call from
+   every extension module. Uses datadir if given, otherwise $LIBPOSTAL_DATA_DIR
+   or libpostal's compiled-in default. Returns 0 with an exception set on error. */
+int pypostal_setup(uint32_t components, char *datadir) {
+    uint32_t missing = components & ~loaded_components;
+    if (missing == 0) {
+        return 1;
+    }
+
+    if (datadir == NULL) {
+        datadir = getenv("LIBPOSTAL_DATA_DIR");
+    }
+
+    // Everything else depends on the base libpostal data
+    if (missing & (PYPOSTAL_COMPONENT_LANGUAGE_CLASSIFIER | PYPOSTAL_COMPONENT_PARSER)) {
+        missing |= (~loaded_components & PYPOSTAL_COMPONENT_LIBPOSTAL);
+    }
+
+    if (missing & PYPOSTAL_COMPONENT_LIBPOSTAL) {
+        if (!(datadir != NULL ? libpostal_setup_datadir(datadir) : libpostal_setup())) {
+            PyErr_SetString(PyExc_RuntimeError,
+                            "Error loading libpostal data");
+            return 0;
+        }
+        loaded_components |= PYPOSTAL_COMPONENT_LIBPOSTAL;
+    }
+
+    if (missing & PYPOSTAL_COMPONENT_LANGUAGE_CLASSIFIER) {
+        if (!(datadir != NULL ? libpostal_setup_language_classifier_datadir(datadir) : libpostal_setup_language_classifier())) {
+            PyErr_SetString(PyExc_RuntimeError,
+                            "Error loading libpostal language classifier");
+            return 0;
+        }
+        loaded_components |= PYPOSTAL_COMPONENT_LANGUAGE_CLASSIFIER;
+    }
+
+    if (missing & PYPOSTAL_COMPONENT_PARSER) {
+        if (!(datadir != NULL ? libpostal_setup_parser_datadir(datadir) : libpostal_setup_parser())) {
+            PyErr_SetString(PyExc_RuntimeError,
+                            "Error loading libpostal address parser");
+            return 0;
+        }
+        loaded_components |= PYPOSTAL_COMPONENT_PARSER;
+    }
+
+    return 1;
+}
+
+/* Shared implementation of the setup_* functions exposed by the extension modules */
+PyObject *pypostal_py_setup(PyObject *args, PyObject *keywords, uint32_t components) {
+    PyObject *arg_datadir = Py_None;
+
+    static char *kwlist[] = {"datadir",
+                             NULL
+                            };
+
+    if (!PyArg_ParseTupleAndKeywords(args, keywords,
+                                     "|O:setup", kwlist,
+                                     &arg_datadir
+                                     )) {
+        return 0;
+    }
+
+    char *datadir = NULL;
+    if (arg_datadir != Py_None) {
+        datadir = PyObject_to_string(arg_datadir);
+        if (datadir == NULL) {
+            return NULL;
+        }
+    }
+
+    int ret = pypostal_setup(components, datadir);
+
+    if (datadir != NULL) {
+        free(datadir);
+    }
+
+    if (!ret) {
+        return NULL;
+    }
+
+    Py_RETURN_TRUE;
+}
+
 
 void string_array_destroy(char **strings, size_t num_strings) {
     if (strings != NULL) {
@@ -67,6 +162,35 @@ char *PyObject_to_string(PyObject *obj) {
 }
 
 
+/* Like PyObject_to_string but without the copy. The returned pointer is only
+   valid for as long as obj is alive, and must not be freed by the caller. */
+const char *PyObject_to_string_borrowed(PyObject *obj) {
+    if (PyUnicode_Check(obj)) {
+        return PyUnicode_AsUTF8(obj);
+    } else if (PyBytes_Check(obj)) {
+        return PyBytes_AS_STRING(obj);
+    }
+
+    PyErr_SetString(PyExc_TypeError,
+                    "Parameter must be bytes or unicode");
+    return NULL;
+}
+
+
+PyObject *pypostal_sequence_snapshot(PyObject *obj, const char *message) {
+    if (PyTuple_CheckExact(obj)) {
+        Py_INCREF(obj);
+        return obj;
+    }
+
+    PyObject *result = PySequence_Tuple(obj);
+    if (result == NULL && PyErr_ExceptionMatches(PyExc_TypeError)) {
+        PyErr_SetString(PyExc_TypeError, message);
+    }
+    return result;
+}
+
+
 char **PyObject_to_strings_max_len(PyObject *obj, ssize_t max_len, size_t *num_strings) {
     char **out = NULL;
     size_t n = 0;
@@ -158,3 +282,530 @@ PyObject *PyObject_from_strings(char **strings, size_t num_strings) {
 }
 
 
+
+/* MurmurHash3_x64_128 (Austin Appleby, public domain). Blocks are read as
+   little-endian regardless of the platform so hashes are the same everywhere. */
+static inline uint64_t murmur_rotl64(uint64_t x, int8_t r) {
+    return (x << r) | (x >> (64 - r));
+}
+
+static inline uint64_t murmur_fmix64(uint64_t k) {
+    k ^= k >> 33;
+    k *= 0xff51afd7ed558ccdULL;
+    k ^= k >> 33;
+    k *= 0xc4ceb9fe1a85ec53ULL;
+    k ^= k >> 33;
+    return k;
+}
+
+static inline uint64_t murmur_read64(const uint8_t *p) {
+    return (uint64_t)p[0] | ((uint64_t)p[1] << 8) | ((uint64_t)p[2] << 16) | ((uint64_t)p[3] << 24) |
+           ((uint64_t)p[4] << 32) | ((uint64_t)p[5] << 40) | ((uint64_t)p[6] << 48) | ((uint64_t)p[7] << 56);
+}
+
+void pypostal_murmurhash3_x64_128(const void *key, size_t len, uint32_t seed, uint64_t out[2]) {
+    const uint8_t *data = (const uint8_t *)key;
+    const size_t num_blocks = len / 16;
+
+    uint64_t h1 = seed;
+    uint64_t h2 = seed;
+
+    const uint64_t c1 = 0x87c37b91114253d5ULL;
+    const uint64_t c2 = 0x4cf5ad432745937fULL;
+
+    for (size_t i = 0; i < num_blocks; i++) {
+        uint64_t k1 = murmur_read64(data + i * 16);
+        uint64_t k2 = murmur_read64(data + i * 16 + 8);
+
+        k1 *= c1; k1 = murmur_rotl64(k1, 31); k1 *= c2; h1 ^= k1;
+        h1 = murmur_rotl64(h1, 27); h1 += h2; h1 = h1 * 5 + 0x52dce729;
+
+        k2 *= c2; k2 = murmur_rotl64(k2, 33); k2 *= c1; h2 ^= k2;
+        h2 = murmur_rotl64(h2, 31); h2 += h1; h2 = h2 * 5 + 0x38495ab5;
+    }
+
+    const uint8_t *tail = data + num_blocks * 16;
+    uint64_t k1 = 0;
+    uint64_t k2 = 0;
+
+    switch (len & 15) {
+        case 15: k2 ^= ((uint64_t)tail[14]) << 48; /* fall through */
+        case 14: k2 ^= ((uint64_t)tail[13]) << 40; /* fall through */
+        case 13: k2 ^= ((uint64_t)tail[12]) << 32; /* fall through */
+        case 12: k2 ^= ((uint64_t)tail[11]) << 24; /* fall through */
+        case 11: k2 ^= ((uint64_t)tail[10]) << 16; /* fall through */
+        case 10: k2 ^= ((uint64_t)tail[9]) << 8; /* fall through */
+        case 9: k2 ^= ((uint64_t)tail[8]);
+            k2 *= c2; k2 = murmur_rotl64(k2, 33); k2 *= c1; h2 ^= k2; /* fall through */
+        case 8: k1 ^= ((uint64_t)tail[7]) << 56; /* fall through */
+        case 7: k1 ^= ((uint64_t)tail[6]) << 48; /* fall through */
+        case 6: k1 ^= ((uint64_t)tail[5]) << 40; /* fall through */
+        case 5: k1 ^= ((uint64_t)tail[4]) << 32; /* fall through */
+        case 4: k1 ^= ((uint64_t)tail[3]) << 24; /* fall through */
+        case 3: k1 ^= ((uint64_t)tail[2]) << 16; /* fall through */
+        case 2: k1 ^= ((uint64_t)tail[1]) << 8; /* fall through */
+        case 1: k1 ^= ((uint64_t)tail[0]);
+            k1 *= c1; k1 = murmur_rotl64(k1, 31); k1 *= c2; h1 ^= k1;
+    }
+
+    h1 ^= (uint64_t)len;
+    h2 ^= (uint64_t)len;
+
+    h1 += h2;
+    h2 += h1;
+
+    h1 = murmur_fmix64(h1);
+    h2 = murmur_fmix64(h2);
+
+    h1 += h2;
+    h2 += h1;
+
+    out[0] = h1;
+    out[1] = h2;
+}
+
+
+int pypostal_output_mode(PyObject *arg) {
+    if (arg == NULL || arg == Py_None) {
+        return PYPOSTAL_OUTPUT_STRINGS;
+    }
+
+    const char *name = PyObject_to_string_borrowed(arg);
+    if (name == NULL) {
+        return -1;
+    }
+
+    if (strcmp(name, "strings") == 0) {
+        return PYPOSTAL_OUTPUT_STRINGS;
+    } else if (strcmp(name, "hash64") == 0) {
+        return PYPOSTAL_OUTPUT_HASH64;
+    } else if (strcmp(name, "hash128") == 0) {
+        return PYPOSTAL_OUTPUT_HASH128;
+    }
+
+    PyErr_Format(PyExc_ValueError, "Invalid output: %s, must be one of strings, hash64, hash128", name);
+    return -1;
+}
+
+
+PyObject *PyObject_hashes_from_strings(char **strings, size_t num_strings, int mode) {
+    size_t width = mode == PYPOSTAL_OUTPUT_HASH128 ? 2 : 1;
+    PyObject *result = PyBytes_FromStringAndSize(NULL, (Py_ssize_t)(num_strings * width * sizeof(uint64_t)));
+    if (result == NULL) {
+        return NULL;
+    }
+
+    uint64_t *hashes = (uint64_t *)PyBytes_AS_STRING(result);
+    for (size_t i = 0; i < num_strings; i++) {
+        uint64_t hash[2];
+        pypostal_murmurhash3_x64_128(strings[i], strlen(strings[i]), 0, hash);
+        hashes[i * width] = hash[0];
+        if (width == 2) {
+            hashes[i * width + 1] = hash[1];
+        }
+    }
+    return result;
+}
+
+
+PyObject *PyObject_from_strings_output(char **strings, size_t num_strings, int mode) {
+    if (mode == PYPOSTAL_OUTPUT_STRINGS) {
+        return PyObject_from_strings(strings, num_strings);
+    }
+    return PyObject_hashes_from_strings(strings, num_strings, mode);
+}
+
+
+
+int pypostal_limits_init(pypostal_limits_t *limits, Py_ssize_t max_expansions, Py_ssize_t max_input_bytes) {
+    if (max_expansions < 0 || max_input_bytes < 0) {
+        PyErr_SetString(PyExc_ValueError, "max_expansions and max_input_bytes must not be negative");
+        return 0;
+    }
+    limits->max_expansions = max_expansions;
+    limits->max_input_bytes = max_input_bytes;
+    return 1;
+}
+
+int pypostal_limits_check_input(pypostal_limits_t *limits, const char *input, pypostal_metric_t *metric) {
+    if (limits->max_input_bytes > 0) {
+        size_t input_bytes = strlen(input);
+        if (input_bytes > (size_t)limits->max_input_bytes) {
+            metric->rejected++;
+            PyErr_Format(PyExc_ValueError, "input of %zu bytes exceeds max_input_bytes=%zd",
+                         input_bytes, limits->max_input_bytes);
+            return 0;
+        }
+    }
+    return 1;
+}
+
+PyObject *PyObject_from_strings_limited(char **strings, size_t num_strings, int mode, pypostal_limits_t *limits,
+                                        pypostal_metric_t *metric) {
+    int truncated = 0;
+    PyObject *result;
+
+    if (strings == NULL) {
+        result = Py_None;
+        Py_INCREF(Py_None);
+    } else {
+        if (limits->max_expansions > 0 && num_strings > (size_t)limits->max_expansions) {
+            num_strings = (size_t)limits->max_expansions;
+            truncated = 1;
+            metric->truncated++;
+        }
+        result = PyObject_from_strings_output(strings, num_strings, mode);
+        if (result == NULL) {
+            return NULL;
+        }
+    }
+
+    if (!PYPOSTAL_LIMITS_ACTIVE(limits)) {
+        return result;
+    }
+
+    return Py_BuildValue("(NO)", result, truncated ? Py_True : Py_False);
+}
+
+
+
+/* Instrumentation, see pyutils.h. Each extension module compiles its own copy of
+   this file, so the flag is per module and postal.metrics sets it on all of them. */
+int pypostal_metrics_enabled = 0;
+
+static const char *phase_names[PYPOSTAL_NUM_PHASES] = {"convert", "libpostal", "result"};
+
+uint64_t pypostal_time_ns(void) {
+#ifdef _WIN32
+    static LARGE_INTEGER frequency = {0};
+    LARGE_INTEGER counter;
+    if (frequency.QuadPart == 0) {
+        QueryPerformanceFrequency(&frequency);
+    }
+    QueryPerformanceCounter(&counter);
+    return (uint64_t)((double)counter.QuadPart * 1e9 / (double)frequency.QuadPart);
+#else
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (uint64_t)ts.tv_sec * 1000000000ULL + (uint64_t)ts.tv_nsec;
+#endif
+}
+
+static inline size_t histogram_bucket(uint64_t ns) {
+    size_t bucket = 0;
+    ns >>= PYPOSTAL_HISTOGRAM_MIN_SHIFT;
+    while (ns > 0 && bucket < PYPOSTAL_HISTOGRAM_BUCKETS - 1) {
+        ns >>= 1;
+        bucket++;
+    }
+    return bucket;
+}
+
+void pypostal_metric_record(pypostal_metric_t *metric, pypostal_timer_t *timer, size_t input_bytes, size_t output_items, int ok) {
+    // Time since the last phase boundary is result building
+    pypostal_timer_phase(timer, PYPOSTAL_PHASE_RESULT);
+
+    metric->calls++;
+    if (!ok) {
+        metric->errors++;
+    }
+    metric->input_bytes += input_bytes;
+    metric->output_items += output_items;
+
+    for (int i = 0; i < PYPOSTAL_NUM_PHASES; i++) {
+        metric->phase_ns[i] += timer->phase_ns[i];
+        metric->phase_buckets[i][histogram_bucket(timer->phase_ns[i])]++;
+    }
+}
+
+static int dict_set_uint64(PyObject *dict, const char *key, uint64_t value) {
+    PyObject *obj = PyLong_FromUnsignedLongLong((unsigned long long)value);
+    if (obj == NULL) {
+        return 0;
+    }
+    int ret = PyDict_SetItemString(dict, key, obj);
+    Py_DECREF(obj);
+    return ret == 0;
+}
+
+/* {name: {"calls": ..., "errors": ..., "input_bytes": ..., "output_items": ..., "rejected": ..., "truncated": ...,
+           "phases": {phase: {"sum_ns": ..., "buckets": [...]}}}} */
+PyObject *pypostal_py_metrics_snapshot(pypostal_metric_t *metrics) {
+    PyObject *result = PyDict_New();
+    if (result == NULL) {
+        return NULL;
+    }
+
+    for (pypostal_metric_t *metric = metrics; metric->name != NULL; metric++) {
+        PyObject *entry = PyDict_New();
+        PyObject *phases = PyDict_New();
+        if (entry == NULL || phases == NULL) {
+            goto exit_entry_error;
+        }
+
+        if (!dict_set_uint64(entry, "calls", metric->calls) ||
+            !dict_set_uint64(entry, "errors", metric->errors) ||
+            !dict_set_uint64(entry, "input_bytes", metric->input_bytes) ||
+            !dict_set_uint64(entry, "output_items", metric->output_items) ||
+            !dict_set_uint64(entry, "rejected", metric->rejected) ||
+            !dict_set_uint64(entry, "truncated", metric->truncated) ||
+            PyDict_SetItemString(entry, "phases", phases) < 0) {
+            goto exit_entry_error;
+        }
+
+        for (int i = 0; i < PYPOSTAL_NUM_PHASES; i++) {
+            PyObject *phase = PyDict_New();
+            PyObject *buckets = PyList_New(PYPOSTAL_HISTOGRAM_BUCKETS);
+            if (phase == NULL || buckets == NULL) {
+                Py_XDECREF(phase);
+                Py_XDECREF(buckets);
+                goto exit_entry_error;
+            }
+
+            for (size_t j = 0; j < PYPOSTAL_HISTOGRAM_BUCKETS; j++) {
+                PyObject *count = PyLong_FromUnsignedLongLong((unsigned long long)metric->phase_buckets[i][j]);
+                if (count == NULL) {
+                    Py_DECREF(phase);
+                    Py_DECREF(buckets);
+                    goto exit_entry_error;
+                }
+                PyList_SET_ITEM(buckets, (Py_ssize_t)j, count);
+            }
+
+            int ok = dict_set_uint64(phase, "sum_ns", metric->phase_ns[i]) &&
+                     PyDict_SetItemString(phase, "buckets", buckets) == 0 &&
+                     PyDict_SetItemString(phases, phase_names[i], phase) == 0;
+            Py_DECREF(phase);
+            Py_DECREF(buckets);
+            if (!ok) {
+                goto exit_entry_error;
+            }
+        }
+
+        Py_DECREF(phases);
+        if (PyDict_SetItemString(result, metric->name, entry) < 0) {
+            Py_DECREF(entry);
+            Py_DECREF(result);
+            return NULL;
+        }
+        Py_DECREF(entry);
+        continue;
+
+exit_entry_error:
+        Py_XDECREF(entry);
+        Py_XDECREF(phases);
+        Py_DECREF(result);
+        return NULL;
+    }
+
+    return result;
+}
+
+PyObject *pypostal_py_metrics_reset(pypostal_metric_t *metrics) {
+    for (pypostal_metric_t *metric = metrics; metric->name != NULL; metric++) {
+        const char *name = metric->name;
+        memset(metric, 0, sizeof(pypostal_metric_t));
+        metric->name = name;
+    }
+    Py_RETURN_NONE;
+}
+
+PyObject *pypostal_py_set_metrics_enabled(PyObject *args) {
+    int enabled = 0;
+    if (!PyArg_ParseTuple(args, "p:set_metrics_enabled", &enabled)) {
+        return NULL;
+    }
+    pypostal_metrics_enabled = enabled;
+    Py_RETURN_NONE;
+}
+
+
+int pypostal_string_column_init(pypostal_string_column_t *column, PyObject *validity, PyObject *offsets, PyObject *data,
+                                Py_ssize_t offset, Py_ssize_t length, int large) {
+    memset(column, 0, sizeof(pypostal_string_column_t));
+    column->large = large;
+    column->offset = offset;
+    column->length = length;
+
+    if (offset < 0 || length < 0) {
+        PyErr_SetString(PyExc_ValueError, "offset and length must not be negative");
+        return 0;
+    }
+
+    if (PyObject_GetBuffer(offsets, &column->offsets, PyBUF_SIMPLE) < 0) {
+        return 0;
+    }
+
+    if (PyObject_GetBuffer(data, &column->data, PyBUF_SIMPLE) < 0) {
+        PyBuffer_Release(&column->offsets);
+        return 0;
+    }
+
+    if (validity != Py_None) {
+        if (PyObject_GetBuffer(validity, &column->validity, PyBUF_SIMPLE) < 0) {
+            PyBuffer_Release(&column->offsets);
+            PyBuffer_Release(&column->data);
+            return 0;
+        }
+        column->has_validity = 1;
+        if (column->validity.len < (offset + length + 7) / 8) {
+            PyErr_SetString(PyExc_ValueError, "validity buffer is too small");
+            goto exit_invalid;
+        }
+    }
+
+    size_t width = large ? sizeof(int64_t) : sizeof(int32_t);
+    if (length > 0 && (size_t)column->offsets.len < (size_t)(offset + length + 1) * width) {
+        PyErr_SetString(PyExc_ValueError, "offsets buffer is too small");
+        goto exit_invalid;
+    }
+
+    // Check every offset once so values can be read later without bounds checks
+    int64_t previous = 0;
+    for (Py_ssize_t i = 0; length > 0 && i <= length; i++) {
+        Py_ssize_t j = offset + i;
+        int64_t value = large ? ((const int64_t *)column->offsets.buf)[j] : ((const int32_t *)column->offsets.buf)[j];
+        if (value < 0 || value > (int64_t)column->data.len || (i > 0 && value < previous)) {
+            PyErr_SetString(PyExc_ValueError, "invalid offsets for the data buffer");
+            goto exit_invalid;
+        }
+        previous = value;
+    }
+
+    return 1;
+
+exit_invalid:
+    pypostal_string_column_release(column);
+    return 0;
+}
+
+void pypostal_string_column_release(pypostal_string_column_t *column) {
+    if (column->offsets.obj != NULL) {
+        PyBuffer_Release(&column->offsets);
+    }
+    if (column->data.obj != NULL) {
+        PyBuffer_Release(&column->data);
+    }
+    if (column->has_validity) {
+        PyBuffer_Release(&column->validity);
+        column->has_validity = 0;
+    }
+}
+
+
+char *pypostal_cstring_set(pypostal_cstring_t *cstring, const char *value, size_t len) {
+    if (cstring->str == NULL || cstring->m < len + 1) {
+        size_t m = cstring->m > 0 ? cstring->m : 64;
+        while (m < len + 1) {
+            m *= 2;
+        }
+        char *str = realloc(cstring->str, m);
+        if (str == NULL) {
+            return NULL;
+        }
+        cstring->str = str;
+        cstring->m = m;
+    }
+    memcpy(cstring->str, value, len);
+    cstring->str[len] = '\0';
+    return cstring->str;
+}
+
+
+int pypostal_string_builder_init(pypostal_string_builder_t *builder, size_t num_rows) {
+    memset(builder, 0, sizeof(pypostal_string_builder_t));
+    builder->rows_m = num_rows > 0 ? num_rows : 1;
+    builder->offsets = calloc(builder->rows_m + 1, sizeof(int32_t));
+    builder->validity = calloc((builder->rows_m + 7) / 8, 1);
+    return builder->offsets != NULL && builder->validity != NULL;
+}
+
+int pypostal_string_builder_append(pypostal_string_builder_t *builder, const char *value, size_t len) {
+    if (builder->data_len + len > INT32_MAX) {
+        builder->overflow = 1;
+        return 0;
+    }
+
+    if (builder->data_len + len > builder->data_m) {
+        size_t m = builder->data_m > 0 ? builder->data_m : 256;
+        while (m < builder->data_len + len) {
+            m *= 2;
+        }
+        char *data = realloc(builder->data, m);
+        if (data == NULL) {
+            return 0;
+        }
+        builder->data = data;
+        builder->data_m = m;
+    }
+
+    memcpy(builder->data + builder->data_len, value, len);
+    builder->data_len += len;
+    return 1;
+}
+
+int pypostal_string_builder_finish_row(pypostal_string_builder_t *builder, int valid) {
+    if (builder->num_rows == builder->rows_m) {
+        size_t m = builder->rows_m * 2;
+        int32_t *offsets = realloc(builder->offsets, (m + 1) * sizeof(int32_t));
+        if (offsets == NULL) {
+            return 0;
+        }
+        builder->offsets = offsets;
+
+        uint8_t *validity = realloc(builder->validity, (m + 7) / 8);
+        if (validity == NULL) {
+            return 0;
+        }
+        memset(validity + (builder->rows_m + 7) / 8, 0, (m + 7) / 8 - (builder->rows_m + 7) / 8);
+        builder->validity = validity;
+        builder->rows_m = m;
+    }
+
+    if (valid) {
+        pypostal_bitmap_set(builder->validity, builder->num_rows);
+    } else {
+        builder->null_count++;
+    }
+
+    builder->num_rows++;
+    builder->offsets[builder->num_rows] = (int32_t)builder->data_len;
+    return 1;
+}
+
+void pypostal_string_builder_destroy(pypostal_string_builder_t *builder) {
+    free(builder->offsets);
+    free(builder->validity);
+    free(builder->data);
+    memset(builder, 0, sizeof(pypostal_string_builder_t));
+}
+
+void pypostal_string_builder_set_error(pypostal_string_builder_t *builder) {
+    if (builder->overflow) {
+        PyErr_SetString(PyExc_OverflowError, "column data exceeds 2GB, use smaller chunks");
+    } else {
+        PyErr_NoMemory();
+    }
+}
+
+PyObject *pypostal_string_builder_to_tuple(pypostal_string_builder_t *builder) {
+    PyObject *validity = NULL;
+    if (builder->null_count > 0) {
+        validity = PyBytes_FromStringAndSize((const char *)builder->validity, (builder->num_rows + 7) / 8);
+    } else {
+        validity = Py_None;
+        Py_INCREF(validity);
+    }
+    PyObject *offsets = PyBytes_FromStringAndSize((const char *)builder->offsets, (builder->num_rows + 1) * sizeof(int32_t));
+    PyObject *data = PyBytes_FromStringAndSize(builder->data != NULL ? builder->data : "", builder->data_len);
+
+    PyObject *result = NULL;
+    if (validity != NULL && offsets != NULL && data != NULL) {
+        result = Py_BuildValue("(OOOn)", validity, offsets, data, (Py_ssize_t)builder->null_count);
+    }
+
+    Py_XDECREF(validity);
+    Py_XDECREF(offsets);
+    Py_XDECREF(data);
+    return result;
+}
@@ -3,17 +3,242 @@
 
 #include <Python.h>
 #include <stdlib.h>
+#include <stdint.h>
 
 #if PY_MAJOR_VERSION >= 3
 #define IS_PY3K
 #endif
 
+/* libpostal components that can be loaded independently. Models are loaded
+   on first use rather than at import time, see pypostal_setup. */
+#define PYPOSTAL_COMPONENT_LIBPOSTAL (1 << 0)
+#define PYPOSTAL_COMPONENT_LANGUAGE_CLASSIFIER (1 << 1)
+#define PYPOSTAL_COMPONENT_PARSER (1 << 2)
+
+int pypostal_setup(uint32_t components, char *datadir);
+PyObject *pypostal_py_setup(PyObject *args, PyObject *keywords, uint32_t components);
+
 void string_array_destroy(char **strings, size_t num_strings);
 
 char *PyObject_to_string(PyObject *obj);
+const char *PyObject_to_string_borrowed(PyObject *obj);
+/* Like PySequence_Fast, except that a list is copied to a tuple. The result holds a
+   reference to every item, so borrowed UTF-8 views of the items stay valid with the
+   GIL released even if another thread replaces items of the caller's list. */
+PyObject *pypostal_sequence_snapshot(PyObject *obj, const char *message);
 char **PyObject_to_strings_max_len(PyObject *obj, ssize_t max_len, size_t *num_strings);
 char **PyObject_to_strings(PyObject *obj, size_t *num_strings);
 
 PyObject *PyObject_from_strings(char **strings, size_t num_strings);
 
+/* Functions returning lists of strings can return stable hashes of them instead,
+   output="hash64" or "hash128". Hashes are MurmurHash3_x64_128 with seed 0 over
+   the UTF-8 bytes of each string, hash64 being the first 64-bit half (h1). They
+   come back as bytes holding native-endian uint64s, h1 and h2 interleaved for
+   hash128, which postal.hashing turns into array('Q'). */
+#define PYPOSTAL_OUTPUT_STRINGS 0
+#define PYPOSTAL_OUTPUT_HASH64 1
+#define PYPOSTAL_OUTPUT_HASH128 2
+
+void pypostal_murmurhash3_x64_128(const void *key, size_t len, uint32_t seed, uint64_t out[2]);
+/* Output mode for an output= argument (None, "strings", "hash64" or "hash128"),
+   -1 with an exception set if it's invalid */
+int pypostal_output_mode(PyObject *arg);
+PyObject *PyObject_hashes_from_strings(char **strings, size_t num_strings, int mode);
+PyObject *PyObject_from_strings_output(char **strings, size_t num_strings, int mode);
+
+
+/* Opt-in instrumentation, exposed through postal.metrics. Each extension module
+   keeps a table of pypostal_metric_t, one per function, terminated by an entry
+   with a NULL name. When metrics are disabled the only cost per call is the
+   check of pypostal_metrics_enabled in pypostal_timer_start.
+
+   Calls are timed in phases: converting the arguments, the libpostal call
+   (including waiting for the parser lock and the GIL) and building the result.
+   Metrics are only ever updated while holding the GIL. */
+#define PYPOSTAL_PHASE_CONVERT 0
+#define PYPOSTAL_PHASE_LIBPOSTAL 1
+#define PYPOSTAL_PHASE_RESULT 2
+#define PYPOSTAL_NUM_PHASES 3
+
+/* Latency histogram buckets are powers of two in nanoseconds, the first holding
+   everything up to 2^PYPOSTAL_HISTOGRAM_MIN_SHIFT ns (256ns) and the last
+   everything above 2^(PYPOSTAL_HISTOGRAM_MIN_SHIFT + PYPOSTAL_HISTOGRAM_BUCKETS - 2) ns (~2.1s) */
+#define PYPOSTAL_HISTOGRAM_MIN_SHIFT 8
+#define PYPOSTAL_HISTOGRAM_BUCKETS 24
+
+typedef struct pypostal_metric {
+    const char *name;
+    uint64_t calls;
+    uint64_t errors;
+    uint64_t input_bytes;
+    uint64_t output_items;
+    uint64_t rejected;
+    uint64_t truncated;
+    uint64_t phase_ns[PYPOSTAL_NUM_PHASES];
+    uint64_t phase_buckets[PYPOSTAL_NUM_PHASES][PYPOSTAL_HISTOGRAM_BUCKETS];
+} pypostal_metric_t;
+
+typedef struct pypostal_timer {
+    int enabled;
+    uint64_t last;
+    uint64_t phase_ns[PYPOSTAL_NUM_PHASES];
+} pypostal_timer_t;
+
+extern int pypostal_metrics_enabled;
+
+uint64_t pypostal_time_ns(void);
+
+static inline void pypostal_timer_start(pypostal_timer_t *timer) {
+    timer->enabled = pypostal_metrics_enabled;
+    if (timer->enabled) {
+        for (int i = 0; i < PYPOSTAL_NUM_PHASES; i++) {
+            timer->phase_ns[i] = 0;
+        }
+        timer->last = pypostal_time_ns();
+    }
+}
+
+/* Attributes the time since the last phase (or the start) to phase */
+static inline void pypostal_timer_phase(pypostal_timer_t *timer, int phase) {
+    if (timer->enabled) {
+        uint64_t now = pypostal_time_ns();
+        timer->phase_ns[phase] += now - timer->last;
+        timer->last = now;
+    }
+}
+
+void pypostal_metric_record(pypostal_metric_t *metric, pypostal_timer_t *timer, size_t input_bytes, size_t output_items, int ok);
+
+/* Arguments are only evaluated when the timer is enabled, so they can do some work e.g. strlen */
+#define PYPOSTAL_METRIC_RECORD(metric, timer, input_bytes, output_items, ok) \
+    do { \
+        if ((timer)->enabled) { \
+            pypostal_metric_record((metric), (timer), (input_bytes), (output_items), (ok)); \
+        } \
+    } while (0)
+
+/* Per-call guards for the functions returning expansions or name hashes, 0 meaning
+   no limit. An input longer than max_input_bytes (UTF-8) is rejected with ValueError
+   before calling libpostal. At most max_expansions strings are converted for the
+   result and the rest are dropped, libpostal still computes all of them. Limit hits
+   are counted in the function's metric (rejected, truncated) even when metrics are
+   disabled, as they're rare and meant for alerting. */
+typedef struct pypostal_limits {
+    Py_ssize_t max_expansions;
+    Py_ssize_t max_input_bytes;
+} pypostal_limits_t;
+
+#define PYPOSTAL_LIMITS_ACTIVE(limits) ((limits)->max_expansions > 0 || (limits)->max_input_bytes > 0)
+
+/* 0 with ValueError set if either limit is negative */
+int pypostal_limits_init(pypostal_limits_t *limits, Py_ssize_t max_expansions, Py_ssize_t max_input_bytes);
+/* 0 with ValueError set if input exceeds max_input_bytes */
+int pypostal_limits_check_input(pypostal_limits_t *limits, const char *input, pypostal_metric_t *metric);
+/* PyObject_from_strings_output for at most max_expansions of the strings (None if strings
+   is NULL). When any limit is set the result is a (result, truncated) tuple. */
+PyObject *PyObject_from_strings_limited(char **strings, size_t num_strings, int mode, pypostal_limits_t *limits,
+                                        pypostal_metric_t *metric);
+
+/* Python-level metrics functions shared by the extension modules */
+PyObject *pypostal_py_metrics_snapshot(pypostal_metric_t *metrics);
+PyObject *pypostal_py_metrics_reset(pypostal_metric_t *metrics);
+PyObject *pypostal_py_set_metrics_enabled(PyObject *args);
+
+#define PYPOSTAL_METRICS_METHODS \
+    {"metrics_snapshot", (PyCFunction)py_metrics_snapshot, METH_NOARGS, "metrics_snapshot()"}, \
+    {"metrics_reset", (PyCFunction)py_metrics_reset, METH_NOARGS, "metrics_reset()"}, \
+    {"set_metrics_enabled", (PyCFunction)py_set_metrics_enabled, METH_VARARGS, "set_metrics_enabled(enabled)"}
+
+/* Defines the functions listed in PYPOSTAL_METRICS_METHODS for a module's metrics table */
+#define PYPOSTAL_METRICS_FUNCTIONS(metrics) \
+    static PyObject *py_metrics_snapshot(PyObject *self, PyObject *noargs) { \
+        return pypostal_py_metrics_snapshot(metrics); \
+    } \
+    static PyObject *py_metrics_reset(PyObject *self, PyObject *noargs) { \
+        return pypostal_py_metrics_reset(metrics); \
+    } \
+    static PyObject *py_set_metrics_enabled(PyObject *self, PyObject *args) { \
+        return pypostal_py_set_metrics_enabled(args); \
+    }
+
+
+/* Arrow string columns (utf8 or large_utf8), read straight from the array's
+   validity bitmap, offsets and data buffers. Any object supporting the buffer
+   protocol works, e.g. pyarrow.Buffer. The offsets are checked once in
+   pypostal_string_column_init, so values can be read without the GIL. */
+typedef struct pypostal_string_column {
+    Py_buffer validity;
+    Py_buffer offsets;
+    Py_buffer data;
+    int has_validity;
+    int large;
+    Py_ssize_t offset;
+    Py_ssize_t length;
+} pypostal_string_column_t;
+
+int pypostal_string_column_init(pypostal_string_column_t *column, PyObject *validity, PyObject *offsets, PyObject *data,
+                                Py_ssize_t offset, Py_ssize_t length, int large);
+void pypostal_string_column_release(pypostal_string_column_t *column);
+
+static inline int pypostal_string_column_is_valid(pypostal_string_column_t *column, Py_ssize_t i) {
+    if (!column->has_validity) {
+        return 1;
+    }
+    Py_ssize_t j = column->offset + i;
+    return (((const uint8_t *)column->validity.buf)[j >> 3] >> (j & 7)) & 1;
+}
+
+static inline const char *pypostal_string_column_value(pypostal_string_column_t *column, Py_ssize_t i, size_t *len) {
+    Py_ssize_t j = column->offset + i;
+    int64_t start, end;
+    if (column->large) {
+        start = ((const int64_t *)column->offsets.buf)[j];
+        end = ((const int64_t *)column->offsets.buf)[j + 1];
+    } else {
+        start = ((const int32_t *)column->offsets.buf)[j];
+        end = ((const int32_t *)column->offsets.buf)[j + 1];
+    }
+    *len = (size_t)(end - start);
+    return (const char *)column->data.buf + start;
+}
+
+/* Reusable NUL-terminated copy of a value, since libpostal takes C strings */
+typedef struct pypostal_cstring {
+    char *str;
+    size_t m;
+} pypostal_cstring_t;
+
+char *pypostal_cstring_set(pypostal_cstring_t *cstring, const char *value, size_t len);
+
+/* Builds the buffers of an Arrow utf8 column (int32 offsets) row by row. Safe to
+   use without the GIL, functions returning int return 0 when out of memory or
+   when the data would no longer fit int32 offsets (overflow is set). */
+typedef struct pypostal_string_builder {
+    int32_t *offsets;
+    uint8_t *validity;
+    char *data;
+    size_t data_len;
+    size_t data_m;
+    size_t num_rows;
+    size_t rows_m;
+    size_t null_count;
+    int overflow;
+} pypostal_string_builder_t;
+
+int pypostal_string_builder_init(pypostal_string_builder_t *builder, size_t num_rows);
+/* Appends to the value of the current row */
+int pypostal_string_builder_append(pypostal_string_builder_t *builder, const char *value, size_t len);
+/* Ends the current row, a null if valid == 0 */
+int pypostal_string_builder_finish_row(pypostal_string_builder_t *builder, int valid);
+void pypostal_string_builder_destroy(pypostal_string_builder_t *builder);
+/* Sets the Python exception for a failed builder call */
+void pypostal_string_builder_set_error(pypostal_string_builder_t *builder);
+/* (validity or None, offsets, data, null_count) as bytes */
+PyObject *pypostal_string_builder_to_tuple(pypostal_string_builder_t *builder);
+/* Validity bitmap helpers for builders of other column types */
+static inline void pypostal_bitmap_set(uint8_t *bitmap, size_t i) {
+    bitmap[i >> 3] |= (uint8_t)(1 << (i & 7));
+}
+
 #endif
\ No newline at end of file
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Test the asyncio interface."""
+
+from __future__ import unicode_literals
+
+import asyncio
+import time
+import unittest
+
+from postal import aio
+from postal.expand import expand_address
+from postal.parser import parse_address
+
+ADDRESSES = [
+    '781 Franklin Ave Crown Heights Brooklyn NYC NY 11216 USA',
+    'Friedrichstraße 128, Berlin, Germany',
+    '30 W 26th St Fl 7',
+]
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class TestAsyncPostal(unittest.TestCase):
+    """Test async parsing and expansion."""
+
+    def test_parse_and_expand(self):
+        async def main():
+            async with aio.AsyncPostal(max_workers=2) as postal:
+                parsed = await asyncio.gather(*[postal.parse_address(a) for a in ADDRESSES * 10])
+                expanded = await asyncio.gather(*[postal.expand_address(a, languages=['en']) for a in ADDRESSES])
+                # Concurrent requests share batches
+                self.assertTrue(postal.stats().batches < len(ADDRESSES) * 10)
+                return parsed, expanded
+
+        parsed, expanded = run(main())
+        self.assertEqual(parsed, [parse_address(a) for a in ADDRESSES * 10])
+        self.assertEqual(expanded, [expand_address(a, languages=['en']) for a in ADDRESSES])
+
+    def test_iterators(self):
+        async def stream():
+            for a in ADDRESSES * 5:
+                yield a
+
+        async def main():
+            async with aio.AsyncPostal(max_workers=2) as postal:
+                parsed = [p async for p in postal.parse_addresses(stream(), window=4)]
+                expanded = [e async for e in postal.expand_addresses(ADDRESSES, languages=['en'], window=2)]
+                return parsed, expanded
+
+        parsed, expanded = run(main())
+        self.assertEqual(parsed, [parse_address(a) for a in ADDRESSES * 5])
+        self.assertEqual(expanded, [expand_address(a, languages=['en']) for a in ADDRESSES])
+
+    def test_errors_and_cancellation(self):
+        async def main():
+            async with aio.AsyncPostal(max_workers=1, max_queue_size=2) as postal:
+                tasks = [asyncio.ensure_future(postal.parse_address(a)) for a in ADDRESSES * 5]
+                tasks[-1].cancel()
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+                self.assertTrue(isinstance(results[-1], asyncio.CancelledError))
+                self.assertEqual(results[0], parse_address(ADDRESSES[0]))
+
+                # A bad request fails on its own, not the rest of its batch
+                results = await asyncio.gather(postal.expand_address(ADDRESSES[0]), postal.expand_address(None),
+                                               return_exceptions=True)
+                self.assertTrue(isinstance(results[0], list))
+                self.assertTrue(isinstance(results[1], TypeError))
+
+        run(main())
+
+    def test_close(self):
+        """Requests waiting for a worker are cancelled on close."""
+        self.assertRaises(ValueError, aio.AsyncPostal, max_queue_size=0)
+
+        async def main():
+            postal = aio.AsyncPostal(max_workers=1)
+            # Holds the only worker while the dispatcher takes the requests off the queue
+            blocker = asyncio.ensure_future(postal.run(time.sleep, 0.2))
+            await asyncio.sleep(0.01)
+            tasks = [asyncio.ensure_future(postal.parse_address(a)) for a in ADDRESSES]
+            tasks += [asyncio.ensure_future(postal.expand_address(a, languages=['en'])) for a in ADDRESSES]
+            await asyncio.sleep(0.05)
+
+            await postal.close()
+            await asyncio.wait(tasks, timeout=1)
+            self.assertTrue(all(task.done() for task in tasks))
+            await blocker
+
+        run(main())
+
+
+if __name__ == '__main__':
+    unittest.main()
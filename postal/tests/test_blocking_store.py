@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Test the disk-backed blocking store."""
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from postal.blocking_store import BlockingStore, Segment, _write_segment
+from postal.hashing import hash_strings
+from postal.utils import geohash
+
+
+class TestBlockingStore(unittest.TestCase):
+    """Test ingest, merge and lookups."""
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'store')
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.path))
+
+    def test_geohash(self):
+        self.assertEqual(geohash.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(sorted(geohash.neighbors('u4pru')),
+                         ['u4pre', 'u4prg', 'u4prs', 'u4prt', 'u4pru', 'u4prv', 'u4r25', 'u4r2h', 'u4r2j'])
+
+    def test_segment_lookup(self):
+        os.mkdir(self.path)
+        path = os.path.join(self.path, 'segment')
+        postings = [(1, 10), (3, 11), (3, 12), (3, 13), (7, 14), (2 ** 64 - 1, 15)]
+        self.assertEqual(_write_segment(path, postings), 6)
+
+        segment = Segment(path)
+        self.assertEqual(segment.lookup(3), (1, 4))
+        self.assertEqual(list(segment.record_ids(1, 4)), [11, 12, 13])
+        self.assertEqual(segment.lookup(1), (0, 1))
+        self.assertEqual(segment.lookup(2 ** 64 - 1), (5, 6))
+        self.assertEqual(segment.lookup(0), (0, 0))
+        self.assertEqual(segment.lookup(5), (4, 4))
+        segment.close()
+
+    def test_add_and_query(self):
+        labels = ['house_number', 'road', 'city', 'postcode']
+        with BlockingStore(self.path, languages=['en']) as store:
+            store.add(1, labels, ['123', 'Broadway', 'New York', '11216'], latitude=40.7, longitude=-74.0)
+            store.add(2, labels, ['7', 'Rue de Rivoli', 'Paris', '75001'], latitude=48.86, longitude=2.35)
+
+        # Reopened in a later run, with the options from the manifest
+        store = BlockingStore(self.path)
+        self.assertEqual(store.languages, ['en'])
+        self.assertEqual(store.stats().num_shards, 2)
+
+        store.add(3, labels, ['123', 'Broadway', 'New York', '11216'], latitude=40.7, longitude=-74.0)
+        store.flush()
+        self.assertEqual(store.candidates(labels, ['123', 'Broadway', 'New York', '11216'],
+                                          latitude=40.7, longitude=-74.0, exclude=3), [1])
+        self.assertEqual(store.candidates_batch([(labels, ['123', 'Broadway', 'New York', '11216'], 40.7, -74.0),
+                                                 (labels, ['7', 'Rue de Rivoli', 'Paris', '75001'])]),
+                         [[1, 3], [2]])
+        store.close()
+
+        self.assertRaises(ValueError, BlockingStore, self.path, languages=['fr'])
+
+    def test_keys_and_merge(self):
+        store = BlockingStore(self.path, max_segments=2, max_block_size=3)
+        for i in range(6):
+            store.add_keys(i, ['hot', 'key{}'.format(i // 2)])
+            store.flush()
+
+        # Merged whenever a shard had more than 2 segments
+        self.assertTrue(store.stats().num_segments <= 2)
+        self.assertEqual(store.stats().num_postings, 12)
+
+        # 'hot' is in more than max_block_size records, so it's ignored
+        self.assertEqual(store.candidates_for_keys(['hot']), [])
+        self.assertEqual(store.candidates_for_keys(['hot', 'key1']), [2, 3])
+        self.assertEqual(store.candidates_for_keys(hash_strings(['key2', 'key0'])), [0, 1, 4, 5])
+
+        store.merge()
+        self.assertEqual(store.stats().num_segments, 1)
+        self.assertEqual(len(os.listdir(os.path.join(self.path, '_'))), 1)
+        self.assertEqual(store.candidates_for_keys(['key1']), [2, 3])
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
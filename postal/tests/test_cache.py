@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Test the in-process result cache."""
+
+from __future__ import unicode_literals
+
+import unittest
+from postal.cache import LRUCache, PostalCache
+from postal.expand import expand_address, Expansions, ExpansionHashes, ExpandOptions
+from postal.parser import parse_address
+
+
+class TestCache(unittest.TestCase):
+    """Test LRU eviction and cached entry points."""
+
+    def test_lru_eviction(self):
+        cache = LRUCache(maxsize=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3)
+
+        # b was least recently used
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('c'), 3)
+
+        info = cache.cache_info()
+        self.assertEqual((info.hits, info.misses, info.evictions, info.currsize), (2, 1, 1, 2))
+
+    def test_lru_maxbytes(self):
+        cache = LRUCache(maxsize=None, maxbytes=1000)
+        for i in range(100):
+            cache.put(i, 'x' * 100)
+        self.assertTrue(cache.cache_info().bytes <= 1000)
+        self.assertTrue(cache.cache_info().evictions > 0)
+
+    def test_cached_results(self):
+        cache = PostalCache(maxsize=100)
+        address = '781 Franklin Ave Crown Hts Brooklyn NY'
+
+        self.assertEqual(list(cache.expand_address(address)), expand_address(address))
+        # Explicitly passing a default option hits the same entry
+        self.assertEqual(cache.expand_address(address, lowercase=True), cache.expand_address(address))
+        self.assertNotEqual(cache.expand_address(address, roman_numerals=False, lowercase=False),
+                            cache.expand_address(address))
+
+        self.assertEqual(list(cache.parse_address(address)), parse_address(address))
+        self.assertTrue(isinstance(cache.parse_address(address), tuple))
+
+        info = cache.cache_info()
+        self.assertEqual(info.hits, 4)
+        self.assertEqual(info.misses, 3)
+
+    def test_parse_options_key(self):
+        """Unicode and UTF-8 encoded language/country share an entry."""
+        cache = PostalCache(maxsize=100)
+        address = '781 Franklin Ave Crown Hts Brooklyn NY'
+        cache.parse_address(address, language='en', country='us')
+        cache.parse_address(address, language=b'en', country=b'us')
+        self.assertEqual(cache.cache_info().hits, 1)
+        self.assertEqual(cache.cache_info().currsize, 1)
+
+    def test_expand_options_key(self):
+        """ExpandOptions are keyed by value, sharing entries with the equivalent keyword options."""
+        cache = PostalCache(maxsize=100)
+        address = '781 Franklin Ave Crown Hts Brooklyn NY'
+        result = cache.expand_address(address, options=ExpandOptions(languages=['en']))
+        self.assertEqual(list(result), expand_address(address, options=ExpandOptions(languages=['en'])))
+        self.assertEqual(cache.expand_address(address, options=ExpandOptions(languages=['en'])), result)
+        self.assertEqual(cache.expand_address(address, languages=['en']), result)
+        cache.name_hashes('Franklin Ave', options=ExpandOptions(languages=['en']))
+        cache.name_hashes('Franklin Ave', options=ExpandOptions(languages=['en']))
+        self.assertEqual((cache.cache_info().hits, cache.cache_info().misses), (3, 2))
+
+    def test_limited_results(self):
+        """Limited results keep their type and truncated flag on cache hits."""
+        cache = PostalCache(maxsize=100)
+        address = '30 W 26th St Fl #7'
+        expected = expand_address(address, languages=['en'], max_expansions=1)
+        for i in range(2):
+            result = cache.expand_address(address, languages=['en'], max_expansions=1)
+            self.assertTrue(isinstance(result, Expansions))
+            self.assertEqual((result, result.truncated), (expected, expected.truncated))
+
+            hashes = cache.expand_address(address, languages=['en'], max_expansions=1, output='hash64')
+            self.assertTrue(isinstance(hashes, ExpansionHashes))
+            self.assertEqual(hashes.truncated, expected.truncated)
+        self.assertEqual(cache.cache_info().hits, 2)
+
+        # Each hit is a new object, so changing one doesn't change the cache
+        result.append('x')
+        self.assertEqual(cache.expand_address(address, languages=['en'], max_expansions=1), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""Test the command-line tool."""
+
+from __future__ import unicode_literals
+
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from postal.cli import main
+from postal.expand import expand_address
+from postal.parser import parse_address
+
+ADDRESSES = [
+    '781 Franklin Ave Crown Heights Brooklyn NYC NY 11216 USA',
+    'Friedrichstraße 128, Berlin, Germany',
+    '30 W 26th St Fl 7',
+]
+
+
+class TestCLI(unittest.TestCase):
+    """Test reading and writing CSV and JSONL through main."""
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, filename, data):
+        path = os.path.join(self.dir, filename)
+        with io.open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(data)
+        return path
+
+    def run_main(self, argv):
+        out = io.StringIO()
+        self.assertEqual(main(argv + ['--quiet'], stdout=out), 0)
+        return out.getvalue()
+
+    def test_parse_csv(self):
+        rows = ''.join('{},"{}"\n'.format(i, a) for i, a in enumerate(ADDRESSES * 5))
+        path = self.write('in.csv', 'id,address\n' + rows)
+        for workers in ('1', '2'):
+            output = self.run_main(['parse', path, '--chunk-size', '2', '--workers', workers])
+            rows = list(csv.DictReader(io.StringIO(output)))
+            self.assertEqual([r['id'] for r in rows], [str(i) for i in range(len(ADDRESSES) * 5)])
+            for row in rows:
+                for value, label in parse_address(row['address']):
+                    self.assertIn(value, row[label])
+
+    def test_expand_jsonl(self):
+        lines = ''.join(json.dumps({'text': a, 'lang': 'en'}) + '\n' for a in ADDRESSES)
+        path = self.write('in.jsonl', lines)
+        output = self.run_main(['expand', path, '--column', 'text', '--language-field', 'lang'])
+        rows = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual([r['text'] for r in rows], ADDRESSES)
+        for row in rows:
+            self.assertEqual(row['expansions'], expand_address(row['text'], languages=['en']))
+
+    def test_hash_tsv(self):
+        path = self.write('in.tsv', 'address\tlat\tlon\n{}\t40.67\t-73.95\n'.format(ADDRESSES[0]))
+        output = self.run_main(['hash', path, '--lat-field', 'lat', '--lon-field', 'lon'])
+        rows = list(csv.DictReader(io.StringIO(output), dialect='excel-tab'))
+        self.assertEqual(len(rows), 1)
+        self.assertTrue(rows[0]['hashes'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""Test columnar parsing and expansion over Arrow arrays."""
+
+from __future__ import unicode_literals
+
+import unittest
+
+from postal.expand import expand_address, expand_address_root
+from postal.parser import parse_address, LABELS
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+ADDRESSES = [
+    '781 Franklin Ave, Crown Heights, Brooklyn, 11216',
+    None,
+    'Friedrichstraße 128, Berlin',
+    '',
+    '92 Avenue des Champs-Élysées, Paris, 75008',
+]
+
+
+def parsed_row(address):
+    if address is None:
+        return None
+    components = {}
+    for value, label in parse_address(address):
+        components[label] = components[label] + ' ' + value if label in components else value
+    return components
+
+
+@unittest.skipIf(pa is None, 'pyarrow is not installed')
+class TestColumnar(unittest.TestCase):
+    """Test parse_address_column and expand_address_column."""
+
+    def assertParsed(self, result, addresses):
+        self.assertEqual([f.name for f in result.type][:len(LABELS)], list(LABELS))
+        for row, address in zip(result.to_pylist(), addresses):
+            if address is None:
+                self.assertIsNone(row)
+            else:
+                self.assertEqual(dict((k, v) for k, v in row.items() if v is not None), parsed_row(address))
+
+    def test_parse_address_column(self):
+        """One field per label, matching parse_address row by row."""
+        from postal.columnar import parse_address_column
+
+        array = pa.array(ADDRESSES)
+        self.assertParsed(parse_address_column(array), ADDRESSES)
+        self.assertParsed(parse_address_column(array.slice(1, 3)), ADDRESSES[1:4])
+        self.assertParsed(parse_address_column(array.cast(pa.large_string())), ADDRESSES)
+
+        result = parse_address_column(pa.chunked_array([array, array.slice(2)]))
+        self.assertEqual(result.num_chunks, 2)
+        self.assertParsed(result.combine_chunks(), ADDRESSES + ADDRESSES[2:])
+
+        result = parse_address_column(ADDRESSES, labels=['road', 'city'])
+        self.assertEqual([f.name for f in result.type], ['road', 'city'])
+        result.validate(full=True)
+
+    def test_expand_address_column(self):
+        """Lists of expansions matching expand_address row by row."""
+        from postal.columnar import expand_address_column
+
+        array = pa.array(ADDRESSES)
+        expected = [expand_address(a, languages=['en']) if a is not None else None for a in ADDRESSES]
+
+        result = expand_address_column(array, languages=['en'])
+        result.validate(full=True)
+        self.assertEqual(result.to_pylist(), expected)
+        self.assertEqual(expand_address_column(array.slice(2), languages=['en']).to_pylist(), expected[2:])
+
+        root = expand_address_column(pa.chunked_array([array]), languages=['en'], root=True)
+        self.assertEqual(root.to_pylist(),
+                         [expand_address_root(a, languages=['en']) if a is not None else None for a in ADDRESSES])
+
+    @unittest.skipIf(pd is None, 'pandas is not installed')
+    def test_pandas(self):
+        """Series in, DataFrame/Series with the same index out."""
+        from postal.columnar import parse_address_column, expand_address_column
+
+        series = pd.Series(ADDRESSES, index=range(10, 10 + len(ADDRESSES)), name='address')
+
+        parsed = parse_address_column(series)
+        self.assertEqual(list(parsed.index), list(series.index))
+        self.assertEqual(parsed.loc[10, 'house_number'], parsed_row(ADDRESSES[0])['house_number'])
+        self.assertTrue(parsed.loc[11].isna().all())
+
+        expanded = expand_address_column(series, languages=['en'])
+        self.assertEqual(list(expanded.index), list(series.index))
+        self.assertEqual(list(expanded[10]), expand_address(ADDRESSES[0], languages=['en']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""Test calling pypostal from multiple threads."""
+
+from __future__ import unicode_literals
+
+import unittest
+from postal.concurrent import ThreadPool
+from postal.expand import expand_address
+from postal.parser import parse_address
+
+
+class TestConcurrent(unittest.TestCase):
+    """Test the thread pool helper."""
+
+    addresses = [
+        '781 Franklin Ave Crown Heights Brooklyn NYC NY 11216 USA',
+        'Friedrichstraße 128, Berlin, Germany',
+        'MAPLE ST.',
+        'Cércle rouge',
+    ] * 25
+
+    def test_map_preserves_order(self):
+        """Threaded results match serial results, in order."""
+        with ThreadPool(max_workers=4) as pool:
+            self.assertEqual(list(pool.map(expand_address, self.addresses, chunk_size=3)),
+                             [expand_address(a) for a in self.addresses])
+
+            self.assertEqual(list(pool.map(parse_address, self.addresses, chunk_size=7)),
+                             [parse_address(a) for a in self.addresses])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""Test pypostal dedupe pipeline."""
+
+from __future__ import unicode_literals
+
+import unittest
+from array import array
+
+from postal.dedupe import *
+
+LABELS = ['house', 'house_number', 'road', 'postcode']
+
+
+class TestDedupe(unittest.TestCase):
+    """Test batched comparison and clustering."""
+
+    def test_compare_pairs(self):
+        columns = [['Whole Foods', 'Whole Foods Market', 'Whole Foods'],
+                   ['123', None, '123']]
+        statuses = compare_pairs(columns, [NAME, HOUSE_NUMBER], array('I', [0, 2, 0, 1]), languages=['en'])
+        self.assertEqual(len(statuses), 4)
+        self.assertEqual(statuses[0], duplicate_status.EXACT_DUPLICATE.value)
+        self.assertEqual(statuses[1], duplicate_status.EXACT_DUPLICATE.value)
+        self.assertEqual(statuses[3], duplicate_status.NULL_DUPLICATE.value)
+
+        self.assertRaises(IndexError, compare_pairs, columns, [NAME, HOUSE_NUMBER], array('I', [0, 3]))
+        self.assertRaises(ValueError, compare_pairs, columns, [NAME, 'country'], array('I', [0, 1]))
+
+    def test_prepared_record(self):
+        """Prepared comparisons match the one field at a time versions."""
+        labels = ['house', 'house_number', 'road', 'city', 'postcode']
+        record1 = PreparedRecord(labels, ['Whole Foods', '123', 'Main St', 'Brooklyn', '11216'], languages=['en'])
+        record2 = PreparedRecord(labels[:3], ['Whole Foods Market', '123', 'Main Street'], languages=['en'])
+        self.assertEqual(record1.languages, ('en',))
+        self.assertEqual(len(record1), 5)
+
+        statuses = compare(record1, record2, fields=[NAME, STREET, HOUSE_NUMBER, POSTAL_CODE, TOPONYM])
+        self.assertEqual(list(statuses), [NAME, STREET, HOUSE_NUMBER, POSTAL_CODE, TOPONYM])
+        self.assertEqual(statuses[NAME], is_name_duplicate('Whole Foods', 'Whole Foods Market', languages=['en']))
+        self.assertEqual(statuses[STREET], is_street_duplicate('Main St', 'Main Street', languages=['en']))
+        self.assertEqual(statuses[HOUSE_NUMBER], duplicate_status.EXACT_DUPLICATE)
+        self.assertEqual(statuses[POSTAL_CODE], duplicate_status.NULL_DUPLICATE)
+        self.assertEqual(statuses[TOPONYM], is_toponym_duplicate(labels, ['Whole Foods', '123', 'Main St', 'Brooklyn', '11216'],
+                                                                  labels[:3], ['Whole Foods Market', '123', 'Main Street'],
+                                                                  languages=['en']))
+
+        many = compare_many(record1, [record2, record1], fields=[NAME, HOUSE_NUMBER])
+        self.assertEqual(len(many), 4)
+        self.assertEqual(duplicate_status.from_id(many[0]), statuses[NAME])
+        self.assertEqual(many[2], duplicate_status.EXACT_DUPLICATE.value)
+
+        self.assertRaises(ValueError, compare, record1, record2, fields=['country'])
+        self.assertRaises(ValueError, PreparedRecord, labels, ['Whole Foods'])
+        self.assertRaises(TypeError, compare_many, record1, [record2, 'Whole Foods'])
+        self.assertRaises(TypeError, PreparedRecord, labels[:1], ['Whole Foods'], languages='en')
+        self.assertRaises(TypeError, PreparedRecord, labels[:1], ['Whole Foods'], languages=[1])
+
+        # Records are immutable, since they're read without the GIL
+        self.assertRaises(TypeError, record1.__init__, labels[:1], ['Trader Joes'])
+        self.assertEqual(len(record1), 5)
+
+    def test_is_duplicate_many(self):
+        """Vectorized checks match the one pair at a time versions."""
+        values1 = ['Whole Foods', '123 Main St', 'Whole Foods Market', '']
+        values2 = ['Whole Foods', '123 Main Street', 'Trader Joes', 'Whole Foods']
+        for many, single in ((is_name_duplicate_many, is_name_duplicate),
+                             (is_street_duplicate_many, is_street_duplicate)):
+            statuses = many(values1, values2, languages=['en'])
+            self.assertEqual([duplicate_status.from_id(s) for s in statuses[:3]],
+                             [single(v1, v2, languages=['en']) for v1, v2 in zip(values1[:3], values2[:3])])
+            self.assertEqual(statuses[3], duplicate_status.NULL_DUPLICATE.value)
+
+        table = ['Whole Foods', 'Trader Joes']
+        statuses = is_name_duplicate_many([0, 0, 1], [0, 1, 1], languages=['en'], table=table)
+        self.assertEqual(statuses[0], duplicate_status.EXACT_DUPLICATE.value)
+        self.assertEqual(statuses[2], duplicate_status.EXACT_DUPLICATE.value)
+
+        self.assertRaises(ValueError, is_name_duplicate_many, ['a'], ['a', 'b'])
+        self.assertRaises(IndexError, is_name_duplicate_many, [0], [2], table=table)
+
+    def test_is_duplicate_fuzzy_many(self):
+        value1 = (['whole', 'foods'], [0.5, 0.5])
+        value2 = (['whole', 'foods', 'market'], [0.4, 0.4, 0.2])
+        statuses, similarities = is_name_duplicate_fuzzy_many([value1, value1], [value1, value2], languages=['en'])
+        for i, other in enumerate((value1, value2)):
+            status, sim = is_name_duplicate_fuzzy(value1[0], value1[1], other[0], other[1], languages=['en'])
+            self.assertEqual(duplicate_status.from_id(statuses[i]), status)
+            self.assertAlmostEqual(similarities[i], sim)
+
+        statuses, similarities = is_street_duplicate_fuzzy_many([0], [1], table=[value1, None])
+        self.assertEqual(statuses[0], duplicate_status.NULL_DUPLICATE.value)
+
+    def test_duplicate_rule(self):
+        rule = DuplicateRule()
+        self.assertTrue(rule({NAME: duplicate_status.EXACT_DUPLICATE.value,
+                              STREET: duplicate_status.NULL_DUPLICATE.value,
+                              HOUSE_NUMBER: duplicate_status.LIKELY_DUPLICATE.value,
+                              UNIT: duplicate_status.NULL_DUPLICATE.value}))
+        self.assertFalse(rule({NAME: duplicate_status.EXACT_DUPLICATE.value,
+                               HOUSE_NUMBER: duplicate_status.NON_DUPLICATE.value}))
+        self.assertFalse(rule({NAME: duplicate_status.EXACT_DUPLICATE.value,
+                               UNIT: duplicate_status.NON_DUPLICATE.value}))
+        self.assertFalse(rule({NAME: duplicate_status.NULL_DUPLICATE.value}))
+
+    def test_union_find(self):
+        uf = UnionFind()
+        for i in range(5):
+            uf.add()
+        self.assertTrue(uf.union(0, 1))
+        self.assertTrue(uf.union(3, 1))
+        self.assertFalse(uf.union(0, 3))
+        self.assertEqual(uf.find(0), uf.find(3))
+        self.assertNotEqual(uf.find(0), uf.find(2))
+
+    def test_dedupe(self):
+        records = [
+            (1, LABELS, ['Whole Foods', '123', 'Broadway', '11216']),
+            (2, LABELS, ['Whole Foods', '123', 'Broadway', '11216']),
+            (3, LABELS, ['Whole Foods', '456', 'Broadway', '11216']),
+            (4, LABELS, ['Whole Foods', '123', 'Broadway', '11216']),
+        ]
+        progress = []
+        deduper = Deduper(languages=['en'], batch_size=1, progress=progress.append, progress_every=2)
+        deduper.extend(records)
+        self.assertEqual(deduper.clusters(), [[1, 2, 4]])
+
+        stats = deduper.stats()
+        self.assertEqual(stats.records, 4)
+        self.assertTrue(stats.duplicate_pairs >= 2)
+        self.assertTrue(stats.candidate_pairs >= stats.duplicate_pairs)
+        self.assertEqual(len(progress), 3)
+
+        self.assertRaises(ValueError, deduper.add, 1, LABELS, ['Whole Foods', '123', 'Broadway', '11216'])
+        self.assertEqual(dedupe(records, languages=['en']), [[1, 2, 4]])
+
+        self.assertRaises(ValueError, Deduper, batch_size=0)
+        self.assertRaises(ValueError, Deduper, progress=progress.append, progress_every=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
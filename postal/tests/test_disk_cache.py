@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Test the persistent on-disk result cache."""
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+from array import array
+
+from postal.disk_cache import DiskCache, data_fingerprint
+from postal.expand import expand_address, Expansions, ExpansionHashes, ExpandOptions
+from postal.near_dupe import near_dupe_hashes
+from postal.parser import parse_address
+
+
+class TestDiskCache(unittest.TestCase):
+    """Test cached entry points, fingerprints and compaction."""
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, 'cache.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_cached_results(self):
+        cache = DiskCache(self.path)
+        address = '781 Franklin Ave Crown Hts Brooklyn NY'
+
+        for i in range(2):
+            self.assertEqual(cache.parse_address(address), parse_address(address))
+            self.assertEqual(cache.expand_address(address), expand_address(address))
+            self.assertEqual(cache.expand_address(address, output='hash64'), expand_address(address, output='hash64'))
+            self.assertEqual(cache.near_dupe_hashes(['road', 'city'], ['Franklin Ave', 'Brooklyn']),
+                             near_dupe_hashes(['road', 'city'], ['Franklin Ave', 'Brooklyn']))
+        self.assertIsInstance(cache.expand_address(address, output='hash64'), array)
+
+        # Explicitly passing a default option hits the same entry
+        self.assertEqual(cache.expand_address(address, lowercase=True), cache.expand_address(address))
+
+        info = cache.cache_info()
+        self.assertEqual((info.misses, info.hits, info.writes, info.entries), (4, 7, 4, 4))
+
+        # Another process or run sees the same entries
+        other = DiskCache(self.path)
+        other.parse_address(address)
+        self.assertEqual(other.cache_info().hits, 1)
+
+        cache.cache_clear()
+        self.assertEqual(len(other), 0)
+
+    def test_options_key(self):
+        cache = DiskCache(self.path)
+        address = '781 Franklin Ave Crown Hts Brooklyn NY'
+
+        options = ExpandOptions(languages=['en'], lowercase=True)
+        self.assertEqual(cache.expand_address(address, options=options), expand_address(address, options=options))
+        # Keyed by the option values, so the equivalent keyword options share the entry
+        self.assertEqual(cache.expand_address(address, languages=['en']), expand_address(address, options=options))
+        self.assertEqual(cache.name_hashes('Franklin Ave', options=ExpandOptions(languages=['en'])),
+                         cache.name_hashes('Franklin Ave', options=ExpandOptions(languages=['en'])))
+
+        self.assertEqual(cache.parse_address(address, language=b'en', country=b'us'),
+                         cache.parse_address(address, language='en', country='us'))
+
+        info = cache.cache_info()
+        self.assertEqual((info.misses, info.hits), (3, 3))
+
+    def test_limited_results(self):
+        cache = DiskCache(self.path)
+        address = '30 W 26th St Fl #7'
+        expected = expand_address(address, languages=['en'], max_expansions=1)
+        for i in range(2):
+            result = cache.expand_address(address, languages=['en'], max_expansions=1)
+            self.assertTrue(isinstance(result, Expansions))
+            self.assertEqual((result, result.truncated), (expected, expected.truncated))
+
+            hashes = cache.expand_address(address, languages=['en'], max_expansions=1, output='hash64')
+            self.assertTrue(isinstance(hashes, ExpansionHashes))
+            self.assertEqual(hashes.truncated, expected.truncated)
+        self.assertEqual(cache.cache_info().hits, 2)
+
+    def test_fingerprint(self):
+        datadir = os.path.join(self.tempdir, 'data')
+        os.mkdir(datadir)
+        with open(os.path.join(datadir, 'model.dat'), 'w') as f:
+            f.write('v1')
+        fingerprint = data_fingerprint(datadir)
+        self.assertEqual(data_fingerprint(datadir), fingerprint)
+
+        with open(os.path.join(datadir, 'model.dat'), 'w') as f:
+            f.write('v2 model')
+        self.assertNotEqual(data_fingerprint(datadir), fingerprint)
+
+        address = '30 W 26th St'
+        old = DiskCache(self.path, fingerprint='v1')
+        old.expand_address(address)
+        new = DiskCache(self.path, fingerprint='v2')
+        new.expand_address(address)
+        self.assertEqual(new.cache_info().misses, 1)
+
+        # Compaction drops the entries from the old fingerprint
+        self.assertEqual(new.compact(), 1)
+        self.assertEqual(len(new), 1)
+        self.assertEqual(new.cache_info().stale, 1)
+
+    def test_max_bytes(self):
+        cache = DiskCache(self.path, max_bytes=64 * 1024, compact_interval=100)
+        for i in range(2000):
+            cache.put(cache._key('test', i), 'x' * 200)
+
+        info = cache.cache_info()
+        self.assertTrue(info.evictions > 0)
+        self.assertTrue(cache.database_bytes() <= 64 * 1024 + 100 * 300 * 2)
+        # The most recently written entries are kept
+        self.assertEqual(cache.get(cache._key('test', 1999)), 'x' * 200)
+        self.assertRaises(KeyError, cache.get, cache._key('test', 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
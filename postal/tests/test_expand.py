@@ -65,5 +65,47 @@ class TestExpand(unittest.TestCase):
         self.contained_in_root_expansions("E 106TH ST", "106", address_components=ADDRESS_STREET | ADDRESS_ANY, languages=['en'])
         self.contained_in_root_expansions("PARK AVE", "park", address_components=ADDRESS_STREET | ADDRESS_ANY, languages=['en'])
 
+    def test_expand_options(self):
+        """Precompiled options give the same expansions as keyword options."""
+        kw = dict(address_components=ADDRESS_STREET | ADDRESS_ANY, roman_numerals=False)
+        options = ExpandOptions(languages=['en'], **kw)
+        self.assertEqual(options.languages, ('en',))
+        self.assertEqual(options.address_components, ADDRESS_STREET | ADDRESS_ANY)
+
+        for address in ('E 106TH ST', 'MAPLE ST.', '120 Malcolm X Blvd'):
+            self.assertEqual(expand_address(address, options=options),
+                             expand_address(address, languages=['en'], **kw))
+            self.assertEqual(expand_address_root(address, options=options),
+                             expand_address_root(address, languages=['en'], **kw))
+
+        self.assertRaises(TypeError, expand_address, 'MAPLE ST.', options=options, languages=['en'])
+        self.assertRaises(TypeError, expand_address, 'MAPLE ST.', options=options, lowercase=False)
+        self.assertRaises(TypeError, ExpandOptions, languages='en')
+        self.assertRaises(TypeError, options.__init__, languages=['fr'])
+        self.assertEqual(options.languages, ('en',))
+
+    def test_limits(self):
+        """max_expansions truncates the result, max_input_bytes rejects long inputs."""
+        address = '30 W 26th St Fl #7'
+        expansions = expand_address(address, languages=['en'])
+
+        limited = expand_address(address, languages=['en'], max_expansions=len(expansions))
+        self.assertIsInstance(limited, Expansions)
+        self.assertEqual(limited, expansions)
+        self.assertFalse(limited.truncated)
+
+        limited = expand_address(address, options=ExpandOptions(languages=['en']), max_expansions=1)
+        self.assertEqual(limited, expansions[:1])
+        self.assertEqual(limited.truncated, len(expansions) > 1)
+
+        hashes = expand_address(address, languages=['en'], max_expansions=1, output='hash64')
+        self.assertIsInstance(hashes, ExpansionHashes)
+        self.assertEqual(len(hashes), 1)
+
+        self.assertRaises(ValueError, expand_address, address, languages=['en'], max_input_bytes=len(address) - 1)
+        self.assertRaises(ValueError, expand_address_root, address, options=ExpandOptions(languages=['en']),
+                          max_input_bytes=len(address) - 1)
+        self.assertRaises(ValueError, expand_address, address, max_expansions=0)
+
 if __name__ == '__main__':
     unittest.main()
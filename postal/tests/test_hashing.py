@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Test pypostal hashed output."""
+
+from __future__ import unicode_literals
+
+import unittest
+
+from array import array
+
+from postal.expand import expand_address, ExpandOptions
+from postal.hashing import hash_strings, hash64, hash128
+from postal.near_dupe import name_hashes, near_dupe_hashes
+
+# MurmurHash3_x64_128, seed 0: these must never change, hashes are stored by users
+REFERENCE = [
+    ('', 0, 0),
+    ('hello', 14688674573012802306, 6565844092913065241),
+    ('The quick brown fox jumps over the lazy dog', 16378391709484522348, 8809951995912426311),
+    ('straße', 12381567729567032470, 634043180361967478),
+]
+
+
+class TestHashing(unittest.TestCase):
+    """Test hashed output modes."""
+
+    def test_stable_hashes(self):
+        """Hashes match the published MurmurHash3 values."""
+        strings = [s for s, h1, h2 in REFERENCE]
+        self.assertEqual(list(hash_strings(strings)), [h1 for s, h1, h2 in REFERENCE])
+        self.assertEqual(list(hash_strings(strings, 'hash128')),
+                         [h for s, h1, h2 in REFERENCE for h in (h1, h2)])
+
+        for s, h1, h2 in REFERENCE:
+            self.assertEqual(hash64(s), h1)
+            self.assertEqual(hash64(s.encode('utf-8')), h1)
+            self.assertEqual(hash128(s), (h2 << 64) | h1)
+
+    def test_expand_output(self):
+        """Hashed expansions are the hashes of the string expansions."""
+        address = '30 W 26th St Fl #7'
+        expansions = expand_address(address, languages=['en'])
+        hashes = expand_address(address, languages=['en'], output='hash64')
+        self.assertIsInstance(hashes, array)
+        self.assertEqual(list(hashes), list(hash_strings(expansions)))
+        self.assertEqual(list(expand_address(address, languages=['en'], output='hash128')),
+                         list(hash_strings(expansions, 'hash128')))
+        self.assertEqual(expand_address(address, languages=['en'], output='strings'), expansions)
+
+        options = ExpandOptions(languages=['en'])
+        self.assertEqual(list(expand_address(address, options=options, output='hash64')), list(hashes))
+
+        self.assertRaises(ValueError, expand_address, address, output='md5')
+
+    def test_near_dupe_output(self):
+        """Hashed blocking keys are the hashes of the string keys."""
+        labels = ['house_number', 'road', 'city', 'postcode']
+        values = ['123', 'Broadway', 'New York', '11216']
+        keys = near_dupe_hashes(labels, values, languages=['en'])
+        self.assertEqual(list(near_dupe_hashes(labels, values, languages=['en'], output='hash64')),
+                         list(hash_strings(keys)))
+
+        names = name_hashes('Brooklyn Public Library', languages=['en'])
+        self.assertEqual(list(name_hashes('Brooklyn Public Library', languages=['en'], output='hash128')),
+                         list(hash_strings(names, 'hash128')))
+        self.assertEqual(list(name_hashes('Brooklyn Public Library', options=ExpandOptions(languages=['en']),
+                                          output='hash64')),
+                         list(hash_strings(name_hashes('Brooklyn Public Library',
+                                                       options=ExpandOptions(languages=['en'])))))
+
+
+if __name__ == '__main__':
+    unittest.main()
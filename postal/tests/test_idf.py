@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""Test the token IDF model."""
+
+from __future__ import unicode_literals
+
+import math
+import os
+import shutil
+import tempfile
+import unittest
+
+from postal.idf import TokenIDFModel
+
+CORPUS = [
+    'Whole Foods Market',
+    'Whole Foods',
+    'Brooklyn Public Library (Central Branch)',
+    'Brooklyn Museum',
+    'Main Street Market',
+]
+
+
+class TestTokenIDFModel(unittest.TestCase):
+    """Test building, scoring and saving IDF models."""
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_build_and_score(self):
+        model = TokenIDFModel.build(CORPUS)
+        self.assertEqual(model.num_docs, len(CORPUS))
+        self.assertEqual(model.doc_freq('whole'), 2)
+        self.assertEqual(model.doc_freq('market'), 2)
+        # Parentheticals are stripped by default
+        self.assertEqual(model.doc_freq('central'), 0)
+        self.assertTrue(model.idf('museum') > model.idf('whole'))
+
+        (tokens, scores), = model.score(['Whole Foods Market'])
+        self.assertEqual(tokens, ['whole', 'foods', 'market'])
+        self.assertAlmostEqual(math.sqrt(sum(s * s for s in scores)), 1.0)
+
+        self.assertRaises(TypeError, model.score, 'Whole Foods')
+
+    def test_save_load(self):
+        model = TokenIDFModel.build(CORPUS)
+        path = os.path.join(self.tempdir, 'corpus.idf')
+        model.save(path)
+
+        loaded = TokenIDFModel.load(path)
+        try:
+            self.assertEqual(len(loaded), len(model))
+            self.assertEqual(loaded.num_docs, model.num_docs)
+            for token in ('whole', 'brooklyn', 'museum', 'nonexistent'):
+                self.assertEqual(loaded.doc_freq(token), model.doc_freq(token))
+            self.assertEqual(loaded.score(CORPUS), model.score(CORPUS))
+            self.assertRaises(ValueError, loaded.update, ['Trader Joes'])
+        finally:
+            loaded.close()
+
+        with open(os.path.join(self.tempdir, 'bad.idf'), 'wb') as f:
+            f.write(b'not a model')
+        self.assertRaises(ValueError, TokenIDFModel.load, os.path.join(self.tempdir, 'bad.idf'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""Test language classification and the language resolver."""
+
+from __future__ import unicode_literals
+
+import unittest
+
+import postal
+from postal.dedupe import is_toponym_duplicate
+from postal.expand import expand_address
+from postal.language import LanguageResolver, TOKENS, classify_language, classify_languages
+
+
+class TestLanguage(unittest.TestCase):
+    """Test classify_language and LanguageResolver."""
+
+    def test_classify_language(self):
+        address = 'Rue de la Paix 12, Paris'
+        languages = classify_language(address)
+        self.assertTrue(languages)
+        for language, probability in languages:
+            self.assertTrue(0.0 <= probability <= 1.0)
+        self.assertEqual([p for l, p in languages], sorted([p for l, p in languages], reverse=True))
+        self.assertEqual(classify_languages([address, address.encode('utf-8')]), [languages, languages])
+        # Also exposed on the package, imported on first access
+        self.assertEqual(postal.classify_language(address), languages)
+        self.assertIs(postal.classify_languages, classify_languages)
+
+    def test_resolver(self):
+        resolver = LanguageResolver(cache_size=10)
+        self.assertEqual(resolver.resolve('Hauptstr. 5', country='DE'), ['de'])
+        self.assertEqual(resolver.resolve('Hauptstr. 5', languages=['de']), ['de'])
+
+        first = resolver.resolve('30 W 26th St')
+        self.assertEqual(resolver.resolve('30  w 26th st'), first)
+        self.assertEqual(resolver.stats(), (1, 1, 1, 1, 3))
+
+        resolver.clear()
+        self.assertEqual(resolver.stats(), (0, 0, 0, 0, 0))
+
+    def test_resolve_many(self):
+        resolver = LanguageResolver(signature=TOKENS)
+        texts = ['12 Main St', '14 Main St', 'Rue de la Paix', 'Hauptstr. 5']
+        results = resolver.resolve_many(texts, countries=[None, None, None, 'de'])
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[3], ['de'])
+        self.assertEqual(results[:3], [LanguageResolver(signature=TOKENS).resolve(t) for t in texts[:3]])
+
+        stats = resolver.stats()
+        self.assertEqual((stats.classifier_calls, stats.cache_hits, stats.country_defaults), (2, 1, 1))
+
+    def test_wrap(self):
+        resolver = LanguageResolver()
+        expand = resolver.wrap(expand_address)
+        address = 'Friedrichstraße 128, Berlin'
+        self.assertEqual(expand(address, country='de'), expand_address(address, languages=['de']))
+        self.assertEqual(resolver.stats().country_defaults, 1)
+
+        # Languages given positionally are used as is
+        self.assertEqual(expand(address, ['de']), expand_address(address, languages=['de']))
+        self.assertEqual(resolver.stats().explicit, 1)
+
+        # Record-style functions aren't supported
+        self.assertRaises(TypeError, resolver.wrap(is_toponym_duplicate),
+                          ['city'], ['Berlin'], ['city'], ['Berlin'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""Test explicit model loading."""
+
+from __future__ import unicode_literals
+
+import subprocess
+import sys
+import unittest
+import postal
+from postal.loader import LIBPOSTAL, PARSER, LANGUAGE_CLASSIFIER
+
+
+class TestLoader(unittest.TestCase):
+    """Test postal.setup and postal.warmup."""
+
+    def test_setup(self):
+        """Setup loads dependencies and reports stats per component."""
+        stats = postal.setup(components=(PARSER,))
+        self.assertEqual(set(stats), set([LIBPOSTAL, PARSER]))
+        for component_stats in stats.values():
+            self.assertTrue(component_stats.seconds >= 0)
+
+        # Already loaded components report their original stats
+        self.assertEqual(postal.setup(components=PARSER), stats)
+
+    def test_warmup(self):
+        stats = postal.warmup(components=(LANGUAGE_CLASSIFIER,))
+        self.assertTrue(LANGUAGE_CLASSIFIER in stats)
+
+    def test_invalid_component(self):
+        with self.assertRaises(ValueError):
+            postal.setup(components=('nope',))
+
+    def test_import(self):
+        """Importing postal doesn't import the C extensions."""
+        code = 'import sys, postal; print(any(m.startswith("postal._") for m in sys.modules))'
+        self.assertEqual(subprocess.check_output([sys.executable, '-c', code]).strip(), b'False')
+
+
+if __name__ == '__main__':
+    unittest.main()
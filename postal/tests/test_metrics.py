@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Test the C extension instrumentation."""
+
+from __future__ import unicode_literals
+
+import unittest
+
+from postal import metrics
+from postal.dedupe import is_name_duplicate
+from postal.expand import expand_address
+from postal.parser import parse_address
+
+
+class TestMetrics(unittest.TestCase):
+    """Test recording, snapshots and the Prometheus exporter."""
+
+    def setUp(self):
+        metrics.reset()
+
+    def tearDown(self):
+        metrics.disable()
+        metrics.reset()
+
+    def test_disabled(self):
+        metrics.disable()
+        parse_address('30 W 26th St Fl 7')
+        self.assertEqual(metrics.snapshot()['parse_address']['calls'], 0)
+
+    def test_snapshot(self):
+        metrics.enable()
+        address = '781 Franklin Ave Crown Heights Brooklyn NYC NY 11216 USA'
+        components = parse_address(address)
+        expansions = expand_address(address, languages=['en'])
+        is_name_duplicate('Whole Foods', 'Whole Foods Market', languages=['en'])
+
+        snapshot = metrics.snapshot()
+        parse = snapshot['parse_address']
+        self.assertEqual(parse['calls'], 1)
+        self.assertEqual(parse['errors'], 0)
+        self.assertEqual(parse['input_bytes'], len(address.encode('utf-8')))
+        self.assertEqual(parse['output_items'], len(components))
+        self.assertEqual(set(parse['phases']), set(metrics.PHASES))
+        for phase in parse['phases'].values():
+            self.assertEqual(sum(phase['buckets']), 1)
+            self.assertEqual(len(phase['buckets']), len(metrics.BUCKET_BOUNDS))
+
+        self.assertEqual(snapshot['expand_address']['output_items'], len(expansions))
+        self.assertEqual(snapshot['is_name_duplicate']['calls'], 1)
+
+        metrics.reset()
+        self.assertEqual(metrics.snapshot()['parse_address']['calls'], 0)
+
+    def test_limits(self):
+        """Limit hits are counted with metrics disabled."""
+        metrics.disable()
+        expand_address('30 W 26th St Fl #7', languages=['en'], max_expansions=1)
+        self.assertRaises(ValueError, expand_address, '30 W 26th St Fl #7', max_input_bytes=4)
+
+        expand = metrics.snapshot()['expand_address']
+        self.assertEqual(expand['calls'], 0)
+        self.assertEqual(expand['rejected'], 1)
+        self.assertEqual(expand['truncated'], 1)
+
+    def test_prometheus_text(self):
+        metrics.enable()
+        parse_address('30 W 26th St Fl 7')
+        text = metrics.prometheus_text()
+        self.assertIn('pypostal_calls_total{function="parse_address"} 1', text)
+        self.assertIn('pypostal_phase_seconds_bucket{function="parse_address",phase="libpostal",le="+Inf"} 1', text)
+        self.assertIn('pypostal_phase_seconds_count{function="parse_address",phase="result"} 1', text)
+
+    def test_export_hook(self):
+        exported = []
+        metrics.add_export_hook(exported.append)
+        try:
+            metrics.enable()
+            parse_address('30 W 26th St Fl 7')
+            metrics.export()
+        finally:
+            metrics.remove_export_hook(exported.append)
+        self.assertEqual(len(exported), 1)
+        self.assertEqual(exported[0]['parse_address']['calls'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
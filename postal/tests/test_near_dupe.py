@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Test pypostal near-dupe blocking."""
+
+from __future__ import unicode_literals
+
+import unittest
+
+from postal.near_dupe import NearDupeIndex
+
+
+class TestNearDupeIndex(unittest.TestCase):
+    """Test the blocking index."""
+
+    def test_add_and_query(self):
+        index = NearDupeIndex(languages=['en'])
+        labels = ['house_number', 'road', 'city', 'postcode']
+        index.add(1, labels, ['123', 'Broadway', 'New York', '11216'])
+        index.add(2, labels, ['123', 'Broadway', 'New York', '11216'])
+        index.add(3, labels, ['7', 'Rue de Rivoli', 'Paris', '75001'])
+
+        self.assertEqual(len(index), 3)
+        self.assertIn(2, index)
+        self.assertEqual(index.candidates(labels, ['123', 'Broadway', 'New York', '11216'], exclude=1), [2])
+        self.assertEqual(list(index.candidate_pairs()), [(1, 2)])
+        self.assertRaises(ValueError, index.add, 1, labels, ['1', 'Main St', 'Boston', '02108'])
+
+    def test_keys(self):
+        index = NearDupeIndex()
+        index.add_keys('a', ['k1', 'k2'])
+        index.add_keys('b', ['k2', 'k3'])
+        index.add_keys('c', ['k1', 'k2', 'k3'])
+
+        # Ordered by the number of shared keys
+        self.assertEqual(index.candidates_for_keys(['k1', 'k2', 'k3'], exclude='c'), ['a', 'b'])
+        self.assertEqual(index.candidates_for_keys(['k4']), [])
+        self.assertEqual(sorted(index.candidate_pairs()), [('a', 'b'), ('a', 'c'), ('b', 'c')])
+
+        stats = index.block_stats()
+        self.assertEqual(stats.num_records, 3)
+        self.assertEqual(stats.num_keys, 3)
+        self.assertEqual(stats.num_postings, 7)
+        self.assertEqual(stats.max_block_size, 3)
+        self.assertEqual(stats.histogram, {2: 3})
+
+    def test_max_block_size(self):
+        index = NearDupeIndex(max_block_size=2)
+        for i in range(5):
+            index.add_keys(i, ['hot', 'key{}'.format(i // 2)])
+
+        self.assertEqual(index.candidates_for_keys(['hot']), [])
+        self.assertEqual(index.candidates_for_keys(['hot', 'key0']), [0, 1])
+        self.assertEqual(sorted(index.candidate_pairs()), [(0, 1), (2, 3)])
+
+        stats = index.block_stats()
+        self.assertEqual(stats.num_oversized, 1)
+        self.assertEqual(stats.max_block_size, 5)
+        self.assertEqual(stats.num_postings, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
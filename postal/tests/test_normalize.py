@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Test pypostal normalization."""
+
+from __future__ import unicode_literals
+
+import unittest
+
+from postal import _normalize
+from postal.normalize import normalized_tokens, normalized_tokens_batch, remove_parens, DEFAULT_STRING_OPTIONS, \
+    DEFAULT_TOKEN_OPTIONS
+from postal.token_types import token_types, TokenType
+
+STRINGS = [
+    'Main St (rear entrance) Apt 5',
+    ') Unbalanced ((nested) parens) 12',
+    'Friedrichstraße 128, Berlin',
+    '',
+]
+
+
+class TestNormalize(unittest.TestCase):
+    """Test normalized tokens."""
+
+    def python_tokens(self, s):
+        tokens = _normalize.normalized_tokens(s, DEFAULT_STRING_OPTIONS, DEFAULT_TOKEN_OPTIONS, False)
+        return [(t, token_types.from_id(int(c))) for t, c in remove_parens(tokens)]
+
+    def test_strip_parentheticals(self):
+        """Stripping in C matches remove_parens."""
+        for s in STRINGS:
+            self.assertEqual(normalized_tokens(s), self.python_tokens(s))
+
+        tokens = normalized_tokens(STRINGS[0], strip_parentheticals=False)
+        self.assertIn(token_types.PUNCT_OPEN, [c for t, c in tokens])
+
+    def test_token_types(self):
+        """Token types are TokenType members, interchangeable with token_types values."""
+        for t, c in normalized_tokens(STRINGS[0], strip_parentheticals=False):
+            self.assertIsInstance(c, TokenType)
+            self.assertEqual(c, token_types.from_id(c.value))
+            self.assertEqual(str(c), str(token_types.from_id(c.value)))
+
+        self.assertIn(TokenType.WORD, token_types.WORD_TOKEN_TYPES)
+        self.assertEqual(TokenType.NUMERIC, token_types.NUMERIC.value)
+
+    def test_normalized_tokens_batch(self):
+        """The batch version matches normalized_tokens for each string."""
+        for strip_parentheticals in (True, False):
+            self.assertEqual(normalized_tokens_batch(STRINGS, strip_parentheticals=strip_parentheticals),
+                             [normalized_tokens(s, strip_parentheticals=strip_parentheticals) for s in STRINGS])
+        self.assertEqual(normalized_tokens_batch(iter(STRINGS[:1])), [normalized_tokens(STRINGS[0])])
+        self.assertEqual(normalized_tokens_batch([]), [])
+        self.assertRaises(TypeError, normalized_tokens_batch, [None])
+        self.assertRaises(TypeError, normalized_tokens_batch, STRINGS, languages=[1])
+        self.assertRaises(TypeError, normalized_tokens_batch, STRINGS, languages='en')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,8 +3,12 @@
 
 from __future__ import unicode_literals
 
+import pickle
 import unittest
-from postal.parser import parse_address
+from postal.expand import expand_address, ExpandOptions, ADDRESS_HOUSE_NUMBER, ADDRESS_STREET, ADDRESS_TOPONYM, \
+    ADDRESS_POSTAL_CODE
+from postal.hashing import hash_strings
+from postal.parser import parse_address, parse_addresses, parse_and_expand, parse_and_expand_batch, ParsedAddress
 
 
 class TestParser(unittest.TestCase):
@@ -37,6 +41,85 @@ class TestParser(unittest.TestCase):
                                  'country': 'usa'
                                  })
 
+    def test_parse_addresses(self):
+        """Batch parsing matches one-at-a-time parsing."""
+        addresses = [
+            '781 Franklin Ave Crown Heights Brooklyn NYC NY 11216 USA',
+            'The Book Club 100-106 Leonard St, Shoreditch, London, Greater London, EC2A 4RH, United Kingdom',
+            '',
+        ]
+
+        expected = [parse_address(address) for address in addresses]
+        self.assertEqual(list(parse_addresses(addresses, chunk_size=2)), expected)
+
+        countries = ['us', 'gb', None]
+        expected = [parse_address(address, country=country) for address, country in zip(addresses, countries)]
+        self.assertEqual(list(parse_addresses(addresses, country=countries)), expected)
+
+        with self.assertRaises(ValueError):
+            list(parse_addresses(addresses, language=['en']))
+
+    def test_compact(self):
+        """ParsedAddress behaves like the list of tuples, plus lookup by label."""
+        address = '781 Franklin Ave, Brooklyn, NY 11216, USA'
+        expected = parse_address(address)
+        parsed = parse_address(address, compact=True)
+
+        self.assertIsInstance(parsed, ParsedAddress)
+        self.assertEqual(parsed, expected)
+        self.assertEqual(list(parsed), expected)
+        self.assertEqual(len(parsed), len(expected))
+        self.assertEqual(parsed[0], expected[0])
+        self.assertEqual(parsed[-1], expected[-1])
+        self.assertEqual(parsed.labels(), [label for value, label in expected])
+
+        components = {}
+        for value, label in expected:
+            components[label] = components[label] + ' ' + value if label in components else value
+        self.assertEqual(parsed.to_dict(), components)
+        for label, value in components.items():
+            self.assertIn(label, parsed)
+            self.assertEqual(parsed[label], value)
+
+        self.assertNotIn('world_region', parsed)
+        self.assertRaises(KeyError, lambda: parsed['world_region'])
+        self.assertIsNone(parsed.get('world_region'))
+        self.assertEqual(parsed.get('world_region', ''), '')
+
+        self.assertEqual(pickle.loads(pickle.dumps(parsed)), parsed)
+        self.assertEqual(ParsedAddress(expected), parsed)
+        self.assertEqual(parse_address('', compact=True).to_dict(), {})
+
+        addresses = [address, '', 'Friedrichstraße 128, Berlin']
+        self.assertEqual(list(parse_addresses(addresses, compact=True)),
+                         [parse_address(a) for a in addresses])
+
+    def test_parse_and_expand(self):
+        """Expansions use the address components for each label."""
+        address = '781 Franklin Ave Crown Heights Brooklyn NY 11216'
+        masks = {'house_number': ADDRESS_HOUSE_NUMBER, 'road': ADDRESS_STREET, 'postcode': ADDRESS_POSTAL_CODE}
+
+        result = parse_and_expand(address, languages=['en'])
+        self.assertEqual([(c.component, c.label) for c in result], parse_address(address))
+        for component, label, expansions in result:
+            self.assertEqual(expansions, expand_address(component, languages=['en'],
+                                                        address_components=masks.get(label, ADDRESS_TOPONYM)))
+
+        # The parser's language is used for expansion too
+        self.assertEqual(parse_and_expand(address, language='en'), result)
+        self.assertEqual(parse_and_expand(address, options=ExpandOptions(languages=['en'])), result)
+        self.assertEqual([list(c.expansions) for c in parse_and_expand(address, languages=['en'], output='hash64')],
+                         [list(hash_strings(c.expansions)) for c in result])
+
+        batch = parse_and_expand_batch([address, '30 W 26th St'], languages=['en'])
+        self.assertEqual(batch, [result, parse_and_expand('30 W 26th St', languages=['en'])])
+        self.assertEqual(parse_and_expand_batch([address], language=['en']), [result])
+        # Rows without a language use the classifier
+        self.assertEqual(parse_and_expand_batch([address, address], language=['en', None]),
+                         [result, parse_and_expand(address)])
+        self.assertEqual(parse_and_expand_batch([]), [])
+        self.assertRaises(TypeError, parse_and_expand, address, address_components=ADDRESS_STREET)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Test the pre-fork process pool."""
+
+from __future__ import unicode_literals
+
+import gc
+import os
+import unittest
+
+from postal.dedupe import is_name_duplicate
+from postal.expand import expand_address
+from postal.parser import parse_address
+from postal.pool import PostalPool, process_memory
+
+ADDRESSES = [
+    '781 Franklin Ave Crown Heights Brooklyn NYC NY 11216 USA',
+    'Friedrichstraße 128, Berlin, Germany',
+    '30 W 26th St Fl 7',
+]
+
+
+class TestPostalPool(unittest.TestCase):
+    """Test mapping over the pool's workers."""
+
+    def test_pool(self):
+        addresses = ADDRESSES * 10
+        with PostalPool(processes=2, chunk_size=4) as pool:
+            self.assertEqual(list(pool.parse_addresses(addresses)), [parse_address(a) for a in addresses])
+            self.assertEqual(list(pool.expand_addresses(addresses, languages=['en'])),
+                             [expand_address(a, languages=['en']) for a in addresses])
+            self.assertEqual(pool.map(expand_address, addresses, languages=['en']),
+                             [expand_address(a, languages=['en']) for a in addresses])
+
+            pairs = [('Whole Foods', 'Whole Foods'), ('Whole Foods', 'Trader Joes')]
+            self.assertEqual(pool.starmap(is_name_duplicate, pairs, languages=['en']),
+                             [is_name_duplicate(a, b, languages=['en']) for a, b in pairs])
+
+            if process_memory(os.getpid()) is not None:
+                memory = pool.memory()
+                self.assertEqual(len(memory), 2)
+                for m in memory:
+                    self.assertTrue(m.rss > 0)
+                    self.assertTrue(m.unique <= m.rss)
+
+    def test_gc_state(self):
+        """The parent's GC isn't left frozen, with or without a with block."""
+        if not hasattr(gc, 'freeze'):
+            return
+        pool = PostalPool(processes=1)
+        try:
+            self.assertEqual(gc.get_freeze_count(), 0)
+        finally:
+            pool.terminate()
+            pool.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Test pypostal tokenization."""
+
+from __future__ import unicode_literals
+
+import unittest
+
+from postal.tokenize import tokenize, tokenize_arrays, tokenize_arrays_batch, BYTES, CODE_POINTS
+from postal.token_types import token_types
+
+STRINGS = [
+    'Friedrichstraße 128, Berlin',
+    '92 Avenue des Champs-Élysées',
+    '',
+    '781 Franklin Ave Crown Heights Brooklyn NYC NY 11216 USA',
+]
+
+
+class TestTokenize(unittest.TestCase):
+    """Test tokenization."""
+
+    def test_tokenize_arrays(self):
+        """Columnar tokens match tokenize."""
+        for s in STRINGS:
+            expected = tokenize(s)
+
+            arrays = tokenize_arrays(s, unit=CODE_POINTS)
+            self.assertEqual([(s[o:o + l], token_types.from_id(t))
+                              for o, l, t in zip(arrays.offsets, arrays.lengths, arrays.types)], expected)
+
+            encoded = s.encode('utf-8')
+            arrays = tokenize_arrays(s, unit=BYTES)
+            self.assertEqual([(encoded[o:o + l].decode('utf-8'), token_types.from_id(t))
+                              for o, l, t in zip(arrays.offsets, arrays.lengths, arrays.types)], expected)
+
+        self.assertRaises(ValueError, tokenize_arrays, STRINGS[0], unit='words')
+
+    def test_tokenize_arrays_batch(self):
+        """The batch version concatenates the per-string arrays."""
+        for unit in (BYTES, CODE_POINTS):
+            batch = tokenize_arrays_batch(STRINGS, unit=unit)
+            self.assertEqual(len(batch.row_index), len(STRINGS) + 1)
+            self.assertEqual(batch.row_index[-1], len(batch.offsets))
+
+            for i, s in enumerate(STRINGS):
+                start, end = batch.row_index[i], batch.row_index[i + 1]
+                arrays = tokenize_arrays(s, unit=unit)
+                self.assertEqual(batch.offsets[start:end], arrays.offsets)
+                self.assertEqual(batch.lengths[start:end], arrays.lengths)
+                self.assertEqual(batch.types[start:end], arrays.types)
+
+
+if __name__ == '__main__':
+    unittest.main()
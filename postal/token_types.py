@@ -1,3 +1,5 @@
+from enum import IntEnum
+
 from postal._token_types import *
 from postal.utils.enum import Enum, EnumValue
 
@@ -103,3 +105,26 @@ class token_types(Enum):
         WHITESPACE,
         NEWLINE,
     ])
+
+
+class _TokenType(IntEnum):
+    # Prints as the bare name like the EnumValues in token_types
+    def __str__(self):
+        return self.name
+
+    __repr__ = __str__
+
+
+# Native int enum with the same names and values as token_types, returned by
+# normalized_tokens. Members are ints, so they compare and hash equal to both
+# the raw ids and the corresponding token_types values.
+TokenType = _TokenType('TokenType', [(name, v.value) for name, v in sorted(token_types.name_registry.items(),
+                                                                          key=lambda item: item[1].value)])
+
+
+def token_type_table():
+    """Tuple of TokenType members indexed by token type id, None for unused ids."""
+    table = [None] * (max(TokenType) + 1)
+    for t in TokenType:
+        table[t] = t
+    return tuple(table)
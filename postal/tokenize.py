@@ -1,10 +1,78 @@
+from array import array
+from collections import namedtuple
+
 from postal import _tokenize
 from postal.utils.encoding import safe_encode, safe_decode
 from postal.token_types import token_types
 
+# Units for the offsets and lengths returned by tokenize_arrays
+BYTES = 'bytes'
+CODE_POINTS = 'code_points'
+
+_units = {
+    BYTES: _tokenize.TOKEN_OFFSETS_BYTES,
+    CODE_POINTS: _tokenize.TOKEN_OFFSETS_CODE_POINTS,
+}
+
+TokenArrays = namedtuple('TokenArrays', 'offsets, lengths, types')
+TokenArraysBatch = namedtuple('TokenArraysBatch', 'offsets, lengths, types, row_index')
+
 
 def tokenize(s, whitespace=False):
     u = safe_decode(s)
     s = safe_encode(s)
     return [(safe_decode(s[start:start + length]), token_types.from_id(token_type))
             for start, length, token_type in _tokenize.tokenize(u, whitespace)]
+
+
+def _unit(unit):
+    try:
+        return _units[unit]
+    except KeyError:
+        raise ValueError('Invalid unit: {}, must be one of {}'.format(unit, ', '.join(sorted(_units))))
+
+
+def _uint32_array(b):
+    a = array('I')
+    a.frombytes(b)
+    return a
+
+
+def tokenize_arrays(s, whitespace=False, unit=CODE_POINTS):
+    """
+    Tokenize a string into columns instead of one tuple per token.
+
+    Returns TokenArrays(offsets, lengths, types), three array('I') of the same length
+    with the start and length of each token and its token type id (see
+    postal.token_types).
+
+    @param s: the string as either Unicode or a UTF-8 encoded string
+    @param whitespace: include whitespace tokens
+    @param unit: CODE_POINTS for offsets/lengths which index into the decoded string
+                 e.g. s[offset:offset + length], or BYTES for offsets/lengths into its
+                 UTF-8 encoding.
+    """
+    offsets, lengths, types = _tokenize.tokenize_arrays(s, whitespace, _unit(unit))
+    return TokenArrays(_uint32_array(offsets), _uint32_array(lengths), _uint32_array(types))
+
+
+def tokenize_arrays_batch(strings, whitespace=False, unit=CODE_POINTS):
+    """
+    Tokenize many strings into one set of flat columns.
+
+    Returns TokenArraysBatch(offsets, lengths, types, row_index). offsets, lengths
+    and types are array('I') holding the tokens of every string back to back, with
+    offsets relative to the start of each string. row_index is an array('Q') of
+    len(strings) + 1 entries: the tokens of strings[i] are at positions
+    row_index[i] to row_index[i + 1] in the other arrays.
+
+    @param strings: a sequence of strings as either Unicode or UTF-8 encoded strings
+    @param whitespace: include whitespace tokens
+    @param unit: CODE_POINTS or BYTES, see tokenize_arrays
+    """
+    if not isinstance(strings, (list, tuple)):
+        strings = list(strings)
+    offsets, lengths, types, row_index = _tokenize.tokenize_arrays_batch(strings, whitespace, _unit(unit))
+    index = array('Q')
+    index.frombytes(row_index)
+    return TokenArraysBatch(_uint32_array(offsets), _uint32_array(lengths), _uint32_array(types), index)
@@ -0,0 +1,76 @@
+"""Geohash encoding, as used by libpostal for near_dupe_hashes, and cell neighbors."""
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+BASE32_INDEX = dict((c, i) for i, c in enumerate(BASE32))
+
+
+def encode(latitude, longitude, precision):
+    """Geohash of the given point with precision characters."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            r, x = lon_range, longitude
+        else:
+            r, x = lat_range, latitude
+        mid = (r[0] + r[1]) / 2.0
+        if x >= mid:
+            value = (value << 1) | 1
+            r[0] = mid
+        else:
+            value <<= 1
+            r[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def bounds(geohash):
+    """(min_latitude, min_longitude, max_latitude, max_longitude) of a geohash cell."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for c in geohash:
+        value = BASE32_INDEX[c]
+        for shift in range(4, -1, -1):
+            r = lon_range if even else lat_range
+            mid = (r[0] + r[1]) / 2.0
+            if (value >> shift) & 1:
+                r[0] = mid
+            else:
+                r[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def neighbors(geohash):
+    """The geohash and its (up to) 8 neighbors of the same precision, wrapping around the antimeridian."""
+    min_lat, min_lon, max_lat, max_lon = bounds(geohash)
+    height = max_lat - min_lat
+    width = max_lon - min_lon
+    center_lat = (min_lat + max_lat) / 2.0
+    center_lon = (min_lon + max_lon) / 2.0
+
+    result = []
+    for dlat in (0, -1, 1):
+        lat = center_lat + dlat * height
+        if lat < -90.0 or lat > 90.0:
+            continue
+        for dlon in (0, -1, 1):
+            lon = center_lon + dlon * width
+            if lon >= 180.0:
+                lon -= 360.0
+            elif lon < -180.0:
+                lon += 360.0
+            cell = encode(lat, lon, len(geohash))
+            if cell not in result:
+                result.append(cell)
+    return result
@@ -44,6 +44,10 @@ def main():
         install_requires=[
             'six',
         ],
+        extras_require={
+            'arrow': ['pyarrow>=8.0'],
+            'pandas': ['pyarrow>=8.0', 'pandas>=2.0'],
+        },
         setup_requires=[],
         ext_modules=[
             Extension('postal._expand',